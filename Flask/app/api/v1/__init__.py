@@ -35,7 +35,10 @@ from .order_api import ns as order_ns
 from .verification_api import ns as verification_ns
 from .freelancer_profile_api import ns as freelancer_profile_ns
 from .employer_profile_api import ns as employer_profile_ns
-# from .admin_api import ns as admin_ns  # 可选，如果有管理员API
+from .communication_api import ns as communication_ns
+from .wallet_api import ns as wallet_ns
+from .admin_auth_api import ns as admin_auth_ns
+from .admin_api import ns as admin_ns
 
 # 添加命名空间到API
 api.add_namespace(user_ns)
@@ -47,7 +50,10 @@ api.add_namespace(order_ns)
 api.add_namespace(verification_ns)
 api.add_namespace(freelancer_profile_ns)
 api.add_namespace(employer_profile_ns)
-# api.add_namespace(admin_ns)  # 可选，如果有管理员API
+api.add_namespace(communication_ns)
+api.add_namespace(wallet_ns)
+api.add_namespace(admin_auth_ns, path='/admin/auth')
+api.add_namespace(admin_ns)
 
 # 您可以在这里添加其他的 namespace
 # e.g., for jobs, orders, etc.
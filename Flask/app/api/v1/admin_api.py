@@ -0,0 +1,156 @@
+from flask import request
+from flask_restx import Namespace, Resource, fields, reqparse, inputs
+from flask_jwt_extended import jwt_required
+
+from app.schemas.dispute_schema import DisputeSchema
+from app.schemas.job_schema import JobSchema
+from app.schemas.report_schema import ReportSchema
+from app.schemas.wallet_schema import WithdrawalRequestSchema
+from app.services.admin_auth_service import admin_auth_service
+from app.services.admin_dispute_report_service import admin_dispute_service, admin_report_service
+from app.services.admin_finance_service import admin_finance_service
+from app.services.admin_job_service import admin_job_service
+from app.services.communication_service import notification_service
+from app.utils.helpers import api_success_response
+from app.utils.pagination import pagination_meta
+
+ns = Namespace('admin', description='[Admin] 审核队列与公告管理')
+
+broadcast_input_model = ns.model('BroadcastInput', {
+    'title': fields.String(required=True, description='公告标题 (最多100字)'),
+    'content': fields.String(required=True, description='公告内容'),
+    'audience': fields.String(description='广播对象', enum=list(notification_service.BROADCAST_AUDIENCES), default='all'),
+    'notification_type': fields.String(description='公告类型', enum=list(notification_service.BROADCAST_NOTIFICATION_TYPES),
+                                       default='system_announcement'),
+})
+broadcast_status_model = ns.model('BroadcastStatus', {
+    'broadcast_id': fields.String(),
+    'audience': fields.String(),
+    'status': fields.String(description='pending/running/completed/failed'),
+    'sent': fields.Integer(description='已发送通知数'),
+    'started_at': fields.String(),
+    'finished_at': fields.String(),
+    'error': fields.String(),
+})
+
+paginated_review_queue_model = ns.model('PaginatedReviewQueue', {
+    'items': fields.List(fields.Raw()),
+    'page': fields.Integer(description='当前页码'),
+    'per_page': fields.Integer(description='每页数量'),
+    'total_pages': fields.Integer(description='总页数'),
+    'total_items': fields.Integer(description='总条目数'),
+    'next_cursor': fields.String(description='下一页游标 (仅游标分页时返回, 没有更多数据时为 null)'),
+    'has_next': fields.Boolean(description='是否还有下一页 (仅游标分页时返回)')
+})
+
+
+def _review_queue_parser(sort_choices):
+    parser = reqparse.RequestParser()
+    parser.add_argument('page', type=int, location='args', default=1, help='页码')
+    parser.add_argument('per_page', type=int, location='args', default=10, help='每页数量')
+    parser.add_argument('cursor', type=str, location='args', help='分页游标 (传入即启用游标分页, 首页传空字符串, 后续传上一页返回的 next_cursor)')
+    parser.add_argument('include_total', type=inputs.boolean, location='args', default=False, help='游标分页时是否返回总条目数')
+    parser.add_argument('sort_by', type=str, location='args', choices=sort_choices, help='排序方式 (默认按创建时间升序)')
+    return parser
+
+
+pending_jobs_parser = _review_queue_parser(('created_at_asc', 'created_at_desc', 'salary_desc'))
+pending_withdrawals_parser = _review_queue_parser(('created_at_asc', 'created_at_desc', 'amount_asc', 'amount_desc'))
+pending_withdrawals_parser.add_argument('withdrawal_method', type=str, location='args', help='按提现方式筛选')
+pending_disputes_parser = _review_queue_parser(('created_at_asc', 'created_at_desc', 'status'))
+pending_disputes_parser.add_argument('status', type=str, location='args', help='按争议状态筛选')
+pending_reports_parser = _review_queue_parser(('created_at_asc', 'created_at_desc', 'report_type'))
+pending_reports_parser.add_argument('report_type', type=str, location='args', help='按举报类型筛选')
+
+
+def _review_queue_response(paginated, schema):
+    return api_success_response({'items': schema.dump(paginated.items), **pagination_meta(paginated)})
+
+
+@ns.route('/notifications/broadcasts')
+class AdminBroadcastListResource(Resource):
+    @jwt_required()
+    @ns.expect(broadcast_input_model)
+    @ns.response(202, 'Accepted', model=broadcast_status_model)
+    @ns.response(403, 'Admin token required')
+    @ns.doc(description="向全体或一类用户广播系统公告 (Admin)，后台分块写入，返回广播ID用于查询进度")
+    def post(self):
+        admin_auth_service.require_admin()
+        data = request.get_json() or {}
+        status = notification_service.start_broadcast(data, audience=data.get('audience') or 'all')
+        return api_success_response(ns.marshal(status, broadcast_status_model), 202)
+
+
+@ns.route('/notifications/broadcasts/<string:broadcast_id>')
+@ns.param('broadcast_id', '广播ID')
+class AdminBroadcastDetailResource(Resource):
+    @jwt_required()
+    @ns.response(200, 'Success', model=broadcast_status_model)
+    @ns.response(403, 'Admin token required')
+    @ns.doc(description="查询公告广播进度 (Admin)")
+    def get(self, broadcast_id):
+        admin_auth_service.require_admin()
+        return api_success_response(ns.marshal(notification_service.get_broadcast_status(broadcast_id), broadcast_status_model))
+
+
+@ns.route('/jobs/pending-review')
+class AdminPendingJobsResource(Resource):
+    @jwt_required()
+    @ns.expect(pending_jobs_parser)
+    @ns.response(200, 'Success', model=paginated_review_queue_model)
+    @ns.doc(description="待审核工作列表 (Admin)")
+    def get(self):
+        admin_auth_service.require_admin()
+        args = pending_jobs_parser.parse_args()
+        paginated_jobs = admin_job_service.get_jobs_pending_review(
+            page=args.get('page'), per_page=args.get('per_page'), sort_by=args.get('sort_by'),
+            cursor=args.get('cursor'), include_total=args.get('include_total'))
+        return _review_queue_response(paginated_jobs, JobSchema(many=True))
+
+
+@ns.route('/withdrawals/pending')
+class AdminPendingWithdrawalsResource(Resource):
+    @jwt_required()
+    @ns.expect(pending_withdrawals_parser)
+    @ns.response(200, 'Success', model=paginated_review_queue_model)
+    @ns.doc(description="待处理提现申请列表 (Admin)")
+    def get(self):
+        admin_auth_service.require_admin()
+        args = pending_withdrawals_parser.parse_args()
+        paginated_withdrawals = admin_finance_service.get_pending_withdrawal_requests(
+            filters={'withdrawal_method': args.get('withdrawal_method')},
+            page=args.get('page'), per_page=args.get('per_page'), sort_by=args.get('sort_by'),
+            cursor=args.get('cursor'), include_total=args.get('include_total'))
+        return _review_queue_response(paginated_withdrawals, WithdrawalRequestSchema(many=True))
+
+
+@ns.route('/disputes/pending')
+class AdminPendingDisputesResource(Resource):
+    @jwt_required()
+    @ns.expect(pending_disputes_parser)
+    @ns.response(200, 'Success', model=paginated_review_queue_model)
+    @ns.doc(description="待处理争议列表 (Admin)")
+    def get(self):
+        admin_auth_service.require_admin()
+        args = pending_disputes_parser.parse_args()
+        paginated_disputes = admin_dispute_service.get_pending_disputes(
+            filters={'status': args.get('status')},
+            page=args.get('page'), per_page=args.get('per_page'), sort_by=args.get('sort_by'),
+            cursor=args.get('cursor'), include_total=args.get('include_total'))
+        return _review_queue_response(paginated_disputes, DisputeSchema(many=True))
+
+
+@ns.route('/reports/pending')
+class AdminPendingReportsResource(Resource):
+    @jwt_required()
+    @ns.expect(pending_reports_parser)
+    @ns.response(200, 'Success', model=paginated_review_queue_model)
+    @ns.doc(description="待处理举报列表 (Admin)")
+    def get(self):
+        admin_auth_service.require_admin()
+        args = pending_reports_parser.parse_args()
+        paginated_reports = admin_report_service.get_pending_reports(
+            filters={'report_type': args.get('report_type')},
+            page=args.get('page'), per_page=args.get('per_page'), sort_by=args.get('sort_by'),
+            cursor=args.get('cursor'), include_total=args.get('include_total'))
+        return _review_queue_response(paginated_reports, ReportSchema(many=True))
@@ -0,0 +1,34 @@
+from flask import request
+from flask_restx import Namespace, Resource, fields
+
+from app.services.admin_auth_service import admin_auth_service
+from app.utils.helpers import api_success_response
+
+ns = Namespace('admin_auth', description='[Admin] 管理员登录')
+
+admin_login_input_model = ns.model('AdminLoginInput', {
+    'username': fields.String(required=True, description='管理员登录账号'),
+    'password': fields.String(required=True, description='密码'),
+})
+admin_output_model = ns.model('AdminOutput', {
+    'id': fields.Integer(),
+    'username': fields.String(),
+    'real_name': fields.String(),
+    'role': fields.String(),
+})
+admin_login_output_model = ns.model('AdminLoginOutput', {
+    'access_token': fields.String(description='管理员JWT访问令牌'),
+    'admin': fields.Nested(admin_output_model),
+})
+
+
+@ns.route('/login')
+class AdminLoginResource(Resource):
+    @ns.expect(admin_login_input_model)
+    @ns.response(200, 'Login successful', model=admin_login_output_model)
+    @ns.response(401, 'Authentication failed')
+    @ns.doc(description="管理员登录，返回带管理员声明的访问令牌 (用于 /admin 下的审核队列等管理接口)")
+    def post(self):
+        data = request.get_json() or {}
+        admin, token = admin_auth_service.login(data.get('username'), data.get('password'))
+        return api_success_response({'access_token': token, 'admin': ns.marshal(admin, admin_output_model)})
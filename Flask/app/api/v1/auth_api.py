@@ -1,10 +1,11 @@
 from flask_restx import Namespace, Resource, fields
 from flask import request, current_app
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity # 用于生成 JWT
+from flask_jwt_extended import create_access_token, jwt_required # 用于生成 JWT
 import datetime
 import bcrypt
 
 from app.services.user_service import user_service # 导入 UserService 实例
+from app.services.identity_service import identity_service
 from app.schemas.user_schema import UserSchema # For serializing user output
 from app.utils.exceptions import AuthenticationException, InvalidUsageException, BusinessException # For catching
 from app.utils.helpers import api_success_response, api_error_response # 假设有响应格式化帮助函数
@@ -142,14 +143,9 @@ class UserMe(Resource):
     @ns.response(404, 'User not found')
     def get(self):
         """获取当前登录用户信息"""
-        current_user_identity = get_jwt_identity() # This will be user's uuid or id
         try:
-            # Assuming get_jwt_identity() returns the user's primary key (id or uuid)
-            # Adjust based on what you store in the JWT (e.g., user.id or user.uuid)
-            # If it's UUID, you might need a get_user_by_uuid method in your service
-            user = user_service.get_user_by_uuid(current_user_identity) # Or get_user_by_id if ID is used
-            if not user:
-                 user = user_service.get_user_by_id(current_user_identity)
+            # JWT identity (UUID) 通过身份解析服务转换为用户ID
+            user = user_service.get_user_by_id(identity_service.current_user_id())
             
             if not user:
                 return api_error_response("用户未找到", 404)
@@ -0,0 +1,139 @@
+from flask import Response, request
+from flask_restx import Namespace, Resource, fields, reqparse, inputs
+from flask_jwt_extended import jwt_required
+
+from app.core.extensions import db
+from app.schemas.notification_schema import NotificationSchema
+from app.services.communication_service import message_service, notification_service
+from app.services.identity_service import identity_service
+from app.services.realtime_service import realtime_service
+from app.services.unread_counter_service import unread_counter_service
+from app.utils.helpers import api_success_response
+from app.utils.pagination import pagination_meta
+
+ns = Namespace('communications', description='消息与通知')
+
+conversation_summary_model = ns.model('ConversationSummary', {
+    'conversation_id': fields.String(),
+    'other_party_id': fields.Integer(),
+    'other_party_nickname': fields.String(),
+    'other_party_avatar_url': fields.String(),
+    'last_message_content': fields.String(description='最新消息摘要'),
+    'last_message_created_at': fields.DateTime(),
+    'unread_count': fields.Integer()
+})
+paginated_conversations_model = ns.model('PaginatedConversations', {
+    'items': fields.List(fields.Nested(conversation_summary_model)),
+    'pagination': fields.Raw(description='分页信息 (page/per_page/total_pages/total_items，游标分页时含 next_cursor/has_next)')
+})
+unread_summary_model = ns.model('UnreadSummary', {
+    'notifications': fields.Integer(description='未读通知数'),
+    'messages': fields.Integer(description='未读消息数'),
+    'total': fields.Integer(description='未读合计')
+})
+notification_output_model = ns.model('NotificationOutput', {
+    'id': fields.Integer(),
+    'notification_type': fields.String(),
+    'title': fields.String(),
+    'content': fields.String(),
+    'related_resource_type': fields.String(),
+    'related_resource_id': fields.Integer(),
+    'is_read': fields.Boolean(),
+    'read_at': fields.DateTime(),
+    'created_at': fields.DateTime()
+})
+paginated_notifications_model = ns.model('PaginatedNotifications', {
+    'items': fields.List(fields.Nested(notification_output_model)),
+    'page': fields.Integer(description='当前页码'),
+    'per_page': fields.Integer(description='每页数量'),
+    'total_pages': fields.Integer(description='总页数'),
+    'total_items': fields.Integer(description='总条目数'),
+    'next_cursor': fields.String(description='下一页游标 (仅游标分页时返回, 没有更多数据时为 null)'),
+    'has_next': fields.Boolean(description='是否还有下一页 (仅游标分页时返回)')
+})
+
+conversation_list_parser = reqparse.RequestParser()
+conversation_list_parser.add_argument('page', type=int, location='args', default=1, help='页码')
+conversation_list_parser.add_argument('per_page', type=int, location='args', default=10, help='每页数量')
+conversation_list_parser.add_argument('cursor', type=str, location='args', help='游标分页: 上一页返回的 next_cursor，传空字符串表示第一页')
+conversation_list_parser.add_argument('include_total', type=inputs.boolean, location='args', default=False, help='游标分页时是否返回总数')
+
+notification_list_parser = reqparse.RequestParser()
+notification_list_parser.add_argument('page', type=int, location='args', default=1, help='页码')
+notification_list_parser.add_argument('per_page', type=int, location='args', default=20, help='每页数量')
+notification_list_parser.add_argument('cursor', type=str, location='args', help='分页游标 (传入即启用游标分页, 首页传空字符串, 后续传上一页返回的 next_cursor)')
+notification_list_parser.add_argument('include_total', type=inputs.boolean, location='args', default=False, help='游标分页时是否返回总条目数')
+notification_list_parser.add_argument('is_read', type=inputs.boolean, location='args', help='按已读状态筛选')
+notification_list_parser.add_argument('notification_type', type=str, location='args', help='按通知类型筛选')
+
+
+@ns.route('/messages/conversations')
+class MessageConversationsResource(Resource):
+    @jwt_required()
+    @ns.response(200, 'Success', model=paginated_conversations_model)
+    @ns.expect(conversation_list_parser)
+    @ns.doc(description="获取我的会话列表")
+    def get(self):
+        args = conversation_list_parser.parse_args()
+        result = message_service.get_user_conversations_summary(
+            identity_service.current_user_id(),
+            page=args.get('page'),
+            per_page=args.get('per_page'),
+            cursor=args.get('cursor'),
+            include_total=args.get('include_total')
+        )
+        return api_success_response({
+            'items': ns.marshal(result['items'], conversation_summary_model),
+            'pagination': result['pagination']
+        })
+
+
+@ns.route('/notifications/me')
+class UserNotificationsResource(Resource):
+    @jwt_required()
+    @ns.expect(notification_list_parser)
+    @ns.response(200, 'Success', model=paginated_notifications_model)
+    @ns.doc(description="获取我的通知 (按时间倒序)")
+    def get(self):
+        args = notification_list_parser.parse_args()
+        filters = {key: args.get(key) for key in ('is_read', 'notification_type') if args.get(key) is not None}
+        paginated_notifications = notification_service.get_my_notifications(
+            identity_service.current_user_id(),
+            filters=filters,
+            page=args.get('page'),
+            per_page=args.get('per_page'),
+            cursor=args.get('cursor'),
+            include_total=args.get('include_total')
+        )
+        return api_success_response({
+            'items': NotificationSchema(many=True).dump(paginated_notifications.items),
+            **pagination_meta(paginated_notifications)
+        })
+
+
+@ns.route('/unread-summary')
+class UnreadSummaryResource(Resource):
+    @jwt_required()
+    @ns.response(200, 'Success', model=unread_summary_model)
+    @ns.doc(description="获取未读通知与未读消息数 (角标，读取按用户维护的计数)")
+    def get(self):
+        return api_success_response(unread_counter_service.get_summary(identity_service.current_user_id()))
+
+@ns.route('/stream')
+class RealtimeStreamResource(Resource):
+    # EventSource 无法设置请求头，允许通过查询参数 ?jwt=<access_token> 认证
+    @jwt_required(locations=['headers', 'query_string'])
+    @ns.param('last_event_id', '最后收到的事件ID (也可通过 Last-Event-ID 请求头传递，重连时由浏览器自动携带)')
+    @ns.doc(description="实时推送新消息与新通知 (Server-Sent Events)；事件类型: message, notification, resync (需重新拉取列表)")
+    def get(self):
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = -1 # 无法识别的事件ID，补发时视为不完整并发送 resync
+        user_id = identity_service.current_user_id()
+        stream = realtime_service.stream(user_id, last_event_id)
+        # 长连接期间不占用数据库连接
+        db.session.remove()
+        return Response(stream, mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -1,8 +1,9 @@
 from flask_restx import Namespace, Resource, fields
 from flask import request, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 
 from ...services.employer_profile_service import employer_profile_service
+from ...services.identity_service import identity_service
 from ...schemas.profile_schema import EmployerProfileSchema # For serialization & input validation
 from ...utils.exceptions import BusinessException, InvalidUsageException, NotFoundException, AuthorizationException
 from ...utils.helpers import api_success_response
@@ -59,7 +60,7 @@ class EmployerProfileSelfResource(Resource):
     @ns.response(200, '获取雇主档案成功', model=employer_profile_model)
     def get(self):
         """获取当前登录雇主的档案信息"""
-        user_id = get_jwt_identity()
+        user_id = identity_service.current_user_id()
         
         try:
             profile = employer_profile_service.get_profile_by_user_id(user_id)
@@ -76,7 +77,7 @@ class EmployerProfileSelfResource(Resource):
     @ns.response(201, '雇主档案创建成功', model=employer_profile_model)
     def put(self):
         """创建或更新当前雇主档案"""
-        user_id = get_jwt_identity()
+        user_id = identity_service.current_user_id()
         data = request.json
         
         # 确保传入了必需字段
@@ -106,7 +107,7 @@ class EmployerProfileAvatarResource(Resource):
     @ns.response(200, '头像上传成功')
     def post(self):
         """上传雇主头像"""
-        user_id = get_jwt_identity()
+        user_id = identity_service.current_user_id()
         
         if 'avatar' not in request.files:
             return {"code": 40001, "message": "没有上传图片文件", "data": None}, 400
@@ -131,7 +132,7 @@ class EmployerProfileLicenseResource(Resource):
     @ns.response(200, '营业执照上传成功')
     def post(self):
         """上传雇主营业执照"""
-        user_id = get_jwt_identity()
+        user_id = identity_service.current_user_id()
         
         if 'license' not in request.files:
             return {"code": 40001, "message": "没有上传执照文件", "data": None}, 400
@@ -1,8 +1,9 @@
 from flask_restx import Namespace, Resource, fields
 from flask import request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 
 from ...services.freelancer_profile_service import freelancer_profile_service
+from ...services.identity_service import identity_service
 from ...services.skill_service import skill_service # Added for skill operations
 from ...schemas import FreelancerProfileSchema
 from ...schemas.skill_schema import SkillSchema as PublicSkillSchema # For nested skill details
@@ -88,7 +89,7 @@ class FreelancerProfileSelfResource(Resource):
     @ns.response(200, '获取零工档案成功', model=freelancer_profile_model)
     def get(self):
         """获取当前登录用户的零工档案"""
-        current_user_id = get_jwt_identity()
+        current_user_id = identity_service.current_user_id()
         try:
             profile = freelancer_profile_service.get_profile_by_user_id(current_user_id)
             profile_data = FreelancerProfileSchema().dump(profile)
@@ -104,7 +105,7 @@ class FreelancerProfileSelfResource(Resource):
     @ns.response(201, '零工档案创建成功', model=freelancer_profile_model)
     def put(self):
         """创建或更新当前登录用户的零工档案"""
-        current_user_id = get_jwt_identity()
+        current_user_id = identity_service.current_user_id()
         data = request.json
         try:
             profile_is_present = FreelancerProfile.query.filter_by(user_id=current_user_id).first() is not None
@@ -127,7 +128,7 @@ class FreelancerProfileSkillsResource(Resource):
     @ns.response(403, '用户非零工角色或零工档案不存在')
     def get(self):
         """当前零工获取自己的技能列表"""
-        current_user_id = get_jwt_identity()
+        current_user_id = identity_service.current_user_id()
         try:
             freelancer_skills = skill_service.get_freelancer_skills(current_user_id)
             result_data = FreelancerSkillSchema(many=True).dump(freelancer_skills)
@@ -146,7 +147,7 @@ class FreelancerProfileSkillsResource(Resource):
     @ns.response(404, '指定技能ID不存在')
     def post(self):
         """当前零工为自己的档案添加技能"""
-        current_user_id = get_jwt_identity()
+        current_user_id = identity_service.current_user_id()
         data = request.json
         try:
             new_freelancer_skill = skill_service.add_skill_to_freelancer(current_user_id, data)
@@ -169,7 +170,7 @@ class FreelancerProfileSkillDetailResource(Resource):
     @ns.response(404, '零工未关联此技能或技能ID不存在')
     def put(self, skill_id):
         """当前零工更新已关联的技能信息"""
-        current_user_id = get_jwt_identity()
+        current_user_id = identity_service.current_user_id()
         data = request.json
         try:
             updated_skill_assoc = skill_service.update_freelancer_skill(current_user_id, skill_id, data)
@@ -187,7 +188,7 @@ class FreelancerProfileSkillDetailResource(Resource):
     @ns.response(404, '零工未关联此技能或技能ID不存在')
     def delete(self, skill_id):
         """当前零工从自己的档案中移除技能"""
-        current_user_id = get_jwt_identity()
+        current_user_id = identity_service.current_user_id()
         try:
             skill_service.remove_skill_from_freelancer(current_user_id, skill_id)
             return api_success_response(None, status_code=204) # No content
@@ -1,12 +1,17 @@
-from flask_restx import Namespace, Resource, fields, reqparse
+from flask_restx import Namespace, Resource, fields, reqparse, inputs
 from flask import request, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 
 from ...services.job_service import job_service
+from ...services.identity_service import identity_service
+from ...services.job_cache import job_cache
+from ...services.job_view_counter import job_view_counter
+from ...services.job_taxonomy_service import job_taxonomy_service
 from ...schemas.job_schema import JobSchema, JobRequiredSkillSchema
 from ...models.job import JobStatusEnum # For status enum if needed in API layer
 from ...utils.exceptions import BusinessException, InvalidUsageException, NotFoundException, AuthorizationException
 from ...utils.helpers import api_success_response
+from ...utils.pagination import pagination_meta
 
 ns = Namespace('jobs', description='工作信息相关操作')
 
@@ -40,6 +45,7 @@ job_output_model = ns.model('JobOutput', {
     'status': fields.String(readonly=True, description='工作状态'),
     'cancellation_reason': fields.String(readonly=True, description='取消原因'),
     'view_count': fields.Integer(readonly=True, description='浏览次数'),
+    'distance_km': fields.Float(readonly=True, description='与搜索中心点的距离 (公里, 仅地理范围搜索时返回)'),
     'application_deadline': fields.DateTime(description='报名截止时间 (ISO 8601)'),
     'created_at': fields.DateTime(readonly=True, description='创建时间'),
     'updated_at': fields.DateTime(readonly=True, description='更新时间')
@@ -96,17 +102,33 @@ pagination_model = ns.model('Pagination', {
     'page': fields.Integer(description='当前页码'),
     'per_page': fields.Integer(description='每页数量'),
     'total_pages': fields.Integer(description='总页数'),
-    'total_items': fields.Integer(description='总条目数')
+    'total_items': fields.Integer(description='总条目数'),
+    'next_cursor': fields.String(description='下一页游标 (仅游标分页时返回, 没有更多数据时为 null)'),
+    'has_next': fields.Boolean(description='是否还有下一页 (仅游标分页时返回)')
+})
+
+facet_value_model = ns.model('JobFacetValue', {
+    'value': fields.Raw(description='分面取值'),
+    'count': fields.Integer(description='符合条件的工作数')
+})
+
+job_facets_model = ns.model('JobFacets', {
+    field: fields.List(fields.Nested(facet_value_model), description=f'{field} 分面计数')
+    for field in job_service.FACET_FIELDS
 })
 
 paginated_job_response_model = ns.model('PaginatedJobResponse', {
     'items': fields.List(fields.Nested(job_output_model)),
-    'pagination': fields.Nested(pagination_model)
+    'pagination': fields.Nested(pagination_model),
+    'facets': fields.Nested(job_facets_model, description='分面计数 (仅 include_facets=true 时返回)')
 })
 
 job_list_parser = reqparse.RequestParser()
 job_list_parser.add_argument('page', type=int, location='args', default=1, help='页码')
 job_list_parser.add_argument('per_page', type=int, location='args', default=10, help='每页数量')
+job_list_parser.add_argument('cursor', type=str, location='args', help='分页游标 (传入即启用游标分页, 首页传空字符串, 后续传上一页返回的 next_cursor)')
+job_list_parser.add_argument('include_total', type=inputs.boolean, location='args', default=False, help='游标分页时是否返回总条目数')
+job_list_parser.add_argument('include_facets', type=inputs.boolean, location='args', default=False, help='是否返回类别/城市/区县/计薪方式/急聘的分面计数')
 job_list_parser.add_argument('q', type=str, location='args', help='关键词搜索 (标题, 描述)')
 job_list_parser.add_argument('status', type=str, location='args', help=f"工作状态 (e.g., {', '.join([s.value for s in JobStatusEnum])})")
 job_list_parser.add_argument('job_category', type=str, location='args', help='工作类别')
@@ -123,12 +145,14 @@ job_list_parser.add_argument('job_tags', type=str, location='args', help='工作
 job_list_parser.add_argument('is_urgent', type=bool, location='args', help='是否急聘')
 job_list_parser.add_argument('start_time_from', type=str, location='args', help='开始时间不早于 (ISO 8601)')
 job_list_parser.add_argument('start_time_to', type=str, location='args', help='开始时间不晚于 (ISO 8601)')
-job_list_parser.add_argument('sort_by', type=str, location='args', help='排序字段 (e.g., created_at_desc, salary_amount_asc)')
+job_list_parser.add_argument('sort_by', type=str, location='args', help='排序字段 (e.g., created_at_desc, salary_amount_asc, relevance, distance_asc)')
 job_list_parser.add_argument('employer_user_id', type=int, location='args', help='发布者ID (用于查看特定雇主的工作)') # Keep for admin or direct lookup
 
 my_posted_jobs_parser = reqparse.RequestParser()
 my_posted_jobs_parser.add_argument('page', type=int, location='args', default=1, help='页码')
 my_posted_jobs_parser.add_argument('per_page', type=int, location='args', default=10, help='每页数量')
+my_posted_jobs_parser.add_argument('cursor', type=str, location='args', help='分页游标 (传入即启用游标分页, 首页传空字符串)')
+my_posted_jobs_parser.add_argument('include_total', type=inputs.boolean, location='args', default=False, help='游标分页时是否返回总条目数')
 my_posted_jobs_parser.add_argument('status', type=str, location='args', help='工作状态')
 my_posted_jobs_parser.add_argument('sort_by', type=str, location='args', help='排序字段')
 
@@ -146,20 +170,29 @@ class JobListResource(Resource):
         page = args.pop('page')
         per_page = args.pop('per_page')
         sort_by_arg = args.pop('sort_by', None) # แยก sort_by ออก
+        cursor = args.pop('cursor', None)
+        include_total = args.pop('include_total', False)
+        include_facets = args.pop('include_facets', False)
         
         filters = {k: v for k, v in args.items() if v is not None}
+
+        def load_page():
+            paginated_jobs = job_service.search_jobs(filters=filters, sort_by=sort_by_arg, page=page, per_page=per_page,
+                                                     cursor=cursor, include_total=include_total)
+            return {
+                'items': JobSchema(many=True).dump(paginated_jobs.items),
+                'pagination': pagination_meta(paginated_jobs)
+            }
+
         try:
-            paginated_jobs = job_service.search_jobs(filters=filters, sort_by=sort_by_arg, page=page, per_page=per_page)
-            items_data = JobSchema(many=True).dump(paginated_jobs.items)
-            return api_success_response({
-                'items': items_data,
-                'pagination': {
-                    'page': paginated_jobs.page,
-                    'per_page': paginated_jobs.per_page,
-                    'total_pages': paginated_jobs.pages,
-                    'total_items': paginated_jobs.total
-                }
-            })
+            # 前几页的搜索结果走缓存 (按规范化后的筛选条件缓存序列化结果)
+            page_data = job_cache.get_search_page(filters, sort_by_arg, page, per_page, cursor, include_total, load_page)
+            job_view_counter.merge_pending_views(page_data['items'])
+            if include_facets:
+                page_data['facets'] = job_cache.get_search_facets(filters, lambda: job_service.get_search_facets(filters))
+            return api_success_response(page_data)
+        except InvalidUsageException as e:
+            raise e
         except Exception as e:
             raise BusinessException(message=f"获取工作列表失败: {str(e)}", status_code=500, error_code=50001)
 
@@ -168,13 +201,12 @@ class JobListResource(Resource):
     @ns.response(201, '工作创建成功', model=job_output_model)
     def post(self):
         """雇主发布新工作"""
-        employer_user_identity_from_token = get_jwt_identity()
-        current_app.logger.info(f"[JobAPI] Attempting to create job. User identity from token: {employer_user_identity_from_token}, type: {type(employer_user_identity_from_token)}")
+        employer_user_id = identity_service.current_user_id()
+        current_app.logger.info(f"[JobAPI] Attempting to create job. Employer user ID: {employer_user_id}")
 
         data = request.json
         try:
-            # Pass the UUID string directly to the service layer
-            new_job = job_service.create_job(employer_user_identity=employer_user_identity_from_token, data=data)
+            new_job = job_service.create_job(employer_user_identity=employer_user_id, data=data)
             # 使用api_success_response包装结果，确保响应格式一致
             job_data = JobSchema().dump(new_job)
             return api_success_response(job_data, status_code=201)
@@ -192,9 +224,10 @@ class JobResource(Resource):
     def get(self, job_id):
         """获取指定ID的工作详情 (浏览次数会增加)"""
         try:
-            job = job_service.get_job_by_id(job_id, increment_view_count=True)
-            job_data = JobSchema().dump(job)
-            return api_success_response(job_data)
+            job_data = job_cache.get_job_detail(job_id, lambda: JobSchema().dump(job_service.get_job_by_id(job_id)))
+            job_service.increment_view_count(job_id)
+            # 合并尚未写回数据库的浏览次数 (含本次浏览)
+            return api_success_response(job_view_counter.merge_pending_views(job_data))
         except (NotFoundException, BusinessException) as e:
             raise e
         except Exception as e:
@@ -205,7 +238,7 @@ class JobResource(Resource):
     @ns.response(200, '工作信息更新成功', model=job_output_model)
     def put(self, job_id):
         """更新指定ID的工作信息 (仅限发布者)"""
-        employer_user_id = get_jwt_identity()
+        employer_user_id = identity_service.current_user_id()
         data = request.json
         try:
             updated_job = job_service.update_job(job_id, employer_user_id, data)
@@ -221,7 +254,7 @@ class JobResource(Resource):
     @ns.doc(description="删除指定ID的工作 (逻辑删除，状态变更为cancelled)。仅限发布者。")
     def delete(self, job_id):
         """删除指定ID的工作 (逻辑删除)"""
-        employer_user_id = get_jwt_identity()
+        employer_user_id = identity_service.current_user_id()
         try:
             # Add reason if desired from request or default
             # reason = request.json.get('reason', '由发布者删除') if request.is_json else '由发布者删除'
@@ -240,7 +273,7 @@ class JobCloseResource(Resource):
     @ns.doc(description="雇主关闭工作招聘 (将状态改为 filled)。仅限工作发布者。")
     def post(self, job_id):
         """雇主关闭工作招聘"""
-        employer_user_id = get_jwt_identity()
+        employer_user_id = identity_service.current_user_id()
         # reason = request.json.get('reason', '招聘结束') if request.is_json else '招聘结束' # Optional reason
         try:
             closed_job = job_service.close_job_listing(job_id, employer_user_id)
@@ -259,7 +292,7 @@ class JobDuplicateResource(Resource):
     @ns.doc(description="雇主复制现有工作以快速创建新工作。新工作将处于待审核状态。仅限工作发布者。")
     def post(self, job_id):
         """雇主复制工作"""
-        employer_user_id = get_jwt_identity()
+        employer_user_id = identity_service.current_user_id()
         try:
             duplicated_job = job_service.duplicate_job(job_id, employer_user_id)
             job_data = JobSchema().dump(duplicated_job)
@@ -276,26 +309,26 @@ class MyPostedJobsResource(Resource):
     @ns.response(200, '获取我发布的工作列表成功', model=paginated_job_response_model)
     def get(self):
         """雇主获取自己发布的工作列表"""
-        employer_user_id = get_jwt_identity()
+        employer_user_id = identity_service.current_user_id()
         args = my_posted_jobs_parser.parse_args()
         page = args.pop('page')
         per_page = args.pop('per_page')
         sort_by_arg = args.pop('sort_by', None)
+        cursor = args.pop('cursor', None)
+        include_total = args.pop('include_total', False)
         filters = {k: v for k, v in args.items() if v is not None}
         try:
             paginated_jobs = job_service.get_jobs_by_employer(
-                employer_user_id, filters=filters, sort_by=sort_by_arg, page=page, per_page=per_page
+                employer_user_id, filters=filters, sort_by=sort_by_arg, page=page, per_page=per_page,
+                cursor=cursor, include_total=include_total
             )
             items_data = JobSchema(many=True).dump(paginated_jobs.items)
             return api_success_response({
                 'items': items_data,
-                'pagination': {
-                    'page': paginated_jobs.page,
-                    'per_page': paginated_jobs.per_page,
-                    'total_pages': paginated_jobs.pages,
-                    'total_items': paginated_jobs.total
-                }
+                'pagination': pagination_meta(paginated_jobs)
             })
+        except InvalidUsageException as e:
+            raise e
         except Exception as e:
             raise BusinessException(message=f"获取我发布的工作列表失败: {str(e)}", status_code=500)
 
@@ -308,7 +341,7 @@ class RecommendedJobsResource(Resource):
     })) # Simpler response, no pagination for this example
     def get(self):
         """(零工) 获取个性化推荐工作列表"""
-        freelancer_user_id = get_jwt_identity()
+        freelancer_user_id = identity_service.current_user_id()
         args = recommended_jobs_parser.parse_args()
         try:
             recommended_jobs_list = job_service.get_recommended_jobs(freelancer_user_id, count=args['count'])
@@ -348,7 +381,7 @@ class JobRequiredSkillsResource(Resource):
     @ns.doc(description="为指定工作添加一项技能要求。需要工作发布者权限。")
     def post(self, job_id):
         """为工作添加技能要求"""
-        employer_user_id = get_jwt_identity()
+        employer_user_id = identity_service.current_user_id()
         skill_data = request.json
         try:
             new_req_skill = job_service.add_required_skill_to_job(job_id, employer_user_id, skill_data)
@@ -368,7 +401,7 @@ class JobRequiredSkillDetailResource(Resource):
     @ns.doc(description="移除指定工作的某项技能要求。需要工作发布者权限。")
     def delete(self, job_id, skill_id):
         """移除工作的技能要求"""
-        employer_user_id = get_jwt_identity()
+        employer_user_id = identity_service.current_user_id()
         try:
             job_service.remove_required_skill_from_job(job_id, employer_user_id, skill_id)
             return api_success_response(None, status_code=204, message="技能要求移除成功")
@@ -387,7 +420,7 @@ class JobCategoriesResource(Resource):
         """获取可用的工作类别列表"""
         try:
             # 从job_service获取所有可用的工作类别
-            categories = job_service.get_all_job_categories()
+            categories = job_cache.get_categories(job_service.get_all_job_categories)
             return api_success_response({'categories': categories})
         except Exception as e:
             raise BusinessException(message=f"获取工作类别列表失败: {str(e)}", status_code=500)
@@ -402,7 +435,49 @@ class JobTagsResource(Resource):
         """获取可用的工作标签列表"""
         try:
             # 从job_service获取所有可用的工作标签
-            tags = job_service.get_all_job_tags()
+            tags = job_cache.get_tags(job_service.get_all_job_tags)
             return api_success_response({'tags': tags})
         except Exception as e:
-            raise BusinessException(message=f"获取工作标签列表失败: {str(e)}", status_code=500)
\ No newline at end of file
+            raise BusinessException(message=f"获取工作标签列表失败: {str(e)}", status_code=500)
+
+tag_usage_model = ns.model('JobTagUsage', {
+    'name': fields.String(description='工作标签'),
+    'usage_count': fields.Integer(description='使用该标签的工作数')
+})
+
+tag_usage_list_model = ns.model('JobTagUsageResponse', {
+    'tags': fields.List(fields.Nested(tag_usage_model))
+})
+
+popular_tags_parser = reqparse.RequestParser()
+popular_tags_parser.add_argument('limit', type=int, location='args', default=20, help='返回数量 (最多100)')
+
+tag_suggest_parser = reqparse.RequestParser()
+tag_suggest_parser.add_argument('prefix', type=str, location='args', default='', help='已输入的标签前缀')
+tag_suggest_parser.add_argument('limit', type=int, location='args', default=10, help='返回数量 (最多50)')
+
+@ns.route('/tags/popular')
+class JobPopularTagsResource(Resource):
+    @ns.expect(popular_tags_parser)
+    @ns.response(200, '获取热门标签成功', model=tag_usage_list_model)
+    def get(self):
+        """按使用次数获取热门工作标签"""
+        args = popular_tags_parser.parse_args()
+        limit = min(max(args['limit'] or 20, 1), 100)
+        try:
+            return api_success_response({'tags': job_taxonomy_service.get_top_tags(limit)})
+        except Exception as e:
+            raise BusinessException(message=f"获取热门标签失败: {str(e)}", status_code=500)
+
+@ns.route('/tags/suggest')
+class JobTagSuggestResource(Resource):
+    @ns.expect(tag_suggest_parser)
+    @ns.response(200, '获取标签联想成功', model=tag_usage_list_model)
+    def get(self):
+        """按前缀联想工作标签 (使用次数多的优先)"""
+        args = tag_suggest_parser.parse_args()
+        limit = min(max(args['limit'] or 10, 1), 50)
+        try:
+            return api_success_response({'tags': job_taxonomy_service.suggest_tags(args['prefix'], limit)})
+        except Exception as e:
+            raise BusinessException(message=f"获取标签联想失败: {str(e)}", status_code=500)
\ No newline at end of file
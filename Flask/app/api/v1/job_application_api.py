@@ -1,14 +1,16 @@
-from flask_restx import Namespace, Resource, fields, reqparse
+from flask_restx import Namespace, Resource, fields, reqparse, inputs
 from flask import request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 
 from ...services.job_application_service import job_application_service
+from ...services.identity_service import identity_service
 from ...schemas import JobApplicationSchema
 from ...schemas import UserPublicSchema # For embedding freelancer info
 from ...schemas import JobSchema # For embedding job info
 from ...models.job import JobApplicationStatusEnum # Corrected import: For status enum
 from ...utils.exceptions import BusinessException, NotFoundException, InvalidUsageException, AuthorizationException
 from ...utils.helpers import api_success_response
+from ...utils.pagination import pagination_meta
 
 ns = Namespace('job_applications', description='工作申请相关操作')
 
@@ -62,7 +64,9 @@ pagination_info_model = ns.model('PaginationInfo', {
     'page': fields.Integer(description='当前页码'),
     'per_page': fields.Integer(description='每页数量'),
     'total_pages': fields.Integer(description='总页数'),
-    'total_items': fields.Integer(description='总条目数')
+    'total_items': fields.Integer(description='总条目数'),
+    'next_cursor': fields.String(description='下一页游标 (仅游标分页时返回, 没有更多数据时为 null)'),
+    'has_next': fields.Boolean(description='是否还有下一页 (仅游标分页时返回)')
 })
 
 paginated_application_response_model = ns.model('PaginatedJobApplicationResponse', { # Was paginated_application_model
@@ -73,6 +77,8 @@ paginated_application_response_model = ns.model('PaginatedJobApplicationResponse
 application_list_parser = reqparse.RequestParser()
 application_list_parser.add_argument('page', type=int, location='args', default=1, help='页码')
 application_list_parser.add_argument('per_page', type=int, location='args', default=10, help='每页数量')
+application_list_parser.add_argument('cursor', type=str, location='args', help='分页游标 (传入即启用游标分页, 首页传空字符串, 后续传上一页返回的 next_cursor)')
+application_list_parser.add_argument('include_total', type=inputs.boolean, location='args', default=False, help='游标分页时是否返回总条目数')
 application_list_parser.add_argument('status', type=str, location='args', help='按状态筛选申请')
 
 check_application_parser = reqparse.RequestParser()
@@ -85,7 +91,7 @@ class CheckApplicationStatusResource(Resource):
     @ns.response(200, '检查申请状态成功')
     def get(self):
         """检查当前用户是否已申请特定工作"""
-        user_id = get_jwt_identity()
+        user_id = identity_service.current_user_id()
         args = check_application_parser.parse_args()
         job_id = args['job_id']
         try:
@@ -115,7 +121,7 @@ class ApplyToJobResource(Resource):
     @ns.response(201, '申请提交成功', model=job_application_output_model)
     def post(self, job_id):
         """零工用户申请特定工作"""
-        freelancer_user_id = get_jwt_identity()
+        freelancer_user_id = identity_service.current_user_id()
         data = request.json or {}
         try:
             # Service method renamed
@@ -136,23 +142,19 @@ class JobApplicationsListForEmployerResource(Resource):
     @ns.response(200, '获取工作申请列表成功', model=paginated_application_response_model)
     def get(self, job_id):
         """雇主查看其发布工作的申请列表 (分页)"""
-        employer_user_id = get_jwt_identity()
+        employer_user_id = identity_service.current_user_id()
         args = application_list_parser.parse_args()
         filters = {'status': args.get('status')} # Pass status filter
         try:
             paginated_apps = job_application_service.get_applications_for_job(
-                job_id, employer_user_id, page=args['page'], per_page=args['per_page'], filters=filters
+                job_id, employer_user_id, page=args['page'], per_page=args['per_page'], filters=filters,
+                cursor=args.get('cursor'), include_total=args.get('include_total')
             )
             items_data = JobApplicationSchema(many=True, context={'include_freelancer_info': True}).dump(paginated_apps.items)
             # Updated pagination structure
             return api_success_response({
                 'items': items_data,
-                'pagination': {
-                    'page': paginated_apps.page,
-                    'per_page': paginated_apps.per_page,
-                    'total_pages': paginated_apps.pages,
-                    'total_items': paginated_apps.total
-                }
+                'pagination': pagination_meta(paginated_apps)
             })
         except (NotFoundException, AuthorizationException, BusinessException) as e:
             raise e
@@ -166,25 +168,21 @@ class FreelancerMyApplicationsListResource(Resource): # Renamed from FreelancerA
     @ns.response(200, '获取我的申请列表成功', model=paginated_application_response_model)
     def get(self):
         """零工用户查看自己提交的申请列表 (分页)"""
-        freelancer_user_id = get_jwt_identity()
+        freelancer_user_id = identity_service.current_user_id()
         args = application_list_parser.parse_args()
         filters = {'status': args.get('status')} # Pass status filter
         try:
             # Service method renamed
             paginated_apps = job_application_service.get_applications_by_freelancer(
-                freelancer_user_id, page=args['page'], per_page=args['per_page'], filters=filters
+                freelancer_user_id, page=args['page'], per_page=args['per_page'], filters=filters,
+                cursor=args.get('cursor'), include_total=args.get('include_total')
             )
             # Embed job_info for freelancer's view
             items_data = JobApplicationSchema(many=True, context={'include_job_info': True}).dump(paginated_apps.items)
             # Updated pagination structure
             return api_success_response({
                 'items': items_data,
-                'pagination': {
-                    'page': paginated_apps.page,
-                    'per_page': paginated_apps.per_page,
-                    'total_pages': paginated_apps.pages,
-                    'total_items': paginated_apps.total
-                }
+                'pagination': pagination_meta(paginated_apps)
             })
         except (NotFoundException, BusinessException) as e:
             raise e
@@ -198,7 +196,7 @@ class JobApplicationDetailResource(Resource):
     @ns.response(200, '获取申请详情成功', model=job_application_output_model)
     def get(self, application_id):
         """获取单个申请详情 (申请人或相关雇主可访问)"""
-        current_user_id = get_jwt_identity()
+        current_user_id = identity_service.current_user_id()
         try:
             application = job_application_service.get_application_by_id(application_id, current_user_id)
             # Ensure context for schema includes all relevant nested info
@@ -218,7 +216,7 @@ class ProcessApplicationResource(Resource):
     @ns.doc(description="雇主处理申请 (接受/拒绝)。")
     def put(self, application_id):
         """雇主处理工作申请 (接受/拒绝)"""
-        employer_user_id = get_jwt_identity()
+        employer_user_id = identity_service.current_user_id()
         data = request.json
         new_status = data.get('status')
         reason = data.get('reason')
@@ -252,7 +250,7 @@ class CancelApplicationResource(Resource):
     @ns.response(200, '取消申请成功', model=job_application_output_model)
     def post(self, application_id):
         """零工用户取消自己的工作申请"""
-        freelancer_user_id = get_jwt_identity()
+        freelancer_user_id = identity_service.current_user_id()
         data = request.json or {}
         reason = data.get('reason')
         try:
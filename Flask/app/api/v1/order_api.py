@@ -1,12 +1,14 @@
-from flask_restx import Namespace, Resource, fields, reqparse
+from flask_restx import Namespace, Resource, fields, reqparse, inputs
 from flask import current_app, request
-from flask_jwt_extended import jwt_required, get_jwt_identity, current_user
+from flask_jwt_extended import jwt_required
 import uuid
 
 from ...services.order_service import order_service
+from ...services.identity_service import identity_service
 from ...schemas.order_schema import OrderSchema, OrderActionSchema, OrderTimeUpdateSchema
 from ...utils.exceptions import BusinessException, InvalidUsageException, NotFoundException, AuthorizationException
 from ...utils.helpers import api_success_response
+from ...utils.pagination import pagination_meta
 from ...models.user import User # To get current_user role
 from sqlalchemy import func
 
@@ -33,6 +35,7 @@ order_output_model = ns.model('OrderOutput', {
     'confirmation_deadline': fields.DateTime(description='确认截止时间'),
     'cancellation_reason': fields.String(description='取消原因'),
     'cancelled_by': fields.String(description='取消方'),
+    'version': fields.Integer(readonly=True, description='乐观锁版本号 (执行订单操作时可回传)'),
     'created_at': fields.DateTime(readonly=True, description='创建时间'),
     'updated_at': fields.DateTime(readonly=True, description='更新时间'),
     # Simplified nested objects for brevity in API model, full details via schemas
@@ -52,7 +55,9 @@ paginated_order_model = ns.model('PaginatedOrderResponse', {
     'page': fields.Integer(description='当前页码'),
     'per_page': fields.Integer(description='每页数量'),
     'total_pages': fields.Integer(description='总页数'),
-    'total_items': fields.Integer(description='总条目数')
+    'total_items': fields.Integer(description='总条目数'),
+    'next_cursor': fields.String(description='下一页游标 (仅游标分页时返回, 没有更多数据时为 null)'),
+    'has_next': fields.Boolean(description='是否还有下一页 (仅游标分页时返回)')
 })
 
 order_action_input_model = ns.model('OrderActionInput', {
@@ -60,7 +65,8 @@ order_action_input_model = ns.model('OrderActionInput', {
                            enum=['start_work', 'complete_work', 'confirm_completion', 'cancel_order']),
     'cancellation_reason': fields.String(description='取消原因 (当 action 为 cancel_order 时可能需要)'),
     'start_time_actual': fields.DateTime(description='实际开始时间 (当 action 为 complete_work 时可选)'),
-    'end_time_actual': fields.DateTime(description='实际结束时间 (当 action 为 complete_work 时可选)')
+    'end_time_actual': fields.DateTime(description='实际结束时间 (当 action 为 complete_work 时可选)'),
+    'version': fields.Integer(description='读取订单时的版本号 (可选, 提供时订单已被修改则返回 409)')
 })
 
 order_time_update_input_model = ns.model('OrderTimeUpdateInput', {
@@ -72,7 +78,11 @@ order_time_update_input_model = ns.model('OrderTimeUpdateInput', {
 order_list_parser = reqparse.RequestParser()
 order_list_parser.add_argument('page', type=int, location='args', default=1, help='页码')
 order_list_parser.add_argument('per_page', type=int, location='args', default=10, help='每页数量')
+order_list_parser.add_argument('cursor', type=str, location='args', help='分页游标 (传入即启用游标分页, 首页传空字符串, 后续传上一页返回的 next_cursor)')
+order_list_parser.add_argument('include_total', type=inputs.boolean, location='args', default=False, help='游标分页时是否返回总条目数')
 order_list_parser.add_argument('status', type=str, location='args', help='筛选订单状态')
+order_list_parser.add_argument('created_from', type=inputs.datetime_from_iso8601, location='args', help='创建时间起 (含, ISO 8601)')
+order_list_parser.add_argument('created_to', type=inputs.datetime_from_iso8601, location='args', help='创建时间止 (不含, ISO 8601)')
 order_list_parser.add_argument('role', type=str, location='args', choices=('freelancer', 'employer'), help='用户角色 (freelancer/employer) - 若不提供, 会尝试从JWT用户当前角色推断')
 # Add sort_by later if needed
 
@@ -96,45 +106,14 @@ class OrderListResource(Resource):
     @ns.response(200, '获取订单列表成功', model=paginated_order_model)
     def get(self):
         """用户获取自己的订单列表 (根据角色区分是零工还是雇主)"""
-        user_identity = get_jwt_identity() # This is likely a UUID string
-        current_app.logger.info(f"[OrderAPI] GET /orders - JWT Identity: {user_identity}")
+        # 通过身份解析服务获取当前用户 (带缓存)
+        jwt_user = identity_service.current_identity()
+        current_app.logger.info(f"[OrderAPI] GET /orders - user {jwt_user.id}")
         args = order_list_parser.parse_args()
         current_app.logger.info(f"[OrderAPI] Request args: {args}")
         
         user_role_arg = args.get('role')
         
-        # 详细记录用户查询过程
-        current_app.logger.info(f"[OrderAPI] Attempting to find user with identity: {user_identity}")
-        
-        jwt_user = None
-        
-        # 尝试作为UUID查找
-        try:
-            if isinstance(user_identity, str) and len(user_identity) > 30:  # 看起来像UUID
-                current_app.logger.debug(f"[OrderAPI] Trying to find user by UUID: {user_identity}")
-                jwt_user = User.query.filter_by(uuid=user_identity).first()
-                if jwt_user:
-                    current_app.logger.info(f"[OrderAPI] User found by UUID: {user_identity}, ID: {jwt_user.id}")
-        except Exception as e:
-            current_app.logger.warning(f"[OrderAPI] Error finding user by UUID: {str(e)}")
-            
-        # 尝试作为ID查找
-        if not jwt_user:
-            try:
-                current_app.logger.debug(f"[OrderAPI] Trying to find user by ID: {user_identity}")
-                # 尝试将身份转换为整数ID
-                user_id = int(user_identity) if isinstance(user_identity, str) else user_identity
-                jwt_user = User.query.get(user_id)
-                if jwt_user:
-                    current_app.logger.info(f"[OrderAPI] User found by ID: {user_id}")
-            except (ValueError, TypeError) as e:
-                current_app.logger.warning(f"[OrderAPI] Error finding user by ID: {str(e)}")
-
-        # 仍未找到用户
-        if not jwt_user:
-            current_app.logger.error(f"[OrderAPI] User not found with identity: {user_identity}")
-            raise NotFoundException("用户不存在或身份无法识别。", error_code=40401)
-        
         # 记录用户角色信息
         current_app.logger.info(f"[OrderAPI] User {jwt_user.id} roles - current: {jwt_user.current_role}, available: {jwt_user.available_roles}")
         
@@ -146,7 +125,7 @@ class OrderListResource(Resource):
             
         current_app.logger.info(f"[OrderAPI] Using role: {user_role_to_use} for user {jwt_user.id}")
 
-        filters = {'status': args.get('status')}
+        filters = {'status': args.get('status'), 'created_from': args.get('created_from'), 'created_to': args.get('created_to')}
         filters = {k: v for k, v in filters.items() if v is not None}
         current_app.logger.info(f"[OrderAPI] Applying filters: {filters}")
 
@@ -157,17 +136,16 @@ class OrderListResource(Resource):
                 user_role=user_role_to_use,
                 filters=filters,
                 page=args.get('page'),
-                per_page=args.get('per_page')
+                per_page=args.get('per_page'),
+                cursor=args.get('cursor'),
+                include_total=args.get('include_total')
             )
             current_app.logger.info(f"[OrderAPI] Got {len(paginated_orders.items)} orders")
             order_data = OrderSchema(many=True).dump(paginated_orders.items)
             current_app.logger.info(f"[OrderAPI] Serialized {len(order_data)} orders")
             return api_success_response({
                 'items': order_data,
-                'page': paginated_orders.page,
-                'per_page': paginated_orders.per_page,
-                'total_pages': paginated_orders.pages,
-                'total_items': paginated_orders.total
+                **pagination_meta(paginated_orders)
             })
         except (AuthorizationException, InvalidUsageException, BusinessException) as e:
             current_app.logger.error(f"[OrderAPI] Known error: {str(e)}")
@@ -186,7 +164,7 @@ class OrderDetailResource(Resource):
     @ns.response(404, '订单未找到')
     def get(self, order_id):
         """获取指定订单详情 (仅限订单参与方)"""
-        user_id = get_jwt_identity()
+        user_id = identity_service.current_user_id()
         try:
             order = order_service.get_order_by_id(order_id, user_id)
             order_data = OrderSchema().dump(order)
@@ -209,13 +187,11 @@ class OrderActionResource(Resource):
     @ns.response(409, '操作与当前订单状态冲突') # Business rule violation
     def post(self, order_id):
         """执行订单操作 (开始工作、完成工作、确认完成、取消订单)"""
-        user_id = get_jwt_identity()
         action_data = request.json
         
         # Determine user_role for service layer, similar to OrderListResource
-        jwt_user = User.query.get(user_id)
-        if not jwt_user:
-            raise NotFoundException("用户不存在。")
+        jwt_user = identity_service.current_identity()
+        user_id = jwt_user.id
         user_role = jwt_user.current_role
         if not user_role:
              raise InvalidUsageException("无法确定用户角色以执行操作。")
@@ -241,7 +217,7 @@ class OrderActualTimesResource(Resource):
     @ns.response(404, '订单未找到')
     def put(self, order_id):
         """(若独立) 更新订单的实际工作开始和结束时间 (通常零工操作)"""
-        user_id = get_jwt_identity()
+        user_id = identity_service.current_user_id()
         data = request.json
         try:
             # OrderTimeUpdateSchema().load(data) # Can be used for Marshmallow-level validation first
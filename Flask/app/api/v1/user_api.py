@@ -1,8 +1,9 @@
 from flask_restx import Namespace, Resource, fields
 from flask import request, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 
 from ...services.user_service import user_service
+from ...services.identity_service import identity_service
 from ...schemas.user_schema import UserSchema, UserPublicSchema # For serializing user output and potentially validating updates
 from ...utils.exceptions import BusinessException, InvalidUsageException, NotFoundException, AuthenticationException
 from ...utils.helpers import api_success_response, api_error_response
@@ -34,7 +35,7 @@ class UserSelfResource(Resource):
     @ns.response(200, '成功获取当前用户信息', model=user_public_output_model)
     def get(self):
         """获取当前登录用户的信息"""
-        user_id = get_jwt_identity()
+        user_id = identity_service.current_user_id()
         
         try:
             user = user_service.get_user_by_id(user_id)
@@ -50,7 +51,7 @@ class UserSelfResource(Resource):
     @ns.response(200, '用户信息更新成功', model=user_public_output_model)
     def put(self):
         """更新当前登录用户的基本信息"""
-        user_id = get_jwt_identity()
+        user_id = identity_service.current_user_id()
         data = request.json
         
         try:
@@ -71,7 +72,7 @@ class UserChangePasswordResource(Resource):
     @ns.response(200, '密码修改成功')
     def post(self):
         """修改当前登录用户的密码"""
-        user_id = get_jwt_identity()
+        user_id = identity_service.current_user_id()
         data = request.json
         
         try:
@@ -94,7 +95,7 @@ class UserCurrentRoleResource(Resource):
     @ns.response(200, '角色切换成功', model=user_public_output_model)
     def put(self):
         """切换当前登录用户的角色"""
-        user_id = get_jwt_identity()
+        user_id = identity_service.current_user_id()
         data = request.json
         
         try:
@@ -1,9 +1,10 @@
 from flask_restx import Namespace, Resource, fields, reqparse
 from flask import request, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 import json
 
 from ...services.verification_service import verification_service
+from ...services.identity_service import identity_service
 from ...schemas import VerificationRecordSchema # Corrected import
 from ...utils.exceptions import BusinessException, InvalidUsageException, NotFoundException
 from ...utils.helpers import api_success_response
@@ -51,7 +52,7 @@ class VerificationSubmissionResource(Resource):
     @ns.response(201, '认证申请提交成功', model=verification_record_model)
     def post(self):
         """用户提交认证申请 (个人实名/企业资质)"""
-        current_user_id = get_jwt_identity()
+        current_user_id = identity_service.current_user_id()
         data = request.json
         # Consider using VerificationRecordCreateSchema for validation if it exists
         try:
@@ -71,7 +72,7 @@ class VerificationRootResource(Resource):
     @ns.response(201, '认证申请提交成功', model=verification_record_model)
     def post(self):
         """用户提交认证申请 (个人实名/企业资质) - 根路径版本"""
-        current_user_id = get_jwt_identity()
+        current_user_id = identity_service.current_user_id()
         current_app.logger.info(f"[VerificationAPI] 收到认证提交请求，用户ID: {current_user_id}")
         current_app.logger.debug(f"[VerificationAPI] 请求内容类型: {request.content_type}")
         
@@ -134,7 +135,7 @@ class UserVerificationRecordsResource(Resource):
     @ns.response(200, '获取用户认证记录成功', model=paginated_verification_model)
     def get(self):
         """用户获取自己的认证记录 (分页)"""
-        current_user_id = get_jwt_identity()
+        current_user_id = identity_service.current_user_id()
         args = verification_list_parser.parse_args()
         try:
             paginated_records = verification_service.get_user_verification_records(
@@ -164,7 +165,7 @@ class UserVerificationMyResource(Resource):
     @ns.response(200, '获取用户认证记录成功', model=paginated_verification_model)
     def get(self):
         """用户获取自己的认证记录 (分页) - 别名路径"""
-        current_user_id = get_jwt_identity()
+        current_user_id = identity_service.current_user_id()
         current_app.logger.info(f"[VerificationAPI] 获取用户认证记录，用户ID: {current_user_id}")
         
         args = verification_list_parser.parse_args()
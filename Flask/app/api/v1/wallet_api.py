@@ -0,0 +1,67 @@
+from flask_restx import Namespace, Resource, fields, reqparse, inputs
+from flask_jwt_extended import jwt_required
+
+from app.schemas.wallet_schema import WalletTransactionSchema
+from app.services.identity_service import identity_service
+from app.services.payment_wallet_service import wallet_service
+from app.utils.helpers import api_success_response
+from app.utils.pagination import pagination_meta
+
+ns = Namespace('wallet', description='钱包与交易流水')
+
+wallet_transaction_output_model = ns.model('WalletTransactionOutput', {
+    'id': fields.Integer(),
+    'transaction_type': fields.String(),
+    'amount': fields.String(description='金额 (正数入账, 负数出账)'),
+    'balance_after': fields.String(description='交易后余额'),
+    'related_payment_id': fields.Integer(),
+    'related_order_id': fields.Integer(),
+    'related_withdrawal_id': fields.Integer(),
+    'description': fields.String(),
+    'created_at': fields.DateTime()
+})
+paginated_wallet_transactions_model = ns.model('PaginatedWalletTransactions', {
+    'items': fields.List(fields.Nested(wallet_transaction_output_model)),
+    'page': fields.Integer(description='当前页码'),
+    'per_page': fields.Integer(description='每页数量'),
+    'total_pages': fields.Integer(description='总页数'),
+    'total_items': fields.Integer(description='总条目数'),
+    'next_cursor': fields.String(description='下一页游标 (仅游标分页时返回, 没有更多数据时为 null)'),
+    'has_next': fields.Boolean(description='是否还有下一页 (仅游标分页时返回)')
+})
+
+transaction_list_parser = reqparse.RequestParser()
+transaction_list_parser.add_argument('page', type=int, location='args', default=1, help='页码')
+transaction_list_parser.add_argument('per_page', type=int, location='args', default=10, help='每页数量')
+transaction_list_parser.add_argument('cursor', type=str, location='args', help='分页游标 (传入即启用游标分页, 首页传空字符串, 后续传上一页返回的 next_cursor)')
+transaction_list_parser.add_argument('include_total', type=inputs.boolean, location='args', default=False, help='游标分页时是否返回总条目数')
+transaction_list_parser.add_argument('transaction_type', type=str, location='args', help='按交易类型筛选')
+transaction_list_parser.add_argument('start_date', type=str, location='args', help='起始时间 (ISO 8601)')
+transaction_list_parser.add_argument('end_date', type=str, location='args', help='截止时间 (ISO 8601)')
+transaction_list_parser.add_argument('sort_by', type=str, location='args',
+                                     choices=('created_at_desc', 'created_at_asc', 'amount_desc', 'amount_asc'), help='排序方式')
+
+
+@ns.route('/transactions')
+class WalletTransactionListResource(Resource):
+    @jwt_required()
+    @ns.expect(transaction_list_parser)
+    @ns.response(200, 'Success', model=paginated_wallet_transactions_model)
+    @ns.doc(description="获取我的钱包交易流水")
+    def get(self):
+        args = transaction_list_parser.parse_args()
+        filters = {key: args.get(key) for key in ('transaction_type', 'start_date', 'end_date') if args.get(key)}
+        paginated_transactions = wallet_service.get_wallet_transactions(
+            identity_service.current_user_id(),
+            filters=filters,
+            page=args.get('page'),
+            per_page=args.get('per_page'),
+            sort_by=args.get('sort_by'),
+            cursor=args.get('cursor'),
+            include_total=args.get('include_total')
+        )
+        schema = WalletTransactionSchema(many=True, only=[name for name in wallet_transaction_output_model])
+        return api_success_response({
+            'items': schema.dump(paginated_transactions.items),
+            **pagination_meta(paginated_transactions)
+        })
@@ -53,10 +53,6 @@ api_v2.add_namespace(dispute_report_ns, path='/issues') # e.g., /issues/disputes
 
 
 # Admin APIs (under a sub-path like /admin)
-from .admin import admin_api_v2 # This will be an Api instance itself or just add namespaces directly
-# Example if admin_api_v2 is an Api instance mounted on a blueprint:
-# v2_blueprint.add_blueprint(admin_api_v2.blueprint, url_prefix='/admin')
-# Or if admin namespaces are added directly:
 from .admin.admin_system_config_api import ns as admin_system_config_ns
 api_v2.add_namespace(admin_system_config_ns, path='/admin/system-configs')
 
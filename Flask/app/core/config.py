@@ -27,15 +27,106 @@ class Config:
     # Redis Configuration (Example)
     REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
 
-    # Celery Configuration (Example)
-    CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/1')
-    CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localhost:6379/2')
-
     # Flask-Caching Configuration (Example)
     CACHE_TYPE = 'RedisCache' # Or 'SimpleCache' for development
     CACHE_REDIS_URL = REDIS_URL
     CACHE_DEFAULT_TIMEOUT = 300 # Default cache timeout in seconds
 
+    # Job keyword search index ('memory' 进程内倒排索引, 'none' 禁用并使用 SQL LIKE 查询)
+    JOB_SEARCH_INDEX_BACKEND = os.environ.get('JOB_SEARCH_INDEX_BACKEND', 'memory')
+    JOB_SEARCH_INDEX_REFRESH_SECONDS = 30 # 多进程部署时追平其他进程写入的间隔
+    JOB_SEARCH_INDEX_MAX_CANDIDATES = 1000 # 索引命中超过该数量时退回 SQL 查询 (按相关度排序时截断)
+
+    # Job geo-radius search
+    JOB_GEO_MAX_CANDIDATES = 5000 # 外接矩形内最多读取的工作数 (按近似距离由近到远)，超出部分不参与精确距离计算
+
+    # JWT identity cache (进程内 LRU + 共享缓存)
+    IDENTITY_CACHE_MAX_SIZE = 10000 # 进程内缓存条目上限
+    IDENTITY_CACHE_LOCAL_TTL = 30 # 进程内缓存有效期 (秒)，也是其他进程感知角色/状态变更的最大延迟
+    IDENTITY_CACHE_USE_SHARED = True # 是否使用 Flask-Caching 作为共享缓存层
+    IDENTITY_CACHE_SHARED_TTL = 300 # 共享缓存有效期 (秒)
+
+    # Job read-path cache (工作详情/搜索结果前几页/类别/标签，基于 Flask-Caching)
+    JOB_CACHE_ENABLED = True
+    JOB_CACHE_DETAIL_TIMEOUT = 300 # 工作详情缓存有效期 (秒)
+    JOB_CACHE_LIST_TIMEOUT = 60 # 搜索结果、类别、标签缓存有效期 (秒)
+    JOB_CACHE_SEARCH_MAX_PAGE = 3 # 只缓存搜索结果的前几页 (游标分页只缓存首页)
+    JOB_CACHE_LOCK_TIMEOUT = 10 # 回源锁有效期 (秒)，应大于单次回源耗时
+    JOB_CACHE_LOCK_WAIT = 2 # 未抢到回源锁时等待结果的最长时间 (秒)，超时后直接查询数据库
+
+    # Job view counter (浏览次数先在进程内缓冲，定期批量写回；'none' 表示每次浏览直接写库)
+    JOB_VIEW_COUNTER_BACKEND = os.environ.get('JOB_VIEW_COUNTER_BACKEND', 'memory')
+    JOB_VIEW_COUNTER_FLUSH_SECONDS = 10 # 后台写回间隔 (秒)，0 表示不启动后台线程 (仅在缓冲过多或进程退出时写回)
+    JOB_VIEW_COUNTER_MAX_PENDING_JOBS = 10000 # 缓冲的工作数达到该值时立即写回
+    JOB_VIEW_COUNTER_BATCH_SIZE = 500 # 每条 UPDATE 语句最多更新的工作数
+
+    # Job recommendation engine (技能稀疏向量 + 地点/类别/薪资/时效特征，NumPy/SciPy 向量化打分)
+    JOB_RECOMMENDATION_ENABLED = True
+    JOB_RECOMMENDATION_REFRESH_SECONDS = 30 # 多进程部署时追平其他进程写入的间隔
+    JOB_RECOMMENDATION_COMPACT_THRESHOLD = 2000 # 增量行数超过该值时合并回基础矩阵
+    # 离线预计算的推荐列表 (manage.py precompute_recommendations，建议定期执行)
+    JOB_RECOMMENDATION_PRECOMPUTED_ENABLED = True # 推荐接口优先读取预计算列表
+    JOB_RECOMMENDATION_PRECOMPUTE_SIZE = 50 # 每个零工预计算的推荐数量
+    JOB_RECOMMENDATION_PRECOMPUTE_MAX_AGE_SECONDS = 6 * 3600 # 超过该时长的列表在下次批量计算时刷新 (纳入新发布的工作)
+    JOB_RECOMMENDATION_PRECOMPUTED_TTL_SECONDS = 24 * 3600 # 超过该时长的列表不再读取 (批量任务停止运行时退回实时计算)
+    JOB_RECOMMENDATION_PRECOMPUTE_WORKERS = 0 # 批量计算的进程数，0 表示 CPU 核数
+    JOB_RECOMMENDATION_PRECOMPUTE_CHUNK_SIZE = 500 # 每个进程任务包含的零工数
+
+    # Urgent job reverse matching (急聘工作发布后通知技能与地点匹配的零工)
+    JOB_MATCHING_ENABLED = True
+    JOB_MATCHING_ASYNC = True # 提交到后台任务队列 (manage.py worker) 匹配与写入通知，不阻塞发布请求
+    JOB_MATCHING_BATCH_SIZE = 1000 # 每批匹配的零工数 (每批一条多行 INSERT 并提交)
+
+    # Bulk notifications (批量通知分块写入，每块提交一次)
+    NOTIFICATION_BULK_CHUNK_SIZE = 1000
+    NOTIFICATION_BROADCAST_ASYNC = True # 全站公告提交到后台任务队列 (manage.py worker) 写入，接口立即返回广播ID
+    NOTIFICATION_BROADCAST_STATUS_TIMEOUT = 86400 # 广播进度在缓存中的保留时间 (秒)
+
+    # Message read receipts (per-conversation read watermark)
+    MESSAGE_READ_RECEIPT_COALESCE_SECONDS = 5 # 同一会话的已读水位在该时间内最多写库一次，0 表示每次前进都立即写入
+    MESSAGE_READ_RECEIPT_FLUSH_SECONDS = 5 # 后台写回缓冲水位的间隔 (秒)，0 表示不启动后台线程 (仅在显式 flush 或进程退出时写回)
+
+    # Order auto-confirmation (manage.py auto_confirm_orders)
+    ORDER_AUTO_CONFIRM_BATCH_SIZE = 200 # 每批读取的到期订单数
+    ORDER_AUTO_CONFIRM_MAX_BATCHES = 0 # 单次执行最多处理的批数，0 表示处理完全部到期订单
+    ORDER_AUTO_CONFIRM_LEASE_SECONDS = 120 # 租约有效期，需大于处理一批订单的耗时
+    ORDER_AUTO_CONFIRM_INTERVAL_SECONDS = 60 # --loop 模式下两轮之间的间隔
+
+    # Job expiry sweeper (manage.py expire_jobs)
+    JOB_EXPIRY_BATCH_SIZE = 500 # 每批过期的工作数 (一条 UPDATE)
+    JOB_EXPIRY_MAX_BATCHES = 0 # 单次执行最多处理的批数，0 表示处理完全部过期工作
+    JOB_EXPIRY_LEASE_SECONDS = 120 # 租约有效期，需大于处理一批工作的耗时
+    JOB_EXPIRY_INTERVAL_SECONDS = 300 # --loop 模式下两轮之间的间隔
+
+    # Background task queue (@task + .delay()，由 manage.py worker 执行)
+    TASK_QUEUE_BACKEND = os.environ.get('TASK_QUEUE_BACKEND', 'database') # 'database' 使用 background_tasks 表；'redis' 使用 Redis
+    TASK_QUEUE_REDIS_URL = os.environ.get('TASK_QUEUE_REDIS_URL') # 为空时使用 REDIS_URL
+    TASK_QUEUE_WORKERS = 4 # 每个 worker 进程的执行线程数
+    TASK_QUEUE_POLL_SECONDS = 1 # 没有到期任务时的轮询间隔
+    TASK_QUEUE_LEASE_SECONDS = 300 # 执行租约，需大于单个任务的最长耗时；worker 崩溃后任务在租约到期时重新执行
+    TASK_QUEUE_MAX_ATTEMPTS = 5 # 默认最多执行次数 (@task(max_attempts=...) 可覆盖)
+    TASK_QUEUE_RETRY_BACKOFF_SECONDS = 10 # 首次重试的等待时间，之后每次翻倍 (带随机抖动)
+    TASK_QUEUE_RETRY_BACKOFF_MAX_SECONDS = 3600 # 重试等待时间上限
+    TASK_QUEUE_RETENTION_SECONDS = 7 * 86400 # 成功任务的保留时间，之后由 worker 定期清理 (失败任务保留供排查)
+    TASK_QUEUE_PURGE_INTERVAL_SECONDS = 3600 # worker 清理过期任务的间隔
+
+    # Realtime push (SSE /communications/stream)
+    REALTIME_ENABLED = True
+    REALTIME_BACKEND = os.environ.get('REALTIME_BACKEND', 'memory') # 'memory' 单节点进程内 Pub/Sub；'redis' 多进程/多节点
+    REALTIME_REDIS_URL = os.environ.get('REALTIME_REDIS_URL') # 为空时使用 REDIS_URL
+    REALTIME_HEARTBEAT_SECONDS = 15 # 空闲时发送心跳的间隔
+    REALTIME_STREAM_MAX_SECONDS = 300 # 单个连接的最长保持时间，之后客户端自动重连
+    REALTIME_RETRY_MILLISECONDS = 3000 # 建议客户端的重连间隔
+    REALTIME_HISTORY_SIZE = 100 # 每个用户保留用于断线补发的最近事件数
+    REALTIME_HISTORY_TTL_SECONDS = 3600 # 断线补发窗口: 超过该时长未收到新事件且不在线的用户，其历史被清理
+    REALTIME_SUBSCRIBER_QUEUE_SIZE = 100 # 每个连接待发送事件上限，超出时断开该连接
+
+    # Platform escrow (平台托管账户，入账分散到多个子账户以避免单行热点)
+    PLATFORM_ESCROW_USER_ID = int(os.environ.get('PLATFORM_ESCROW_USER_ID', 1))
+    PLATFORM_ESCROW_SHARDS = 16 # 子账户数量，调整后需先执行 consolidate_escrow 再变更
+    ESCROW_CONSOLIDATION_LEASE_SECONDS = 60 # 归集租约有效期 (manage.py consolidate_escrow)
+    ESCROW_CONSOLIDATION_INTERVAL_SECONDS = 300 # --loop 模式下两轮之间的间隔
+
     # Add other common configurations here
     ITEMS_PER_PAGE = 20
 
@@ -60,6 +151,10 @@ class TestingConfig(Config):
     WTF_CSRF_ENABLED = False # Disable CSRF forms validation during tests
     # Use simple cache or mock Redis for tests
     CACHE_TYPE = 'NullCache' # Disable caching for tests
+    JOB_VIEW_COUNTER_FLUSH_SECONDS = 0 # 测试中显式调用 job_view_counter.flush()
+    MESSAGE_READ_RECEIPT_FLUSH_SECONDS = 0 # 测试中显式调用 message_read_receipts.flush()
+    JOB_MATCHING_ASYNC = False # 测试中在发布请求内同步匹配
+    NOTIFICATION_BROADCAST_ASYNC = False # 测试中在请求内同步广播
 
 class ProductionConfig(Config):
     """Production configuration."""
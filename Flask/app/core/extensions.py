@@ -9,7 +9,6 @@ from flask_bcrypt import Bcrypt
 from flask_caching import Cache
 from flask_cors import CORS  # 添加 CORS 支持
 # from flask_socketio import SocketIO # If using SocketIO
-# from celery import Celery # Celery setup might be more complex
 
 # Instantiate extensions
 db = SQLAlchemy()
@@ -21,24 +20,7 @@ cache = Cache()
 cors = CORS()  # 实例化 CORS
 # socketio = SocketIO() # If using SocketIO
 
-# Celery requires a bit more setup, often done in the app factory or a dedicated file
-# def make_celery(app):
-#     celery = Celery(
-#         app.import_name,
-#         backend=app.config['CELERY_RESULT_BACKEND'],
-#         broker=app.config['CELERY_BROKER_URL']
-#     )
-#     celery.conf.update(app.config)
-#
-#     class ContextTask(celery.Task):
-#         def __call__(self, *args, **kwargs):
-#             with app.app_context():
-#                 return self.run(*args, **kwargs)
-#
-#     celery.Task = ContextTask
-#     return celery
-#
-# celery = None # Placeholder, will be initialized in create_app
+# Background tasks: app/services/task_queue.py (@task + .delay()，由 manage.py worker 执行)
 
 def init_app(app):
     """Initialize extensions with the Flask app instance."""
@@ -57,29 +39,22 @@ def init_app(app):
         methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
         allow_headers=["Content-Type", "Authorization", "Accept", "X-Requested-With"]
     )
-    
-    # Initialize Celery if used
-    # global celery
-    # celery = make_celery(app)
 
     # JWT配置和回调函数
-    from ..services.user_service import user_service
+    from ..services.identity_service import identity_service
+    from ..services.admin_auth_service import admin_auth_service
+    from ..utils.exceptions import NotFoundException
     from flask import jsonify
     
     @jwt.user_lookup_loader
     def user_lookup_callback(_jwt_header, jwt_data):
-        from ..models.user import User
-        identity = jwt_data["sub"]
+        # 管理员令牌返回启用状态的 AdminUser；用户令牌返回缓存的身份快照 (CurrentIdentity)，找不到时返回None
+        if admin_auth_service.is_admin_token(jwt_data):
+            return admin_auth_service.resolve(jwt_data)
         try:
-            # 尝试通过UUID查找用户
-            return user_service.get_user_by_uuid(identity)
-        except:
-            try:
-                # 尝试通过ID查找用户
-                return user_service.get_user_by_id(identity)
-            except:
-                # 如果找不到用户，返回None
-                return None
+            return identity_service.resolve(jwt_data["sub"])
+        except NotFoundException:
+            return None
     
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
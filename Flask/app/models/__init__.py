@@ -6,18 +6,18 @@ from app.core.extensions import db
 
 from .user import User
 from .profile import FreelancerProfile, EmployerProfile
-from .job import Job, JobApplication
-from .order import Order, Payment, Evaluation
+from .job import Job, JobApplication, JobTaxonomyTerm, JobRecommendationList
+from .order import Order, Payment, Evaluation, UserRatingAggregate
 from .skill import Skill, FreelancerSkill, JobRequiredSkill
-from .message import Message
+from .message import Message, Conversation
 from .admin import AdminUser
 from .verification import VerificationRecord
-from .wallet import WithdrawalRequest, WalletTransaction, UserWallet
-from .notification import Notification
+from .wallet import WithdrawalRequest, WalletTransaction, UserWallet, PlatformEscrowShard
+from .notification import Notification, UnreadCounter
 from .favorite import Favorite
 from .report import Report
 from .dispute import Dispute
-from .system import SystemConfig
+from .system import SystemConfig, SchedulerLease, BackgroundTask
 
 # You can optionally define __all__ for explicit exports
 __all__ = [
@@ -26,22 +26,30 @@ __all__ = [
     'EmployerProfile',
     'Job',
     'JobApplication',
+    'JobTaxonomyTerm',
+    'JobRecommendationList',
     'Order',
     'Payment',
     'Evaluation',
+    'UserRatingAggregate',
     'Skill',
     'FreelancerSkill',
     'JobRequiredSkill',
     'Message',
+    'Conversation',
     'AdminUser',
     'VerificationRecord',
     'WithdrawalRequest',
     'WalletTransaction',
     'UserWallet',
+    'PlatformEscrowShard',
     'Notification',
+    'UnreadCounter',
     'Favorite',
     'Report',
     'Dispute',
     'SystemConfig',
+    'SchedulerLease',
+    'BackgroundTask',
 ]
 
@@ -32,6 +32,11 @@ class JobApplicationStatusEnum(enum.Enum):
     # withdrawn_by_employer = 'withdrawn_by_employer' # Example, if needed
     # interview_scheduled = 'interview_scheduled' # Example, if needed
 
+# --- Enums for JobTaxonomyTerm ---
+class JobTermTypeEnum(enum.Enum):
+    tag = 'tag'
+    category = 'category'
+
 # --- Job Model ---
 class Job(db.Model):
     __tablename__ = 'jobs'
@@ -50,6 +55,9 @@ class Job(db.Model):
     location_city = db.Column(db.String(50), nullable=True, index=True, comment='城市 (冗余)')
     location_district = db.Column(db.String(50), nullable=True, index=True, comment='区县 (冗余)')
     location_point = db.Column(db.JSON, nullable=True, comment='地理坐标 (GeoJSON)') # Add spatial index in DB if supported for JSON
+    location_geohash = db.Column(db.String(12), nullable=True, index=True, comment='地理坐标 geohash (空间网格索引, 随 location_point 维护)')
+    location_lat = db.Column(db.Float, nullable=True, comment='纬度 (随 location_point 维护, 地理范围搜索的外接矩形过滤)')
+    location_lng = db.Column(db.Float, nullable=True, comment='经度 (随 location_point 维护)')
 
     start_time = db.Column(db.DateTime(timezone=True), nullable=False, comment='预计开始时间')
     end_time = db.Column(db.DateTime(timezone=True), nullable=False, comment='预计结束时间')
@@ -74,7 +82,7 @@ class Job(db.Model):
     application_deadline = db.Column(db.DateTime(timezone=True), nullable=True, comment='报名截止时间')
 
     created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow, index=True)
-    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True) # 搜索索引增量追平使用
 
     # --- Relationships ---
     employer = db.relationship('User', back_populates='jobs_posted', foreign_keys=[employer_user_id])
@@ -83,6 +91,13 @@ class Job(db.Model):
     evaluations = db.relationship('Evaluation', back_populates='job', cascade='all, delete-orphan', lazy='dynamic')
     required_skills_assoc = db.relationship('JobRequiredSkill', back_populates='job', cascade='all, delete-orphan', lazy='dynamic')
 
+    # --- Constraints ---
+    __table_args__ = (
+        db.Index('ix_jobs_status_application_deadline', 'status', 'application_deadline'), # 过期清理: 报名截止
+        db.Index('ix_jobs_status_end_time', 'status', 'end_time'), # 过期清理: 工作结束
+        db.Index('ix_jobs_location_lat_lng', 'location_lat', 'location_lng'), # 地理范围搜索: 外接矩形
+    )
+
     def __repr__(self):
         return f'<Job {self.id} ({self.title})>'
 
@@ -114,3 +129,34 @@ class JobApplication(db.Model):
 
     def __repr__(self):
         return f'<JobApplication {self.id} (Job: {self.job_id}, Freelancer: {self.freelancer_user_id})>'
+
+
+class JobTaxonomyTerm(db.Model):
+    """工作标签/类别字典 (按使用中的工作数引用计数，由 job_taxonomy_service 随工作变更维护)"""
+    __tablename__ = 'job_taxonomy_terms'
+
+    term_type = db.Column(db.Enum(JobTermTypeEnum), primary_key=True, comment='词条类型 (tag/category)')
+    name = db.Column(db.String(50), primary_key=True, comment='标签或类别名称')
+    usage_count = db.Column(db.Integer, nullable=False, default=0, comment='使用该词条的工作数 (不含已取消/审核未通过的工作)')
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # --- Constraints ---
+    __table_args__ = (
+        db.Index('ix_job_taxonomy_terms_type_usage', 'term_type', 'usage_count'),
+    )
+
+    def __repr__(self):
+        return f'<JobTaxonomyTerm {self.term_type.name}:{self.name} ({self.usage_count})>'
+
+
+class JobRecommendationList(db.Model):
+    """零工推荐工作列表 (离线批量预计算，由 job_recommendation_lists 维护)"""
+    __tablename__ = 'job_recommendation_lists'
+
+    freelancer_user_id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), db.ForeignKey('users.id', ondelete='CASCADE', onupdate='CASCADE'), primary_key=True, comment='零工用户ID')
+    job_ids = db.Column(db.LargeBinary, nullable=False, comment='推荐工作ID，按得分降序打包的小端 int64 数组')
+    input_digest = db.Column(db.String(40), nullable=False, comment='计算时零工技能、地点与工作偏好的摘要')
+    computed_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow, index=True, comment='计算时间')
+
+    def __repr__(self):
+        return f'<JobRecommendationList freelancer={self.freelancer_user_id} ({len(self.job_ids or b"") // 8} jobs)>'
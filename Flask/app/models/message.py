@@ -36,3 +36,29 @@ class Message(db.Model):
 
     def __repr__(self):
         return f'<Message {self.id} (From: {self.sender_id} To: {self.recipient_id})>'
+
+
+# --- Conversation Model (会话投影) ---
+class Conversation(db.Model):
+    """
+    会话列表投影：每个会话为每个参与方各保存一行，记录最新消息摘要、该参与方的未读数与已读水位，
+    由 MessageService 在发送消息、message_read_receipts 在写回已读水位时同步维护，会话列表只需按 (user_id, last_message_at) 索引分页查询
+    """
+    __tablename__ = 'conversations'
+    __table_args__ = (
+        db.UniqueConstraint('conversation_id', 'user_id', name='uq_conversation_user'),
+        db.Index('ix_conversations_user_last_message', 'user_id', 'last_message_at', 'id'),
+    )
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True, autoincrement=True, comment='会话投影ID')
+    conversation_id = db.Column(db.String(64), nullable=False, comment='会话ID')
+    user_id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), db.ForeignKey('users.id', ondelete='CASCADE', onupdate='CASCADE'), nullable=False, comment='会话所属用户ID')
+    other_party_id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), db.ForeignKey('users.id', ondelete='CASCADE', onupdate='CASCADE'), nullable=False, comment='会话另一方用户ID')
+    last_message_id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), nullable=True, comment='最新消息ID')
+    last_message_snippet = db.Column(db.String(100), nullable=True, comment='最新消息摘要')
+    last_message_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow, comment='最新消息时间')
+    unread_count = db.Column(db.Integer, nullable=False, default=0, comment='该用户在此会话中的未读消息数')
+    last_read_message_id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), nullable=True, comment='该用户已读到的最新消息ID (已读水位)')
+
+    def __repr__(self):
+        return f'<Conversation {self.conversation_id} (User: {self.user_id}, Unread: {self.unread_count})>'
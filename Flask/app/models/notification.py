@@ -36,3 +36,17 @@ class Notification(db.Model):
 
     def __repr__(self):
         return f'<Notification {self.id} (User: {self.user_id}, Type: {self.notification_type.name})>'
+
+
+# --- UnreadCounter Model ---
+class UnreadCounter(db.Model):
+    """用户未读数计数 (通知与消息)，由 unread_counter_service 随写入/标记已读在同一事务中维护，角标查询只读这一行"""
+    __tablename__ = 'user_unread_counters'
+
+    user_id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), db.ForeignKey('users.id', ondelete='CASCADE', onupdate='CASCADE'), primary_key=True, comment='用户ID')
+    unread_notifications = db.Column(db.Integer, nullable=False, default=0, comment='未读通知数')
+    unread_messages = db.Column(db.Integer, nullable=False, default=0, comment='未读消息数')
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UnreadCounter user={self.user_id} notifications={self.unread_notifications} messages={self.unread_messages}>'
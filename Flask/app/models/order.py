@@ -23,9 +23,27 @@ class CancellationPartyEnum(enum.Enum):
     employer = 'employer'
     platform = 'platform'
 
+# --- Order status transitions ---
+# 订单状态机: {当前状态: 允许进入的状态}；OrderService 的订单操作只沿这些边迁移
+ORDER_STATUS_TRANSITIONS = {
+    OrderStatusEnum.pending_start: {OrderStatusEnum.in_progress, OrderStatusEnum.cancelled},
+    OrderStatusEnum.in_progress: {OrderStatusEnum.pending_confirmation, OrderStatusEnum.disputed},
+    OrderStatusEnum.pending_confirmation: {OrderStatusEnum.completed, OrderStatusEnum.disputed},
+    OrderStatusEnum.completed: {OrderStatusEnum.disputed},
+    OrderStatusEnum.disputed: {OrderStatusEnum.in_progress, OrderStatusEnum.completed, OrderStatusEnum.cancelled},
+    OrderStatusEnum.cancelled: set(),
+}
+
 # --- Order Model ---
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        # 订单列表: 按参与方 + 状态过滤，按创建时间排序/按时间范围过滤
+        db.Index('ix_orders_freelancer_status_created', 'freelancer_user_id', 'status', 'created_at'),
+        db.Index('ix_orders_employer_status_created', 'employer_user_id', 'status', 'created_at'),
+        # 自动确认: 按 (状态, 确认截止时间) 顺序扫描到期订单
+        db.Index('ix_orders_status_confirmation_deadline', 'status', 'confirmation_deadline'),
+    )
 
     id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True, autoincrement=True, comment='订单唯一ID')
     job_id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), db.ForeignKey('jobs.id', ondelete='RESTRICT', onupdate='CASCADE'), nullable=False, index=True, comment='关联的工作ID')
@@ -50,9 +68,14 @@ class Order(db.Model):
     cancellation_reason = db.Column(db.Text, nullable=True, comment='取消原因')
     cancelled_by = db.Column(db.Enum('freelancer', 'employer', 'platform'), nullable=True, comment='取消方')
 
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1', comment='乐观锁版本号，每次修改 +1')
+
     created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # ORM 方式修改订单时同样按版本号条件更新，并发修改抛出 StaleDataError
+    __mapper_args__ = {'version_id_col': version}
+
     # --- Relationships ---
     job = db.relationship('Job', back_populates='orders')
     application = db.relationship('JobApplication', back_populates='order')
@@ -140,3 +163,36 @@ class Evaluation(db.Model):
 
     def __repr__(self):
         return f'<Evaluation {self.id} (Order: {self.order_id}, Evaluator: {self.evaluator_user_id})>'
+
+
+# --- Rating Aggregate Model ---
+class UserRatingAggregate(db.Model):
+    """
+    用户按角色汇总的评分统计 (评价数、评分总和、各星级分布)，
+    在提交评价时原子累加，档案上的 average_rating 由此推导
+    """
+    __tablename__ = 'user_rating_aggregates'
+
+    user_id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), db.ForeignKey('users.id', ondelete='CASCADE', onupdate='CASCADE'), primary_key=True, comment='被评价用户ID')
+    role = db.Column(db.Enum(EvaluatorRoleEnum), primary_key=True, comment='被评价时的角色 (freelancer/employer)')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, comment='评价总数')
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, comment='评分总和')
+    rating_1_count = db.Column(db.Integer, nullable=False, default=0, comment='1星评价数')
+    rating_2_count = db.Column(db.Integer, nullable=False, default=0, comment='2星评价数')
+    rating_3_count = db.Column(db.Integer, nullable=False, default=0, comment='3星评价数')
+    rating_4_count = db.Column(db.Integer, nullable=False, default=0, comment='4星评价数')
+    rating_5_count = db.Column(db.Integer, nullable=False, default=0, comment='5星评价数')
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def average_rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+    @property
+    def histogram(self):
+        return {star: getattr(self, f'rating_{star}_count') or 0 for star in range(1, 6)}
+
+    def __repr__(self):
+        return f'<UserRatingAggregate {self.user_id} ({self.role.name}): {self.rating_sum}/{self.rating_count}>'
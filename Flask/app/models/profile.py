@@ -56,6 +56,11 @@ class FreelancerProfile(db.Model):
     user = db.relationship('User', back_populates='freelancer_profile')
     verification_record = db.relationship('VerificationRecord', back_populates='freelancer_profile_verified', foreign_keys=[verification_record_id])
 
+    # --- Constraints ---
+    __table_args__ = (
+        db.Index('ix_freelancer_profiles_city_district', 'location_city', 'location_district'),
+    )
+
     def __repr__(self):
         return f'<FreelancerProfile user_id={self.user_id} nickname={self.nickname}>'
 
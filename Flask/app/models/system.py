@@ -1,6 +1,7 @@
-"""System Configuration Model"""
+"""System Configuration, Scheduler Lease and Background Task Models"""
 from ..core.extensions import db
 from datetime import datetime
+import enum
 
 # --- SystemConfig Model ---
 class SystemConfig(db.Model):
@@ -13,3 +14,57 @@ class SystemConfig(db.Model):
 
     def __repr__(self):
         return f'<SystemConfig {self.config_key}>'
+
+
+# --- SchedulerLease Model ---
+class SchedulerLease(db.Model):
+    """
+    定时任务租约：多个节点运行同一定时任务时，只有持有未过期租约的节点执行，
+    持有者需在租约过期前续约，进程崩溃后租约到期自动释放
+    """
+    __tablename__ = 'scheduler_leases'
+
+    name = db.Column(db.String(100), primary_key=True, comment='定时任务名称')
+    holder = db.Column(db.String(200), nullable=False, comment='租约持有者 (主机:进程:随机串)')
+    expires_at = db.Column(db.DateTime, nullable=False, comment='租约到期时间 (UTC)')
+    acquired_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, comment='本次获得租约的时间 (UTC)')
+
+    def __repr__(self):
+        return f'<SchedulerLease {self.name} ({self.holder} until {self.expires_at})>'
+
+
+# --- BackgroundTask Model ---
+class BackgroundTaskStatusEnum(enum.Enum):
+    queued = 'queued'
+    running = 'running'
+    succeeded = 'succeeded'
+    failed = 'failed'
+
+
+class BackgroundTask(db.Model):
+    """
+    后台任务队列 (task_queue 的数据库后端)：worker 按 (status, run_at) 领取到期任务，
+    执行中的任务 run_at 为租约到期时间，worker 崩溃后任务在租约到期时被重新领取
+    """
+    __tablename__ = 'background_tasks'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True, autoincrement=True, comment='任务ID')
+    name = db.Column(db.String(100), nullable=False, comment='任务名称 (@task 注册名)')
+    payload = db.Column(db.JSON, nullable=False, comment='任务参数 {"args": [...], "kwargs": {...}}')
+    idempotency_key = db.Column(db.String(191), nullable=True, unique=True, comment='幂等键 (相同键只入队一次)')
+    status = db.Column(db.Enum(BackgroundTaskStatusEnum), nullable=False, default=BackgroundTaskStatusEnum.queued, comment='任务状态')
+    attempts = db.Column(db.Integer, nullable=False, default=0, comment='已执行次数')
+    max_attempts = db.Column(db.Integer, nullable=False, default=5, comment='最多执行次数')
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, comment='下次可执行时间；执行中为租约到期时间 (UTC)')
+    locked_by = db.Column(db.String(200), nullable=True, comment='执行中的 worker 标识')
+    last_error = db.Column(db.Text, nullable=True, comment='最近一次失败原因')
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True, index=True, comment='成功或最终失败的时间 (UTC)')
+
+    __table_args__ = (
+        db.Index('ix_background_tasks_status_run_at', 'status', 'run_at'),
+    )
+
+    def __repr__(self):
+        return f'<BackgroundTask {self.id} ({self.name}, {self.status})>'
@@ -60,6 +60,7 @@ class WalletTransaction(db.Model):
     related_order_id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), db.ForeignKey('orders.id', ondelete='SET NULL', onupdate='CASCADE'), nullable=True, index=True, comment='关联的订单ID (冗余)')
     related_withdrawal_id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), db.ForeignKey('withdrawal_requests.id', ondelete='SET NULL', onupdate='CASCADE'), nullable=True, index=True, comment='关联的提现申请ID')
     description = db.Column(db.String(255), nullable=True, comment='交易描述')
+    escrow_shard_id = db.Column(db.SmallInteger, nullable=True, comment='平台托管子账户编号 (非空时 balance_after 为该子账户余额)')
     created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow, index=True)
 
     # --- Relationships ---
@@ -86,3 +87,19 @@ class UserWallet(db.Model):
 
     def __repr__(self):
         return f'<UserWallet for User {self.user_id} (Balance: {self.balance})>'
+
+
+# --- PlatformEscrowShard Model ---
+class PlatformEscrowShard(db.Model):
+    """
+    平台托管账户的入账子账户：支付成功时按订单ID分散入账，避免所有支付回调争用同一钱包行锁；
+    平台托管逻辑余额 = 平台钱包余额 + 各子账户余额之和，定期归集到平台钱包
+    """
+    __tablename__ = 'platform_escrow_shards'
+
+    shard_id = db.Column(db.SmallInteger, primary_key=True, autoincrement=False, comment='子账户编号')
+    balance = db.Column(db.Numeric(12, 2), nullable=False, default=0.00, comment='子账户余额 (尚未归集的托管入账)')
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<PlatformEscrowShard {self.shard_id} (Balance: {self.balance})>'
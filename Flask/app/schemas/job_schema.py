@@ -63,6 +63,7 @@ class JobSchema(ma.Schema):
     status = fields.String(validate=validate.OneOf([e.value for e in JobStatusEnum]), dump_only=True, dump_default=JobStatusEnum.pending_review.value)
     cancellation_reason = fields.String(dump_only=True) # Set via specific action/endpoint
     view_count = fields.Integer(dump_only=True, dump_default=0)
+    distance_km = fields.Float(dump_only=True) # 仅地理范围搜索时由 search_jobs 设置
     application_deadline = fields.DateTime(allow_none=True)
 
     created_at = fields.DateTime(dump_only=True)
@@ -77,6 +77,7 @@ class OrderSchema(ma.Schema):
 
     cancellation_reason = fields.String(dump_only=True, allow_none=True)
     cancelled_by = fields.String(validate=validate.OneOf([e.value for e in CancellationPartyEnum]), dump_only=True, allow_none=True)
+    version = fields.Integer(dump_only=True) # 乐观锁版本号，执行订单操作时可回传
 
     created_at = fields.DateTime(dump_only=True)
     updated_at = fields.DateTime(dump_only=True)
@@ -106,6 +107,7 @@ class OrderActionSchema(ma.Schema):
     ]))
     # Optional fields depending on action
     cancellation_reason = fields.String(validate=validate.Length(max=500)) # Required if action is 'cancel_order' by user
+    version = fields.Integer() # 客户端读取到的订单版本号，提供时订单已被修改则操作失败 (409)
 
     @validates_schema
     def validate_cancel_reason(self, data, **kwargs):
@@ -10,6 +10,7 @@ from .job_application_service import job_application_service
 from .verification_service import verification_service
 from .skill_service import skill_service
 from .order_service import order_service
+from .identity_service import identity_service
 
 __all__ = [
     'user_service',
@@ -19,5 +20,6 @@ __all__ = [
     'job_application_service',
     'verification_service',
     'skill_service',
-    'order_service'
+    'order_service',
+    'identity_service'
 ]
@@ -0,0 +1,88 @@
+"""
+管理员认证 (Admin Authentication)
+
+管理员账号 (admin_users) 与平台用户相互独立。管理员登录后签发的访问令牌:
+- sub 为 'admin:<管理员ID>'，不会被解析为平台用户
+- 附带 is_admin / admin_id 声明，管理员接口通过 require_admin() 校验
+每次请求由 JWT user_lookup_loader 调用 resolve() 确认管理员仍存在且处于启用状态，
+被停用的管理员持有的令牌立即失效。
+"""
+from datetime import datetime, timezone
+
+from flask_jwt_extended import create_access_token, get_jwt
+
+from ..core.extensions import bcrypt, db
+from ..models.admin import AdminStatusEnum, AdminUser
+from ..utils.exceptions import AuthenticationException, AuthorizationException, BusinessException
+
+ADMIN_IDENTITY_PREFIX = 'admin:'
+
+
+class AdminAuthService:
+    def login(self, username, password):
+        """
+        管理员登录
+        :param username: 管理员登录账号
+        :param password: 密码
+        :return: (admin, token) 管理员对象和JWT token
+        :raises: AuthenticationException, BusinessException
+        """
+        if not username or not password:
+            raise BusinessException("账号和密码不能为空")
+
+        admin = AdminUser.query.filter_by(username=username).first()
+        if not admin or not bcrypt.check_password_hash(admin.password_hash, password):
+            raise AuthenticationException("账号或密码错误")
+        if admin.status != AdminStatusEnum.active:
+            raise AuthenticationException("管理员账号已被停用")
+
+        admin.last_login_at = datetime.now(timezone.utc)
+        db.session.commit()
+        return admin, self.create_token(admin)
+
+    def create_token(self, admin):
+        """为管理员签发访问令牌 (带 is_admin 声明)"""
+        return create_access_token(identity=f'{ADMIN_IDENTITY_PREFIX}{admin.id}',
+                                   additional_claims={'is_admin': True, 'admin_id': admin.id})
+
+    def create_admin(self, username, password, role='super_admin', real_name=None):
+        """
+        创建管理员账号
+        :return: AdminUser
+        :raises: BusinessException 账号已存在
+        """
+        if AdminUser.query.filter_by(username=username).first():
+            raise BusinessException(f"管理员账号 {username} 已存在")
+        admin = AdminUser(username=username, password_hash=bcrypt.generate_password_hash(password).decode('utf-8'),
+                          role=role, real_name=real_name, status=AdminStatusEnum.active)
+        db.session.add(admin)
+        db.session.commit()
+        return admin
+
+    def is_admin_token(self, jwt_data):
+        return bool(jwt_data.get('is_admin')) and str(jwt_data.get('sub', '')).startswith(ADMIN_IDENTITY_PREFIX)
+
+    def resolve(self, jwt_data):
+        """
+        解析管理员令牌
+        :param jwt_data: JWT 声明
+        :return: 启用状态的 AdminUser；不存在或已停用时返回 None
+        """
+        admin = db.session.get(AdminUser, jwt_data.get('admin_id'))
+        if admin is None or admin.status != AdminStatusEnum.active:
+            return None
+        return admin
+
+    def require_admin(self):
+        """
+        校验当前请求为管理员令牌 (需在 jwt_required 保护的视图中调用)
+        :return: 管理员ID
+        :raises: AuthorizationException
+        """
+        claims = get_jwt()
+        if not self.is_admin_token(claims):
+            raise AuthorizationException(message="需要管理员权限", error_code=40303)
+        return claims['admin_id']
+
+
+admin_auth_service = AdminAuthService()
@@ -1,28 +1,33 @@
 from ..models.dispute import Dispute, DisputeStatusEnum
 from ..models.report import Report, ReportTypeEnum, ReportStatusEnum
-from ..models.order import Order, OrderStatusEnum
+from ..models.order import Order, OrderStatusEnum, CancellationPartyEnum, Evaluation, Payment, PaymentStatusEnum
 from ..models.job import Job
 from ..models.user import User
-from ..models.evaluation import Evaluation
 from ..models.message import Message
-from ..models.payment import Payment, PaymentStatusEnum
-from ..models.wallet import UserWallet, WalletTransaction, TransactionTypeEnum
+from ..models.notification import NotificationTypeEnum
+from ..models.wallet import TransactionTypeEnum
 from ..services.dispute_report_service import dispute_service, report_service
 from ..services.admin_user_service import admin_user_service
+from ..services.order_service import order_service
+from ..services.target_loader import target_loader
+from ..services.wallet_ledger import wallet_ledger, LedgerEntry
 from ..core.extensions import db
-from ..utils.exceptions import NotFoundException, AuthorizationException, BusinessException, InvalidUsageException
+from ..utils.exceptions import NotFoundException, AuthorizationException, BusinessException, InvalidUsageException, InsufficientFundsException
 from sqlalchemy.orm import joinedload
 from datetime import datetime
 from decimal import Decimal
+from ..utils.pagination import keyset_paginate
 
 class AdminDisputeService:
-    def get_pending_disputes(self, filters=None, page=1, per_page=10, sort_by=None):
+    def get_pending_disputes(self, filters=None, page=1, per_page=10, sort_by=None, cursor=None, include_total=False):
         """
         获取待处理的争议列表（管理员专用）
         :param filters: 过滤条件，例如status
         :param page: 页码
         :param per_page: 每页数量
         :param sort_by: 排序方式
+        :param cursor: 游标分页参数，非 None 时启用游标分页 (空字符串表示第一页)，不支持按 status 排序
+        :param include_total: 游标分页时是否统计总数
         :return: 分页后的争议列表
         """
         from flask import current_app
@@ -69,6 +74,15 @@ class AdminDisputeService:
                 # 默认按创建时间升序 (FIFO处理)
                 query = query.order_by(Dispute.created_at.asc())
             
+            if cursor is not None:
+                if sort_by == 'status':
+                    raise InvalidUsageException(message="按状态排序不支持游标分页，请使用页码分页。")
+                if sort_by == 'created_at_desc':
+                    order_by = [(Dispute.created_at, 'desc'), (Dispute.id, 'desc')]
+                else:
+                    order_by = [(Dispute.created_at, 'asc'), (Dispute.id, 'asc')]
+                return keyset_paginate(query, order_by, cursor=cursor, per_page=per_page, include_total=include_total)
+            
             # 执行分页
             paginated_disputes = query.paginate(page=page, per_page=per_page, error_out=False)
             
@@ -77,6 +91,8 @@ class AdminDisputeService:
             
             return paginated_disputes
             
+        except InvalidUsageException:
+            raise
         except Exception as e:
             current_app.logger.error(f"管理员获取待处理争议列表时出错: {str(e)}")
             raise BusinessException(message=f"获取待处理争议列表失败: {str(e)}", status_code=500, error_code=50001)
@@ -157,53 +173,44 @@ class AdminDisputeService:
                     if not order:
                         raise BusinessException(message="争议关联的订单不存在", status_code=500, error_code=50002)
                     
-                    # 执行争议解决后的特定操作
-                    if 'resolution_action' in mediation_data:
-                        resolution_action = mediation_data['resolution_action']
-                        
-                        # 根据解决动作执行不同操作
-                        if resolution_action == 'complete_order':
-                            # 将订单标记为完成
-                            order.status = OrderStatusEnum.completed
-                            order.completed_at = datetime.utcnow()
-                            # TODO: 可能需要触发完成后的结算流程
-                            
-                        elif resolution_action == 'cancel_order':
-                            # 将订单取消
-                            order.status = OrderStatusEnum.cancelled
-                            order.cancellation_reason = f"争议处理结果：{dispute.resolution_result}"
-                            
-                        elif resolution_action == 'partial_refund' and 'refund_amount' in mediation_data:
-                            # 部分退款
-                            self._process_refund(
-                                order, 
-                                Decimal(str(mediation_data['refund_amount'])), 
-                                f"争议部分退款: {dispute.resolution_result}"
-                            )
-                            # 标记订单为已完成但有争议
-                            order.status = OrderStatusEnum.completed
-                            order.completed_at = datetime.utcnow()
-                            
-                        elif resolution_action == 'full_refund':
-                            # 全额退款
-                            self._process_refund(
-                                order, 
-                                order.order_amount, 
-                                f"争议全额退款: {dispute.resolution_result}"
-                            )
-                            # 标记订单为已取消
-                            order.status = OrderStatusEnum.cancelled
-                            order.cancellation_reason = f"争议处理结果全额退款：{dispute.resolution_result}"
-                            
-                        else:
-                            # 默认情况，根据当前订单状态决定
-                            if order.status == OrderStatusEnum.disputed:
-                                # 恢复到争议前的状态（假设为进行中）
-                                order.status = OrderStatusEnum.in_progress
-                    else:
-                        # 未指定解决动作，默认只是将订单从争议状态恢复到进行中
-                        if order.status == OrderStatusEnum.disputed:
-                            order.status = OrderStatusEnum.in_progress
+                    # 执行争议解决后的特定操作 (订单状态按状态机从争议中迁移，与退款在同一事务中提交)
+                    resolution_action = mediation_data.get('resolution_action')
+                    if resolution_action == 'complete_order':
+                        # 将订单标记为完成
+                        # TODO: 可能需要触发完成后的结算流程
+                        self._resolve_order(order, 'resolve_dispute_complete')
+
+                    elif resolution_action == 'cancel_order':
+                        # 将订单取消
+                        self._resolve_order(order, 'resolve_dispute_cancel', {
+                            'cancellation_reason': f"争议处理结果：{dispute.resolution_result}",
+                            'cancelled_by': CancellationPartyEnum.platform.value,
+                        })
+
+                    elif resolution_action == 'partial_refund' and 'refund_amount' in mediation_data:
+                        # 部分退款，标记订单为已完成但有争议
+                        self._resolve_order(order, 'resolve_dispute_complete')
+                        self._process_refund(
+                            order, 
+                            Decimal(str(mediation_data['refund_amount'])), 
+                            f"争议部分退款: {dispute.resolution_result}"
+                        )
+
+                    elif resolution_action == 'full_refund':
+                        # 全额退款，标记订单为已取消
+                        self._resolve_order(order, 'resolve_dispute_cancel', {
+                            'cancellation_reason': f"争议处理结果全额退款：{dispute.resolution_result}",
+                            'cancelled_by': CancellationPartyEnum.platform.value,
+                        })
+                        self._process_refund(
+                            order, 
+                            order.order_amount, 
+                            f"争议全额退款: {dispute.resolution_result}"
+                        )
+
+                    elif order.status == OrderStatusEnum.disputed.value:
+                        # 未指定 (或无法识别) 解决动作时，将订单从争议状态恢复到进行中
+                        self._resolve_order(order, 'resolve_dispute_resume')
                 
                 current_app.logger.info(f"管理员 {admin_user_id} 处理争议 {dispute_id}, 状态从 {old_status.value} 变更为 {new_status.value}")
             
@@ -222,6 +229,15 @@ class AdminDisputeService:
                 raise BusinessException(message=f"处理争议失败: {str(e)}", status_code=500, error_code=50003)
             raise e
     
+    def _resolve_order(self, order, action, values=None):
+        """
+        按订单状态机迁移争议订单 (在当前事务中执行，不提交)
+        :raises: BusinessException(409) 订单已不在争议中
+        """
+        if not order_service.apply_platform_transition(order.id, action, values):
+            raise BusinessException(message=f"订单状态为 {order.status}，不在争议中，无法按争议结果处理",
+                                    status_code=409, error_code=40902)
+
     def _process_refund(self, order, amount, description):
         """
         处理退款流程
@@ -241,74 +257,54 @@ class AdminDisputeService:
         # 查找原始支付记录
         original_payment = Payment.query.filter_by(
             order_id=order.id,
-            status=PaymentStatusEnum.succeeded
+            status=PaymentStatusEnum.succeeded.value
         ).first()
         
         if not original_payment:
             raise BusinessException(message=f"未找到订单 {order.id} 的成功支付记录", status_code=500, error_code=50004)
         
-        # 获取平台托管账户（假设为原支付的收款方）
-        platform_wallet = UserWallet.query.filter_by(user_id=original_payment.payee_user_id).first()
-        if not platform_wallet:
-            raise BusinessException(message="平台托管账户钱包不存在", status_code=500, error_code=50005)
-        
-        # 获取付款方（雇主）钱包
-        employer_wallet = UserWallet.query.filter_by(user_id=order.employer_user_id).first()
-        if not employer_wallet:
-            raise BusinessException(message=f"雇主 {order.employer_user_id} 的钱包不存在", status_code=500, error_code=50006)
-        
-        # 检查平台余额是否足够退款
-        if platform_wallet.balance < amount:
-            raise BusinessException(
-                message=f"平台托管账户余额不足，当前余额: {platform_wallet.balance}，需要退款: {amount}", 
-                status_code=500, 
-                error_code=50007
-            )
-        
-        # 创建退款支付记录
+        # 创建退款支付记录 (平台托管账户，即原支付的收款方，向原付款方退款)
         refund_payment = Payment(
             order_id=order.id,
             payer_user_id=original_payment.payee_user_id,  # 平台作为退款方
             payee_user_id=original_payment.payer_user_id,  # 原付款方作为收款方
             amount=amount,
             payment_method="platform_refund",
-            status=PaymentStatusEnum.succeeded,
+            status=PaymentStatusEnum.succeeded.value,
             internal_transaction_id=f"refund_{original_payment.internal_transaction_id}",
-            paid_at=datetime.utcnow(),
-            description=description
+            paid_at=datetime.utcnow()
         )
         db.session.add(refund_payment)
         db.session.flush()  # 获取生成的ID
         
-        # 减少平台账户余额
-        platform_wallet.balance -= amount
-        
-        # 创建平台支出交易记录
-        platform_transaction = WalletTransaction(
-            user_id=platform_wallet.user_id,
-            transaction_type=TransactionTypeEnum.refund_out,
-            amount=-amount,  # 负数表示支出
-            balance_after=platform_wallet.balance,
-            related_payment_id=refund_payment.id,
-            related_order_id=order.id,
-            description=f"向订单 #{order.id} 雇主退款"
-        )
-        db.session.add(platform_transaction)
-        
-        # 增加雇主账户余额
-        employer_wallet.balance += amount
-        
-        # 创建雇主收入交易记录
-        employer_transaction = WalletTransaction(
-            user_id=employer_wallet.user_id,
-            transaction_type=TransactionTypeEnum.refund_in,
-            amount=amount,  # 正数表示收入
-            balance_after=employer_wallet.balance,
-            related_payment_id=refund_payment.id,
-            related_order_id=order.id,
-            description=f"订单 #{order.id} 退款"
-        )
-        db.session.add(employer_transaction)
+        # 平台托管账户支出、雇主账户收入，余额不足时条件更新失败，不会出现负余额
+        try:
+            wallet_ledger.post_entries([
+                LedgerEntry(
+                    original_payment.payee_user_id,
+                    TransactionTypeEnum.refund,
+                    balance_delta=-amount,  # 负数表示支出
+                    related_payment_id=refund_payment.id,
+                    related_order_id=order.id,
+                    description=f"向订单 #{order.id} 雇主退款"
+                ),
+                LedgerEntry(
+                    order.employer_user_id,
+                    TransactionTypeEnum.refund,
+                    balance_delta=amount,  # 正数表示收入
+                    related_payment_id=refund_payment.id,
+                    related_order_id=order.id,
+                    description=f"订单 #{order.id} 退款"
+                ),
+            ])
+        except InsufficientFundsException:
+            raise BusinessException(
+                message=f"平台托管账户余额不足，需要退款: {amount}", 
+                status_code=500, 
+                error_code=50007
+            )
+        except NotFoundException as e:
+            raise BusinessException(message=e.message, status_code=500, error_code=50005)
         
         current_app.logger.info(f"订单 {order.id} 退款处理完成，金额：{amount}, 说明：{description}")
     
@@ -351,16 +347,15 @@ class AdminDisputeService:
                 notification_content += f" 处理结果：{dispute.resolution_result}"
             
             notification_data = {
-                'notification_type': 'dispute_mediation_result',
+                'notification_type': NotificationTypeEnum.dispute_update,
                 'title': notification_title,
                 'content': notification_content,
                 'related_resource_type': 'dispute',
                 'related_resource_id': dispute.id
             }
             
-            # 向双方发送通知
-            for user_id in recipients:
-                notification_service.create_notification(user_id, notification_data)
+            # 向双方发送通知 (一次写入、一次提交)
+            notification_service.create_notifications_bulk(recipients, notification_data)
             
             current_app.logger.info(f"已向用户 {recipients} 发送争议处理结果通知")
             
@@ -370,13 +365,15 @@ class AdminDisputeService:
 
 
 class AdminReportService:
-    def get_pending_reports(self, filters=None, page=1, per_page=10, sort_by=None):
+    def get_pending_reports(self, filters=None, page=1, per_page=10, sort_by=None, cursor=None, include_total=False):
         """
         获取待处理的举报列表（管理员专用）
         :param filters: 过滤条件，例如report_type
         :param page: 页码
         :param per_page: 每页数量
         :param sort_by: 排序方式
+        :param cursor: 游标分页参数，非 None 时启用游标分页 (空字符串表示第一页)，不支持按 report_type 排序
+        :param include_total: 游标分页时是否统计总数
         :return: 分页后的举报列表
         """
         from flask import current_app
@@ -414,26 +411,39 @@ class AdminReportService:
                 # 默认按创建时间升序 (FIFO处理)
                 query = query.order_by(Report.created_at.asc())
             
-            # 执行分页
-            paginated_reports = query.paginate(page=page, per_page=per_page, error_out=False)
+            if cursor is not None:
+                if sort_by == 'report_type':
+                    raise InvalidUsageException(message="按举报类型排序不支持游标分页，请使用页码分页。")
+                if sort_by == 'created_at_desc':
+                    order_by = [(Report.created_at, 'desc'), (Report.id, 'desc')]
+                else:
+                    order_by = [(Report.created_at, 'asc'), (Report.id, 'asc')]
+                paginated_reports = keyset_paginate(query, order_by, cursor=cursor, per_page=per_page, include_total=include_total)
+            else:
+                # 执行分页
+                paginated_reports = query.paginate(page=page, per_page=per_page, error_out=False)
             
-            # 为每个举报项添加被举报对象摘要信息
+            # 按类型批量加载被举报对象 (每种目标一条 IN 查询)，再为每个举报项添加摘要信息
+            targets = target_loader.load((report.report_type, report.target_id) for report in paginated_reports.items)
             for report in paginated_reports.items:
-                report.target_summary = self._get_report_target_summary(report)
+                report.target_summary = self._get_report_target_summary(report, targets)
             
             # 记录日志
             current_app.logger.info(f"管理员查询待处理举报列表，过滤条件: {filters}, 页码: {page}, 每页: {per_page}, 总数: {paginated_reports.total}")
             
             return paginated_reports
             
+        except InvalidUsageException:
+            raise
         except Exception as e:
             current_app.logger.error(f"管理员获取待处理举报列表时出错: {str(e)}")
             raise BusinessException(message=f"获取待处理举报列表失败: {str(e)}", status_code=500, error_code=50008)
     
-    def _get_report_target_summary(self, report):
+    def _get_report_target_summary(self, report, targets=None):
         """
         获取举报目标的摘要信息
         :param report: 举报记录
+        :param targets: target_loader.load() 的结果；为 None 时单独加载该举报的目标
         :return: 摘要信息字符串
         """
         from flask import current_app
@@ -442,37 +452,30 @@ class AdminReportService:
             report_type = report.report_type
             target_id = report.target_id
             
-            if report_type == ReportTypeEnum.job:
-                job = Job.query.get(target_id)
-                if job:
-                    return f"工作：{job.title} (ID: {job.id})"
-            
-            elif report_type == ReportTypeEnum.user:
-                user = User.query.get(target_id)
-                if user:
-                    if hasattr(user, 'phone_number'):
-                        return f"用户：{user.phone_number} (ID: {user.id})"
-                    return f"用户 ID: {user.id}"
-            
-            elif report_type == ReportTypeEnum.order:
-                order = Order.query.get(target_id)
-                if order:
-                    # 尝试通过关联的Job获取更多信息
-                    job_title = "未知工作"
-                    if hasattr(order, 'job') and order.job:
-                        job_title = order.job.title
-                    return f"订单：{job_title} (订单ID: {order.id})"
-            
-            elif report_type == ReportTypeEnum.message:
-                message = Message.query.get(target_id)
-                if message:
-                    content_preview = message.content[:20] + "..." if len(message.content) > 20 else message.content
-                    return f"消息：{content_preview} (ID: {message.id})"
-            
-            elif report_type == ReportTypeEnum.evaluation:
-                evaluation = Evaluation.query.get(target_id)
-                if evaluation:
-                    return f"评价 ID: {evaluation.id}, 评分: {evaluation.rating}"
+            if targets is None:
+                targets = target_loader.load([(report_type, target_id)])
+            target = targets.get((report_type.value if hasattr(report_type, 'value') else report_type, target_id))
+            
+            if target is not None:
+                if report_type == ReportTypeEnum.job:
+                    return f"工作：{target.title} (ID: {target.id})"
+                
+                elif report_type == ReportTypeEnum.user:
+                    if target.phone_number:
+                        return f"用户：{target.phone_number} (ID: {target.id})"
+                    return f"用户 ID: {target.id}"
+                
+                elif report_type == ReportTypeEnum.order:
+                    # 通过预加载的关联Job获取更多信息
+                    job_title = target.job.title if target.job else "未知工作"
+                    return f"订单：{job_title} (订单ID: {target.id})"
+                
+                elif report_type == ReportTypeEnum.message:
+                    content_preview = target.content[:20] + "..." if len(target.content) > 20 else target.content
+                    return f"消息：{content_preview} (ID: {target.id})"
+                
+                elif report_type == ReportTypeEnum.evaluation:
+                    return f"评价 ID: {target.id}, 评分: {target.rating}"
             
             return f"未知类型 {report_type.value if hasattr(report_type, 'value') else report_type} 的举报目标 ID: {target_id}"
             
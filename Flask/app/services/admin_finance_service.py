@@ -1,19 +1,23 @@
-from ..models.wallet import UserWallet, WalletTransaction, TransactionTypeEnum, WithdrawalRequest, WithdrawalStatusEnum
+from ..models.wallet import TransactionTypeEnum, WithdrawalRequest, WithdrawalStatusEnum
 from ..models.user import User
 from ..core.extensions import db
-from ..utils.exceptions import NotFoundException, AuthorizationException, BusinessException, InvalidUsageException
+from ..utils.exceptions import NotFoundException, AuthorizationException, BusinessException, InvalidUsageException, InsufficientFundsException
 from sqlalchemy.orm import joinedload
 from datetime import datetime
 from decimal import Decimal
+from ..utils.pagination import keyset_paginate
+from .wallet_ledger import wallet_ledger, LedgerEntry
 
 class AdminFinanceService:
-    def get_pending_withdrawal_requests(self, filters=None, page=1, per_page=10, sort_by=None):
+    def get_pending_withdrawal_requests(self, filters=None, page=1, per_page=10, sort_by=None, cursor=None, include_total=False):
         """
         获取待处理的提现申请列表（管理员专用）
         :param filters: 过滤条件，例如withdrawal_method, amount_min, amount_max
         :param page: 页码
         :param per_page: 每页数量
         :param sort_by: 排序方式
+        :param cursor: 游标分页参数，非 None 时启用游标分页 (空字符串表示第一页)
+        :param include_total: 游标分页时是否统计总数
         :return: 分页后的提现申请列表
         """
         from flask import current_app
@@ -62,6 +66,15 @@ class AdminFinanceService:
                 # 默认按创建时间升序 (FIFO处理)
                 query = query.order_by(WithdrawalRequest.created_at.asc())
             
+            if cursor is not None:
+                keyset_orders = {
+                    'created_at_desc': [(WithdrawalRequest.created_at, 'desc'), (WithdrawalRequest.id, 'desc')],
+                    'amount_asc': [(WithdrawalRequest.amount, 'asc'), (WithdrawalRequest.id, 'asc')],
+                    'amount_desc': [(WithdrawalRequest.amount, 'desc'), (WithdrawalRequest.id, 'desc')],
+                }
+                order_by = keyset_orders.get(sort_by, [(WithdrawalRequest.created_at, 'asc'), (WithdrawalRequest.id, 'asc')])
+                return keyset_paginate(query, order_by, cursor=cursor, per_page=per_page, include_total=include_total)
+            
             # 执行分页
             paginated_withdrawals = query.paginate(page=page, per_page=per_page, error_out=False)
             
@@ -70,6 +83,8 @@ class AdminFinanceService:
             
             return paginated_withdrawals
             
+        except InvalidUsageException:
+            raise
         except Exception as e:
             current_app.logger.error(f"管理员获取待处理提现列表时出错: {str(e)}")
             raise BusinessException(message=f"获取待处理提现列表失败: {str(e)}", status_code=500, error_code=50001)
@@ -94,88 +109,80 @@ class AdminFinanceService:
             raise InvalidUsageException(message="无效的处理动作，必须是 succeeded 或 failed", error_code=40002)
         
         try:
-            # 开始数据库事务
-            with db.session.begin():
-                # 查询提现申请
-                withdrawal_req = WithdrawalRequest.query.get(withdrawal_id)
-                if not withdrawal_req:
-                    raise NotFoundException(message="提现申请不存在", error_code=40401)
-                
-                # 验证提现申请状态必须是待处理
-                if withdrawal_req.status != WithdrawalStatusEnum.pending:
-                    raise InvalidUsageException(
-                        message=f"该提现申请不在待处理状态，当前状态: {withdrawal_req.status.value}", 
-                        error_code=40003
-                    )
+            # 查询提现申请
+            withdrawal_req = WithdrawalRequest.query.get(withdrawal_id)
+            if not withdrawal_req:
+                raise NotFoundException(message="提现申请不存在", error_code=40401)
+            
+            # 以条件更新抢占处理权：申请必须仍处于待处理状态，并发处理同一申请时只有一个会成功
+            new_status = WithdrawalStatusEnum.succeeded if process_data['action'] == 'succeeded' else WithdrawalStatusEnum.failed
+            claimed = WithdrawalRequest.query.filter(
+                WithdrawalRequest.id == withdrawal_id,
+                WithdrawalRequest.status == WithdrawalStatusEnum.pending
+            ).update({'status': new_status}, synchronize_session=False)
+            if not claimed:
+                db.session.rollback()
+                raise InvalidUsageException(
+                    message=f"该提现申请不在待处理状态，当前状态: {withdrawal_req.status.value}", 
+                    error_code=40003
+                )
+            
+            # 更新提现申请
+            withdrawal_req.status = new_status
+            withdrawal_req.processor_id = admin_user_id
+            withdrawal_req.processed_at = datetime.utcnow()
+            
+            if process_data['action'] == 'succeeded':
+                # 记录外部交易ID（如支付平台返回的交易号）
+                if 'external_transaction_id' in process_data and process_data['external_transaction_id']:
+                    withdrawal_req.external_transaction_id = process_data['external_transaction_id']
                 
-                # 查询用户钱包
-                wallet = UserWallet.query.filter_by(user_id=withdrawal_req.user_id).first()
-                if not wallet:
-                    raise BusinessException(
-                        message=f"用户 {withdrawal_req.user_id} 的钱包不存在", 
-                        status_code=500, 
-                        error_code=50002
-                    )
+                # 资金操作：从冻结余额中减去提现金额（因为这笔钱已经打给用户），可用余额不变
+                entry = LedgerEntry(
+                    withdrawal_req.user_id,
+                    TransactionTypeEnum.withdrawal,
+                    frozen_delta=-withdrawal_req.amount,
+                    amount=-withdrawal_req.amount,  # 负值表示资金流出
+                    related_withdrawal_id=withdrawal_req.id,
+                    description=f"提现成功 ({withdrawal_req.withdrawal_method})"
+                )
                 
-                # 更新提现申请
-                withdrawal_req.processor_id = admin_user_id
-                withdrawal_req.processed_at = datetime.utcnow()
+            else:
+                # 记录失败原因
+                failure_reason = process_data.get('failure_reason', '提现处理失败')
+                withdrawal_req.failure_reason = failure_reason
                 
-                if process_data['action'] == 'succeeded':
-                    withdrawal_req.status = WithdrawalStatusEnum.succeeded
-                    
-                    # 记录外部交易ID（如支付平台返回的交易号）
-                    if 'external_transaction_id' in process_data and process_data['external_transaction_id']:
-                        withdrawal_req.external_transaction_id = process_data['external_transaction_id']
-                    
-                    # 资金操作：从冻结余额中减去提现金额（因为这笔钱已经打给用户）
-                    if wallet.frozen_balance < withdrawal_req.amount:
-                        raise BusinessException(
-                            message=f"用户 {withdrawal_req.user_id} 的冻结余额不足，当前: {wallet.frozen_balance}，需要: {withdrawal_req.amount}",
-                            status_code=500,
-                            error_code=50003
-                        )
-                    
-                    wallet.frozen_balance -= withdrawal_req.amount
-                    
-                    # 创建交易记录 - 确认提现（资金实际流出）
-                    transaction = WalletTransaction(
-                        user_id=withdrawal_req.user_id,
-                        transaction_type=TransactionTypeEnum.withdrawal_completed,
-                        amount=-withdrawal_req.amount,  # 负值表示资金流出
-                        balance_after=wallet.balance,  # 可用余额未变
-                        related_withdrawal_id=withdrawal_req.id,
-                        description=f"提现成功 ({withdrawal_req.withdrawal_method})"
-                    )
-                    
-                    db.session.add(transaction)
-                    
-                    current_app.logger.info(f"管理员 {admin_user_id} 标记提现申请 {withdrawal_id} 为成功处理，金额: {withdrawal_req.amount}")
-                    
-                elif process_data['action'] == 'failed':
-                    withdrawal_req.status = WithdrawalStatusEnum.failed
-                    
-                    # 记录失败原因
-                    failure_reason = process_data.get('failure_reason', '提现处理失败')
-                    withdrawal_req.failure_reason = failure_reason
-                    
-                    # 资金操作：解冻资金并退回到可用余额
-                    wallet.frozen_balance -= withdrawal_req.amount
-                    wallet.balance += withdrawal_req.amount
-                    
-                    # 创建交易记录 - 提现失败退款
-                    transaction = WalletTransaction(
-                        user_id=withdrawal_req.user_id,
-                        transaction_type=TransactionTypeEnum.withdrawal_failed_refund,
-                        amount=withdrawal_req.amount,  # 正值表示资金回流
-                        balance_after=wallet.balance,
-                        related_withdrawal_id=withdrawal_req.id,
-                        description=f"提现失败退款 ({failure_reason})"
-                    )
-                    
-                    db.session.add(transaction)
-                    
-                    current_app.logger.info(f"管理员 {admin_user_id} 标记提现申请 {withdrawal_id} 为处理失败，原因: {failure_reason}")
+                # 资金操作：解冻资金并退回到可用余额
+                entry = LedgerEntry(
+                    withdrawal_req.user_id,
+                    TransactionTypeEnum.refund,
+                    balance_delta=withdrawal_req.amount,  # 正值表示资金回流
+                    frozen_delta=-withdrawal_req.amount,
+                    related_withdrawal_id=withdrawal_req.id,
+                    description=f"提现失败退款 ({failure_reason})"
+                )
+            
+            try:
+                wallet_ledger.post_entries([entry])
+            except InsufficientFundsException:
+                raise BusinessException(
+                    message=f"用户 {withdrawal_req.user_id} 的冻结余额不足，需要: {withdrawal_req.amount}",
+                    status_code=500,
+                    error_code=50003
+                )
+            except NotFoundException:
+                raise BusinessException(
+                    message=f"用户 {withdrawal_req.user_id} 的钱包不存在", 
+                    status_code=500, 
+                    error_code=50002
+                )
+            
+            db.session.commit()
+            
+            if process_data['action'] == 'succeeded':
+                current_app.logger.info(f"管理员 {admin_user_id} 标记提现申请 {withdrawal_id} 为成功处理，金额: {withdrawal_req.amount}")
+            else:
+                current_app.logger.info(f"管理员 {admin_user_id} 标记提现申请 {withdrawal_id} 为处理失败，原因: {withdrawal_req.failure_reason}")
             
             # 记录管理员操作日志
             # TODO: self._log_admin_action(admin_user_id, f"{process_data['action']}_withdrawal", withdrawal_id)
@@ -186,7 +193,7 @@ class AdminFinanceService:
             return withdrawal_req
             
         except Exception as e:
-            # 异常时事务已经回滚
+            db.session.rollback()
             if not isinstance(e, NotFoundException) and not isinstance(e, InvalidUsageException) and not isinstance(e, BusinessException):
                 current_app.logger.error(f"处理提现申请时出错: {str(e)}")
                 raise BusinessException(message=f"处理提现申请失败: {str(e)}", status_code=500, error_code=50004)
@@ -4,14 +4,18 @@ from ..core.extensions import db
 from ..utils.exceptions import NotFoundException, AuthorizationException, BusinessException, InvalidUsageException
 from sqlalchemy.orm import joinedload
 from datetime import datetime
+from ..utils.pagination import keyset_paginate
+from .job_search_index import job_search_index
 
 class AdminJobService:
-    def get_jobs_pending_review(self, page=1, per_page=10, sort_by=None):
+    def get_jobs_pending_review(self, page=1, per_page=10, sort_by=None, cursor=None, include_total=False):
         """
         获取待审核工作列表（管理员专用）
         :param page: 页码
         :param per_page: 每页数量
         :param sort_by: 排序方式
+        :param cursor: 游标分页参数，非 None 时启用游标分页 (空字符串表示第一页)
+        :param include_total: 游标分页时是否统计总数
         :return: 分页后的工作列表
         """
         from flask import current_app
@@ -36,6 +40,14 @@ class AdminJobService:
                 # 默认按创建时间升序 (FIFO审核)
                 query = query.order_by(Job.created_at.asc())
             
+            if cursor is not None:
+                keyset_orders = {
+                    'created_at_desc': [(Job.created_at, 'desc'), (Job.id, 'desc')],
+                    'salary_desc': [(Job.salary_amount, 'desc'), (Job.id, 'desc')],
+                }
+                order_by = keyset_orders.get(sort_by, [(Job.created_at, 'asc'), (Job.id, 'asc')])
+                return keyset_paginate(query, order_by, cursor=cursor, per_page=per_page, include_total=include_total)
+            
             # 执行分页
             paginated_jobs = query.paginate(page=page, per_page=per_page, error_out=False)
             
@@ -44,6 +56,8 @@ class AdminJobService:
             
             return paginated_jobs
             
+        except InvalidUsageException:
+            raise
         except Exception as e:
             current_app.logger.error(f"管理员获取待审核工作列表时出错: {str(e)}")
             raise BusinessException(message=f"获取待审核工作列表失败: {str(e)}", status_code=500, error_code=50001)
@@ -102,6 +116,7 @@ class AdminJobService:
             
             # 提交更改
             db.session.commit()
+            job_search_index.index_job(job)
             
             # 记录管理员操作日志
             # TODO: self._log_admin_action(admin_user_id, f"{review_data['action']}_job", job_id)
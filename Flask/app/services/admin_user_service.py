@@ -5,6 +5,7 @@ from ..utils.exceptions import NotFoundException, AuthorizationException, Busine
 from sqlalchemy.orm import joinedload
 from sqlalchemy import or_
 from datetime import datetime
+from .identity_service import identity_service
 
 class AdminUserService:
     def get_all_users_paginated(self, filters=None, page=1, per_page=10, sort_by=None):
@@ -123,7 +124,7 @@ class AdminUserService:
             
             # 更新用户状态
             old_status = user.status
-            user.status = new_status
+            user.status = new_status.value
             
             # 记录更新时间
             user.updated_at = datetime.utcnow()
@@ -144,9 +145,10 @@ class AdminUserService:
             
             # 提交更改
             db.session.commit()
+            identity_service.invalidate(user)
             
             # 记录管理员操作日志
-            status_change_msg = f"用户状态从 {old_status.value} 变更为 {new_status.value}"
+            status_change_msg = f"用户状态从 {old_status} 变更为 {new_status.value}"
             if ban_reason:
                 status_change_msg += f"，原因: {ban_reason}"
             
@@ -155,7 +157,7 @@ class AdminUserService:
             # TODO: self._log_admin_action(admin_user_id, "update_user_status", user_uuid, status_change_msg)
             
             # 通知用户状态变更（如果状态变为封禁或恢复活跃）
-            if old_status != new_status and new_status in [UserStatusEnum.banned, UserStatusEnum.active]:
+            if old_status != new_status.value and new_status in [UserStatusEnum.banned, UserStatusEnum.active]:
                 self._notify_user_status_change(user.id, new_status, ban_reason)
             
             return user
@@ -5,6 +5,7 @@ from ..core.extensions import db
 from ..utils.exceptions import NotFoundException, AuthorizationException, BusinessException, InvalidUsageException
 from sqlalchemy.orm import joinedload
 from datetime import datetime
+from .identity_service import identity_service
 
 class AdminVerificationService:
     def get_pending_verifications(self, filters=None, page=1, per_page=10, sort_by=None):
@@ -104,8 +105,8 @@ class AdminVerificationService:
                     self._update_profile_verification_status(record, VerificationStatusEnum.verified)
                     
                     # 如果是首次认证通过且用户状态是待认证，则更新用户状态为活跃
-                    if record.user.status == UserStatusEnum.pending_verification:
-                        record.user.status = UserStatusEnum.active
+                    if record.user.status == UserStatusEnum.pending_verification.value:
+                        record.user.status = UserStatusEnum.active.value
                         record.user.updated_at = datetime.utcnow()
                     
                     current_app.logger.info(f"管理员 {admin_user_id} 批准了用户 {record.user_id} 的认证申请 {verification_id}")
@@ -125,6 +126,10 @@ class AdminVerificationService:
             # 记录管理员操作日志
             # TODO: self._log_admin_action(admin_user_id, f"{review_data['action']}_verification", verification_id)
             
+            # 审核通过可能激活了用户状态，清除身份缓存
+            if review_data['action'] == 'approve':
+                identity_service.invalidate(record.user)
+            
             # 通知用户审核结果
             self._notify_verification_review_result(record, review_data['action'], review_data.get('rejection_reason'))
             
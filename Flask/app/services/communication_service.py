@@ -1,114 +1,194 @@
-from ..models.message import Message, MessageTypeEnum
+from ..models.message import Message, MessageTypeEnum, Conversation
 from ..models.notification import Notification, NotificationTypeEnum
 from ..models.user import User
-from ..core.extensions import db
+from ..models.profile import FreelancerProfile, EmployerProfile
+from ..core.extensions import db, cache
 from ..utils.exceptions import NotFoundException, AuthorizationException, BusinessException, InvalidUsageException
-from sqlalchemy.orm import joinedload
+from sqlalchemy import Select, case, func, insert, literal, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query, joinedload
 from datetime import datetime
+from collections import Counter
+from itertools import islice
+import uuid
+from ..utils.pagination import keyset_paginate, pagination_meta
+from .message_read_receipts import message_read_receipts
+from .realtime_service import realtime_service
+from .task_queue import task
+from .unread_counter_service import unread_counter_service
+
+_BROADCAST_STATUS_KEY = 'notification:broadcast:{}'
 
 class MessageService:
-    def get_user_conversations_summary(self, user_id, page=1, per_page=10):
+    SNIPPET_LENGTH = 50
+
+    def get_user_conversations_summary(self, user_id, page=1, per_page=10, cursor=None, include_total=False):
         """
-        获取用户的会话列表摘要
+        获取用户的会话列表摘要 (基于 conversations 投影表，单条索引查询 + 数据库分页)
         :param user_id: 用户ID
         :param page: 页码
         :param per_page: 每页数量
+        :param cursor: 游标分页参数，非 None 时启用游标分页 (空字符串表示第一页)
+        :param include_total: 游标分页时是否统计总数
         :return: 会话摘要列表和分页信息
         """
         from flask import current_app
-        
-        # 获取该用户参与的所有会话ID
-        subquery_sender = db.session.query(Message.conversation_id).filter(Message.sender_id == user_id)
-        subquery_recipient = db.session.query(Message.conversation_id).filter(Message.recipient_id == user_id)
-        distinct_conversation_ids_query = subquery_sender.union(subquery_recipient).distinct()
-        
+
+        query = db.session.query(
+            Conversation.id,
+            Conversation.conversation_id,
+            Conversation.other_party_id,
+            Conversation.last_message_snippet,
+            Conversation.last_message_at,
+            Conversation.unread_count,
+            User.phone_number,
+            FreelancerProfile.user_id.label('freelancer_profile_user_id'),
+            FreelancerProfile.nickname.label('freelancer_nickname'),
+            FreelancerProfile.avatar_url.label('freelancer_avatar_url'),
+            EmployerProfile.user_id.label('employer_profile_user_id'),
+            EmployerProfile.nickname.label('employer_nickname'),
+            EmployerProfile.avatar_url.label('employer_avatar_url'),
+        ).join(User, User.id == Conversation.other_party_id)\
+         .outerjoin(FreelancerProfile, FreelancerProfile.user_id == Conversation.other_party_id)\
+         .outerjoin(EmployerProfile, EmployerProfile.user_id == Conversation.other_party_id)\
+         .filter(Conversation.user_id == user_id)
+
         try:
-            # 获取所有会话ID
-            conversation_ids = [row[0] for row in distinct_conversation_ids_query.all()]
-            
-            # 会话摘要列表
-            conversation_summaries = []
-            
-            for cid in conversation_ids:
-                # 获取最新一条消息
-                last_message = Message.query.filter_by(conversation_id=cid).order_by(
-                    Message.created_at.desc()).first()
-                
-                if not last_message:
-                    continue
-                
-                # 确定对话的另一方ID
-                other_party_id = last_message.sender_id if last_message.recipient_id == user_id else last_message.recipient_id
-                
-                # 查询另一方用户信息
-                other_party_user = User.query.get(other_party_id)
-                if not other_party_user:
-                    current_app.logger.warning(f"会话 {cid} 的另一方用户 {other_party_id} 不存在")
-                    continue
-                
-                # 获取用户昵称和头像
-                nickname = None
-                avatar_url = None
-                
-                if hasattr(other_party_user, 'freelancer_profile') and other_party_user.freelancer_profile:
-                    nickname = other_party_user.freelancer_profile.nickname
-                    avatar_url = other_party_user.freelancer_profile.avatar_url
-                elif hasattr(other_party_user, 'employer_profile') and other_party_user.employer_profile:
-                    nickname = other_party_user.employer_profile.nickname
-                    avatar_url = other_party_user.employer_profile.avatar_url
-                
-                # 使用手机号作为备选
-                if not nickname:
-                    nickname = other_party_user.phone_number
-                
-                # 统计未读消息数
-                unread_count = Message.query.filter_by(
-                    conversation_id=cid, 
-                    recipient_id=user_id, 
-                    is_read=False
-                ).count()
-                
-                # 构建会话摘要对象
-                summary = {
-                    "conversation_id": cid,
-                    "other_party_id": other_party_id,
-                    "other_party_nickname": nickname,
-                    "other_party_avatar_url": avatar_url,
-                    "last_message_content": last_message.content[:50] + '...' if len(last_message.content) > 50 else last_message.content,
-                    "last_message_created_at": last_message.created_at,
-                    "unread_count": unread_count
+            if cursor is not None:
+                paginated = keyset_paginate(query, [(Conversation.last_message_at, 'desc'), (Conversation.id, 'desc')],
+                                            cursor=cursor, per_page=per_page, include_total=include_total)
+                pagination = pagination_meta(paginated)
+            else:
+                paginated = query.order_by(Conversation.last_message_at.desc(), Conversation.id.desc())\
+                                 .paginate(page=page, per_page=per_page, error_out=False)
+                pagination = {
+                    "page": page,
+                    "per_page": per_page,
+                    "total_pages": paginated.pages or 1,
+                    "total_items": paginated.total
                 }
-                
-                conversation_summaries.append(summary)
-            
-            # 按最新消息时间排序
-            conversation_summaries.sort(key=lambda x: x["last_message_created_at"], reverse=True)
-            
-            # 手动分页
-            total = len(conversation_summaries)
-            total_pages = (total + per_page - 1) // per_page if total > 0 else 1
-            start = (page - 1) * per_page
-            end = min(start + per_page, total)
-            
-            paginated_summaries = conversation_summaries[start:end]
-            
-            # 构建分页信息
-            pagination = {
-                "page": page,
-                "per_page": per_page,
-                "total_pages": total_pages,
-                "total_items": total
-            }
-            
+
+            items = [self._build_conversation_summary(row) for row in paginated.items]
+            # 已读水位尚在缓冲区时，按水位扣除已读消息，避免读完后会话仍显示未读
+            pending_reads = message_read_receipts.pending_read_counts(user_id, [item['conversation_id'] for item in items])
+            for item in items:
+                if pending_reads.get(item['conversation_id']):
+                    item['unread_count'] = max((item['unread_count'] or 0) - pending_reads[item['conversation_id']], 0)
             return {
-                "items": paginated_summaries,
+                "items": items,
                 "pagination": pagination
             }
-            
+        except InvalidUsageException:
+            raise
         except Exception as e:
             current_app.logger.error(f"获取用户会话摘要时出错: {str(e)}")
             raise BusinessException(message=f"获取会话列表失败: {str(e)}", status_code=500, error_code=50001)
 
+    def _build_conversation_summary(self, row):
+        # 昵称/头像优先取零工档案，其次雇主档案，最后以手机号兜底
+        if row.freelancer_profile_user_id is not None:
+            nickname, avatar_url = row.freelancer_nickname, row.freelancer_avatar_url
+        elif row.employer_profile_user_id is not None:
+            nickname, avatar_url = row.employer_nickname, row.employer_avatar_url
+        else:
+            nickname, avatar_url = None, None
+
+        return {
+            "conversation_id": row.conversation_id,
+            "other_party_id": row.other_party_id,
+            "other_party_nickname": nickname or row.phone_number,
+            "other_party_avatar_url": avatar_url,
+            "last_message_content": row.last_message_snippet,
+            "last_message_created_at": row.last_message_at,
+            "unread_count": row.unread_count
+        }
+
+    def _make_snippet(self, content):
+        content = content or ''
+        if len(content) > self.SNIPPET_LENGTH:
+            return content[:self.SNIPPET_LENGTH] + '...'
+        return content
+
+    def _apply_message_to_conversations(self, message):
+        """
+        在同一事务中将新消息同步到双方的会话投影行 (发送方只更新摘要，接收方未读数 +1)
+        使用条件 UPDATE 而非读-改-写，并发发送时不会丢失未读计数，也不会被较早的消息覆盖摘要
+        """
+        snippet = self._make_snippet(message.content)
+        participants = ((message.sender_id, message.recipient_id, 0),
+                        (message.recipient_id, message.sender_id, 1))
+        for owner_id, other_party_id, unread_increment in participants:
+            if owner_id is None or other_party_id is None:
+                continue
+            is_newer = or_(Conversation.last_message_id.is_(None), Conversation.last_message_id < message.id)
+            values = {
+                'last_message_id': case((is_newer, message.id), else_=Conversation.last_message_id),
+                'last_message_snippet': case((is_newer, snippet), else_=Conversation.last_message_snippet),
+                'last_message_at': case((is_newer, message.created_at), else_=Conversation.last_message_at),
+                'unread_count': Conversation.unread_count + unread_increment,
+            }
+            row_filter = (Conversation.conversation_id == message.conversation_id, Conversation.user_id == owner_id)
+            if Conversation.query.filter(*row_filter).update(values, synchronize_session=False):
+                continue
+
+            # 首条消息: 创建投影行；并发创建冲突时退回 UPDATE
+            try:
+                with db.session.begin_nested():
+                    db.session.add(Conversation(
+                        conversation_id=message.conversation_id,
+                        user_id=owner_id,
+                        other_party_id=other_party_id,
+                        last_message_id=message.id,
+                        last_message_snippet=snippet,
+                        last_message_at=message.created_at,
+                        unread_count=unread_increment
+                    ))
+            except IntegrityError:
+                Conversation.query.filter(*row_filter).update(values, synchronize_session=False)
+
+    def rebuild_conversations(self, batch_size=500):
+        """
+        根据 messages 表全量重建 conversations 投影 (用于首次上线或数据修复)
+        :param batch_size: 每批处理的会话数
+        :return: 写入的投影行数
+        """
+        unread_rows = db.session.query(Message.conversation_id, Message.recipient_id, func.count(Message.id))\
+            .filter(Message.is_read == False)\
+            .group_by(Message.conversation_id, Message.recipient_id).all()
+        unread_counts = {(cid, recipient_id): count for cid, recipient_id, count in unread_rows}
+        read_watermarks = {(cid, recipient_id): message_id for cid, recipient_id, message_id in
+                           db.session.query(Message.conversation_id, Message.recipient_id, func.max(Message.id))
+                           .filter(Message.is_read == True)
+                           .group_by(Message.conversation_id, Message.recipient_id).all()}
+
+        last_message_ids = [row[0] for row in db.session.query(func.max(Message.id))
+                            .group_by(Message.conversation_id).all()]
+
+        Conversation.query.delete(synchronize_session=False)
+        created = 0
+        for offset in range(0, len(last_message_ids), batch_size):
+            batch_ids = last_message_ids[offset:offset + batch_size]
+            for message in Message.query.filter(Message.id.in_(batch_ids)).all():
+                if message.sender_id is None:
+                    continue
+                snippet = self._make_snippet(message.content)
+                for owner_id, other_party_id in ((message.sender_id, message.recipient_id),
+                                                 (message.recipient_id, message.sender_id)):
+                    db.session.add(Conversation(
+                        conversation_id=message.conversation_id,
+                        user_id=owner_id,
+                        other_party_id=other_party_id,
+                        last_message_id=message.id,
+                        last_message_snippet=snippet,
+                        last_message_at=message.created_at,
+                        unread_count=unread_counts.get((message.conversation_id, owner_id), 0),
+                        last_read_message_id=read_watermarks.get((message.conversation_id, owner_id))
+                    ))
+                    created += 1
+            db.session.flush()
+        db.session.commit()
+        return created
+
     def get_messages_in_conversation(self, user_id, conversation_id, page=1, per_page=20, before_message_id=None):
         """
         获取会话中的消息
@@ -153,24 +233,13 @@ class MessageService:
         # 执行分页
         paginated_messages = query.paginate(page=page, per_page=per_page, error_out=False)
         
-        # 标记消息为已读
-        try:
-            updated_count = Message.query.filter(
-                Message.conversation_id == conversation_id,
-                Message.recipient_id == user_id,
-                Message.is_read == False
-            ).update({
-                'is_read': True,
-                'read_at': datetime.utcnow()
-            })
-            
-            if updated_count > 0:
-                db.session.commit()
-                current_app.logger.info(f"已将 {updated_count} 条消息标记为已读")
-        except Exception as e:
-            db.session.rollback()
-            current_app.logger.error(f"标记消息为已读时出错: {str(e)}")
-            # 不影响主流程，继续返回消息
+        # 前移已读水位: 只有本页出现了水位之后的消息才需要写入，且同一会话的写入按时间窗口合并
+        if paginated_messages.items:
+            try:
+                message_read_receipts.mark_read(user_id, conversation_id, max(message.id for message in paginated_messages.items))
+            except Exception as e:
+                current_app.logger.error(f"记录已读水位时出错: {str(e)}")
+                # 不影响主流程，继续返回消息
         
         return paginated_messages
 
@@ -213,9 +282,22 @@ class MessageService:
         
         try:
             db.session.add(new_message)
+            db.session.flush()
+            self._apply_message_to_conversations(new_message)
+            unread_counter_service.increment([recipient_id], messages=1)
             db.session.commit()
-            
-            # TODO: 这里可以触发实时推送通知给接收方
+
+            # 提交后实时推送给接收方 (推送失败不影响发送结果)
+            realtime_service.publish_to_user(recipient_id, 'message', {
+                'id': new_message.id,
+                'conversation_id': new_message.conversation_id,
+                'sender_id': new_message.sender_id,
+                'recipient_id': new_message.recipient_id,
+                'content': new_message.content,
+                'message_type': getattr(new_message.message_type, 'value', new_message.message_type),
+                'created_at': new_message.created_at.isoformat() if new_message.created_at else None,
+                'is_read': new_message.is_read
+            })
             
             return new_message
         except Exception as e:
@@ -225,13 +307,15 @@ class MessageService:
 
 
 class NotificationService:
-    def get_my_notifications(self, user_id, filters=None, page=1, per_page=20):
+    def get_my_notifications(self, user_id, filters=None, page=1, per_page=20, cursor=None, include_total=False):
         """
         获取用户的通知列表
         :param user_id: 用户ID
         :param filters: 过滤条件，如is_read, notification_type
         :param page: 页码
         :param per_page: 每页数量
+        :param cursor: 游标分页参数，非 None 时启用游标分页 (空字符串表示第一页)
+        :param include_total: 游标分页时是否统计总数
         :return: 通知列表和分页信息
         """
         if filters is None:
@@ -254,6 +338,10 @@ class NotificationService:
         # 按时间倒序排序
         query = query.order_by(Notification.created_at.desc())
         
+        if cursor is not None:
+            return keyset_paginate(query, [(Notification.created_at, 'desc'), (Notification.id, 'desc')],
+                                   cursor=cursor, per_page=per_page, include_total=include_total)
+        
         # 执行分页
         paginated_notifications = query.paginate(page=page, per_page=per_page, error_out=False)
         
@@ -273,12 +361,14 @@ class NotificationService:
         if not notification:
             raise NotFoundException(message="通知未找到或无权限操作", error_code=40402)
         
-        # 如果通知未读，则标记为已读
+        # 如果通知未读，则标记为已读 (条件 UPDATE，并发重复标记时只扣减一次未读数)
         if not notification.is_read:
-            notification.is_read = True
-            notification.read_at = datetime.utcnow()
-            
             try:
+                updated = Notification.query.filter_by(id=notification_id, user_id=user_id, is_read=False).update({
+                    'is_read': True,
+                    'read_at': datetime.utcnow()
+                }, synchronize_session='fetch')
+                unread_counter_service.decrement(user_id, notifications=updated)
                 db.session.commit()
                 current_app.logger.info(f"已将通知 {notification_id} 标记为已读")
             except Exception as e:
@@ -305,6 +395,7 @@ class NotificationService:
                 'is_read': True,
                 'read_at': current_time
             })
+            unread_counter_service.decrement(user_id, notifications=updated_count)
             
             db.session.commit()
             current_app.logger.info(f"已将用户 {user_id} 的 {updated_count} 条通知标记为已读")
@@ -337,9 +428,19 @@ class NotificationService:
             )
             
             db.session.add(new_notification)
+            unread_counter_service.increment([user_id], notifications=1)
             db.session.commit()
             
             current_app.logger.info(f"已为用户 {user_id} 创建新通知 ID: {new_notification.id}")
+            realtime_service.publish_to_user(user_id, 'notification', {
+                'id': new_notification.id,
+                'notification_type': getattr(new_notification.notification_type, 'value', new_notification.notification_type),
+                'title': new_notification.title,
+                'content': new_notification.content,
+                'related_resource_type': new_notification.related_resource_type,
+                'related_resource_id': new_notification.related_resource_id,
+                'created_at': new_notification.created_at.isoformat() if new_notification.created_at else None
+            })
             
             return new_notification
         except Exception as e:
@@ -347,7 +448,214 @@ class NotificationService:
             current_app.logger.error(f"创建通知失败: {str(e)}")
             raise BusinessException(message=f"创建通知失败: {str(e)}", status_code=500, error_code=50005)
 
+    def insert_notifications(self, user_ids, notification_data):
+        """
+        为一批用户写入同一条通知 (一条多行 INSERT，不提交事务，由调用方控制批次大小与提交)
+        :param user_ids: 接收通知的用户ID列表
+        :param notification_data: 通知数据，包含type, title, content等
+        :return: 写入的通知数量
+        """
+        if not user_ids:
+            return 0
+        row = self._notification_row(notification_data)
+        db.session.execute(insert(Notification).values([dict(row, user_id=user_id) for user_id in user_ids]))
+        # 同一用户出现多次时按出现次数增加未读数
+        user_ids_by_count = {}
+        for user_id, count in Counter(user_ids).items():
+            user_ids_by_count.setdefault(count, []).append(user_id)
+        for count, counted_user_ids in user_ids_by_count.items():
+            unread_counter_service.increment(counted_user_ids, notifications=count)
+        return len(user_ids)
+
+    def create_notifications_bulk(self, user_ids, notification_data, chunk_size=None, progress_callback=None):
+        """
+        向大量用户发送同一条通知，分块写入，每块提交一次
+        :param user_ids: 接收通知的用户ID，可以是:
+            - 只查询一列用户ID的 Query/Select (每个用户只出现一次)：按ID键集分块执行 INSERT ... SELECT，用户ID不经过应用进程
+            - 用户ID的可迭代对象 (可以是生成器)：逐块读取，每块一条多行 INSERT
+        :param notification_data: 通知数据，包含type, title, content等
+        :param chunk_size: 每块的通知数，为空时读取 NOTIFICATION_BULK_CHUNK_SIZE
+        :param progress_callback: 每块提交后调用 progress_callback(已发送数量)
+        :return: {'sent': 已发送数量, 'chunks': 块数}
+        """
+        from flask import current_app
+
+        chunk_size = chunk_size or current_app.config.get('NOTIFICATION_BULK_CHUNK_SIZE', 1000)
+        if isinstance(user_ids, Query):
+            user_ids = user_ids.statement
+        chunks = self._select_chunks(user_ids, notification_data, chunk_size) if isinstance(user_ids, Select) \
+            else self._iterable_chunks(user_ids, notification_data, chunk_size)
+
+        sent = chunk_count = 0
+        try:
+            for written in chunks:
+                db.session.commit()
+                sent += written
+                chunk_count += 1
+                if progress_callback is not None:
+                    progress_callback(sent)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"批量创建通知失败 (已发送 {sent} 条): {str(e)}")
+            raise BusinessException(message=f"批量创建通知失败，已发送 {sent} 条: {str(e)}", status_code=500, error_code=50005)
+
+        current_app.logger.info(f"批量创建通知完成: 共 {sent} 条，{chunk_count} 次提交")
+        return {'sent': sent, 'chunks': chunk_count}
+
+    def _iterable_chunks(self, user_ids, notification_data, chunk_size):
+        """逐块写入 (不提交)，每块产出写入数量"""
+        iterator = iter(user_ids)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                return
+            yield self.insert_notifications(chunk, notification_data)
+
+    def _select_chunks(self, user_id_select, notification_data, chunk_size):
+        """按用户ID键集分块执行 INSERT ... SELECT (不提交)，每块产出写入数量"""
+        source = user_id_select.subquery()
+        user_id = list(source.c)[0]
+        table = Notification.__table__
+        row = self._notification_row(notification_data)
+        columns = list(row)
+        constants = [literal(row[name], table.c[name].type) for name in columns]
+
+        last_id = None
+        while True:
+            after_last = [user_id > last_id] if last_id is not None else []
+            # 本块的最大用户ID (按索引跳过 chunk_size-1 行)；为空表示剩余不足一块
+            upper_id = db.session.execute(select(user_id).where(*after_last).order_by(user_id.asc())
+                                          .offset(chunk_size - 1).limit(1)).scalar()
+            bounds = after_last + ([user_id <= upper_id] if upper_id is not None else [])
+            statement = insert(Notification).from_select(['user_id'] + columns,
+                                                         select(user_id, *constants).where(*bounds))
+            written = db.session.execute(statement).rowcount
+            unread_counter_service.increment_selected(select(user_id).where(*bounds), notifications=1)
+            yield written
+            if upper_id is None:
+                return
+            last_id = upper_id
+
+    # --- 全站公告广播 ---
+    BROADCAST_AUDIENCES = ('all', 'freelancer', 'employer')
+    BROADCAST_NOTIFICATION_TYPES = (NotificationTypeEnum.system_announcement.value, NotificationTypeEnum.policy_update.value)
+
+    def broadcast_audience_query(self, audience='all'):
+        """
+        广播对象的用户ID查询 (只包含状态正常的账号)
+        :param audience: all / freelancer (有零工档案) / employer (有雇主档案)
+        """
+        if audience == 'freelancer':
+            query = db.session.query(FreelancerProfile.user_id).join(User, User.id == FreelancerProfile.user_id)
+        elif audience == 'employer':
+            query = db.session.query(EmployerProfile.user_id).join(User, User.id == EmployerProfile.user_id)
+        else:
+            query = db.session.query(User.id)
+        return query.filter(User.status == 'active')
+
+    def start_broadcast(self, notification_data, audience='all'):
+        """
+        向一类用户广播公告；NOTIFICATION_BROADCAST_ASYNC 为真时提交到后台任务队列 (manage.py worker) 分块写入，立即返回广播状态
+        :param notification_data: 通知数据，包含 title, content，可选 notification_type (system_announcement/policy_update)
+        :param audience: 广播对象，见 broadcast_audience_query
+        :return: 广播状态 (含 broadcast_id，可通过 get_broadcast_status 查询进度)
+        """
+        from flask import current_app
+
+        if audience not in self.BROADCAST_AUDIENCES:
+            raise InvalidUsageException(f"无效的广播对象: {audience}. 可选值: {list(self.BROADCAST_AUDIENCES)}")
+        title = (notification_data.get('title') or '').strip()
+        content = (notification_data.get('content') or '').strip()
+        if not title or not content:
+            raise InvalidUsageException("公告标题和内容不能为空")
+        notification_type = notification_data.get('notification_type') or NotificationTypeEnum.system_announcement.value
+        if notification_type not in self.BROADCAST_NOTIFICATION_TYPES:
+            raise InvalidUsageException(f"无效的公告类型: {notification_type}. 可选值: {list(self.BROADCAST_NOTIFICATION_TYPES)}")
+        notification_data = {'notification_type': notification_type, 'title': title[:100], 'content': content}
+
+        broadcast_id = uuid.uuid4().hex
+        status = {
+            'broadcast_id': broadcast_id,
+            'audience': audience,
+            'status': 'pending',
+            'sent': 0,
+            'started_at': datetime.utcnow().isoformat(),
+            'finished_at': None,
+            'error': None,
+        }
+        self._save_broadcast_status(status)
+        if current_app.config.get('NOTIFICATION_BROADCAST_ASYNC', True):
+            broadcast_notification.apply_async((status, notification_data, audience),
+                                               idempotency_key=f"notification-broadcast:{broadcast_id}")
+        else:
+            self.run_broadcast(status, notification_data, audience)
+        return status
+
+    def get_broadcast_status(self, broadcast_id):
+        """
+        查询广播进度
+        :return: {'broadcast_id', 'audience', 'status' (pending/running/completed/failed), 'sent', 'started_at', 'finished_at', 'error'}
+        """
+        status = cache.get(_BROADCAST_STATUS_KEY.format(broadcast_id))
+        if status is None:
+            raise NotFoundException(message="广播任务不存在或已过期", error_code=40404)
+        return status
+
+    def run_broadcast(self, status, notification_data, audience):
+        """
+        分块写入广播通知并记录进度 (后台任务或同步广播时调用)
+        :param status: start_broadcast 返回的广播状态
+        :param notification_data: 通知数据 (notification_type 为枚举值字符串)
+        :param audience: 广播对象
+        :return: 最终的广播状态
+        """
+        from flask import current_app
+
+        def report_progress(sent):
+            status.update(status='running', sent=sent)
+            self._save_broadcast_status(status)
+
+        notification_data = dict(notification_data, notification_type=NotificationTypeEnum(notification_data['notification_type']))
+        try:
+            result = self.create_notifications_bulk(self.broadcast_audience_query(audience), notification_data,
+                                                    progress_callback=report_progress)
+            status.update(status='completed', sent=result['sent'])
+        except Exception as e:
+            current_app.logger.error(f"公告广播 {status['broadcast_id']} 失败: {str(e)}", exc_info=True)
+            status.update(status='failed', error=str(e))
+        finally:
+            status['finished_at'] = datetime.utcnow().isoformat()
+            self._save_broadcast_status(status)
+        return status
+
+    def _save_broadcast_status(self, status):
+        from flask import current_app
+        broadcast_id = status['broadcast_id']
+        try:
+            cache.set(_BROADCAST_STATUS_KEY.format(broadcast_id), dict(status),
+                      timeout=current_app.config.get('NOTIFICATION_BROADCAST_STATUS_TIMEOUT', 86400))
+        except Exception as e:
+            current_app.logger.warning(f"保存广播进度失败 {broadcast_id}: {str(e)}")
+
+    def _notification_row(self, notification_data):
+        return {
+            'notification_type': notification_data.get('notification_type', NotificationTypeEnum.system_announcement),
+            'title': notification_data.get('title', '系统通知'),
+            'content': notification_data.get('content', ''),
+            'related_resource_type': notification_data.get('related_resource_type'),
+            'related_resource_id': notification_data.get('related_resource_id'),
+            'is_read': False,
+            'created_at': datetime.utcnow(),
+        }
+
 
 # 服务实例
 message_service = MessageService()
-notification_service = NotificationService() 
\ No newline at end of file
+notification_service = NotificationService()
+
+
+# 广播不做去重，重复执行会重复发送，失败后不自动重试 (状态记录为 failed，由管理员确认后重新发起)
+@task(name='notification.broadcast', max_attempts=1)
+def broadcast_notification(status, notification_data, audience):
+    """后台任务: 分块写入全站/按角色的公告通知"""
+    notification_service.run_broadcast(status, notification_data, audience)
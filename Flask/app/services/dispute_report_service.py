@@ -1,10 +1,9 @@
 from ..models.dispute import Dispute, DisputeStatusEnum
 from ..models.report import Report, ReportTypeEnum
-from ..models.order import Order, OrderStatusEnum
+from ..models.order import Order, OrderStatusEnum, Evaluation
 from ..models.job import Job
 from ..models.message import Message
 from ..models.user import User
-from ..models.evaluation import Evaluation
 from ..core.extensions import db
 from ..utils.exceptions import NotFoundException, AuthorizationException, BusinessException, InvalidUsageException
 from sqlalchemy.orm import joinedload
@@ -0,0 +1,56 @@
+"""
+托管子账户定期归集 (Escrow Consolidation)
+
+支付入账分散在 PLATFORM_ESCROW_SHARDS 个子账户 (platform_escrow_shards) 中，平台钱包本身只在退款余额不足时才被动归集。
+本定时任务定期执行 wallet_ledger.consolidate_escrow()，让平台钱包余额与托管逻辑余额保持接近，
+退款路径通常无需在请求内加锁全部子账户：
+- 归集在一个短事务中完成 (平台钱包 -> 子账户编号升序加锁)，与支付回调、退款使用相同的加锁顺序
+- 租约同订单自动确认 (scheduler_lease): 多个节点可同时运行 (manage.py consolidate_escrow --loop)，
+  只有获得 'escrow_consolidation' 租约的节点执行
+- 每轮返回并记录指标: 归集金额、归集后的托管逻辑余额、耗时
+"""
+import time
+
+from flask import current_app
+
+from ..core.extensions import db
+from .scheduler_lease import new_lease_holder, scheduler_lease_service
+from .wallet_ledger import wallet_ledger
+
+LEASE_NAME = 'escrow_consolidation'
+
+
+class EscrowConsolidationScheduler:
+    def run_once(self):
+        """
+        归集一轮托管子账户余额
+        :return: {'acquired': 是否获得租约, 'moved': 归集金额, 'escrow_balance': 托管逻辑余额, 'seconds': 耗时}
+        """
+        lease_ttl = current_app.config.get('ESCROW_CONSOLIDATION_LEASE_SECONDS', 60)
+
+        started = time.monotonic()
+        stats = {'acquired': False, 'moved': 0, 'escrow_balance': None, 'seconds': 0}
+        holder = new_lease_holder()
+        if not scheduler_lease_service.acquire(LEASE_NAME, holder, lease_ttl):
+            current_app.logger.info("[EscrowConsolidation] 租约由其他节点持有，跳过本轮")
+            return stats
+        stats['acquired'] = True
+
+        try:
+            stats['moved'] = wallet_ledger.consolidate_escrow()
+            stats['escrow_balance'] = wallet_ledger.get_escrow_balance()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.remove()
+            scheduler_lease_service.release(LEASE_NAME, holder)
+
+        stats['seconds'] = round(time.monotonic() - started, 3)
+        current_app.logger.info(f"[EscrowConsolidation] 归集 {stats['moved']}，托管余额 {stats['escrow_balance']}，"
+                                f"耗时 {stats['seconds']} 秒")
+        return stats
+
+
+escrow_consolidation = EscrowConsolidationScheduler()
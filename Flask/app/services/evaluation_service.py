@@ -1,11 +1,13 @@
-from ..models.evaluation import Evaluation, EvaluatorRoleEnum
-from ..models.order import Order, OrderStatusEnum
+from ..models.order import Order, OrderStatusEnum, Evaluation, EvaluatorRoleEnum, UserRatingAggregate
 from ..models.user import User
 from ..models.profile import FreelancerProfile, EmployerProfile
 from ..core.extensions import db
 from ..utils.exceptions import NotFoundException, AuthorizationException, BusinessException, InvalidUsageException
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
 from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
 
 class EvaluationService:
     def create_evaluation(self, evaluator_user_id, order_id, evaluation_data):
@@ -24,7 +26,7 @@ class EvaluationService:
             raise NotFoundException(message="订单不存在", error_code=40401)
         
         # 校验订单状态
-        if order.status != OrderStatusEnum.completed:
+        if order.status != OrderStatusEnum.completed.value:
             raise InvalidUsageException(message="订单尚未完成，不能评价", error_code=40001)
         
         # 确定评价者角色和被评价者ID
@@ -49,6 +51,14 @@ class EvaluationService:
         if existing_eval:
             raise BusinessException(message="您已评价过此订单", status_code=409, error_code=40901)
         
+        rating = evaluation_data.get('rating')
+        # bool 是 int 的子类，True/False 不能当作 1/0 分
+        if isinstance(rating, bool) or not isinstance(rating, int) or not 1 <= rating <= 5:
+            raise InvalidUsageException(message="评分必须为1-5的整数", error_code=40002)
+        
+        # 被评价者的角色与评价者相反
+        evaluatee_role = EvaluatorRoleEnum.employer if evaluator_role == EvaluatorRoleEnum.freelancer else EvaluatorRoleEnum.freelancer
+        
         try:
             # 创建评价记录
             new_evaluation = Evaluation(
@@ -57,69 +67,137 @@ class EvaluationService:
                 evaluator_user_id=evaluator_user_id,
                 evaluatee_user_id=evaluatee_user_id,
                 evaluator_role=evaluator_role,
-                rating=evaluation_data.get('rating'),
+                rating=rating,
                 comment=evaluation_data.get('comment', ''),
                 tags=evaluation_data.get('tags', []),
                 is_anonymous=evaluation_data.get('is_anonymous', False)
             )
             
             db.session.add(new_evaluation)
-            db.session.commit()
+            db.session.flush()
             
-            # 更新被评价者平均评分（可以改为异步任务）
-            self._update_user_average_rating(evaluatee_user_id)
+            # 与评价记录在同一事务中累加评分统计并刷新档案平均分
+            self._apply_rating_to_aggregate(evaluatee_user_id, evaluatee_role, rating)
+            db.session.commit()
             
             return new_evaluation
+        except IntegrityError:
+            db.session.rollback()
+            raise BusinessException(message="您已评价过此订单", status_code=409, error_code=40901)
         except Exception as e:
             db.session.rollback()
             current_app.logger.error(f"创建评价时出错: {str(e)}")
             raise BusinessException(message=f"提交评价失败: {str(e)}", status_code=500, error_code=50001)
 
-    def _update_user_average_rating(self, user_id):
+    def _apply_rating_to_aggregate(self, user_id, role, rating):
+        """
+        原子累加用户在某角色下的评分统计 (条件 UPDATE，不做读-改-写)，并据此刷新档案平均分
+        :param user_id: 被评价者用户ID
+        :param role: 被评价者角色 (EvaluatorRoleEnum)
+        :param rating: 本次评分 (1-5)
+        """
+        star_column = getattr(UserRatingAggregate, f'rating_{rating}_count')
+        values = {
+            UserRatingAggregate.rating_count: UserRatingAggregate.rating_count + 1,
+            UserRatingAggregate.rating_sum: UserRatingAggregate.rating_sum + rating,
+            star_column: star_column + 1,
+            UserRatingAggregate.updated_at: datetime.utcnow(),
+        }
+        row_filter = (UserRatingAggregate.user_id == user_id, UserRatingAggregate.role == role)
+        if not UserRatingAggregate.query.filter(*row_filter).update(values, synchronize_session=False):
+            try:
+                with db.session.begin_nested():
+                    db.session.add(UserRatingAggregate(
+                        user_id=user_id, role=role, rating_count=1, rating_sum=rating,
+                        **{f'rating_{star}_count': int(star == rating) for star in range(1, 6)}
+                    ))
+            except IntegrityError:
+                # 并发的首条评价已创建统计行
+                UserRatingAggregate.query.filter(*row_filter).update(values, synchronize_session=False)
+
+        # 本事务已持有该统计行的写锁，读取到的是包含本次评分的最新值
+        rating_count, rating_sum = db.session.query(
+            UserRatingAggregate.rating_count, UserRatingAggregate.rating_sum
+        ).filter(*row_filter).one()
+        self._set_profile_average_rating(user_id, role, self._average(rating_sum, rating_count))
+
+    def _average(self, rating_sum, rating_count):
+        if not rating_count:
+            return None
+        return (Decimal(rating_sum) / Decimal(rating_count)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    def _set_profile_average_rating(self, user_id, role, average_rating):
+        profile_model = FreelancerProfile if role == EvaluatorRoleEnum.freelancer else EmployerProfile
+        profile_model.query.filter(profile_model.user_id == user_id)\
+            .update({'average_rating': average_rating}, synchronize_session=False)
+
+    def get_rating_aggregate(self, user_id, role):
         """
-        更新用户平均评分
+        获取用户在某角色下的评分统计
         :param user_id: 用户ID
-        :return: None
+        :param role: 'freelancer' / 'employer' 或 EvaluatorRoleEnum
+        :return: {'rating_count', 'average_rating', 'histogram'}
+        """
+        if not isinstance(role, EvaluatorRoleEnum):
+            try:
+                role = EvaluatorRoleEnum(role)
+            except ValueError:
+                raise InvalidUsageException(message="无效的角色", error_code=40002)
+        aggregate = UserRatingAggregate.query.get((user_id, role))
+        if not aggregate:
+            return {'rating_count': 0, 'average_rating': None, 'histogram': {star: 0 for star in range(1, 6)}}
+        return {
+            'rating_count': aggregate.rating_count,
+            'average_rating': self._average(aggregate.rating_sum, aggregate.rating_count),
+            'histogram': aggregate.histogram,
+        }
+
+    def rebuild_rating_aggregates(self):
+        """
+        用一次分组查询从 evaluations 表重建全部评分统计，并同步刷新档案平均分 (用于数据修复)
+        :return: 重建的统计行数
         """
         from flask import current_app
-        
+
+        # 被评价者角色与评价者角色相反
+        rows = db.session.query(
+            Evaluation.evaluatee_user_id, Evaluation.evaluator_role, Evaluation.rating, func.count(Evaluation.id)
+        ).group_by(Evaluation.evaluatee_user_id, Evaluation.evaluator_role, Evaluation.rating).all()
+
+        aggregates = {}
+        for user_id, evaluator_role, rating, count in rows:
+            if rating not in (1, 2, 3, 4, 5):
+                continue
+            role = EvaluatorRoleEnum.employer if evaluator_role == EvaluatorRoleEnum.freelancer else EvaluatorRoleEnum.freelancer
+            aggregate = aggregates.setdefault((user_id, role), {
+                'user_id': user_id, 'role': role, 'rating_count': 0, 'rating_sum': 0,
+                **{f'rating_{star}_count': 0 for star in range(1, 6)}
+            })
+            aggregate['rating_count'] += count
+            aggregate['rating_sum'] += rating * count
+            aggregate[f'rating_{rating}_count'] += count
+
         try:
-            # 查询用户所有有效评分
-            ratings = [e.rating for e in Evaluation.query.filter_by(evaluatee_user_id=user_id).all() if e.rating]
-            
-            if not ratings:
-                current_app.logger.info(f"用户 {user_id} 没有有效评分，不更新平均分")
-                return
-            
-            # 计算新平均分
-            new_avg_rating = sum(ratings) / len(ratings)
-            
-            # 查询被评价者
-            evaluatee_user = User.query.get(user_id)
-            if not evaluatee_user:
-                current_app.logger.warning(f"被评价用户 {user_id} 不存在，无法更新平均分")
-                return
-            
-            # 更新对应档案
-            updated = False
-            
-            # 检查是否有自由职业者角色
-            if hasattr(evaluatee_user, 'freelancer_profile') and evaluatee_user.freelancer_profile:
-                evaluatee_user.freelancer_profile.average_rating = new_avg_rating
-                updated = True
-            
-            # 检查是否有雇主角色
-            if hasattr(evaluatee_user, 'employer_profile') and evaluatee_user.employer_profile:
-                evaluatee_user.employer_profile.average_rating = new_avg_rating
-                updated = True
-            
-            if updated:
-                db.session.commit()
-                current_app.logger.info(f"已更新用户 {user_id} 的平均评分为 {new_avg_rating}")
+            UserRatingAggregate.query.delete(synchronize_session=False)
+            db.session.bulk_insert_mappings(UserRatingAggregate, list(aggregates.values()))
+
+            for role, profile_model in ((EvaluatorRoleEnum.freelancer, FreelancerProfile),
+                                        (EvaluatorRoleEnum.employer, EmployerProfile)):
+                rated = [a for a in aggregates.values() if a['role'] == role]
+                profile_model.query.filter(profile_model.average_rating.isnot(None))\
+                    .update({'average_rating': None}, synchronize_session=False)
+                db.session.bulk_update_mappings(profile_model, [
+                    {'user_id': a['user_id'], 'average_rating': self._average(a['rating_sum'], a['rating_count'])}
+                    for a in rated
+                ])
+            db.session.commit()
         except Exception as e:
             db.session.rollback()
-            current_app.logger.error(f"更新用户平均评分时出错: {str(e)}")
-            # 不抛出异常，因为这是次要操作
+            current_app.logger.error(f"重建评分统计时出错: {str(e)}")
+            raise BusinessException(message=f"重建评分统计失败: {str(e)}", status_code=500, error_code=50001)
+
+        current_app.logger.info(f"已重建 {len(aggregates)} 条评分统计")
+        return len(aggregates)
     
     def get_evaluations_for_order(self, order_id, current_user_id=None):
         """
@@ -1,6 +1,7 @@
 from ..models.favorite import Favorite, FavoriteTypeEnum
 from ..models.job import Job
 from ..models.user import User
+from .target_loader import target_loader
 from ..core.extensions import db
 from ..utils.exceptions import NotFoundException, BusinessException, InvalidUsageException
 from datetime import datetime
@@ -152,48 +153,53 @@ class FavoriteService:
         # 执行分页
         paginated_favorites = query.paginate(page=page, per_page=per_page, error_out=False)
         
-        # 为每个收藏项添加目标详情
+        # 按类型批量加载收藏目标 (每种目标一条 IN 查询)，再为每个收藏项添加目标详情
+        targets = target_loader.load((favorite.favorite_type, favorite.target_id) for favorite in paginated_favorites.items)
         for favorite in paginated_favorites.items:
-            favorite.target_details = self._get_target_details(favorite)
+            favorite.target_details = self._get_target_details(favorite, targets)
         
         return paginated_favorites
 
-    def _get_target_details(self, favorite):
+    def _get_target_details(self, favorite, targets=None):
         """
         获取收藏目标的详细信息
         :param favorite: Favorite对象
+        :param targets: target_loader.load() 的结果；为 None 时单独加载该收藏的目标
         :return: 包含目标详情的字典
         """
         from flask import current_app
         
+        favorite_type = favorite.favorite_type.value if hasattr(favorite.favorite_type, 'value') else str(favorite.favorite_type)
         target_details = {
-            "type": favorite.favorite_type.value if hasattr(favorite.favorite_type, 'value') else str(favorite.favorite_type),
+            "type": favorite_type,
             "id": favorite.target_id
         }
         
+        if targets is None:
+            targets = target_loader.load([(favorite.favorite_type, favorite.target_id)])
+        target = targets.get((favorite_type, favorite.target_id))
+        
         try:
             if favorite.favorite_type == FavoriteTypeEnum.job:
-                job = Job.query.get(favorite.target_id)
-                if job:
+                if target:
+                    employer_profile = target.employer.employer_profile if target.employer else None
                     target_details.update({
-                        "title": job.title,
-                        "employer_nickname": getattr(job.employer.employer_profile, 'nickname', '') if hasattr(job, 'employer') and hasattr(job.employer, 'employer_profile') else f"雇主{job.employer_user_id}" if hasattr(job, 'employer_user_id') else "未知雇主"
+                        "title": target.title,
+                        "employer_nickname": getattr(employer_profile, 'nickname', '') if target.employer else f"雇主{target.employer_user_id}"
                     })
             
             elif favorite.favorite_type == FavoriteTypeEnum.freelancer:
-                user = User.query.get(favorite.target_id)
-                if user and hasattr(user, 'freelancer_profile') and user.freelancer_profile:
+                if target and target.freelancer_profile:
                     target_details.update({
-                        "nickname": user.freelancer_profile.nickname or f"用户{user.id}",
-                        "avatar_url": user.freelancer_profile.avatar_url
+                        "nickname": target.freelancer_profile.nickname or f"用户{target.id}",
+                        "avatar_url": target.freelancer_profile.avatar_url
                     })
             
             elif favorite.favorite_type == FavoriteTypeEnum.employer:
-                user = User.query.get(favorite.target_id)
-                if user and hasattr(user, 'employer_profile') and user.employer_profile:
+                if target and target.employer_profile:
                     target_details.update({
-                        "nickname": user.employer_profile.nickname or f"用户{user.id}",
-                        "avatar_url": user.employer_profile.avatar_url
+                        "nickname": target.employer_profile.nickname or f"用户{target.id}",
+                        "avatar_url": target.employer_profile.avatar_url
                     })
         
         except Exception as e:
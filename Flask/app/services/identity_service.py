@@ -0,0 +1,179 @@
+"""
+JWT 身份解析服务
+
+将 JWT 中的身份标识 (sub，通常为用户 UUID，也兼容旧的整数ID) 解析为当前用户的身份快照，
+避免每个认证请求都查询 users 表：
+- 第一层: 进程内有界 LRU (带 TTL)
+- 第二层: 可选的共享缓存 (Flask-Caching，例如 Redis)，多进程/多实例共享
+用户角色、状态变更时调用 invalidate() 清除两层缓存；其他进程的本地缓存最多在 TTL 内过期。
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from flask_jwt_extended import get_jwt_identity
+
+from ..core.extensions import cache
+from ..models.user import User
+from ..utils.exceptions import NotFoundException
+
+_SHARED_CACHE_PREFIX = 'identity:'
+
+
+class CurrentIdentity:
+    """当前用户的身份快照 (只包含鉴权常用字段，可安全跨请求缓存)"""
+    __slots__ = ('id', 'uuid', 'current_role', 'available_roles', 'status')
+
+    def __init__(self, id, uuid, current_role, available_roles, status):
+        self.id = id
+        self.uuid = uuid
+        self.current_role = current_role
+        self.available_roles = list(available_roles or [])
+        self.status = status
+
+    @classmethod
+    def from_user(cls, user):
+        status = user.status.value if hasattr(user.status, 'value') else user.status
+        current_role = user.current_role.value if hasattr(user.current_role, 'value') else user.current_role
+        available_roles = user.available_roles if isinstance(user.available_roles, list) else []
+        return cls(user.id, str(user.uuid), current_role, available_roles, status)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['id'], data['uuid'], data['current_role'], data['available_roles'], data['status'])
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'uuid': self.uuid,
+            'current_role': self.current_role,
+            'available_roles': self.available_roles,
+            'status': self.status,
+        }
+
+    def has_role(self, role):
+        return role in self.available_roles or self.current_role == role
+
+    def __repr__(self):
+        return f'<CurrentIdentity {self.id} ({self.uuid}, {self.current_role})>'
+
+
+class IdentityService:
+    def __init__(self):
+        self._local = OrderedDict() # key -> (expires_at, CurrentIdentity)
+        self._lock = threading.Lock()
+
+    # --- 查询 ---
+    def resolve(self, identity):
+        """
+        解析身份标识
+        :param identity: JWT sub (UUID 字符串) 或用户整数ID
+        :return: CurrentIdentity
+        :raises: NotFoundException
+        """
+        if identity is None or identity == '':
+            raise NotFoundException(message="用户不存在或身份无法识别。", error_code=40401)
+        key = str(identity)
+
+        resolved = self._get_local(key)
+        if resolved is not None:
+            return resolved
+
+        resolved = self._get_shared(key)
+        if resolved is None:
+            resolved = self._load_from_db(key)
+            self._set_shared(key, resolved)
+        self._set_local(key, resolved)
+        return resolved
+
+    def resolve_user_id(self, identity):
+        """解析身份标识并返回用户整数ID"""
+        return self.resolve(identity).id
+
+    def current_identity(self):
+        """解析当前请求 JWT 中的用户身份 (需在 jwt_required 保护的视图中调用)"""
+        return self.resolve(get_jwt_identity())
+
+    def current_user_id(self):
+        """当前请求用户的整数ID"""
+        return self.current_identity().id
+
+    def _load_from_db(self, key):
+        if key.isdigit():
+            user = User.query.get(int(key))
+        else:
+            user = User.query.filter_by(uuid=key).first()
+        if not user:
+            raise NotFoundException(message="用户不存在或身份无法识别。", error_code=40401)
+        return CurrentIdentity.from_user(user)
+
+    # --- 失效 ---
+    def invalidate(self, user):
+        """
+        用户角色/状态变更后清除缓存
+        :param user: User 对象或 CurrentIdentity
+        """
+        keys = {str(user.id), str(user.uuid)}
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+        if self._shared_enabled():
+            try:
+                cache.delete_many(*[_SHARED_CACHE_PREFIX + key for key in keys])
+            except Exception as e:
+                current_app.logger.warning(f"[IdentityService] 清除共享身份缓存失败: {str(e)}")
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    # --- 本地 LRU ---
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, resolved = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return resolved
+
+    def _set_local(self, key, resolved):
+        max_size = current_app.config.get('IDENTITY_CACHE_MAX_SIZE', 10000)
+        ttl = current_app.config.get('IDENTITY_CACHE_LOCAL_TTL', 30)
+        if max_size <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._local[key] = (time.monotonic() + ttl, resolved)
+            self._local.move_to_end(key)
+            while len(self._local) > max_size:
+                self._local.popitem(last=False)
+
+    # --- 共享缓存 ---
+    def _shared_enabled(self):
+        return current_app.config.get('IDENTITY_CACHE_USE_SHARED', True)
+
+    def _get_shared(self, key):
+        if not self._shared_enabled():
+            return None
+        try:
+            data = cache.get(_SHARED_CACHE_PREFIX + key)
+        except Exception as e:
+            current_app.logger.warning(f"[IdentityService] 读取共享身份缓存失败: {str(e)}")
+            return None
+        return CurrentIdentity.from_dict(data) if data else None
+
+    def _set_shared(self, key, resolved):
+        if not self._shared_enabled():
+            return
+        try:
+            cache.set(_SHARED_CACHE_PREFIX + key, resolved.to_dict(),
+                      timeout=current_app.config.get('IDENTITY_CACHE_SHARED_TTL', 300))
+        except Exception as e:
+            current_app.logger.warning(f"[IdentityService] 写入共享身份缓存失败: {str(e)}")
+
+
+identity_service = IdentityService()
@@ -4,6 +4,7 @@ from ..core.extensions import db
 from ..utils.exceptions import NotFoundException, InvalidUsageException, AuthorizationException, BusinessException
 from datetime import datetime
 from .order_service import order_service # Import OrderService
+from ..utils.pagination import keyset_paginate
 
 class JobApplicationService:
     def create_job_application(self, freelancer_user_id, job_id, data):
@@ -53,7 +54,7 @@ class JobApplicationService:
             db.session.rollback()
             raise BusinessException(message=f"申请工作失败: {str(e)}", status_code=500, error_code=50001)
 
-    def get_applications_for_job(self, job_id, employer_user_id, page=1, per_page=10, filters=None):
+    def get_applications_for_job(self, job_id, employer_user_id, page=1, per_page=10, filters=None, cursor=None, include_total=False):
         job = Job.query.get(job_id)
         if not job:
             raise NotFoundException(message="工作不存在。", error_code=40401)
@@ -65,10 +66,13 @@ class JobApplicationService:
             query = query.filter(JobApplication.status == filters['status'])
         
         query = query.order_by(JobApplication.created_at.desc())
+        if cursor is not None:
+            return keyset_paginate(query, [(JobApplication.created_at, 'desc'), (JobApplication.id, 'desc')],
+                                   cursor=cursor, per_page=per_page, include_total=include_total)
         applications = query.paginate(page=page, per_page=per_page, error_out=False)
         return applications
 
-    def get_applications_by_freelancer(self, freelancer_user_id, page=1, per_page=10, filters=None):
+    def get_applications_by_freelancer(self, freelancer_user_id, page=1, per_page=10, filters=None, cursor=None, include_total=False):
         user = User.query.get(freelancer_user_id)
         if not user:
             raise NotFoundException(message="用户不存在。")
@@ -78,6 +82,9 @@ class JobApplicationService:
             query = query.filter(JobApplication.status == filters['status'])
             
         query = query.order_by(JobApplication.created_at.desc())
+        if cursor is not None:
+            return keyset_paginate(query, [(JobApplication.created_at, 'desc'), (JobApplication.id, 'desc')],
+                                   cursor=cursor, per_page=per_page, include_total=include_total)
         applications = query.paginate(page=page, per_page=per_page, error_out=False)
         return applications
 
@@ -0,0 +1,299 @@
+"""
+工作读路径缓存 (Read-through Cache)
+
+基于 Flask-Caching (`extensions.cache`) 缓存工作详情、类别/标签列表以及搜索结果的前几页，
+缓存内容为已序列化的 JobSchema 数据 (dict)，命中时无需访问数据库也无需再次序列化。
+搜索分面统计按筛选条件缓存 (与页码无关)。
+
+- 工作详情按 job_id 缓存 (job:detail:<id>)，工作变更后按 ID 删除
+- 列表类缓存 (搜索结果、分面统计、类别、标签) 的键中带有"列表代次" (job:list:gen)，
+  任意工作变更后写入新的代次，旧代次的键不再被读取，等待 TTL 自然过期；
+  读取方在回源前先取得代次，回源期间发生的变更不会被写回新代次
+- 失效由 Job / JobRequiredSkill 的 after_insert/after_update/after_delete 事件驱动：
+  flush 时只记录受影响的工作，事务提交后 (after_commit) 才真正清除，避免其他请求在提交前把旧数据重新写回缓存；
+  仅浏览次数 (view_count) 变化不触发失效，返回前由 job_view_counter.merge_pending_views() 补齐缓存后新增的浏览次数
+- 通过 Query.update() 等批量语句修改工作不会触发 ORM 事件，调用方需自行调用 invalidate_job()/invalidate_listings()
+- 热点键回源做单飞 (single-flight) 保护：进程内按键加锁，跨进程用 cache.add 抢占回源锁，
+  未抢到锁的请求短暂等待回源结果，超时后直接查询数据库 (不写缓存)
+- 缓存后端不可用时记录警告并直接回源，不影响接口可用性
+"""
+import hashlib
+import json
+import threading
+import time
+import uuid
+
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from ..core.extensions import cache
+from ..models.job import Job
+from ..models.skill import JobRequiredSkill
+
+_DETAIL_KEY = 'job:detail:{}'
+_LIST_GENERATION_KEY = 'job:list:gen'
+_SEARCH_KEY = 'job:search:{}:{}'
+_FACETS_KEY = 'job:facets:{}:{}'
+_CATEGORIES_KEY = 'job:categories:{}'
+_TAGS_KEY = 'job:tags:{}'
+_LOCK_SUFFIX = ':lock'
+
+# 变更这些字段不影响任何缓存内容 (或允许滞后)
+_IGNORED_JOB_FIELDS = frozenset({'view_count', 'updated_at'})
+
+_SESSION_PENDING_KEY = 'job_cache_pending'
+
+
+class JobCache:
+    _LOCK_STRIPES = 64
+
+    def __init__(self):
+        self._local_locks = [threading.Lock() for _ in range(self._LOCK_STRIPES)]
+
+    # --- 读取 ---
+    def get_job_detail(self, job_id, loader):
+        """
+        读取工作详情
+        :param job_id: 工作ID
+        :param loader: 未命中时调用，返回序列化后的工作详情 (工作不存在时应抛出 NotFoundException，不会被缓存)
+        :return: 工作详情 dict
+        """
+        if not self._enabled():
+            return loader()
+        return self._get_or_load(_DETAIL_KEY.format(job_id), loader,
+                                 current_app.config.get('JOB_CACHE_DETAIL_TIMEOUT', 300))
+
+    def get_search_page(self, filters, sort_by, page, per_page, cursor, include_total, loader):
+        """
+        读取搜索结果页，只缓存前 JOB_CACHE_SEARCH_MAX_PAGE 页 (游标分页只缓存首页)
+        :param loader: 未命中时调用，返回 {'items': [...], 'pagination': {...}}
+        :return: 搜索结果 dict
+        """
+        if not self._enabled() or not self._is_cacheable_page(page, cursor):
+            return loader()
+        generation = self._list_generation()
+        if generation is None:
+            return loader()
+        key = _SEARCH_KEY.format(generation, self._search_digest(filters, sort_by, page, per_page, cursor, include_total))
+        return self._get_or_load(key, loader, current_app.config.get('JOB_CACHE_LIST_TIMEOUT', 60))
+
+    def get_search_facets(self, filters, loader):
+        """
+        读取分面统计，按规范化后的筛选条件缓存 (与分页无关，翻页时复用)
+        :param loader: 未命中时调用，返回分面统计 dict
+        """
+        if not self._enabled():
+            return loader()
+        generation = self._list_generation()
+        if generation is None:
+            return loader()
+        key = _FACETS_KEY.format(generation, self._digest({'f': self._normalize_filters(filters)}))
+        return self._get_or_load(key, loader, current_app.config.get('JOB_CACHE_LIST_TIMEOUT', 60))
+
+    def get_categories(self, loader):
+        """读取工作类别列表"""
+        return self._get_listing(_CATEGORIES_KEY, loader)
+
+    def get_tags(self, loader):
+        """读取工作标签列表"""
+        return self._get_listing(_TAGS_KEY, loader)
+
+    def _get_listing(self, key_template, loader):
+        if not self._enabled():
+            return loader()
+        generation = self._list_generation()
+        if generation is None:
+            return loader()
+        return self._get_or_load(key_template.format(generation), loader,
+                                 current_app.config.get('JOB_CACHE_LIST_TIMEOUT', 60))
+
+    def _is_cacheable_page(self, page, cursor):
+        if cursor is not None:
+            return cursor == ''
+        max_page = current_app.config.get('JOB_CACHE_SEARCH_MAX_PAGE', 3)
+        return page is not None and 1 <= int(page) <= max_page
+
+    def _normalize_filters(self, filters):
+        """规范化搜索条件: 忽略空值、去除首尾空白 (键顺序在取摘要时统一排序)"""
+        normalized = {}
+        for name, value in (filters or {}).items():
+            if isinstance(value, str):
+                value = value.strip()
+            if value is None or value == '':
+                continue
+            normalized[name] = value
+        return normalized
+
+    def _search_digest(self, filters, sort_by, page, per_page, cursor, include_total):
+        payload = {
+            'f': self._normalize_filters(filters),
+            's': sort_by or None,
+            'p': None if cursor is not None else int(page),
+            'n': int(per_page),
+            'c': cursor is not None,
+            't': bool(include_total) if cursor is not None else None,
+        }
+        return self._digest(payload)
+
+    def _digest(self, payload):
+        """对缓存键内容取摘要 (键排序，保证相同条件得到相同的键)"""
+        raw = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    # --- 单飞回源 ---
+    def _get_or_load(self, key, loader, timeout):
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        # 同一进程内同一个键只有一个线程回源，其余线程等待后直接命中缓存
+        with self._local_locks[hash(key) % self._LOCK_STRIPES]:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+
+            lock_key = key + _LOCK_SUFFIX
+            if self._cache_add(lock_key, current_app.config.get('JOB_CACHE_LOCK_TIMEOUT', 10)):
+                try:
+                    value = loader()
+                    self._cache_set(key, value, timeout)
+                    return value
+                finally:
+                    self._cache_delete(lock_key)
+
+            # 其他进程正在回源：等待其写入结果
+            deadline = time.monotonic() + current_app.config.get('JOB_CACHE_LOCK_WAIT', 2)
+            poll_interval = current_app.config.get('JOB_CACHE_LOCK_POLL_INTERVAL', 0.05)
+            while time.monotonic() < deadline:
+                time.sleep(poll_interval)
+                cached = self._cache_get(key)
+                if cached is not None:
+                    return cached
+
+        current_app.logger.info(f"[JobCache] 等待回源结果超时，直接查询: {key}")
+        return loader()
+
+    # --- 失效 ---
+    def invalidate_job(self, job_id):
+        """清除指定工作的详情缓存，并使所有列表类缓存失效"""
+        self.invalidate(job_ids=[job_id], listings=True)
+
+    def invalidate_listings(self):
+        """使搜索结果、类别、标签缓存失效"""
+        self.invalidate(job_ids=(), listings=True)
+
+    def invalidate(self, job_ids=(), listings=True):
+        """
+        :param job_ids: 需要清除详情缓存的工作ID
+        :param listings: 是否同时使列表类缓存失效
+        """
+        if not self._enabled():
+            return
+        try:
+            if job_ids:
+                cache.delete_many(*[_DETAIL_KEY.format(job_id) for job_id in job_ids])
+            if listings:
+                cache.set(_LIST_GENERATION_KEY, uuid.uuid4().hex[:12], timeout=0)
+        except Exception as e:
+            current_app.logger.warning(f"[JobCache] 清除工作缓存失败: {str(e)}")
+
+    def _list_generation(self):
+        """当前列表代次；代次键不存在 (首次使用或被淘汰) 时写入新的随机代次，确保不会读到旧代次的数据"""
+        try:
+            generation = cache.get(_LIST_GENERATION_KEY)
+            if generation is None:
+                cache.add(_LIST_GENERATION_KEY, uuid.uuid4().hex[:12], timeout=0)
+                generation = cache.get(_LIST_GENERATION_KEY)
+            return generation
+        except Exception as e:
+            current_app.logger.warning(f"[JobCache] 读取列表缓存代次失败: {str(e)}")
+            return None
+
+    # --- 缓存后端访问 (失败时降级为未命中) ---
+    def _enabled(self):
+        return current_app.config.get('JOB_CACHE_ENABLED', True)
+
+    def _cache_get(self, key):
+        try:
+            return cache.get(key)
+        except Exception as e:
+            current_app.logger.warning(f"[JobCache] 读取缓存失败 {key}: {str(e)}")
+            return None
+
+    def _cache_set(self, key, value, timeout):
+        try:
+            cache.set(key, value, timeout=timeout)
+        except Exception as e:
+            current_app.logger.warning(f"[JobCache] 写入缓存失败 {key}: {str(e)}")
+
+    def _cache_add(self, key, timeout):
+        try:
+            return cache.add(key, 1, timeout=timeout)
+        except Exception as e:
+            # 缓存不可用时放弃跨进程互斥，直接回源
+            current_app.logger.warning(f"[JobCache] 获取回源锁失败 {key}: {str(e)}")
+            return True
+
+    def _cache_delete(self, key):
+        try:
+            cache.delete(key)
+        except Exception as e:
+            current_app.logger.warning(f"[JobCache] 删除缓存失败 {key}: {str(e)}")
+
+
+job_cache = JobCache()
+
+
+# --- ORM 事件：flush 时记录受影响的工作，事务提交后统一失效 ---
+def _pending(session):
+    return session.info.setdefault(_SESSION_PENDING_KEY, set())
+
+
+def _mark_job_changed(target, job_id):
+    session = object_session(target)
+    if session is not None and job_id is not None:
+        _pending(session).add(job_id)
+
+
+def _job_content_changed(target):
+    state = inspect(target)
+    return any(attr.history.has_changes() for attr in state.attrs if attr.key not in _IGNORED_JOB_FIELDS)
+
+
+@event.listens_for(Job, 'after_insert')
+@event.listens_for(Job, 'after_delete')
+def _on_job_written(mapper, connection, target):
+    _mark_job_changed(target, target.id)
+
+
+@event.listens_for(Job, 'after_update')
+def _on_job_updated(mapper, connection, target):
+    if _job_content_changed(target):
+        _mark_job_changed(target, target.id)
+
+
+@event.listens_for(JobRequiredSkill, 'after_insert')
+@event.listens_for(JobRequiredSkill, 'after_update')
+@event.listens_for(JobRequiredSkill, 'after_delete')
+def _on_job_skill_written(mapper, connection, target):
+    _mark_job_changed(target, target.job_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    job_ids = session.info.pop(_SESSION_PENDING_KEY, None)
+    if not job_ids:
+        return
+    try:
+        job_cache.invalidate(job_ids=sorted(job_ids), listings=True)
+    except RuntimeError:
+        # 没有应用上下文 (例如脱离 Flask 使用模型)，无缓存可清除
+        pass
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_after_rollback(session, transaction):
+    # 最外层事务结束但未提交 (回滚)：丢弃记录的变更
+    if transaction.parent is None:
+        session.info.pop(_SESSION_PENDING_KEY, None)
@@ -0,0 +1,151 @@
+"""
+工作过期清理 (Job Expiry Sweeper)
+
+招聘中 (active) 的工作过了报名截止时间 (application_deadline) 或预计结束时间 (end_time) 后不会再有人处理，
+原先一直保持 active，搜索结果中的过时工作与 active 集合不断增长。本定时任务定期将其置为 expired：
+- 两条规则依次处理: status = active 且 application_deadline <= 本轮开始时间；status = active 且 end_time <= 本轮开始时间，
+  分别走 (status, application_deadline)、(status, end_time) 复合索引，按截止时间顺序每次读取 JOB_EXPIRY_BATCH_SIZE 个工作ID
+- 每批在一个短事务中: 条件 UPDATE 将仍满足条件的工作置为 expired (期间被雇主关闭或修改截止时间的工作不受影响)，
+  并将这些工作下尚未处理 (pending/viewed) 的报名批量置为 rejected；已过期的工作离开 active 范围，下一批无需键集推进
+- 批量 UPDATE 不触发 ORM 事件，标签/类别字典 (job_taxonomy_service) 的计数在同一事务中扣减 (已过期的工作不计入)；
+  每批提交后由本任务通知读路径: 清除工作详情与列表缓存 (job_cache，包括搜索分面统计与标签/类别列表)，
+  从本进程的全文检索索引中移除 (job_search_index)，登记推荐引擎待重新加载的工作 (job_recommender)；
+  其他进程的索引与推荐矩阵按 updated_at 追平
+- 租约与批次控制同订单自动确认 (scheduler_lease): 只有获得 'job_expiry' 租约的节点执行，每批处理前续约
+- 每轮返回并记录指标: 按规则的过期工作数、自动拒绝的报名数、批数、最久逾期时长、耗时
+"""
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from ..core.extensions import db
+from ..models.job import Job, JobApplication, JobApplicationStatusEnum, JobStatusEnum
+from .job_cache import job_cache
+from .job_recommendation import job_recommender
+from .job_search_index import job_search_index
+from .job_taxonomy_service import job_taxonomy_service
+from .scheduler_lease import new_lease_holder, scheduler_lease_service
+
+LEASE_NAME = 'job_expiry'
+
+# (指标名, 截止时间列)
+_EXPIRY_RULES = (
+    ('expired_by_deadline', Job.application_deadline),
+    ('expired_by_end_time', Job.end_time),
+)
+
+# 工作过期时自动拒绝的报名状态
+_OPEN_APPLICATION_STATUSES = (JobApplicationStatusEnum.pending, JobApplicationStatusEnum.viewed)
+
+_REJECTION_REASON = '工作已过期，报名自动关闭'
+
+
+class JobExpirySweeper:
+    def run_once(self, batch_size=None, max_batches=None):
+        """
+        过期一轮到期的工作
+        :param batch_size: 每批过期的工作数，默认 JOB_EXPIRY_BATCH_SIZE
+        :param max_batches: 本轮最多处理的批数，默认 JOB_EXPIRY_MAX_BATCHES (0 表示不限)
+        :return: {'acquired': 是否获得租约, 'expired_by_deadline': 报名截止过期数, 'expired_by_end_time': 工作结束过期数,
+                  'applications_rejected': 自动拒绝的报名数, 'batches': 批数, 'max_overdue_seconds': 最久逾期秒数,
+                  'seconds': 耗时}
+        """
+        config = current_app.config
+        batch_size = batch_size or config.get('JOB_EXPIRY_BATCH_SIZE', 500)
+        if max_batches is None:
+            max_batches = config.get('JOB_EXPIRY_MAX_BATCHES', 0)
+        lease_ttl = config.get('JOB_EXPIRY_LEASE_SECONDS', 120)
+
+        started = time.monotonic()
+        stats = {'acquired': False, 'expired_by_deadline': 0, 'expired_by_end_time': 0, 'applications_rejected': 0,
+                 'batches': 0, 'max_overdue_seconds': 0, 'seconds': 0}
+        holder = new_lease_holder()
+        if not scheduler_lease_service.acquire(LEASE_NAME, holder, lease_ttl):
+            current_app.logger.info("[JobExpiry] 租约由其他节点持有，跳过本轮")
+            return stats
+        stats['acquired'] = True
+
+        # 以本轮开始时间为准，执行期间新到期的工作留给下一轮
+        now = datetime.utcnow()
+        lease_lost = False
+        try:
+            for metric, column in _EXPIRY_RULES:
+                while not lease_lost and (not max_batches or stats['batches'] < max_batches):
+                    if stats['batches'] and not scheduler_lease_service.renew(LEASE_NAME, holder, lease_ttl):
+                        current_app.logger.warning("[JobExpiry] 租约已失效，停止本轮")
+                        lease_lost = True
+                        break
+                    result = self._expire_batch(column, now, batch_size)
+                    if result is None:
+                        break
+                    expired, rejected, overdue_seconds = result
+                    stats['batches'] += 1
+                    stats[metric] += expired
+                    stats['applications_rejected'] += rejected
+                    stats['max_overdue_seconds'] = max(stats['max_overdue_seconds'], overdue_seconds)
+        finally:
+            db.session.remove()
+            scheduler_lease_service.release(LEASE_NAME, holder)
+
+        stats['seconds'] = round(time.monotonic() - started, 3)
+        current_app.logger.info(f"[JobExpiry] 过期工作 {stats['expired_by_deadline']} 个 (报名截止)、"
+                                f"{stats['expired_by_end_time']} 个 (工作结束)，自动拒绝报名 {stats['applications_rejected']} 个，"
+                                f"最久逾期 {stats['max_overdue_seconds']} 秒，共 {stats['batches']} 批，耗时 {stats['seconds']} 秒")
+        return stats
+
+    def _expire_batch(self, column, now, batch_size):
+        """
+        过期一批截止时间早于 now 的招聘中工作，并拒绝其未处理的报名
+        :return: (过期工作数, 拒绝报名数, 本批最久逾期秒数)；没有到期工作时返回 None
+        """
+        # 锁定本批工作直到提交，过期的工作与下面扣减字典计数的工作一致
+        rows = db.session.query(Job.id, column)\
+            .filter(Job.status == JobStatusEnum.active, column <= now)\
+            .order_by(column.asc(), Job.id.asc()).limit(batch_size).with_for_update().all()
+        if not rows:
+            db.session.commit()
+            return None
+        job_ids = [job_id for job_id, _ in rows]
+
+        try:
+            # 重新校验条件: 读取之后被关闭或延后截止时间的工作保持不变
+            expired = db.session.execute(
+                update(Job)
+                .where(Job.id.in_(job_ids), Job.status == JobStatusEnum.active, column <= now)
+                .values(status=JobStatusEnum.expired, updated_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            rejected = db.session.execute(
+                update(JobApplication)
+                .where(JobApplication.job_id.in_(select(Job.id).where(Job.id.in_(job_ids), Job.status == JobStatusEnum.expired)),
+                       JobApplication.status.in_(_OPEN_APPLICATION_STATUSES))
+                .values(status=JobApplicationStatusEnum.rejected, rejection_reason=_REJECTION_REASON,
+                        processed_at=now, updated_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            self._release_terms(job_ids)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        self._publish_expired(job_ids)
+        return expired, rejected, int((now - rows[0][1]).total_seconds())
+
+    def _release_terms(self, job_ids):
+        """在当前事务中扣减本批已过期工作的标签/类别计数"""
+        expired_jobs = db.session.query(Job.job_category, Job.job_tags)\
+            .filter(Job.id.in_(job_ids), Job.status == JobStatusEnum.expired).all()
+        job_taxonomy_service.release_jobs(db.session.connection(), expired_jobs)
+
+    def _publish_expired(self, job_ids):
+        """批量 UPDATE 不经过 ORM 事件，提交后通知缓存、搜索索引与推荐引擎"""
+        job_cache.invalidate(job_ids=job_ids, listings=True)
+        for job_id in job_ids:
+            job_search_index.remove_job(job_id)
+        job_recommender.mark_jobs_changed(job_ids)
+
+
+job_expiry_sweeper = JobExpirySweeper()
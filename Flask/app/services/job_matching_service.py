@@ -0,0 +1,119 @@
+"""
+急聘工作反向匹配 (Urgent Job Reverse Matching)
+
+急聘 (is_urgent) 工作发布后，查找能胜任且在附近的零工并发送通知：
+- 匹配条件: 账号状态正常；常驻城市与工作相同，工作指定了区县时零工常驻区县相同或未填写；
+  零工技能覆盖工作的全部必备技能 (JobRequiredSkill.is_mandatory)，工作没有必备技能时只按地点匹配
+- 匹配在数据库中完成 (必备技能覆盖用 GROUP BY ... HAVING COUNT = 必备技能数 的子查询)，
+  按零工ID键集分批读取，每批通过 NotificationService.insert_notifications 一条多行 INSERT 写入并提交，
+  单批大小由 JOB_MATCHING_BATCH_SIZE 控制，匹配数万零工时内存与事务大小保持有界
+- 发布请求只在提交后把工作ID提交到后台任务队列 (task_queue，幂等键 job-matching:<工作ID>)，由 manage.py worker 执行，
+  匹配与写通知不占用请求线程，进程重启也不会丢失；JOB_MATCHING_ASYNC=False 时在当前线程同步执行 (测试或命令行使用)
+- 匹配读取执行时的工作状态与必备技能；工作已不是急聘或不再进行中时跳过
+- 已收到该工作推荐通知的零工不再匹配，任务失败重试或重复执行时不会重复通知
+"""
+from flask import current_app
+from sqlalchemy import exists, func, or_
+
+from ..core.extensions import db
+from ..models.job import Job, JobStatusEnum
+from ..models.notification import Notification, NotificationTypeEnum
+from ..models.profile import FreelancerProfile
+from ..models.skill import FreelancerSkill, JobRequiredSkill
+from ..models.user import User
+from .communication_service import notification_service
+from .task_queue import task
+
+
+class JobMatchingService:
+    # --- 调度 ---
+    def dispatch_urgent_job(self, job_id):
+        """
+        提交急聘工作的匹配通知任务 (在工作提交后调用)
+        :param job_id: 工作ID
+        """
+        if not current_app.config.get('JOB_MATCHING_ENABLED', True):
+            return
+        if not current_app.config.get('JOB_MATCHING_ASYNC', True):
+            self.notify_matching_freelancers(job_id)
+            return
+        notify_urgent_job.apply_async((job_id,), idempotency_key=f"job-matching:{job_id}")
+
+    # --- 匹配 ---
+    def notify_matching_freelancers(self, job_id):
+        """
+        为急聘工作匹配零工并分批写入通知
+        :param job_id: 工作ID
+        :return: 写入的通知数量
+        """
+        job = db.session.get(Job, job_id)
+        if job is None or not job.is_urgent or job.status != JobStatusEnum.active:
+            return 0
+        if not job.location_city:
+            current_app.logger.info(f"[JobMatchingService] 工作 {job_id} 未填写城市，跳过匹配")
+            return 0
+
+        batch_size = current_app.config.get('JOB_MATCHING_BATCH_SIZE', 1000)
+        notification_data = self._notification_data(job)
+        query = self._matching_query(job)
+        notified = 0
+        last_id = 0
+        while True:
+            user_ids = [user_id for (user_id,) in query.filter(FreelancerProfile.user_id > last_id)
+                        .order_by(FreelancerProfile.user_id.asc()).limit(batch_size).all()]
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+            try:
+                notified += notification_service.insert_notifications(user_ids, notification_data)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+        current_app.logger.info(f"[JobMatchingService] 急聘工作 {job_id} 已通知 {notified} 位匹配的零工")
+        return notified
+
+    def _matching_query(self, job):
+        """匹配零工ID的查询 (未排序、未分页)"""
+        query = db.session.query(FreelancerProfile.user_id)\
+            .join(User, User.id == FreelancerProfile.user_id)\
+            .filter(User.status == 'active',
+                    FreelancerProfile.user_id != job.employer_user_id,
+                    FreelancerProfile.location_city == job.location_city,
+                    ~exists().where(Notification.user_id == FreelancerProfile.user_id,
+                                    Notification.notification_type == NotificationTypeEnum.job_recommendation,
+                                    Notification.related_resource_type == 'job',
+                                    Notification.related_resource_id == job.id))
+        if job.location_district:
+            query = query.filter(or_(FreelancerProfile.location_district == job.location_district,
+                                     FreelancerProfile.location_district.is_(None)))
+
+        mandatory_skill_ids = [skill_id for (skill_id,) in db.session.query(JobRequiredSkill.skill_id)
+                               .filter(JobRequiredSkill.job_id == job.id, JobRequiredSkill.is_mandatory.is_(True)).all()]
+        if mandatory_skill_ids:
+            qualified = db.session.query(FreelancerSkill.freelancer_user_id)\
+                .filter(FreelancerSkill.skill_id.in_(mandatory_skill_ids))\
+                .group_by(FreelancerSkill.freelancer_user_id)\
+                .having(func.count(FreelancerSkill.skill_id) == len(mandatory_skill_ids))
+            query = query.filter(FreelancerProfile.user_id.in_(qualified))
+        return query
+
+    def _notification_data(self, job):
+        location = f"{job.location_city}{job.location_district or ''}"
+        return {
+            'notification_type': NotificationTypeEnum.job_recommendation,
+            'title': '附近有急聘工作匹配您的技能',
+            'content': f"{location}的工作「{job.title}」正在急聘，您的技能符合要求，快去看看吧。",
+            'related_resource_type': 'job',
+            'related_resource_id': job.id,
+        }
+
+
+job_matching_service = JobMatchingService()
+
+
+@task(name='job_matching.notify_urgent_job')
+def notify_urgent_job(job_id):
+    """后台任务: 为急聘工作匹配零工并写入通知"""
+    job_matching_service.notify_matching_freelancers(job_id)
@@ -0,0 +1,503 @@
+"""
+工作推荐引擎 (Skill-based Job Recommendation)
+
+为零工推荐进行中的工作，替代原先"最新工作"的占位实现：
+- 特征: 技能匹配 (稀疏向量余弦相似度)、必备技能缺失惩罚、地点 (区县/城市/省份)、偏好类别、期望薪资、发布时间、急聘
+- 工作侧: 进行中 (active) 的工作按行存放在 SciPy CSR 稀疏矩阵 (工作 x 技能) 中，地点/薪资等特征为按行对齐的 NumPy 数组；
+  必备技能另存一份 0/1 矩阵，用于一次矩阵乘法算出每个工作已满足的必备技能数
+- 零工侧: 技能按熟练度与经验年限加权后 L2 归一化，一次稀疏矩阵-向量乘法得到全部工作的相似度，
+  其余特征全部向量化计算，最后用 argpartition 取 Top-K (不对全部工作排序)
+- 增量维护: 工作变更 (Job / JobRequiredSkill 的 ORM 事件) 提交后登记为待更新，下次推荐前批量重新加载；
+  变更的行写入小的增量矩阵，查询时覆盖基础矩阵中的旧行，增量行数超过阈值时合并回基础矩阵；
+  多进程部署时按 updated_at 定期追平其他进程写入的变更
+- 引擎在进程内惰性构建；任何异常由调用方退回原有的按发布时间推荐
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import current_app
+from scipy import sparse
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from ..core.extensions import db
+from ..models.job import Job, JobApplication, JobStatusEnum
+from ..models.profile import FreelancerProfile
+from ..models.skill import FreelancerSkill, JobRequiredSkill
+
+_SESSION_PENDING_KEY = 'job_recommendation_pending'
+
+
+class _Vocabulary:
+    """字符串 -> 连续整数编码 (0 表示空值)"""
+
+    def __init__(self):
+        self._codes = {}
+
+    def code(self, key):
+        if key is None or key == '':
+            return 0
+        code = self._codes.get(key)
+        if code is None:
+            code = len(self._codes) + 1
+            self._codes[key] = code
+        return code
+
+    def lookup(self, key):
+        """查询已有编码；不存在时返回 -1 (不会与任何工作匹配，包括空值 0)"""
+        if key is None or key == '':
+            return -1
+        return self._codes.get(key, -1)
+
+
+def _enum_value(value):
+    return value.value if hasattr(value, 'value') else value
+
+
+class JobRecommendationEngine:
+    # 评分权重
+    WEIGHT_SKILL = 0.55
+    WEIGHT_MISSING_MANDATORY = 0.30
+    WEIGHT_LOCATION = 0.15
+    WEIGHT_CATEGORY = 0.10
+    WEIGHT_SALARY = 0.10
+    WEIGHT_RECENCY = 0.05
+    WEIGHT_URGENT = 0.03
+    RECENCY_HALF_LIFE_DAYS = 14
+
+    # 工作侧技能权重 (必备/加分) 与零工侧熟练度权重
+    MANDATORY_SKILL_WEIGHT = 1.0
+    OPTIONAL_SKILL_WEIGHT = 0.6
+    PROFICIENCY_WEIGHTS = {'beginner': 0.5, 'intermediate': 0.75, 'advanced': 0.9, 'expert': 1.0}
+    DEFAULT_PROFICIENCY_WEIGHT = 0.6
+    EXPERIENCE_WEIGHT_PER_YEAR = 0.03
+    MAX_EXPERIENCE_YEARS = 10
+
+    LOAD_BATCH_SIZE = 5000
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._pending_lock = threading.Lock()
+        self._pending_job_ids = set()
+        self._reset()
+
+    def _reset(self):
+        self._ready = False
+        self._slots = {} # job_id -> 行号
+        self._size = 0
+        self._allocate(0)
+        self._skill_cols = {} # skill_id -> 列号
+        self._provinces = _Vocabulary()
+        self._cities = _Vocabulary()
+        self._districts = _Vocabulary()
+        self._categories = _Vocabulary()
+        self._salary_types = _Vocabulary()
+        self._base_weights = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._base_mandatory = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._delta_rows = {} # 行号 -> (列号数组, 权重数组, 必备标记数组)
+        self._delta_matrices = None
+        self._last_sync_at = datetime.utcnow()
+        self._last_refresh_check = time.monotonic()
+
+    def _allocate(self, capacity):
+        self._capacity = capacity
+        self._job_ids = np.zeros(capacity, dtype=np.int64)
+        self._active = np.zeros(capacity, dtype=bool)
+        self._province = np.zeros(capacity, dtype=np.int32)
+        self._city = np.zeros(capacity, dtype=np.int32)
+        self._district = np.zeros(capacity, dtype=np.int32)
+        self._category = np.zeros(capacity, dtype=np.int32)
+        self._salary_type = np.zeros(capacity, dtype=np.int32)
+        self._salary = np.zeros(capacity, dtype=np.float32)
+        self._created_ts = np.zeros(capacity, dtype=np.float64)
+        self._urgent = np.zeros(capacity, dtype=bool)
+        self._mandatory_count = np.zeros(capacity, dtype=np.float32)
+
+    def _ensure_capacity(self, size):
+        if size <= self._capacity:
+            return
+        capacity = max(size, self._capacity * 2, 1024)
+        for name in ('_job_ids', '_active', '_province', '_city', '_district', '_category', '_salary_type',
+                     '_salary', '_created_ts', '_urgent', '_mandatory_count'):
+            old = getattr(self, name)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+        self._capacity = capacity
+
+    # --- 查询 ---
+    def recommend(self, freelancer_user_id, count=10, freelancer=None):
+        """
+        为零工计算推荐工作
+        :param freelancer_user_id: 零工用户ID
+        :param count: 推荐数量
+        :param freelancer: 已加载的零工特征 (load_freelancers 的返回值)，为空时从数据库加载
+        :return: 按推荐得分降序的工作ID列表
+        """
+        self._ensure_ready()
+        if freelancer is None:
+            freelancer = self.load_freelancers([freelancer_user_id])[freelancer_user_id]
+        applied_job_ids = [job_id for (job_id,) in db.session.query(JobApplication.job_id)
+                           .filter(JobApplication.freelancer_user_id == freelancer_user_id).all()]
+        return self.top_k(freelancer, count, applied_job_ids)
+
+    def top_k(self, freelancer, count, excluded_job_ids=()):
+        """
+        按当前工作矩阵为零工打分并取 Top-K (不访问数据库，可在 fork 出的子进程中调用)
+        :param freelancer: 零工特征 (load_freelancers 的返回值)
+        :param count: 推荐数量
+        :param excluded_job_ids: 需排除的工作ID (如已申请的工作)
+        :return: 按推荐得分降序的工作ID列表
+        """
+        with self._lock:
+            return self._top_k(freelancer, count, excluded_job_ids)
+
+    def active_job_ids(self):
+        """:return: 当前矩阵中进行中的工作ID (已排序的 NumPy 数组)"""
+        self._ensure_ready()
+        with self._lock:
+            return np.sort(self._job_ids[:self._size][self._active[:self._size]])
+
+    def load_freelancers(self, freelancer_user_ids):
+        """
+        批量加载零工特征 (技能、地点、工作偏好)，只包含基本类型，可序列化后传给子进程
+        :param freelancer_user_ids: 零工用户ID列表
+        :return: {零工用户ID: {'skills': [(技能ID, 熟练度, 经验年限), ...], 'province', 'city', 'district', 'preference'}}
+        """
+        freelancers = {user_id: {'skills': [], 'province': None, 'city': None, 'district': None, 'preference': {}}
+                       for user_id in freelancer_user_ids}
+        if not freelancers:
+            return freelancers
+        skills = db.session.query(FreelancerSkill.freelancer_user_id, FreelancerSkill.skill_id,
+                                  FreelancerSkill.proficiency_level, FreelancerSkill.years_of_experience)\
+            .filter(FreelancerSkill.freelancer_user_id.in_(list(freelancers)))\
+            .order_by(FreelancerSkill.freelancer_user_id, FreelancerSkill.skill_id).all()
+        for user_id, skill_id, proficiency, years in skills:
+            freelancers[user_id]['skills'].append((skill_id, _enum_value(proficiency), years))
+        profiles = db.session.query(FreelancerProfile.user_id, FreelancerProfile.location_province,
+                                    FreelancerProfile.location_city, FreelancerProfile.location_district,
+                                    FreelancerProfile.work_preference)\
+            .filter(FreelancerProfile.user_id.in_(list(freelancers))).all()
+        for user_id, province, city, district, preference in profiles:
+            freelancers[user_id].update(province=province, city=city, district=district,
+                                        preference=preference if isinstance(preference, dict) else {})
+        return freelancers
+
+    def _freelancer_vectors(self, skills):
+        """零工技能向量 (L2 归一化) 与技能持有标记，只包含有工作要求的技能"""
+        n_cols = len(self._skill_cols)
+        weights = np.zeros(n_cols, dtype=np.float32)
+        has_skill = np.zeros(n_cols, dtype=np.float32)
+        for skill_id, proficiency, years in skills:
+            col = self._skill_cols.get(skill_id)
+            if col is None:
+                continue
+            weight = self.PROFICIENCY_WEIGHTS.get(proficiency, self.DEFAULT_PROFICIENCY_WEIGHT)
+            weight += min(years or 0, self.MAX_EXPERIENCE_YEARS) * self.EXPERIENCE_WEIGHT_PER_YEAR
+            weights[col] = weight
+            has_skill[col] = 1.0
+        norm = np.linalg.norm(weights)
+        if norm > 0:
+            weights /= norm
+        return weights, has_skill
+
+    def _skill_scores(self, weights, has_skill):
+        """:return: (技能相似度, 已满足的必备技能数)，均按行对齐"""
+        size = self._size
+        similarity = np.zeros(size, dtype=np.float32)
+        matched_mandatory = np.zeros(size, dtype=np.float32)
+        base_rows, base_cols = self._base_weights.shape
+        if base_rows and base_cols:
+            similarity[:base_rows] = self._base_weights @ weights[:base_cols]
+            matched_mandatory[:base_rows] = self._base_mandatory @ has_skill[:base_cols]
+        if self._delta_rows:
+            slots, delta_weights, delta_mandatory = self._get_delta_matrices()
+            delta_cols = delta_weights.shape[1]
+            similarity[slots] = delta_weights @ weights[:delta_cols]
+            matched_mandatory[slots] = delta_mandatory @ has_skill[:delta_cols]
+        return similarity, matched_mandatory
+
+    def _top_k(self, freelancer, count, excluded_job_ids):
+        size = self._size
+        if size == 0 or count <= 0:
+            return []
+
+        weights, has_skill = self._freelancer_vectors(freelancer['skills'])
+        similarity, matched_mandatory = self._skill_scores(weights, has_skill)
+        mandatory_count = self._mandatory_count[:size]
+
+        scores = self.WEIGHT_SKILL * similarity
+        missing_ratio = (mandatory_count - matched_mandatory) / np.maximum(mandatory_count, 1.0)
+        scores -= self.WEIGHT_MISSING_MANDATORY * missing_ratio
+
+        district = self._districts.lookup(self._district_key(freelancer['city'], freelancer['district']))
+        city = self._cities.lookup(freelancer['city'])
+        province = self._provinces.lookup(freelancer['province'])
+        location = np.where(self._district[:size] == district, 1.0,
+                            np.where(self._city[:size] == city, 0.7,
+                                     np.where(self._province[:size] == province, 0.3, 0.0)))
+        scores += self.WEIGHT_LOCATION * location
+
+        preference = freelancer['preference']
+        preferred_categories = preference.get('categories') or preference.get('preferred_job_types') or []
+        if isinstance(preferred_categories, list) and preferred_categories:
+            category_codes = [self._categories.lookup(category) for category in preferred_categories
+                              if isinstance(category, str)]
+            scores += self.WEIGHT_CATEGORY * np.isin(self._category[:size], category_codes)
+
+        expected_salary, expected_salary_type = self._expected_salary(preference)
+        if expected_salary:
+            salary_ratio = np.clip(self._salary[:size] / expected_salary, 0.0, 1.5) / 1.5
+            if expected_salary_type:
+                salary_ratio = salary_ratio * (self._salary_type[:size] == self._salary_types.lookup(expected_salary_type))
+            scores += self.WEIGHT_SALARY * salary_ratio
+
+        age_days = np.maximum(datetime.utcnow().timestamp() - self._created_ts[:size], 0.0) / 86400.0
+        scores += self.WEIGHT_RECENCY * np.exp2(-age_days / self.RECENCY_HALF_LIFE_DAYS)
+        scores += self.WEIGHT_URGENT * self._urgent[:size]
+
+        scores = scores.astype(np.float64)
+        scores[~self._active[:size]] = -np.inf
+        excluded_slots = [self._slots[job_id] for job_id in excluded_job_ids if job_id in self._slots]
+        if excluded_slots:
+            scores[excluded_slots] = -np.inf
+
+        candidates = int(np.count_nonzero(np.isfinite(scores)))
+        k = min(count, candidates)
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [int(job_id) for job_id in self._job_ids[top]]
+
+    def _expected_salary(self, preference):
+        """从工作偏好中读取期望薪资: (金额, 计薪方式或 None)"""
+        for key, salary_type in (('expected_salary', preference.get('salary_type')),
+                                 ('salary_min', preference.get('salary_type')),
+                                 ('hourly_rate', 'hourly')):
+            try:
+                amount = float(preference.get(key) or 0)
+            except (TypeError, ValueError):
+                continue
+            if amount > 0:
+                return amount, salary_type
+        return None, None
+
+    def _district_key(self, city, district):
+        return f"{city or ''}/{district}" if district else None
+
+    # --- 构建与增量维护 ---
+    def mark_jobs_changed(self, job_ids):
+        """登记已提交变更的工作，下次推荐前重新加载 (不在事务提交回调中访问数据库)"""
+        with self._pending_lock:
+            self._pending_job_ids.update(job_ids)
+
+    def _ensure_ready(self):
+        with self._lock:
+            if not self._ready:
+                self.rebuild()
+                return
+            interval = current_app.config.get('JOB_RECOMMENDATION_REFRESH_SECONDS', 30)
+            now = time.monotonic()
+            changed_job_ids = set()
+            if now - self._last_refresh_check >= interval:
+                # 追平其他进程写入的变更；留出重叠窗口，避免时钟误差与未提交事务导致漏数据
+                started_at = datetime.utcnow()
+                since = self._last_sync_at - timedelta(seconds=interval)
+                changed_job_ids.update(job_id for (job_id,) in db.session.query(Job.id)
+                                       .filter(Job.updated_at >= since).all())
+                self._last_sync_at = started_at
+                self._last_refresh_check = now
+            with self._pending_lock:
+                changed_job_ids.update(self._pending_job_ids)
+                self._pending_job_ids.clear()
+            if changed_job_ids:
+                self._reload_jobs(sorted(changed_job_ids))
+            if len(self._delta_rows) > current_app.config.get('JOB_RECOMMENDATION_COMPACT_THRESHOLD', 2000):
+                self._compact()
+
+    def rebuild(self):
+        """从数据库全量构建工作矩阵 (只加载进行中的工作)"""
+        with self._lock:
+            started_at = datetime.utcnow()
+            with self._pending_lock:
+                self._pending_job_ids.clear()
+            self._reset()
+            rows, cols, weights, mandatory = [], [], [], []
+            last_id = 0
+            while True:
+                jobs = self._query_job_rows(Job.id > last_id, Job.status == JobStatusEnum.active)\
+                    .order_by(Job.id.asc()).limit(self.LOAD_BATCH_SIZE).all()
+                if not jobs:
+                    break
+                skills_by_job = self._query_job_skills([job[0] for job in jobs])
+                for job in jobs:
+                    slot = self._store_job(job, skills_by_job.get(job[0], []))
+                    job_cols, job_weights, job_mandatory = self._job_vector(skills_by_job.get(job[0], []))
+                    rows.append(np.full(len(job_cols), slot, dtype=np.int32))
+                    cols.append(job_cols)
+                    weights.append(job_weights)
+                    mandatory.append(job_mandatory)
+                last_id = jobs[-1][0]
+
+            self._base_weights, self._base_mandatory = self._build_matrices(rows, cols, weights, mandatory, self._size)
+            self._ready = True
+            self._last_sync_at = started_at
+            self._last_refresh_check = time.monotonic()
+        current_app.logger.info(f"[JobRecommendation] 推荐矩阵构建完成，共 {self._size} 个工作，{len(self._skill_cols)} 个技能")
+
+    def _reload_jobs(self, job_ids):
+        for start in range(0, len(job_ids), self.LOAD_BATCH_SIZE):
+            batch = job_ids[start:start + self.LOAD_BATCH_SIZE]
+            jobs = {job[0]: job for job in self._query_job_rows(Job.id.in_(batch)).all()}
+            skills_by_job = self._query_job_skills([job_id for job_id, job in jobs.items()
+                                                    if _enum_value(job[1]) == JobStatusEnum.active.value])
+            for job_id in batch:
+                job = jobs.get(job_id)
+                if job is None or _enum_value(job[1]) != JobStatusEnum.active.value:
+                    slot = self._slots.get(job_id)
+                    if slot is not None:
+                        self._active[slot] = False
+                    continue
+                skills = skills_by_job.get(job_id, [])
+                slot = self._store_job(job, skills)
+                self._delta_rows[slot] = self._job_vector(skills)
+                self._delta_matrices = None
+
+    def _query_job_rows(self, *conditions):
+        return db.session.query(Job.id, Job.status, Job.location_province, Job.location_city, Job.location_district,
+                                Job.job_category, Job.salary_amount, Job.salary_type, Job.created_at, Job.is_urgent)\
+            .filter(*conditions)
+
+    def _query_job_skills(self, job_ids):
+        skills_by_job = {}
+        if not job_ids:
+            return skills_by_job
+        rows = db.session.query(JobRequiredSkill.job_id, JobRequiredSkill.skill_id, JobRequiredSkill.is_mandatory)\
+            .filter(JobRequiredSkill.job_id.in_(job_ids)).all()
+        for job_id, skill_id, is_mandatory in rows:
+            skills_by_job.setdefault(job_id, []).append((skill_id, bool(is_mandatory)))
+        return skills_by_job
+
+    def _store_job(self, job, skills):
+        """写入工作的非技能特征，返回行号"""
+        job_id, _, province, city, district, category, salary, salary_type, created_at, is_urgent = job
+        slot = self._slots.get(job_id)
+        if slot is None:
+            slot = self._size
+            self._size += 1
+            self._ensure_capacity(self._size)
+            self._slots[job_id] = slot
+        self._job_ids[slot] = job_id
+        self._active[slot] = True
+        self._province[slot] = self._provinces.code(province)
+        self._city[slot] = self._cities.code(city)
+        self._district[slot] = self._districts.code(self._district_key(city, district))
+        self._category[slot] = self._categories.code(category)
+        self._salary_type[slot] = self._salary_types.code(_enum_value(salary_type))
+        self._salary[slot] = float(salary or 0)
+        self._created_ts[slot] = created_at.replace(tzinfo=None).timestamp() if created_at else 0.0
+        self._urgent[slot] = bool(is_urgent)
+        self._mandatory_count[slot] = sum(1 for _, is_mandatory in skills if is_mandatory)
+        return slot
+
+    def _job_vector(self, skills):
+        """工作技能向量 (L2 归一化): (列号, 权重, 必备标记)"""
+        cols = np.array([self._skill_col(skill_id) for skill_id, _ in skills], dtype=np.int32)
+        weights = np.array([self.MANDATORY_SKILL_WEIGHT if is_mandatory else self.OPTIONAL_SKILL_WEIGHT
+                            for _, is_mandatory in skills], dtype=np.float32)
+        mandatory = np.array([1.0 if is_mandatory else 0.0 for _, is_mandatory in skills], dtype=np.float32)
+        norm = np.linalg.norm(weights)
+        if norm > 0:
+            weights /= norm
+        return cols, weights, mandatory
+
+    def _skill_col(self, skill_id):
+        col = self._skill_cols.get(skill_id)
+        if col is None:
+            col = len(self._skill_cols)
+            self._skill_cols[skill_id] = col
+        return col
+
+    def _build_matrices(self, rows, cols, weights, mandatory, n_rows):
+        shape = (n_rows, len(self._skill_cols))
+        if rows:
+            rows, cols = np.concatenate(rows), np.concatenate(cols)
+            weights, mandatory = np.concatenate(weights), np.concatenate(mandatory)
+        else:
+            rows = cols = np.zeros(0, dtype=np.int32)
+            weights = mandatory = np.zeros(0, dtype=np.float32)
+        weight_matrix = sparse.csr_matrix((weights, (rows, cols)), shape=shape, dtype=np.float32)
+        mandatory_matrix = sparse.csr_matrix((mandatory, (rows, cols)), shape=shape, dtype=np.float32)
+        return weight_matrix, mandatory_matrix
+
+    def _get_delta_matrices(self):
+        if self._delta_matrices is None:
+            slots = np.array(sorted(self._delta_rows), dtype=np.int64)
+            rows, cols, weights, mandatory = [], [], [], []
+            for index, slot in enumerate(slots):
+                slot_cols, slot_weights, slot_mandatory = self._delta_rows[int(slot)]
+                rows.append(np.full(len(slot_cols), index, dtype=np.int32))
+                cols.append(slot_cols)
+                weights.append(slot_weights)
+                mandatory.append(slot_mandatory)
+            self._delta_matrices = (slots, *self._build_matrices(rows, cols, weights, mandatory, len(slots)))
+        return self._delta_matrices
+
+    def _compact(self):
+        """将增量行合并回基础矩阵"""
+        delta_slots = sorted(self._delta_rows)
+        compacted = []
+        for matrix, field in ((self._base_weights, 1), (self._base_mandatory, 2)):
+            base = matrix.tocoo()
+            keep = ~np.isin(base.row, delta_slots)
+            rows, cols, data = [base.row[keep].astype(np.int32)], [base.col[keep].astype(np.int32)], [base.data[keep]]
+            for slot in delta_slots:
+                entry = self._delta_rows[slot]
+                rows.append(np.full(len(entry[0]), slot, dtype=np.int32))
+                cols.append(entry[0])
+                data.append(entry[field])
+            compacted.append(sparse.csr_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                                               shape=(self._size, len(self._skill_cols)), dtype=np.float32))
+        self._base_weights, self._base_mandatory = compacted
+        self._delta_rows = {}
+        self._delta_matrices = None
+
+
+job_recommender = JobRecommendationEngine()
+
+
+# --- ORM 事件：记录变更的工作，提交后登记到推荐引擎 ---
+def _mark_job_changed(target, job_id):
+    session = object_session(target)
+    if session is not None and job_id is not None:
+        session.info.setdefault(_SESSION_PENDING_KEY, set()).add(job_id)
+
+
+@event.listens_for(Job, 'after_insert')
+@event.listens_for(Job, 'after_update')
+@event.listens_for(Job, 'after_delete')
+def _on_job_written(mapper, connection, target):
+    _mark_job_changed(target, target.id)
+
+
+@event.listens_for(JobRequiredSkill, 'after_insert')
+@event.listens_for(JobRequiredSkill, 'after_update')
+@event.listens_for(JobRequiredSkill, 'after_delete')
+def _on_job_skill_written(mapper, connection, target):
+    _mark_job_changed(target, target.job_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _register_changes_after_commit(session):
+    job_ids = session.info.pop(_SESSION_PENDING_KEY, None)
+    if job_ids:
+        job_recommender.mark_jobs_changed(job_ids)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_after_rollback(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_SESSION_PENDING_KEY, None)
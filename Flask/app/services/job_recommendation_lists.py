@@ -0,0 +1,194 @@
+"""
+预计算推荐列表 (Precomputed Recommendation Lists)
+
+推荐引擎 (job_recommendation) 每次请求都要为零工打分一遍全部工作，而同一零工的结果在工作集合不变时是相同的。
+这里离线批量为每个活跃零工计算 Top-N 工作ID，打包为小端 int64 数组存入 job_recommendation_lists 表，
+推荐接口优先读取：
+- 批量计算 (precompute) 由 manage.py precompute_recommendations 定期执行：主进程按零工ID分批加载特征并判断是否需要刷新，
+  需要刷新的零工分块交给进程池打分 (fork 出的子进程继承已构建的工作矩阵，不访问数据库)，结果由主进程批量写回
+- 只刷新以下零工: 尚无列表、技能/地点/工作偏好已变更 (特征摘要不一致)、列表中有已关闭或已申请的工作、
+  列表超过 JOB_RECOMMENDATION_PRECOMPUTE_MAX_AGE_SECONDS (纳入新发布的工作)
+- 读取时重新计算特征摘要，与列表不一致 (零工刚修改了技能或偏好) 或列表过期时不使用，由调用方实时计算；
+  已关闭、已申请的工作在读取时过滤
+- 不支持 fork 的平台或 workers=1 时在当前进程内顺序计算
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import current_app
+
+from ..core.extensions import db
+from ..models.job import JobApplication, JobRecommendationList
+from ..models.profile import FreelancerProfile
+from ..models.user import User
+from .job_recommendation import job_recommender
+
+_PACK_DTYPE = np.dtype('<i8')
+
+
+def pack_job_ids(job_ids):
+    """工作ID列表 -> 小端 int64 字节串"""
+    return np.asarray(job_ids, dtype=_PACK_DTYPE).tobytes()
+
+
+def unpack_job_ids(packed):
+    """小端 int64 字节串 -> 工作ID数组"""
+    return np.frombuffer(packed or b'', dtype=_PACK_DTYPE)
+
+
+def freelancer_digest(freelancer):
+    """零工特征摘要: 技能、地点或工作偏好变化时改变"""
+    payload = [sorted(freelancer['skills']), freelancer['province'], freelancer['city'],
+               freelancer['district'], freelancer['preference']]
+    raw = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _score_chunk(args):
+    """进程池任务: 为一块零工计算推荐列表 -> [(零工用户ID, 打包的工作ID, 特征摘要), ...]"""
+    tasks, size = args
+    return [(user_id, pack_job_ids(job_recommender.top_k(freelancer, size, applied_job_ids)), digest)
+            for user_id, freelancer, applied_job_ids, digest in tasks]
+
+
+def _init_worker(engine):
+    # 子进程不使用父进程连接池中的连接 (不关闭，避免影响父进程)
+    engine.dispose(close=False)
+
+
+class JobRecommendationListService:
+    # --- 读取 ---
+    def get_job_ids(self, freelancer_user_id, freelancer=None):
+        """
+        读取零工的预计算推荐列表
+        :param freelancer_user_id: 零工用户ID
+        :param freelancer: 已加载的零工特征，为空时从数据库加载
+        :return: 按得分降序的工作ID列表；没有可用列表 (不存在、已过期或特征已变更) 时返回 None
+        """
+        row = db.session.query(JobRecommendationList.job_ids, JobRecommendationList.input_digest,
+                               JobRecommendationList.computed_at)\
+            .filter(JobRecommendationList.freelancer_user_id == freelancer_user_id).first()
+        if row is None:
+            return None
+        packed, digest, computed_at = row
+        ttl = current_app.config.get('JOB_RECOMMENDATION_PRECOMPUTED_TTL_SECONDS', 24 * 3600)
+        if computed_at is None or computed_at.replace(tzinfo=None) < datetime.utcnow() - timedelta(seconds=ttl):
+            return None
+        if freelancer is None:
+            freelancer = job_recommender.load_freelancers([freelancer_user_id])[freelancer_user_id]
+        if freelancer_digest(freelancer) != digest:
+            return None
+        return [int(job_id) for job_id in unpack_job_ids(packed)]
+
+    # --- 批量计算 ---
+    def precompute(self, full=False, workers=None, chunk_size=None):
+        """
+        为活跃零工批量计算推荐列表 (可定期调度执行)
+        :param full: 是否忽略刷新条件，重新计算全部零工
+        :param workers: 进程数，为空时读取 JOB_RECOMMENDATION_PRECOMPUTE_WORKERS (0 表示 CPU 核数)
+        :param chunk_size: 每个进程任务包含的零工数
+        :return: {'checked': 检查的零工数, 'refreshed': 重新计算的零工数, 'seconds': 耗时}
+        """
+        config = current_app.config
+        size = config.get('JOB_RECOMMENDATION_PRECOMPUTE_SIZE', 50)
+        chunk_size = chunk_size or config.get('JOB_RECOMMENDATION_PRECOMPUTE_CHUNK_SIZE', 500)
+        if workers is None:
+            workers = config.get('JOB_RECOMMENDATION_PRECOMPUTE_WORKERS', 0)
+        workers = workers or os.cpu_count() or 1
+        max_age = timedelta(seconds=config.get('JOB_RECOMMENDATION_PRECOMPUTE_MAX_AGE_SECONDS', 6 * 3600))
+
+        started = time.monotonic()
+        # 重新构建工作矩阵，本次计算基于同一份工作快照
+        job_recommender.rebuild()
+        active_job_ids = job_recommender.active_job_ids()
+
+        pool = None
+        if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            pool = multiprocessing.get_context('fork').Pool(workers, initializer=_init_worker, initargs=(db.engine,))
+        checked = refreshed = 0
+        try:
+            last_id = 0
+            while True:
+                # 每轮加载 workers 个任务块的零工，交给进程池并行计算
+                user_ids = [user_id for (user_id,) in db.session.query(FreelancerProfile.user_id)
+                            .join(User, User.id == FreelancerProfile.user_id)
+                            .filter(FreelancerProfile.user_id > last_id, User.status == 'active')
+                            .order_by(FreelancerProfile.user_id.asc()).limit(chunk_size * workers).all()]
+                if not user_ids:
+                    break
+                last_id = user_ids[-1]
+                checked += len(user_ids)
+
+                tasks = self._stale_tasks(user_ids, active_job_ids, full, max_age)
+                if not tasks:
+                    continue
+                chunks = [(tasks[start:start + chunk_size], size) for start in range(0, len(tasks), chunk_size)]
+                results = pool.imap_unordered(_score_chunk, chunks) if pool is not None else map(_score_chunk, chunks)
+                for chunk_result in results:
+                    self._save(chunk_result)
+                    refreshed += len(chunk_result)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        stats = {'checked': checked, 'refreshed': refreshed, 'seconds': round(time.monotonic() - started, 3)}
+        current_app.logger.info(f"[JobRecommendationLists] 预计算完成: 检查 {checked} 个零工，刷新 {refreshed} 个，"
+                                f"耗时 {stats['seconds']} 秒")
+        return stats
+
+    def _stale_tasks(self, user_ids, active_job_ids, full, max_age):
+        """需要重新计算的零工: [(零工用户ID, 零工特征, 已申请的工作ID, 特征摘要), ...]"""
+        freelancers = job_recommender.load_freelancers(user_ids)
+        applied = {}
+        for user_id, job_id in db.session.query(JobApplication.freelancer_user_id, JobApplication.job_id)\
+                .filter(JobApplication.freelancer_user_id.in_(user_ids)).all():
+            applied.setdefault(user_id, []).append(job_id)
+        existing = {user_id: (packed, digest, computed_at) for user_id, packed, digest, computed_at in
+                    db.session.query(JobRecommendationList.freelancer_user_id, JobRecommendationList.job_ids,
+                                     JobRecommendationList.input_digest, JobRecommendationList.computed_at)
+                    .filter(JobRecommendationList.freelancer_user_id.in_(user_ids)).all()}
+
+        expires_before = datetime.utcnow() - max_age
+        tasks = []
+        for user_id in user_ids:
+            freelancer = freelancers[user_id]
+            digest = freelancer_digest(freelancer)
+            applied_job_ids = applied.get(user_id, [])
+            current = existing.get(user_id)
+            if not full and current is not None:
+                packed, stored_digest, computed_at = current
+                job_ids = unpack_job_ids(packed)
+                if (stored_digest == digest
+                        and computed_at is not None and computed_at.replace(tzinfo=None) >= expires_before
+                        and np.isin(job_ids, active_job_ids).all()
+                        and not np.isin(job_ids, applied_job_ids).any()):
+                    continue
+            tasks.append((user_id, freelancer, applied_job_ids, digest))
+        return tasks
+
+    def _save(self, results):
+        """写回一块计算结果 (先删除旧列表再批量插入，同一事务提交)"""
+        if not results:
+            return
+        now = datetime.utcnow()
+        try:
+            db.session.query(JobRecommendationList)\
+                .filter(JobRecommendationList.freelancer_user_id.in_([user_id for user_id, _, _ in results]))\
+                .delete(synchronize_session=False)
+            db.session.execute(JobRecommendationList.__table__.insert(), [
+                {'freelancer_user_id': user_id, 'job_ids': packed, 'input_digest': digest, 'computed_at': now}
+                for user_id, packed, digest in results
+            ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+job_recommendation_lists = JobRecommendationListService()
@@ -0,0 +1,318 @@
+"""
+工作全文检索索引 (Job Full-Text Search Index)
+
+为 JobService.search_jobs 的关键字查询 (q) 提供倒排索引，避免每次搜索都对 jobs 表
+(包括 TEXT 类型的 description) 做 `LIKE '%q%'` 全表扫描。
+
+- 分词: 中日韩字符按字符二元组 (bigram) 切分，英文/数字按字符三元组 (trigram) 切分并转为小写，
+  包含关键字子串的工作一定包含关键字的全部 n-gram，因此索引命中集合是 LIKE 结果的超集，
+  由 SQL 对候选再做一次 LIKE 校验；短于 n-gram 的关键字 (单个汉字、一两个字母) 无法用索引回答，退回 SQL
+- 范围: 只索引招聘中 (active) 的工作，其他状态的搜索直接走 SQL
+- 排序: BM25 相关度打分，标题命中权重高于描述
+- 维护: create_job / update_job / delete_job 等时增量更新；多进程部署时按 updated_at 定期追平
+- 可插拔: 通过 JOB_SEARCH_INDEX_BACKEND 配置选择后端，'none' 表示禁用并退回 SQL 查询
+"""
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from ..core.extensions import db
+from ..models.job import Job, JobStatusEnum
+
+# 中日韩统一表意文字、扩展A区、兼容表意文字、日文假名、韩文音节
+_CJK_RANGES = r'\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af'
+_TOKEN_PATTERN = re.compile(rf'[{_CJK_RANGES}]+|[a-z0-9]+')
+_CJK_PATTERN = re.compile(rf'[{_CJK_RANGES}]')
+
+_CJK_GRAM = 2
+_LATIN_GRAM = 3
+
+
+def tokenize(text):
+    """
+    将文本切分为索引词项 (中日韩字符二元组，英文/数字三元组；不足 n 个字符的片段保留原样)
+    :param text: 原始文本
+    :return: 词项列表 (保留重复，用于统计词频)
+    """
+    if not text:
+        return []
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(str(text).lower()):
+        size = _CJK_GRAM if _CJK_PATTERN.match(run) else _LATIN_GRAM
+        if len(run) <= size:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + size] for i in range(len(run) - size + 1))
+    return tokens
+
+
+def _is_partial_term(term):
+    """短于 n-gram 的词项只能匹配同样短的完整片段，无法回答子串查询"""
+    return len(term) < (_CJK_GRAM if _CJK_PATTERN.match(term) else _LATIN_GRAM)
+
+
+class BaseJobSearchIndex:
+    """搜索索引后端接口，自定义后端需实现以下方法"""
+
+    def index_job(self, job):
+        raise NotImplementedError
+
+    def remove_job(self, job_id):
+        raise NotImplementedError
+
+    def search(self, query_text, limit=None):
+        """
+        :return: [(job_id, score), ...] 按相关度降序；返回 None 表示索引无法回答该查询，调用方应退回 SQL
+        """
+        raise NotImplementedError
+
+    def is_ready(self):
+        return False
+
+
+class InMemoryJobSearchIndex(BaseJobSearchIndex):
+    """进程内倒排索引，首次查询时从数据库全量构建"""
+
+    TITLE_WEIGHT = 3
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)  # term -> {job_id: weighted_tf}
+        self._doc_terms = {}                # job_id -> {term: weighted_tf}
+        self._doc_lengths = {}              # job_id -> 文档长度
+        self._total_length = 0
+        self._ready = False
+        self._last_sync_at = None
+        self._last_refresh_check = 0.0
+
+    # --- 维护 ---
+    def _analyze(self, title, description):
+        terms = defaultdict(int)
+        for token in tokenize(title):
+            terms[token] += self.TITLE_WEIGHT
+        for token in tokenize(description):
+            terms[token] += 1
+        return terms
+
+    def _add(self, job_id, title, description):
+        self._discard(job_id)
+        terms = self._analyze(title, description)
+        if not terms:
+            return
+        for term, tf in terms.items():
+            self._postings[term][job_id] = tf
+        length = sum(terms.values())
+        self._doc_terms[job_id] = dict(terms)
+        self._doc_lengths[job_id] = length
+        self._total_length += length
+
+    def _discard(self, job_id):
+        terms = self._doc_terms.pop(job_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(job_id, None)
+                if not posting:
+                    del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(job_id, 0)
+
+    def index_job(self, job):
+        if not self._ready:
+            # 索引尚未构建，首次查询时会整体加载，无需单独维护
+            return
+        with self._lock:
+            if job.status == JobStatusEnum.active:
+                self._add(job.id, job.title, job.description)
+            else:
+                self._discard(job.id)
+
+    def remove_job(self, job_id):
+        if not self._ready:
+            return
+        with self._lock:
+            self._discard(job_id)
+
+    def rebuild(self, batch_size=1000):
+        """从数据库全量重建索引 (按主键分批读取)"""
+        started_at = datetime.utcnow()
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_lengths.clear()
+            self._total_length = 0
+
+            last_id = 0
+            while True:
+                rows = db.session.query(Job.id, Job.title, Job.description)\
+                    .filter(Job.id > last_id, Job.status == JobStatusEnum.active)\
+                    .order_by(Job.id.asc())\
+                    .limit(batch_size).all()
+                if not rows:
+                    break
+                for job_id, title, description in rows:
+                    self._add(job_id, title, description)
+                last_id = rows[-1][0]
+
+            self._ready = True
+            self._last_sync_at = started_at
+            self._last_refresh_check = time.monotonic()
+        current_app.logger.info(f"[JobSearchIndex] 索引构建完成，共 {len(self._doc_lengths)} 个工作，{len(self._postings)} 个词项")
+
+    def refresh(self, interval_seconds):
+        """
+        追平其他进程写入的变更 (按 updated_at 增量拉取)
+        :param interval_seconds: 两次追平之间的最短间隔
+        """
+        now = time.monotonic()
+        if now - self._last_refresh_check < interval_seconds:
+            return
+        with self._lock:
+            if now - self._last_refresh_check < interval_seconds:
+                return
+            self._last_refresh_check = now
+            started_at = datetime.utcnow()
+            # 留出少量重叠窗口，避免时钟误差与未提交事务导致漏数据
+            since = self._last_sync_at - timedelta(seconds=interval_seconds)
+            rows = db.session.query(Job.id, Job.title, Job.description, Job.status)\
+                .filter(Job.updated_at >= since).all()
+            for job_id, title, description, status in rows:
+                if status == JobStatusEnum.active:
+                    self._add(job_id, title, description)
+                else:
+                    self._discard(job_id)
+            self._last_sync_at = started_at
+
+    def is_ready(self):
+        return self._ready
+
+    # --- 查询 ---
+    def search(self, query_text, limit=None):
+        query_terms = set(tokenize(query_text))
+        if not query_terms:
+            return None
+        # 单个汉字、一两个字母的片段可能是更长词的一部分，索引无法回答，交给 SQL 处理
+        if any(_is_partial_term(term) for term in query_terms):
+            return None
+
+        with self._lock:
+            postings = []
+            for term in query_terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    return []
+                postings.append((term, posting))
+
+            # 包含关键字的工作必然包含其全部 n-gram: 从最短倒排链开始求交集得到候选超集
+            postings.sort(key=lambda item: len(item[1]))
+            candidates = set(postings[0][1])
+            for _, posting in postings[1:]:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    return []
+
+            doc_count = len(self._doc_lengths)
+            avg_length = (self._total_length / doc_count) if doc_count else 1.0
+            scores = dict.fromkeys(candidates, 0.0)
+            for term, posting in postings:
+                df = len(posting)
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                for job_id in candidates:
+                    tf = posting[job_id]
+                    norm = self.K1 * (1 - self.B + self.B * self._doc_lengths[job_id] / avg_length)
+                    scores[job_id] += idf * tf * (self.K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        if limit:
+            ranked = ranked[:limit]
+        return ranked
+
+
+_BACKENDS = {
+    'memory': InMemoryJobSearchIndex,
+}
+
+
+def register_search_backend(name, backend_cls):
+    """注册自定义搜索索引后端 (例如基于 Elasticsearch / MySQL ngram FULLTEXT 的实现)"""
+    _BACKENDS[name] = backend_cls
+
+
+class JobSearchIndexManager:
+    """
+    JobService 使用的统一入口：根据配置选择后端，惰性构建，
+    任何索引异常都只记录日志，不影响主业务流程 (调用方会退回 SQL 查询)
+    """
+
+    def __init__(self):
+        self._backend = None
+        self._backend_name = None
+        self._build_lock = threading.Lock()
+
+    def reset(self):
+        """丢弃当前后端，下次查询时重新构建 (测试或切换数据库后使用)"""
+        self._backend = None
+        self._backend_name = None
+
+    def _get_backend(self):
+        backend_name = current_app.config.get('JOB_SEARCH_INDEX_BACKEND', 'memory')
+        if not backend_name or backend_name == 'none':
+            return None
+        if self._backend is None or self._backend_name != backend_name:
+            backend_cls = _BACKENDS.get(backend_name)
+            if backend_cls is None:
+                current_app.logger.warning(f"[JobSearchIndex] 未知的索引后端: {backend_name}，已退回 SQL 查询")
+                return None
+            self._backend = backend_cls()
+            self._backend_name = backend_name
+        return self._backend
+
+    def _ensure_ready(self, backend):
+        if backend.is_ready():
+            if hasattr(backend, 'refresh'):
+                backend.refresh(current_app.config.get('JOB_SEARCH_INDEX_REFRESH_SECONDS', 30))
+            return
+        with self._build_lock:
+            if not backend.is_ready() and hasattr(backend, 'rebuild'):
+                backend.rebuild()
+
+    def search(self, query_text):
+        """
+        :return: [(job_id, score), ...]；返回 None 表示索引不可用，调用方应退回 SQL 查询
+        """
+        try:
+            backend = self._get_backend()
+            if backend is None:
+                return None
+            self._ensure_ready(backend)
+            return backend.search(query_text)
+        except Exception as e:
+            current_app.logger.warning(f"[JobSearchIndex] 索引查询失败，退回 SQL 查询: {str(e)}")
+            return None
+
+    def index_job(self, job):
+        try:
+            backend = self._get_backend()
+            if backend is not None:
+                backend.index_job(job)
+        except Exception as e:
+            current_app.logger.warning(f"[JobSearchIndex] 更新工作 {job.id} 的索引失败: {str(e)}")
+
+    def remove_job(self, job_id):
+        try:
+            backend = self._get_backend()
+            if backend is not None:
+                backend.remove_job(job_id)
+        except Exception as e:
+            current_app.logger.warning(f"[JobSearchIndex] 移除工作 {job_id} 的索引失败: {str(e)}")
+
+
+job_search_index = JobSearchIndexManager()
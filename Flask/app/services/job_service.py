@@ -1,11 +1,21 @@
-from ..models.job import Job, JobStatusEnum, SalaryTypeEnum # Added SalaryTypeEnum
+from ..models.job import Job, JobApplication, JobStatusEnum, SalaryTypeEnum # Added SalaryTypeEnum
 from ..models.user import User # To verify employer existence or role
 from ..models.skill import Skill, JobRequiredSkill # Corrected import: JobRequiredSkill is in skill.py
 from ..core.extensions import db
 from ..utils.exceptions import InvalidUsageException, NotFoundException, AuthorizationException, BusinessException
+import math
 from datetime import datetime
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, case, func
 from flask import current_app # For logging
+from .job_search_index import job_search_index
+from .job_view_counter import job_view_counter
+from .job_taxonomy_service import job_taxonomy_service
+from .job_recommendation import job_recommender
+from .job_recommendation_lists import job_recommendation_lists
+from .job_matching_service import job_matching_service
+from .identity_service import identity_service
+from ..utils.geo import bounding_box, extract_lat_lng, geohash_encode, geohash_cells_covering, haversine_km
+from ..utils.pagination import ListPagination, keyset_paginate
 
 class JobService:
     def create_job(self, employer_user_identity, data):
@@ -15,42 +25,17 @@ class JobService:
         :param data: 包含工作详情的字典 (title, description, job_category, location_address, etc.)
         :return: 创建的 Job 对象
         """
-        current_app.logger.info(f"[JobService] Attempting to find employer with identity: {employer_user_identity}")
-        
-        # 首先尝试将identity作为ID直接查找用户
-        employer = None
-        
+        # 通过身份解析服务获取雇主 (整数ID或UUID均可，命中缓存时无需查询数据库)
         try:
-            # 尝试将identity转换为整数ID
-            user_id = int(employer_user_identity)
-            employer = User.query.get(user_id)
-            if employer:
-                current_app.logger.info(f"[JobService] Found employer by ID: {user_id}")
-        except (ValueError, TypeError):
-            # 如果不是有效的整数ID，可能是UUID
-            current_app.logger.info(f"[JobService] Identity {employer_user_identity} is not a valid integer ID, trying as UUID")
-        
-        # 如果通过ID未找到，尝试通过UUID查找
-        if not employer and isinstance(employer_user_identity, str):
-            employer = User.query.filter_by(uuid=employer_user_identity).first()
-            if employer:
-                current_app.logger.info(f"[JobService] Found employer by UUID: {employer_user_identity}")
-        
-        if not employer:
+            employer = identity_service.resolve(employer_user_identity)
+        except NotFoundException:
             current_app.logger.warning(f"[JobService] Employer not found with identity: {employer_user_identity}")
             raise NotFoundException(message="发布工作的用户不存在。", error_code=40401)
 
-        current_app.logger.info(f"[JobService] Employer found: ID {employer.id}, UUID {employer.uuid}, Role: {employer.current_role}, Available: {employer.available_roles}")
-
         # 角色检查
-        user_roles = employer.available_roles if isinstance(employer.available_roles, list) else []
-        if hasattr(employer, 'current_role') and hasattr(employer, 'available_roles'):
-            if 'employer' not in user_roles and employer.current_role != 'employer':
-                current_app.logger.warning(f"[JobService] User {employer_user_identity} is not authorized to post jobs. Roles: {user_roles}, Current: {employer.current_role}")
-                raise AuthorizationException(message="用户无权发布工作。", error_code=40302)
-        else:
-            current_app.logger.error(f"[JobService] User {employer_user_identity} object is missing role attributes.")
-            raise BusinessException(message="用户信息不完整，无法验证角色。")
+        if not employer.has_role('employer'):
+            current_app.logger.warning(f"[JobService] User {employer_user_identity} is not authorized to post jobs. Roles: {employer.available_roles}, Current: {employer.current_role}")
+            raise AuthorizationException(message="用户无权发布工作。", error_code=40302)
 
         # Validate required fields from data (schemas should handle this mostly at API layer)
         required_fields = ['title', 'description', 'job_category', 'location_address', 'start_time', 'end_time', 'salary_amount', 'salary_type', 'required_people']
@@ -93,6 +78,7 @@ class JobService:
             location_city=data.get('location_city'),
             location_district=data.get('location_district'),
             location_point=location_point_data,
+            **self._location_columns(location_point_data),
             start_time=start_time,
             end_time=end_time,
             salary_amount=data['salary_amount'],
@@ -113,12 +99,20 @@ class JobService:
         try:
             db.session.commit()
             current_app.logger.info(f"[JobService] Job created successfully with ID: {new_job.id} by employer {employer.id}")
-            return new_job
+            job_search_index.index_job(new_job)
         except Exception as e:
             db.session.rollback()
             current_app.logger.error(f"[JobService] Error committing new job to database: {str(e)}", exc_info=True)
             raise BusinessException(message=f"创建工作时数据库操作失败。", status_code=500)
 
+        if new_job.is_urgent:
+            # 急聘工作通知匹配的零工 (后台执行，失败不影响发布)
+            try:
+                job_matching_service.dispatch_urgent_job(new_job.id)
+            except Exception as e:
+                current_app.logger.warning(f"[JobService] Failed to dispatch matching for urgent job {new_job.id}: {str(e)}")
+        return new_job
+
     def get_job_by_id(self, job_id, increment_view_count=False):
         """根据ID获取工作详情"""
         job = Job.query.get(job_id)
@@ -126,85 +120,47 @@ class JobService:
             raise NotFoundException(message="未找到指定的工作。", error_code=40401)
         
         if increment_view_count:
-            try:
-                job.view_count = (job.view_count or 0) + 1
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                print(f"Error incrementing view count for job {job_id}: {e}")
+            self.increment_view_count(job_id)
 
         return job
 
-    def search_jobs(self, filters=None, sort_by=None, page=1, per_page=20):
+    def increment_view_count(self, job_id):
+        """
+        记录一次浏览 (先累加到缓冲区，由 job_view_counter 定期批量写回，不在请求中提交事务)
+        :param job_id: 工作ID
+        """
+        try:
+            job_view_counter.record_view(job_id)
+        except Exception as e:
+            current_app.logger.warning(f"[JobService] Error recording view for job {job_id}: {str(e)}")
+
+    def search_jobs(self, filters=None, sort_by=None, page=1, per_page=20, cursor=None, include_total=False):
+        """
+        搜索工作
+        :param cursor: 游标分页参数，非 None 时启用游标分页 (空字符串表示第一页)，否则使用页码分页
+        :param include_total: 游标分页时是否统计总数
+        """
         query = Job.query
+        ranked_job_ids = None # 倒排索引命中的工作ID (按相关度降序)
+        geo_center = None # (纬度, 经度, 半径km)
 
         if filters:
-            filter_conditions = []
-            if filters.get('q'): # Keyword search
-                term = f"%{filters['q']}%"
-                filter_conditions.append(or_(Job.title.ilike(term), Job.description.ilike(term)))
-            
-            # 状态过滤处理
-            if filters.get('status'):
-                # 根据传入的状态值类型进行适当处理
-                status_filter = filters['status']
-                # 字符串值转换为枚举对象
-                if isinstance(status_filter, str) and status_filter in [s.value for s in JobStatusEnum]:
-                    try:
-                        # 转换为枚举对象
-                        status_enum = JobStatusEnum(status_filter)
-                        filter_conditions.append(Job.status == status_enum)
-                    except ValueError:
-                        # 如果字符串值不是有效的枚举值
-                        current_app.logger.warning(f"Invalid status value: {status_filter}")
-                elif isinstance(status_filter, JobStatusEnum):
-                    # 已经是枚举对象
-                    filter_conditions.append(Job.status == status_filter) 
-            else:
-                # 默认显示活跃工作
-                filter_conditions.append(Job.status == JobStatusEnum.active)
-
-            for field in ['job_category', 'location_province', 'location_city', 'location_district', 'salary_type', 'employer_user_id']:
-                if filters.get(field):
-                    filter_conditions.append(getattr(Job, field) == filters[field])
-            
-            is_urgent_filter_value = filters.get('is_urgent')
-            if is_urgent_filter_value is not None:
-                filter_conditions.append(Job.is_urgent.is_(is_urgent_filter_value))
-
-            if filters.get('salary_min'):
-                filter_conditions.append(Job.salary_amount >= filters['salary_min'])
-            if filters.get('salary_max'):
-                filter_conditions.append(Job.salary_amount <= filters['salary_max'])
-
-            if filters.get('start_time_from'):
-                try:
-                    start_time = datetime.fromisoformat(str(filters['start_time_from']).replace('Z', '+00:00'))
-                    filter_conditions.append(Job.start_time >= start_time)
-                except ValueError:
-                    current_app.logger.warning(f"Invalid start_time_from format: {filters['start_time_from']}")
-                
-            if filters.get('start_time_to'):
-                try:
-                    end_time = datetime.fromisoformat(str(filters['start_time_to']).replace('Z', '+00:00'))
-                    filter_conditions.append(Job.start_time <= end_time)
-                except ValueError:
-                    current_app.logger.warning(f"Invalid start_time_to format: {filters['start_time_to']}")
-            
-            # Geo-spatial search (placeholder for actual geo-queries)
-            # if filters.get('latitude') and filters.get('longitude') and filters.get('radius_km'):
-            #     # This requires specific DB functions (e.g., PostGIS ST_DWithin or custom calculation)
-            #     # For now, this filter is illustrative and won't be fully functional without geo-extensions
-            #     pass
-
-            # Job tags (assuming job_tags is a JSON array of strings)
-            # if filters.get('job_tags'):
-            #     # This might require JSON_CONTAINS or similar, depending on DB
-            #     # Example: query = query.filter(Job.job_tags.contains(filters['job_tags']))
-            #     pass
+            filter_conditions, ranked_job_ids, geo_center = self._search_conditions(filters, sort_by)
             if filter_conditions:
                 query = query.filter(and_(*filter_conditions))
 
+        job_distances = None # {job_id: 距离km}
+        if geo_center:
+            job_distances = self._jobs_within_radius(query, *geo_center)
+            query = query.filter(Job.id.in_(list(job_distances)))
+            if sort_by == 'distance_asc' and cursor is None:
+                return self._paginate_by_distance(job_distances, page, per_page)
+
+        if cursor is not None:
+            paginated_jobs = keyset_paginate(query, self._job_keyset_order(sort_by), cursor=cursor,
+                                             per_page=per_page, include_total=include_total)
+            self._attach_distances(paginated_jobs.items, job_distances)
+            return paginated_jobs
 
         # Sorting (example: 'created_at_desc', 'salary_amount_asc')
         if sort_by:
@@ -216,13 +172,258 @@ class JobService:
                 query = query.order_by(Job.salary_amount.desc())
             elif sort_by == 'salary_amount_asc':
                 query = query.order_by(Job.salary_amount.asc())
+            elif sort_by == 'relevance':
+                if ranked_job_ids:
+                    relevance_rank = case({job_id: rank for rank, job_id in enumerate(ranked_job_ids)}, value=Job.id)
+                    query = query.order_by(relevance_rank.asc(), Job.created_at.desc())
+                else:
+                    # 没有关键字 (或退回了 SQL 查询) 时无法计算相关度，按发布时间排序
+                    query = query.order_by(Job.created_at.desc())
             # Add more sort options as needed
         else:
             query = query.order_by(Job.created_at.desc()) # Default sort
         
         paginated_jobs = query.paginate(page=page, per_page=per_page, error_out=False)
+        self._attach_distances(paginated_jobs.items, job_distances)
         return paginated_jobs
 
+    # 支持分面统计的筛选字段
+    FACET_FIELDS = ('job_category', 'location_city', 'location_district', 'salary_type', 'is_urgent')
+
+    def get_search_facets(self, filters=None):
+        """
+        统计当前筛选条件下各分面取值的工作数
+        只执行一次分组查询: 非分面条件 (关键字、状态、薪资、时间、地理范围等) 在 SQL 中过滤，
+        按全部分面字段 GROUP BY 后在内存中汇总；每个分面的计数应用除自身以外的其他分面条件，
+        因此已选中的分面仍会返回其他可选取值的数量
+        :param filters: 与 search_jobs 相同的筛选条件
+        :return: {分面字段: [{'value': 取值, 'count': 工作数}, ...]} (按数量降序)
+        """
+        filters = filters or {}
+        facet_columns = [getattr(Job, field) for field in self.FACET_FIELDS]
+        query = db.session.query(*facet_columns, func.count(Job.id))
+
+        selected = {}
+        if filters:
+            base_filters = {}
+            for name, value in filters.items():
+                if name not in self.FACET_FIELDS:
+                    base_filters[name] = value
+                elif (value is not None) if name == 'is_urgent' else value:
+                    selected[name] = value
+            filter_conditions, _, geo_center = self._search_conditions(base_filters)
+            if filter_conditions:
+                query = query.filter(and_(*filter_conditions))
+            if geo_center:
+                job_distances = self._jobs_within_radius(Job.query.filter(and_(*filter_conditions)), *geo_center)
+                query = query.filter(Job.id.in_(list(job_distances)))
+
+        counts = {field: {} for field in self.FACET_FIELDS}
+        for row in query.group_by(*facet_columns).all():
+            values, count = row[:-1], row[-1]
+            matched = [field not in selected or self._facet_value_matches(field, value, selected[field])
+                       for field, value in zip(self.FACET_FIELDS, values)]
+            for index, (field, value) in enumerate(zip(self.FACET_FIELDS, values)):
+                if value is None or not all(matched[:index] + matched[index + 1:]):
+                    continue
+                counts[field][value] = counts[field].get(value, 0) + count
+
+        return {
+            field: [{'value': value, 'count': count}
+                    for value, count in sorted(values.items(), key=lambda item: (-item[1], str(item[0])))]
+            for field, values in counts.items()
+        }
+
+    def _facet_value_matches(self, field, value, selected_value):
+        if field == 'is_urgent':
+            return bool(value) == bool(selected_value)
+        return value == selected_value
+
+    def _search_conditions(self, filters, sort_by=None):
+        """
+        将搜索条件转换为 SQL 过滤条件
+        :return: (过滤条件列表, 倒排索引命中的工作ID 或 None, 地理范围 (纬度, 经度, 半径km) 或 None)
+        """
+        ranked_job_ids = None
+        geo_center = None
+        filter_conditions = []
+        if filters.get('q'): # Keyword search
+            term = f"%{filters['q']}%"
+            keyword_condition = or_(Job.title.ilike(term), Job.description.ilike(term))
+            # 索引只包含招聘中的工作，按其他状态搜索时直接走 SQL
+            if filters.get('status') in (None, '', JobStatusEnum.active.value, JobStatusEnum.active):
+                ranked_job_ids = self._search_index_candidates(filters['q'], sort_by)
+            if ranked_job_ids is not None:
+                # 索引命中是 n-gram 候选 (LIKE 结果的超集)，在候选范围内再做一次 LIKE 校验
+                filter_conditions.append(and_(Job.id.in_(ranked_job_ids), keyword_condition))
+            else:
+                # 索引不可用或查询过宽时退回 SQL 模糊匹配
+                filter_conditions.append(keyword_condition)
+        
+        # 状态过滤处理
+        if filters.get('status'):
+            # 根据传入的状态值类型进行适当处理
+            status_filter = filters['status']
+            # 字符串值转换为枚举对象
+            if isinstance(status_filter, str) and status_filter in [s.value for s in JobStatusEnum]:
+                try:
+                    # 转换为枚举对象
+                    status_enum = JobStatusEnum(status_filter)
+                    filter_conditions.append(Job.status == status_enum)
+                except ValueError:
+                    # 如果字符串值不是有效的枚举值
+                    current_app.logger.warning(f"Invalid status value: {status_filter}")
+            elif isinstance(status_filter, JobStatusEnum):
+                # 已经是枚举对象
+                filter_conditions.append(Job.status == status_filter) 
+        else:
+            # 默认显示活跃工作
+            filter_conditions.append(Job.status == JobStatusEnum.active)
+
+        for field in ['job_category', 'location_province', 'location_city', 'location_district', 'salary_type', 'employer_user_id']:
+            if filters.get(field):
+                filter_conditions.append(getattr(Job, field) == filters[field])
+        
+        is_urgent_filter_value = filters.get('is_urgent')
+        if is_urgent_filter_value is not None:
+            filter_conditions.append(Job.is_urgent.is_(is_urgent_filter_value))
+
+        if filters.get('salary_min'):
+            filter_conditions.append(Job.salary_amount >= filters['salary_min'])
+        if filters.get('salary_max'):
+            filter_conditions.append(Job.salary_amount <= filters['salary_max'])
+
+        if filters.get('start_time_from'):
+            try:
+                start_time = datetime.fromisoformat(str(filters['start_time_from']).replace('Z', '+00:00'))
+                filter_conditions.append(Job.start_time >= start_time)
+            except ValueError:
+                current_app.logger.warning(f"Invalid start_time_from format: {filters['start_time_from']}")
+            
+        if filters.get('start_time_to'):
+            try:
+                end_time = datetime.fromisoformat(str(filters['start_time_to']).replace('Z', '+00:00'))
+                filter_conditions.append(Job.start_time <= end_time)
+            except ValueError:
+                current_app.logger.warning(f"Invalid start_time_to format: {filters['start_time_to']}")
+        
+        # 地理范围搜索: geohash 网格预筛选 + haversine 精确过滤 (无需 PostGIS)
+        if filters.get('latitude') is not None and filters.get('longitude') is not None and filters.get('radius_km'):
+            try:
+                geo_center = (float(filters['latitude']), float(filters['longitude']), float(filters['radius_km']))
+            except (TypeError, ValueError):
+                raise InvalidUsageException("经纬度和搜索半径必须是有效的数字。")
+            if not (-90 <= geo_center[0] <= 90 and -180 <= geo_center[1] <= 180) or geo_center[2] <= 0:
+                raise InvalidUsageException("经纬度超出有效范围或搜索半径无效。")
+
+        # Job tags (assuming job_tags is a JSON array of strings)
+        # if filters.get('job_tags'):
+        #     # This might require JSON_CONTAINS or similar, depending on DB
+        #     # Example: query = query.filter(Job.job_tags.contains(filters['job_tags']))
+        #     pass
+        return filter_conditions, ranked_job_ids, geo_center
+
+    def _job_keyset_order(self, sort_by):
+        """游标分页使用的排序键 (以 id 作为唯一的次级排序键)"""
+        keyset_orders = {
+            None: [(Job.created_at, 'desc'), (Job.id, 'desc')],
+            'created_at_desc': [(Job.created_at, 'desc'), (Job.id, 'desc')],
+            'created_at_asc': [(Job.created_at, 'asc'), (Job.id, 'asc')],
+            'salary_amount_desc': [(Job.salary_amount, 'desc'), (Job.id, 'desc')],
+            'salary_amount_asc': [(Job.salary_amount, 'asc'), (Job.id, 'asc')],
+        }
+        if sort_by not in keyset_orders:
+            raise InvalidUsageException(f"排序方式 {sort_by} 不支持游标分页，请使用页码分页。")
+        return keyset_orders[sort_by]
+
+    def _attach_distances(self, jobs, job_distances):
+        """为地理范围搜索结果附加 distance_km"""
+        if job_distances is None:
+            return
+        for job in jobs:
+            job.distance_km = round(job_distances[job.id], 3)
+
+    def _location_columns(self, location_point):
+        """根据 GeoJSON Point 计算冗余的地理检索列 (geohash 与经纬度)，坐标无效时均为 None"""
+        lat_lng = extract_lat_lng(location_point)
+        if lat_lng is None:
+            return {'location_geohash': None, 'location_lat': None, 'location_lng': None}
+        return {'location_geohash': geohash_encode(*lat_lng), 'location_lat': lat_lng[0], 'location_lng': lat_lng[1]}
+
+    def _jobs_within_radius(self, query, latitude, longitude, radius_km):
+        """
+        找出半径范围内的工作
+        geohash 前缀走索引范围扫描，外接矩形与近似距离排序在 SQL 中完成，最多读取 JOB_GEO_MAX_CANDIDATES 个
+        最近的候选，再在内存中做 haversine 精确过滤
+        :param query: 已应用其他筛选条件的查询
+        :return: {job_id: 距离km}
+        """
+        min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+        conditions = [Job.location_lat.between(min_lat, max_lat), Job.location_lng.isnot(None)]
+        if min_lng > max_lng:
+            # 外接矩形跨越 ±180 经线
+            conditions.append(or_(Job.location_lng >= min_lng, Job.location_lng <= max_lng))
+        elif max_lng - min_lng < 360:
+            conditions.append(Job.location_lng.between(min_lng, max_lng))
+        cells = geohash_cells_covering(latitude, longitude, radius_km)
+        if cells:
+            # 前缀匹配可以走 location_geohash 索引的范围扫描
+            conditions.append(or_(*[Job.location_geohash.like(f"{cell}%") for cell in cells]))
+
+        # 等距圆柱投影下的平方距离 (只用于排序，无需三角函数，各数据库通用)
+        lng_delta = func.abs(Job.location_lng - longitude)
+        lng_delta = case((lng_delta > 180, 360 - lng_delta), else_=lng_delta)
+        lng_scale = math.cos(math.radians(latitude)) ** 2
+        approx_distance = (Job.location_lat - latitude) * (Job.location_lat - latitude) + lng_delta * lng_delta * lng_scale
+
+        max_candidates = current_app.config.get('JOB_GEO_MAX_CANDIDATES', 5000)
+        rows = query.with_entities(Job.id, Job.location_lat, Job.location_lng).filter(*conditions)\
+            .order_by(approx_distance.asc(), Job.id.asc()).limit(max_candidates + 1).all()
+        if len(rows) > max_candidates:
+            current_app.logger.info(f"[JobService] 地理范围搜索候选超过 {max_candidates} 个，只保留最近的候选")
+            rows = rows[:max_candidates]
+
+        job_distances = {}
+        for job_id, job_lat, job_lng in rows:
+            distance = haversine_km(latitude, longitude, job_lat, job_lng)
+            if distance <= radius_km:
+                job_distances[job_id] = distance
+        return job_distances
+
+    def _paginate_by_distance(self, job_distances, page, per_page):
+        """按距离由近到远分页，只加载当前页的工作"""
+        ordered_ids = sorted(job_distances, key=lambda job_id: (job_distances[job_id], job_id))
+        page = max(page or 1, 1)
+        page_ids = ordered_ids[(page - 1) * per_page:page * per_page]
+
+        jobs_by_id = {job.id: job for job in Job.query.filter(Job.id.in_(page_ids)).all()} if page_ids else {}
+        items = []
+        for job_id in page_ids:
+            job = jobs_by_id.get(job_id)
+            if job is not None:
+                job.distance_km = round(job_distances[job_id], 3)
+                items.append(job)
+        return ListPagination(items, page, per_page, len(ordered_ids))
+
+    def _search_index_candidates(self, keyword, sort_by=None):
+        """
+        通过倒排索引获取关键字命中的工作ID
+        :param keyword: 搜索关键字
+        :param sort_by: 排序方式，按相关度排序时只保留得分最高的候选 (索引只含招聘中的工作，截断不会被其他状态占用)
+        :return: 按相关度降序的工作ID列表；返回 None 表示应退回 SQL 模糊匹配
+        """
+        ranked = job_search_index.search(keyword)
+        if ranked is None:
+            return None
+
+        max_candidates = current_app.config.get('JOB_SEARCH_INDEX_MAX_CANDIDATES', 1000)
+        if len(ranked) > max_candidates:
+            if sort_by != 'relevance':
+                # 命中过多时 IN 列表不再比 SQL 更有优势，且截断会影响按时间/薪资排序的结果
+                return None
+            ranked = ranked[:max_candidates]
+        return [job_id for job_id, _ in ranked]
+
     def update_job(self, job_id, employer_user_id, data):
         """
         更新工作信息
@@ -262,6 +463,10 @@ class JobService:
             except ValueError:
                 raise InvalidUsageException(message="经纬度格式不正确。")
         
+        if 'location_point' in data:
+            for column, value in self._location_columns(data['location_point']).items():
+                setattr(job, column, value)
+
         for key, value in data.items():
             if key in allowed_to_update:
                 if value is not None:
@@ -289,6 +494,7 @@ class JobService:
 
         try:
             db.session.commit()
+            job_search_index.index_job(job)
             return job
         except Exception as e:
             db.session.rollback()
@@ -321,6 +527,7 @@ class JobService:
         
         try:
             db.session.commit()
+            job_search_index.remove_job(job.id)
             return True # Indicate success
         except Exception as e:
             db.session.rollback()
@@ -350,6 +557,7 @@ class JobService:
         
         try:
             db.session.commit()
+            job_search_index.remove_job(job.id)
             return job
         except Exception as e:
             db.session.rollback()
@@ -407,26 +615,61 @@ class JobService:
             current_app.logger.error(f"[JobService] Error duplicating job: {str(e)}", exc_info=True)
             raise
 
-    def get_jobs_by_employer(self, employer_user_id, filters=None, sort_by=None, page=1, per_page=10):
+    def get_jobs_by_employer(self, employer_user_id, filters=None, sort_by=None, page=1, per_page=10, cursor=None, include_total=False):
         if filters is None:
             filters = {}
         filters['employer_user_id'] = employer_user_id
         # Can add specific statuses relevant for "my posted jobs" view, e.g., not 'cancelled' by default
-        return self.search_jobs(filters=filters, sort_by=sort_by, page=page, per_page=per_page)
+        return self.search_jobs(filters=filters, sort_by=sort_by, page=page, per_page=per_page,
+                                cursor=cursor, include_total=include_total)
 
     def get_recommended_jobs(self, freelancer_user_id, count=10):
-        # Placeholder for recommendation logic
-        # This would typically involve user profile, skills, application history, job similarity etc.
-        # For now, return a few recent active jobs, not personalized.
+        """
+        为零工推荐工作 (技能匹配 + 地点/类别/薪资/时效特征打分，见 job_recommendation)
+        推荐引擎不可用时退回按发布时间排序的进行中工作
+        :param freelancer_user_id: 零工用户ID
+        :param count: 推荐数量
+        :return: Job 列表 (按推荐得分降序)
+        """
         user = User.query.get(freelancer_user_id)
         if not user:
             raise NotFoundException("用户不存在")
-            
-        query = Job.query.filter(Job.status == JobStatusEnum.active.value)\
+
+        if current_app.config.get('JOB_RECOMMENDATION_ENABLED', True):
+            try:
+                freelancer = job_recommender.load_freelancers([freelancer_user_id])[freelancer_user_id]
+                if current_app.config.get('JOB_RECOMMENDATION_PRECOMPUTED_ENABLED', True):
+                    jobs = self._precomputed_recommendations(freelancer_user_id, freelancer, count)
+                    if jobs is not None:
+                        return jobs
+                job_ids = job_recommender.recommend(freelancer_user_id, count=count, freelancer=freelancer)
+                jobs_by_id = {job.id: job for job in Job.query.filter(Job.id.in_(job_ids)).all()} if job_ids else {}
+                return [jobs_by_id[job_id] for job_id in job_ids if job_id in jobs_by_id]
+            except Exception as e:
+                current_app.logger.warning(f"[JobService] 推荐引擎计算失败，退回按发布时间推荐: {str(e)}", exc_info=True)
+
+        query = Job.query.filter(Job.status == JobStatusEnum.active)\
                          .order_by(Job.created_at.desc())\
                          .limit(count)
         return query.all()
 
+    def _precomputed_recommendations(self, freelancer_user_id, freelancer, count):
+        """
+        从预计算列表中取推荐工作，过滤已关闭和已申请的工作
+        :return: Job 列表；列表不可用或过滤后不足 count 个时返回 None
+        """
+        job_ids = job_recommendation_lists.get_job_ids(freelancer_user_id, freelancer=freelancer)
+        if not job_ids or len(job_ids) < count:
+            return None
+        applied_job_ids = {job_id for (job_id,) in db.session.query(JobApplication.job_id)
+                           .filter(JobApplication.freelancer_user_id == freelancer_user_id,
+                                   JobApplication.job_id.in_(job_ids)).all()}
+        candidate_ids = [job_id for job_id in job_ids if job_id not in applied_job_ids]
+        jobs_by_id = {job.id: job for job in Job.query.filter(Job.id.in_(candidate_ids),
+                                                              Job.status == JobStatusEnum.active).all()}
+        jobs = [jobs_by_id[job_id] for job_id in candidate_ids if job_id in jobs_by_id]
+        return jobs[:count] if len(jobs) >= count else None
+
     def add_required_skill_to_job(self, job_id, employer_user_id, skill_data):
         job = self.get_job_by_id(job_id)
         if job.employer_user_id != employer_user_id:
@@ -451,6 +694,7 @@ class JobService:
             # proficiency_level=skill_data.get('proficiency_level') # If you add this to JobRequiredSkill model
         )
         db.session.add(new_required_skill)
+        job.updated_at = datetime.utcnow() # 其他进程的搜索索引/推荐引擎按 updated_at 追平
         try:
             db.session.commit()
             # To return the object with skill details, you might need to eager load or query again.
@@ -470,6 +714,7 @@ class JobService:
             raise NotFoundException("该工作未要求此技能，无法移除。")
 
         db.session.delete(required_skill)
+        job.updated_at = datetime.utcnow()
         try:
             db.session.commit()
             return True
@@ -479,41 +724,22 @@ class JobService:
 
     def get_all_job_categories(self):
         """
-        获取系统中所有可用的工作类别
-        :return: 工作类别列表
+        获取系统中所有使用中的工作类别 (读取维护好的类别字典，不扫描 jobs 表)
+        :return: 工作类别列表 (按名称排序)
         """
         try:
-            # 从 Job 表中查询并去重所有使用中的类别
-            current_app.logger.info("[JobService] 开始查询所有工作类别")
-            categories = db.session.query(Job.job_category).distinct().all()
-            current_app.logger.info(f"[JobService] 查询结果: {categories}")
-
-            # 将查询结果转换为字符串列表
-            categories_list = [category[0] for category in categories]
-            current_app.logger.info(f"[JobService] 转换后的类别列表: {categories_list}")
-
-            return sorted(categories_list) # 按字母顺序排序
+            return job_taxonomy_service.get_categories()
         except Exception as e:
             current_app.logger.error(f"[JobService] 查询工作类别时发生错误: {str(e)}")
             raise BusinessException(message=f"获取工作类别失败: {str(e)}", status_code=500)
 
     def get_all_job_tags(self):
         """
-        获取系统中所有使用的工作标签
-        :return: 工作标签列表
+        获取系统中所有使用中的工作标签 (读取维护好的标签字典，不加载各工作的 job_tags)
+        :return: 工作标签列表 (按名称排序)
         """
         try:
-            # Job.job_tags是JSON数组，需要从中提取所有唯一标签
-            jobs_with_tags = db.session.query(Job.job_tags).filter(Job.job_tags.is_not(None)).all()
-            
-            # 先提取所有标签列表，然后去重
-            all_tags = set()
-            for job_tags in jobs_with_tags:
-                if job_tags[0]: # 确保不是None
-                    for tag in job_tags[0]:
-                        all_tags.add(tag)
-                        
-            return sorted(list(all_tags)) # 按字母顺序排序
+            return job_taxonomy_service.get_tags()
         except Exception as e:
             current_app.logger.error(f"[JobService] Error fetching job tags: {str(e)}")
             raise BusinessException(message=f"获取工作标签失败: {str(e)}", status_code=500)
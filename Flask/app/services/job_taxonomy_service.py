@@ -0,0 +1,224 @@
+"""
+工作标签/类别字典 (Job Taxonomy Dictionary)
+
+/jobs/tags 与 /jobs/categories 原先每次请求都扫描 jobs 表 (SELECT DISTINCT 或加载全部 job_tags JSON)。
+这里维护一张引用计数字典表 job_taxonomy_terms: (词条类型, 名称) -> 使用中的工作数
+- 计数随 Job 的 after_insert/after_update/after_delete 事件在同一事务内增减 (创建、修改标签/类别、取消、删除)，
+  同一次 flush 的增量先合并，再按 (类型, 名称) 顺序写入，并发事务以相同顺序加锁
+- 已取消、审核未通过、已过期的工作不计入；计数归零的词条保留在表中但不再返回
+- 通过 Query.update() 等批量语句修改工作不会触发 ORM 事件，调用方需在同一事务中调用 release_jobs() (如过期清理)，
+  或在变更后执行 rebuild() 校正
+- 查询只读字典表：全部词条、按使用次数的热门标签、按前缀的标签联想 (走 (term_type, name) 主键索引)
+"""
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+
+from ..core.extensions import db
+from ..models.job import Job, JobStatusEnum, JobTaxonomyTerm, JobTermTypeEnum
+
+# 不计入字典的工作状态
+_UNCOUNTED_STATUSES = frozenset({JobStatusEnum.cancelled.value, JobStatusEnum.rejected.value, JobStatusEnum.expired.value})
+
+_SESSION_DELTAS_KEY = 'job_taxonomy_deltas'
+
+_NAME_MAX_LENGTH = 50
+
+
+def _enum_value(value):
+    return value.value if hasattr(value, 'value') else value
+
+
+def _job_terms(status, category, tags):
+    """一个工作对字典的贡献: {(词条类型, 名称), ...}"""
+    if status is None or _enum_value(status) in _UNCOUNTED_STATUSES:
+        return set()
+    terms = set()
+    if category:
+        terms.add((JobTermTypeEnum.category, str(category).strip()[:_NAME_MAX_LENGTH]))
+    for tag in tags or []:
+        if isinstance(tag, str) and tag.strip():
+            terms.add((JobTermTypeEnum.tag, tag.strip()[:_NAME_MAX_LENGTH]))
+    return {term for term in terms if term[1]}
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class JobTaxonomyService:
+    # --- 查询 ---
+    def get_categories(self):
+        """:return: 使用中的工作类别 (按名称排序)"""
+        return self._names(JobTermTypeEnum.category)
+
+    def get_tags(self):
+        """:return: 使用中的工作标签 (按名称排序)"""
+        return self._names(JobTermTypeEnum.tag)
+
+    def get_top_tags(self, limit=20):
+        """
+        按使用次数降序的热门标签
+        :param limit: 返回数量
+        :return: [{'name': 标签, 'usage_count': 使用次数}, ...]
+        """
+        rows = db.session.query(JobTaxonomyTerm.name, JobTaxonomyTerm.usage_count)\
+            .filter(JobTaxonomyTerm.term_type == JobTermTypeEnum.tag, JobTaxonomyTerm.usage_count > 0)\
+            .order_by(JobTaxonomyTerm.usage_count.desc(), JobTaxonomyTerm.name.asc())\
+            .limit(limit).all()
+        return [{'name': name, 'usage_count': usage_count} for name, usage_count in rows]
+
+    def suggest_tags(self, prefix, limit=10):
+        """
+        标签联想：按前缀匹配，使用次数多的优先
+        :param prefix: 用户已输入的前缀
+        :param limit: 返回数量
+        :return: [{'name': 标签, 'usage_count': 使用次数}, ...]
+        """
+        prefix = (prefix or '').strip()
+        if not prefix:
+            return self.get_top_tags(limit)
+        rows = db.session.query(JobTaxonomyTerm.name, JobTaxonomyTerm.usage_count)\
+            .filter(JobTaxonomyTerm.term_type == JobTermTypeEnum.tag,
+                    JobTaxonomyTerm.name.like(f"{_escape_like(prefix)}%", escape='\\'),
+                    JobTaxonomyTerm.usage_count > 0)\
+            .order_by(JobTaxonomyTerm.usage_count.desc(), JobTaxonomyTerm.name.asc())\
+            .limit(limit).all()
+        return [{'name': name, 'usage_count': usage_count} for name, usage_count in rows]
+
+    def _names(self, term_type):
+        rows = db.session.query(JobTaxonomyTerm.name)\
+            .filter(JobTaxonomyTerm.term_type == term_type, JobTaxonomyTerm.usage_count > 0)\
+            .order_by(JobTaxonomyTerm.name.asc()).all()
+        return [name for (name,) in rows]
+
+    # --- 维护 ---
+    def apply_deltas(self, connection, deltas):
+        """
+        在当前事务中写入计数增量
+        :param connection: 当前会话的连接
+        :param deltas: {(JobTermTypeEnum, 名称): 增量}
+        """
+        table = JobTaxonomyTerm.__table__
+        now = datetime.utcnow()
+        for (term_type, name), delta in sorted(deltas.items(), key=lambda item: (item[0][0].value, item[0][1])):
+            if not delta:
+                continue
+            statement = table.update()\
+                .where(table.c.term_type == term_type, table.c.name == name)\
+                .values(usage_count=table.c.usage_count + delta, updated_at=now)
+            if connection.execute(statement).rowcount:
+                continue
+            if delta < 0:
+                current_app.logger.warning(f"[JobTaxonomyService] 词条 {term_type.value}:{name} 不存在，计数可能已漂移，请执行 rebuild_job_taxonomy")
+                continue
+            try:
+                with connection.begin_nested():
+                    connection.execute(table.insert().values(term_type=term_type, name=name, usage_count=delta, updated_at=now))
+            except IntegrityError:
+                # 并发事务已创建该词条
+                connection.execute(statement)
+
+    def release_jobs(self, connection, jobs):
+        """
+        批量语句将工作置为不计入的状态 (如过期) 后，在同一事务中扣减其词条计数
+        :param connection: 当前会话的连接
+        :param jobs: [(job_category, job_tags), ...] 变更前计入字典的工作
+        """
+        deltas = Counter()
+        for category, tags in jobs:
+            for term in _job_terms(JobStatusEnum.active, category, tags):
+                deltas[term] -= 1
+        self.apply_deltas(connection, deltas)
+
+    def rebuild(self, batch_size=1000):
+        """
+        按 jobs 表全量重建字典 (用于初始化或校正漂移)
+        :return: 重建的词条数
+        """
+        counts = Counter()
+        last_id = 0
+        while True:
+            rows = db.session.query(Job.id, Job.status, Job.job_category, Job.job_tags)\
+                .filter(Job.id > last_id).order_by(Job.id.asc()).limit(batch_size).all()
+            if not rows:
+                break
+            for _, status, category, tags in rows:
+                counts.update(_job_terms(status, category, tags))
+            last_id = rows[-1][0]
+
+        try:
+            now = datetime.utcnow()
+            db.session.query(JobTaxonomyTerm).delete(synchronize_session=False)
+            if counts:
+                db.session.execute(JobTaxonomyTerm.__table__.insert(), [
+                    {'term_type': term_type, 'name': name, 'usage_count': count, 'updated_at': now}
+                    for (term_type, name), count in counts.items()
+                ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        current_app.logger.info(f"[JobTaxonomyService] 字典重建完成，共 {len(counts)} 个词条")
+        return len(counts)
+
+
+job_taxonomy_service = JobTaxonomyService()
+
+
+# --- ORM 事件：flush 中累计各工作的词条增量，flush 结束前统一写入 ---
+def _add_deltas(target, old_terms, new_terms):
+    if old_terms == new_terms:
+        return
+    session = object_session(target)
+    if session is None:
+        return
+    deltas = session.info.setdefault(_SESSION_DELTAS_KEY, Counter())
+    for term in new_terms - old_terms:
+        deltas[term] += 1
+    for term in old_terms - new_terms:
+        deltas[term] -= 1
+
+
+def _previous_value(target, key):
+    history = inspect(target).attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.has_changes():
+        # 修改前的值未加载，无法得知旧词条
+        current_app.logger.warning(f"[JobTaxonomyService] 工作 {target.id} 的 {key} 旧值未加载，字典计数可能漂移")
+    return getattr(target, key)
+
+
+@event.listens_for(Job, 'after_insert')
+def _on_job_inserted(mapper, connection, target):
+    _add_deltas(target, set(), _job_terms(target.status, target.job_category, target.job_tags))
+
+
+@event.listens_for(Job, 'after_update')
+def _on_job_updated(mapper, connection, target):
+    old_terms = _job_terms(_previous_value(target, 'status'), _previous_value(target, 'job_category'),
+                           _previous_value(target, 'job_tags'))
+    _add_deltas(target, old_terms, _job_terms(target.status, target.job_category, target.job_tags))
+
+
+@event.listens_for(Job, 'after_delete')
+def _on_job_deleted(mapper, connection, target):
+    _add_deltas(target, _job_terms(target.status, target.job_category, target.job_tags), set())
+
+
+@event.listens_for(Session, 'before_flush')
+def _discard_stale_deltas(session, flush_context, instances):
+    # 上一次 flush 失败时遗留的增量已随事务回滚，不能再写入
+    session.info.pop(_SESSION_DELTAS_KEY, None)
+
+
+@event.listens_for(Session, 'after_flush')
+def _write_deltas_after_flush(session, flush_context):
+    deltas = session.info.pop(_SESSION_DELTAS_KEY, None)
+    if deltas:
+        job_taxonomy_service.apply_deltas(session.connection(), deltas)
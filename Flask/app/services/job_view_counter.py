@@ -0,0 +1,262 @@
+"""
+工作浏览次数缓冲计数 (Buffered View Counter)
+
+工作详情是读最多的接口，逐次 `view_count + 1` 并提交会把每次浏览变成一次写事务，热门工作的行锁竞争严重。
+这里把浏览次数先累加在进程内缓冲区，由后台线程定期批量写回：
+- 写回按增量分组，每组一条 `UPDATE jobs SET view_count = view_count + :n WHERE id IN (...)`，
+  每条语句单独提交 (不同时持有多行锁，多进程同时写回不会死锁)
+- 写回使用独立连接，不会提交调用方会话中的未完成事务
+- 写回失败的增量会放回缓冲区，下次重试
+- 读取时通过 merge_pending_views() 把尚未写回的增量合并进返回的 view_count，读者看到的是近实时的数字
+- 写回后记录各工作写回后的库内浏览次数 (保留一个缓存 TTL)，合并时以它作为下限：
+  写回前缓存的详情/列表数据不再包含已写回的增量，若不补齐，写回后读者看到的浏览次数会倒退
+- 进程退出时写回剩余增量；fork 出的子进程清空继承的缓冲区，避免重复计数
+- 可插拔: 通过 JOB_VIEW_COUNTER_BACKEND 选择缓冲后端，'none' 表示不缓冲，每次浏览直接写库
+"""
+import atexit
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import current_app
+from sqlalchemy import bindparam, select
+
+from ..core.extensions import db
+from ..models.job import Job
+
+
+class InMemoryViewCountBuffer:
+    """进程内缓冲区: {job_id: 待写回的浏览次数}"""
+
+    def __init__(self):
+        self._pending = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, job_id, count=1):
+        """:return: 当前缓冲中的工作数量"""
+        with self._lock:
+            self._pending[job_id] += count
+            return len(self._pending)
+
+    def pending(self, job_id):
+        with self._lock:
+            return self._pending.get(job_id, 0)
+
+    def drain(self):
+        """取出并清空全部待写回增量"""
+        with self._lock:
+            drained, self._pending = self._pending, defaultdict(int)
+            return dict(drained)
+
+    def restore(self, deltas):
+        """写回失败时放回增量"""
+        with self._lock:
+            for job_id, count in deltas.items():
+                self._pending[job_id] += count
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+
+
+_BACKENDS = {
+    'memory': InMemoryViewCountBuffer,
+}
+
+
+def register_view_counter_backend(name, backend_cls):
+    """注册自定义缓冲后端 (需实现 add/pending/drain/restore/clear，例如基于 Redis 的共享计数)"""
+    _BACKENDS[name] = backend_cls
+
+
+class JobViewCounter:
+    def __init__(self):
+        self._buffer = None
+        self._backend_name = None
+        self._app = None
+        self._flusher = None
+        self._flusher_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # {job_id: (写回后的库内浏览次数, 过期时间)}
+        self._flushed_floors = {}
+        self._floors_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    # --- 记录 ---
+    def record_view(self, job_id, count=1):
+        """
+        记录工作浏览
+        :param job_id: 工作ID
+        :param count: 浏览次数
+        """
+        buffer = self._get_buffer()
+        if buffer is None:
+            self._write_deltas({job_id: count})
+            return
+
+        self._ensure_flusher()
+        buffered_jobs = buffer.add(job_id, count)
+        if buffered_jobs >= current_app.config.get('JOB_VIEW_COUNTER_MAX_PENDING_JOBS', 10000):
+            # 缓冲的工作数过多时立即写回，限制内存占用
+            self.flush()
+
+    # --- 读取 ---
+    def pending_views(self, job_id):
+        """尚未写回数据库的浏览次数"""
+        buffer = self._get_buffer()
+        return buffer.pending(job_id) if buffer is not None else 0
+
+    def merge_pending_views(self, job_payloads):
+        """
+        将未写回的浏览次数合并进序列化后的工作数据 (原地修改)
+        :param job_payloads: 单个工作 dict 或工作 dict 列表 (需包含 id 与 view_count)
+        :return: job_payloads
+        """
+        items = job_payloads if isinstance(job_payloads, list) else [job_payloads]
+        for item in items:
+            job_id = item.get('id')
+            view_count = max(item.get('view_count') or 0, self._flushed_floor(job_id))
+            pending = self.pending_views(job_id)
+            if pending or view_count != item.get('view_count'):
+                item['view_count'] = view_count + pending
+        return job_payloads
+
+    def _flushed_floor(self, job_id):
+        """写回后的库内浏览次数 (缓存中写回前的数据可能低于该值)；已过保留期或未写回过时返回 0"""
+        with self._floors_lock:
+            floor = self._flushed_floors.get(job_id)
+        if floor is None or floor[1] <= time.monotonic():
+            return 0
+        return floor[0]
+
+    def _record_flushed_floors(self, view_counts):
+        # 保留到写回前缓存的数据全部过期为止
+        retention = max(current_app.config.get('JOB_CACHE_DETAIL_TIMEOUT', 300),
+                        current_app.config.get('JOB_CACHE_LIST_TIMEOUT', 60))
+        now = time.monotonic()
+        expires_at = now + retention
+        with self._floors_lock:
+            expired = [job_id for job_id, (_, expiry) in self._flushed_floors.items() if expiry <= now]
+            for job_id in expired:
+                del self._flushed_floors[job_id]
+            for job_id, view_count in view_counts:
+                self._flushed_floors[job_id] = (view_count, expires_at)
+
+    # --- 写回 ---
+    def flush(self):
+        """
+        将缓冲区中的浏览次数批量写回数据库
+        :return: 本次写回的浏览次数
+        """
+        buffer = self._get_buffer()
+        if buffer is None:
+            return 0
+        with self._flush_lock:
+            deltas = buffer.drain()
+            if not deltas:
+                return 0
+            written = self._write_deltas(deltas, buffer)
+        return written
+
+    def _write_deltas(self, deltas, buffer=None):
+        # 相同增量的工作合并为一条 UPDATE ... WHERE id IN (...)
+        job_ids_by_delta = defaultdict(list)
+        for job_id, count in deltas.items():
+            job_ids_by_delta[count].append(job_id)
+
+        batch_size = current_app.config.get('JOB_VIEW_COUNTER_BATCH_SIZE', 500)
+        statement = Job.__table__.update()\
+            .where(Job.id.in_(bindparam('job_ids', expanding=True)))\
+            .values(view_count=Job.view_count + bindparam('delta'))
+        flushed_counts = select(Job.id, Job.view_count).where(Job.id.in_(bindparam('job_ids', expanding=True)))
+
+        batches = []
+        for count, job_ids in sorted(job_ids_by_delta.items()):
+            job_ids.sort()
+            for start in range(0, len(job_ids), batch_size):
+                batches.append((count, job_ids[start:start + batch_size]))
+
+        written = 0
+        for index, (count, job_ids) in enumerate(batches):
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(statement, {'job_ids': job_ids, 'delta': count})
+                    view_counts = connection.execute(flushed_counts, {'job_ids': job_ids}).all()
+            except Exception as e:
+                current_app.logger.warning(f"[JobViewCounter] 写回浏览次数失败: {str(e)}")
+                if buffer is not None:
+                    buffer.restore({job_id: c for c, ids in batches[index:] for job_id in ids})
+                break
+            written += count * len(job_ids)
+            self._record_flushed_floors(view_counts)
+        return written
+
+    def reset(self):
+        """丢弃待写回增量与写回记录 (测试或切换数据库后使用)"""
+        if self._buffer is not None:
+            self._buffer.clear()
+        with self._floors_lock:
+            self._flushed_floors.clear()
+
+    # --- 后台写回线程 ---
+    def _ensure_flusher(self):
+        interval = current_app.config.get('JOB_VIEW_COUNTER_FLUSH_SECONDS', 10)
+        if not interval or interval <= 0:
+            return
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._flusher_lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            if self._app is None:
+                atexit.register(self._flush_at_exit)
+            self._app = current_app._get_current_object()
+            self._flusher = threading.Thread(target=self._run_flusher, args=(self._app, interval),
+                                             name='job-view-counter-flusher', daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self, app, interval):
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    self.flush()
+                except Exception as e:
+                    app.logger.warning(f"[JobViewCounter] 定期写回浏览次数失败: {str(e)}")
+
+    def _flush_at_exit(self):
+        if self._app is None:
+            return
+        with self._app.app_context():
+            try:
+                self.flush()
+            except Exception as e:
+                self._app.logger.warning(f"[JobViewCounter] 退出时写回浏览次数失败: {str(e)}")
+
+    def _reset_after_fork(self):
+        # 子进程不继承父进程的待写回增量与写回线程
+        if self._buffer is not None:
+            self._buffer.clear()
+        self._flushed_floors = {}
+        self._floors_lock = threading.Lock()
+        self._flusher = None
+        self._flusher_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def _get_buffer(self):
+        backend_name = current_app.config.get('JOB_VIEW_COUNTER_BACKEND', 'memory')
+        if not backend_name or backend_name == 'none':
+            return None
+        if self._buffer is None or self._backend_name != backend_name:
+            backend_cls = _BACKENDS.get(backend_name)
+            if backend_cls is None:
+                current_app.logger.warning(f"[JobViewCounter] 未知的缓冲后端: {backend_name}，浏览次数将直接写库")
+                return None
+            self._buffer = backend_cls()
+            self._backend_name = backend_name
+        return self._buffer
+
+
+job_view_counter = JobViewCounter()
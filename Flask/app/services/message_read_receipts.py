@@ -0,0 +1,242 @@
+"""
+会话已读水位 (Read Watermarks)
+
+原先每次拉取会话消息都会执行 `UPDATE messages SET is_read = 1 ...` 并提交，即使没有未读消息，纯读接口变成了写接口。
+这里改为按用户、按会话记录"已读到的最新消息ID" (conversations.last_read_message_id)：
+- 消息是否已读由水位推导: 接收方的水位 >= 消息ID 即为已读
+- 拉取消息时只在水位前进时才需要写入；水位未前进 (没有新消息、翻看更早的消息) 时不产生任何写操作
+- 写入合并: 同一会话在 MESSAGE_READ_RECEIPT_COALESCE_SECONDS 内只写一次，期间前进的水位暂存在进程内缓冲区
+  (同一会话只保留最大值)，由后台线程每 MESSAGE_READ_RECEIPT_FLUSH_SECONDS 秒批量写回，进程退出时写回剩余水位
+- 写回时在同一事务中: 条件 UPDATE 前移水位 (只增不减，多进程并发写回互不覆盖)，批量补写水位以下消息的 is_read/read_at
+  (保留 is_read 供通知、校正等按布尔列统计的查询使用)，并按实际更新的行数扣减会话与用户的未读数
+- 缓冲期间读者看到的未读状态由水位推导: 会话列表与未读角标扣除 pending_read_counts() (缓冲水位已覆盖、库中仍未读的消息数)，
+  本进程内已读状态立即生效，不必等待写回
+- 写回失败的水位放回缓冲区，下次重试；fork 出的子进程清空继承的缓冲区
+"""
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import and_, case, func, or_
+
+from ..core.extensions import db
+from ..models.message import Conversation, Message
+from .unread_counter_service import unread_counter_service
+
+
+class InMemoryReadReceiptBuffer:
+    """进程内缓冲区: {(用户ID, 会话ID): 待写回的水位}，并记录每个会话最近一次写入的时间"""
+
+    def __init__(self):
+        self._pending = {}
+        self._written_at = {}
+        self._lock = threading.Lock()
+
+    def pending(self, key):
+        with self._lock:
+            return self._pending.get(key, 0)
+
+    def pending_for_user(self, user_id):
+        """:return: {会话ID: 待写回的水位}"""
+        with self._lock:
+            return {conversation_id: watermark for (owner_id, conversation_id), watermark in self._pending.items()
+                    if owner_id == user_id}
+
+    def add(self, key, watermark):
+        with self._lock:
+            self._pending[key] = max(self._pending.get(key, 0), watermark)
+
+    def claim_write(self, key, interval):
+        """距上次写入已超过 interval 秒时占用本次写入并返回 True，否则返回 False"""
+        now = time.monotonic()
+        with self._lock:
+            written_at = self._written_at.get(key)
+            if written_at is not None and now - written_at < interval:
+                return False
+            self._written_at[key] = now
+            return True
+
+    def drain(self, interval):
+        """取出全部待写回水位，同时清理超过合并窗口的写入时间记录"""
+        now = time.monotonic()
+        with self._lock:
+            drained, self._pending = self._pending, {}
+            self._written_at = {key: written_at for key, written_at in self._written_at.items()
+                                if now - written_at < interval}
+            for key in drained:
+                self._written_at[key] = now
+            return drained
+
+    def restore(self, watermarks):
+        """写回失败时放回水位"""
+        with self._lock:
+            for key, watermark in watermarks.items():
+                self._pending[key] = max(self._pending.get(key, 0), watermark)
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+            self._written_at.clear()
+
+
+class MessageReadReceipts:
+    def __init__(self):
+        self._buffer = InMemoryReadReceiptBuffer()
+        self._app = None
+        self._flusher = None
+        self._flusher_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    # --- 读取 ---
+    def get_watermark(self, user_id, conversation_id):
+        """
+        用户在会话中的已读水位 (含尚未写回的部分)
+        :return: 已读到的最新消息ID，从未读过时为 0
+        """
+        stored = db.session.query(Conversation.last_read_message_id)\
+            .filter(Conversation.conversation_id == conversation_id, Conversation.user_id == user_id).scalar()
+        return max(stored or 0, self._buffer.pending((user_id, conversation_id)))
+
+    def pending_read_counts(self, user_id, conversation_ids=None):
+        """
+        缓冲中的水位已覆盖、但数据库中仍标记为未读的消息数 (读取未读数时扣除)
+        :param user_id: 用户ID
+        :param conversation_ids: 只统计这些会话，为空时统计该用户全部缓冲中的会话
+        :return: {会话ID: 消息数}
+        """
+        watermarks = self._buffer.pending_for_user(user_id)
+        if conversation_ids is not None:
+            watermarks = {cid: watermark for cid, watermark in watermarks.items() if cid in set(conversation_ids)}
+        if not watermarks:
+            return {}
+        rows = db.session.query(Message.conversation_id, func.count(Message.id))\
+            .filter(Message.recipient_id == user_id, Message.is_read == False,
+                    or_(*[and_(Message.conversation_id == cid, Message.id <= watermark) for cid, watermark in watermarks.items()]))\
+            .group_by(Message.conversation_id).all()
+        return {cid: count for cid, count in rows}
+
+    # --- 记录 ---
+    def mark_read(self, user_id, conversation_id, message_id, current_watermark=None):
+        """
+        将用户在会话中的已读水位前移到 message_id
+        :param user_id: 用户ID
+        :param conversation_id: 会话ID
+        :param message_id: 已读到的最新消息ID
+        :param current_watermark: 调用方已查询的当前水位，为空时查询
+        :return: 是否前移了水位 (立即写入或进入缓冲区)
+        """
+        if current_watermark is None:
+            current_watermark = self.get_watermark(user_id, conversation_id)
+        if not message_id or message_id <= current_watermark:
+            return False
+
+        key = (user_id, conversation_id)
+        interval = current_app.config.get('MESSAGE_READ_RECEIPT_COALESCE_SECONDS', 5)
+        self._ensure_flusher()
+        if not interval or interval <= 0 or self._buffer.claim_write(key, interval):
+            self._write({key: message_id})
+        else:
+            self._buffer.add(key, message_id)
+        return True
+
+    # --- 写回 ---
+    def flush(self):
+        """
+        将缓冲区中的水位写回数据库
+        :return: 写回的会话数
+        """
+        with self._flush_lock:
+            watermarks = self._buffer.drain(current_app.config.get('MESSAGE_READ_RECEIPT_COALESCE_SECONDS', 5))
+            if not watermarks:
+                return 0
+            return self._write(watermarks)
+
+    def _write(self, watermarks):
+        written = 0
+        keys = sorted(watermarks)
+        for index, key in enumerate(keys):
+            try:
+                self._apply_watermark(key[0], key[1], watermarks[key])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.warning(f"[MessageReadReceipts] 写回已读水位失败: {str(e)}")
+                self._buffer.restore({k: watermarks[k] for k in keys[index:]})
+                break
+            written += 1
+        return written
+
+    def _apply_watermark(self, user_id, conversation_id, watermark):
+        """在当前事务中前移水位，并补写水位以下消息的 is_read 与未读数"""
+        row_filter = (Conversation.conversation_id == conversation_id, Conversation.user_id == user_id)
+        advanced = Conversation.query.filter(
+            *row_filter,
+            or_(Conversation.last_read_message_id.is_(None), Conversation.last_read_message_id < watermark)
+        ).update({'last_read_message_id': watermark}, synchronize_session=False)
+        if not advanced and db.session.query(Conversation.id).filter(*row_filter).first() is not None:
+            # 其他进程已写回更高的水位
+            return
+
+        read_count = Message.query.filter(
+            Message.conversation_id == conversation_id,
+            Message.recipient_id == user_id,
+            Message.id <= watermark,
+            Message.is_read == False
+        ).update({'is_read': True, 'read_at': datetime.utcnow()})
+        if read_count:
+            Conversation.query.filter(*row_filter).update({
+                'unread_count': case((Conversation.unread_count > read_count, Conversation.unread_count - read_count), else_=0)
+            }, synchronize_session=False)
+            unread_counter_service.decrement(user_id, messages=read_count)
+
+    # --- 后台写回线程 ---
+    def _ensure_flusher(self):
+        interval = current_app.config.get('MESSAGE_READ_RECEIPT_FLUSH_SECONDS', 5)
+        if not interval or interval <= 0:
+            return
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._flusher_lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            if self._app is None:
+                atexit.register(self._flush_at_exit)
+            self._app = current_app._get_current_object()
+            self._flusher = threading.Thread(target=self._run_flusher, args=(self._app, interval),
+                                             name='message-read-receipts-flusher', daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self, app, interval):
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    self.flush()
+                except Exception as e:
+                    app.logger.warning(f"[MessageReadReceipts] 定期写回已读水位失败: {str(e)}")
+                finally:
+                    db.session.remove()
+
+    def _flush_at_exit(self):
+        if self._app is None:
+            return
+        with self._app.app_context():
+            try:
+                self.flush()
+            except Exception as e:
+                self._app.logger.warning(f"[MessageReadReceipts] 退出时写回已读水位失败: {str(e)}")
+
+    def _reset_after_fork(self):
+        # 子进程不继承父进程的待写回水位与写回线程
+        self._buffer.clear()
+        self._flusher = None
+        self._flusher_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+
+message_read_receipts = MessageReadReceipts()
@@ -0,0 +1,106 @@
+"""
+订单自动确认 (Order Auto-Confirmation)
+
+零工完成工作后订单进入 pending_confirmation，并设置 confirmation_deadline (完成后 7 天)。
+雇主在截止时间前未确认也未发起争议时，由本定时任务代为确认：
+- 按 (status, confirmation_deadline) 索引顺序分批读取到期订单的 (ID, 版本号)，批大小 ORDER_AUTO_CONFIRM_BATCH_SIZE；
+  批与批之间按 (confirmation_deadline, id) 键集推进，确认失败的订单本轮不会被重复读取
+- 每个订单通过 order_service.auto_confirm_order 走与雇主确认相同的状态迁移 (条件 UPDATE + 版本号)，
+  在同一个短事务中完成状态变更、资金结算与通知；期间雇主确认或发起争议时条件 UPDATE 不命中，直接跳过
+- 租约: 多个节点可同时运行 (manage.py auto_confirm_orders)，只有获得 scheduler_leases 中
+  'order_auto_confirm' 租约的节点执行；每批处理前续约，续约失败 (租约已被接管) 立即停止
+- 积压数十万订单时，单次执行处理 ORDER_AUTO_CONFIRM_MAX_BATCHES 批后释放租约，剩余订单下次继续
+"""
+import time
+from datetime import datetime
+
+from flask import current_app
+
+from ..core.extensions import db
+from ..models.order import Order, OrderStatusEnum
+from ..utils.exceptions import BusinessException
+from .order_service import order_service
+from .scheduler_lease import new_lease_holder, scheduler_lease_service
+
+LEASE_NAME = 'order_auto_confirm'
+
+
+class OrderAutoConfirmScheduler:
+    def run_once(self, batch_size=None, max_batches=None):
+        """
+        确认一轮到期订单
+        :param batch_size: 每批读取的订单数，默认 ORDER_AUTO_CONFIRM_BATCH_SIZE
+        :param max_batches: 本轮最多处理的批数，默认 ORDER_AUTO_CONFIRM_MAX_BATCHES (0 表示不限)
+        :return: {'acquired': 是否获得租约, 'confirmed': 确认数, 'skipped': 跳过数, 'batches': 批数, 'seconds': 耗时}
+        """
+        config = current_app.config
+        batch_size = batch_size or config.get('ORDER_AUTO_CONFIRM_BATCH_SIZE', 200)
+        if max_batches is None:
+            max_batches = config.get('ORDER_AUTO_CONFIRM_MAX_BATCHES', 0)
+        lease_ttl = config.get('ORDER_AUTO_CONFIRM_LEASE_SECONDS', 120)
+
+        started = time.monotonic()
+        stats = {'acquired': False, 'confirmed': 0, 'skipped': 0, 'batches': 0, 'seconds': 0}
+        holder = new_lease_holder()
+        if not scheduler_lease_service.acquire(LEASE_NAME, holder, lease_ttl):
+            current_app.logger.info("[OrderAutoConfirm] 租约由其他节点持有，跳过本轮")
+            return stats
+        stats['acquired'] = True
+
+        # 以本轮开始时间为准，执行期间新到期的订单留给下一轮
+        now = datetime.utcnow()
+        last_key = None
+        try:
+            while not max_batches or stats['batches'] < max_batches:
+                if stats['batches'] and not scheduler_lease_service.renew(LEASE_NAME, holder, lease_ttl):
+                    current_app.logger.warning("[OrderAutoConfirm] 租约已失效，停止本轮")
+                    break
+                batch = self._due_orders(now, last_key, batch_size)
+                if not batch:
+                    break
+                stats['batches'] += 1
+                last_key = (batch[-1].confirmation_deadline, batch[-1].id)
+                for order_id, version, _ in batch:
+                    if self._confirm(order_id, version, now):
+                        stats['confirmed'] += 1
+                    else:
+                        stats['skipped'] += 1
+                # 释放本批加载的对象，积压很大时内存保持有界
+                db.session.expunge_all()
+        finally:
+            db.session.remove()
+            scheduler_lease_service.release(LEASE_NAME, holder)
+
+        stats['seconds'] = round(time.monotonic() - started, 3)
+        current_app.logger.info(f"[OrderAutoConfirm] 自动确认 {stats['confirmed']} 个订单，跳过 {stats['skipped']} 个，"
+                                f"共 {stats['batches']} 批，耗时 {stats['seconds']} 秒")
+        return stats
+
+    def _due_orders(self, now, last_key, batch_size):
+        """到期订单的 (ID, 版本号, 截止时间)，按 (confirmation_deadline, id) 排序"""
+        query = db.session.query(Order.id, Order.version, Order.confirmation_deadline)\
+            .filter(Order.status == OrderStatusEnum.pending_confirmation.value,
+                    Order.confirmation_deadline <= now)
+        if last_key is not None:
+            deadline, order_id = last_key
+            query = query.filter((Order.confirmation_deadline > deadline) |
+                                 ((Order.confirmation_deadline == deadline) & (Order.id > order_id)))
+        rows = query.order_by(Order.confirmation_deadline.asc(), Order.id.asc()).limit(batch_size).all()
+        # 结束读事务，后续每个订单单独开启短事务
+        db.session.commit()
+        return rows
+
+    def _confirm(self, order_id, version, now):
+        try:
+            order_service.auto_confirm_order(order_id, expected_version=version, now=now)
+            return True
+        except BusinessException as e:
+            if e.status_code == 409:
+                # 扫描后雇主已确认或发起争议
+                current_app.logger.info(f"[OrderAutoConfirm] 订单 {order_id} 状态已变化，跳过")
+            else:
+                current_app.logger.error(f"[OrderAutoConfirm] 订单 {order_id} 自动确认失败: {e.message}")
+            return False
+
+
+order_auto_confirm = OrderAutoConfirmScheduler()
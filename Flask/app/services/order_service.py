@@ -1,13 +1,44 @@
 from ..core.extensions import db
-from ..models.order import Order, OrderStatusEnum, CancellationPartyEnum, ConfirmationStatusEnum
+from ..models.order import Order, Payment, OrderStatusEnum, PaymentStatusEnum, CancellationPartyEnum, ConfirmationStatusEnum, ORDER_STATUS_TRANSITIONS
+from ..models.notification import NotificationTypeEnum
+from ..models.wallet import TransactionTypeEnum
 from ..models.user import User
-from ..models.job import Job, JobApplication # Corrected import for JobApplication
+from ..models.job import Job, JobApplication, JobStatusEnum # Corrected import for JobApplication
 from ..utils.exceptions import NotFoundException, AuthorizationException, InvalidUsageException, BusinessException
-from sqlalchemy.orm import joinedload
-from sqlalchemy import func  # 添加对func的导入
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import func, select, update
 from datetime import datetime, timedelta, timezone # Ensure timezone is imported
 from decimal import Decimal, InvalidOperation
 from flask import current_app
+from ..utils.pagination import ListPagination, keyset_paginate
+from collections import namedtuple
+from .communication_service import notification_service
+from .wallet_ledger import LedgerEntry, wallet_ledger
+
+# 订单操作 -> 状态迁移: 执行方、允许的当前状态、目标状态、用于错误提示的操作名
+OrderTransition = namedtuple('OrderTransition', ['actors', 'from_statuses', 'to_status', 'label'])
+
+ORDER_ACTIONS = {
+    'start_work': OrderTransition(('freelancer',), (OrderStatusEnum.pending_start,), OrderStatusEnum.in_progress, '开始工作'),
+    'complete_work': OrderTransition(('freelancer',), (OrderStatusEnum.in_progress,), OrderStatusEnum.pending_confirmation, '完成工作'),
+    'confirm_completion': OrderTransition(('employer',), (OrderStatusEnum.pending_confirmation,), OrderStatusEnum.completed, '确认完成'),
+    'cancel_order': OrderTransition(('freelancer', 'employer'), (OrderStatusEnum.pending_start,), OrderStatusEnum.cancelled, '取消订单'),
+    # 平台操作 (不接受用户调用): 确认截止时间已过的订单由 order_auto_confirm 定时任务自动确认
+    'auto_confirm': OrderTransition(('platform',), (OrderStatusEnum.pending_confirmation,), OrderStatusEnum.completed, '自动确认完成'),
+    # 支付成功后待开始的订单进入进行中 (支付回调、管理员确认支付)
+    'payment_succeeded': OrderTransition(('platform',), (OrderStatusEnum.pending_start,), OrderStatusEnum.in_progress, '支付后开始订单'),
+    # 管理员处理争议: 恢复进行中、判定完成或取消
+    'resolve_dispute_resume': OrderTransition(('platform',), (OrderStatusEnum.disputed,), OrderStatusEnum.in_progress, '恢复争议订单'),
+    'resolve_dispute_complete': OrderTransition(('platform',), (OrderStatusEnum.disputed,), OrderStatusEnum.completed, '完成争议订单'),
+    'resolve_dispute_cancel': OrderTransition(('platform',), (OrderStatusEnum.disputed,), OrderStatusEnum.cancelled, '取消争议订单'),
+}
+
+
+def _allowed_from_statuses(transition):
+    """订单操作允许的当前状态: 只保留状态机 (ORDER_STATUS_TRANSITIONS) 中存在到目标状态的边"""
+    return [status.value for status in transition.from_statuses
+            if transition.to_status in ORDER_STATUS_TRANSITIONS.get(status, ())]
+
 
 class OrderService:
 
@@ -32,55 +63,68 @@ class OrderService:
         
         return order
 
-    def get_orders_for_user(self, user_id, user_role, filters=None, page=1, per_page=20, sort_by=None):
+    def get_orders_for_user(self, user_id, user_role, filters=None, page=1, per_page=20, sort_by=None, cursor=None, include_total=False):
         """
         Get orders for a specific user (either as freelancer or employer).
-        Supports filtering, pagination, and sorting.
+        Supports status / created_at range filtering and pagination, sorted by newest first.
+        Pass `cursor` (empty string for the first page) to use keyset pagination instead of page numbers.
+
+        Read path per request: at most one COUNT on the bare filtered orders table (skipped in cursor mode
+        unless include_total), one page query served by the (user, status, created_at) composite indexes,
+        and one selectin query each for the job and application columns OrderSchema dumps.
         """
-        current_app.logger.info(f"[OrderService] Fetching orders for user_id: {user_id}, role: {user_role}")
-        
-        query = Order.query.options(
-            joinedload(Order.job),
-            joinedload(Order.freelancer),
-            joinedload(Order.employer)
+        conditions = self._order_list_conditions(user_id, user_role, filters or {})
+        query = Order.query.filter(*conditions).options(
+            selectinload(Order.job).load_only(Job.id, Job.title),
+            selectinload(Order.application).load_only(JobApplication.id, JobApplication.status)
         )
+        order_by = [(Order.created_at, 'desc'), (Order.id, 'desc')]
 
+        try:
+            if cursor is not None:
+                paginated = keyset_paginate(query, order_by, cursor=cursor, per_page=per_page)
+                if include_total:
+                    paginated.total = self._count_orders(conditions)
+                return paginated
+
+            page = max(int(page or 1), 1)
+            per_page = max(int(per_page or 20), 1)
+            total = self._count_orders(conditions)
+            items = []
+            if total > (page - 1) * per_page:
+                items = query.order_by(Order.created_at.desc(), Order.id.desc())\
+                    .offset((page - 1) * per_page).limit(per_page).all()
+            return ListPagination(items, page, per_page, total)
+        except InvalidUsageException:
+            raise
+        except Exception as e:
+            current_app.logger.error(f"[OrderService] Error executing order list query: {str(e)}", exc_info=True)
+            raise BusinessException(f"查询订单时出错: {str(e)}", status_code=500)
+
+    def _order_list_conditions(self, user_id, user_role, filters):
+        """订单列表的过滤条件 (列顺序与 (user, status, created_at) 复合索引一致)"""
         if user_role == 'freelancer':
-            current_app.logger.debug(f"[OrderService] Filtering as freelancer with ID: {user_id}")
-            query = query.filter(Order.freelancer_user_id == user_id)
+            conditions = [Order.freelancer_user_id == user_id]
         elif user_role == 'employer':
-            current_app.logger.debug(f"[OrderService] Filtering as employer with ID: {user_id}")
-            query = query.filter(Order.employer_user_id == user_id)
+            conditions = [Order.employer_user_id == user_id]
         else:
             current_app.logger.warning(f"[OrderService] Invalid user role: {user_role}")
             raise AuthorizationException("无效的用户角色，无法查询订单。")
 
-        if filters:
-            current_app.logger.debug(f"[OrderService] Applying filters: {filters}")
-            if filters.get('status'):
-                query = query.filter(Order.status == filters['status'])
-            # Add more filters as needed: job_id, date ranges, etc.
-
-        # TODO: Implement sorting based on sort_by parameter
-        # Example: if sort_by == 'created_at_desc': query = query.order_by(Order.created_at.desc())
-        # Default sort or handle based on input
-        query = query.order_by(Order.created_at.desc())
-
-        # 验证查询SQL
-        try:
-            current_app.logger.debug(f"[OrderService] SQL Query: {query}")
-            
-            # 使用辅助函数获取订单总数
-            order_count = self._get_query_count(query)
-            current_app.logger.info(f"[OrderService] Total orders matching query: {order_count}")
-            
-            paginated_orders = query.paginate(page=page, per_page=per_page, error_out=False)
-            current_app.logger.info(f"[OrderService] Returning {len(paginated_orders.items)} orders on page {page}")
-            
-            return paginated_orders
-        except Exception as e:
-            current_app.logger.error(f"[OrderService] Error executing query: {str(e)}", exc_info=True)
-            raise BusinessException(f"查询订单时出错: {str(e)}", status_code=500)
+        if filters.get('status'):
+            status = filters['status']
+            if status not in {e.value for e in OrderStatusEnum}:
+                raise InvalidUsageException(f"无效的订单状态: {status}")
+            conditions.append(Order.status == status)
+        if filters.get('created_from'):
+            conditions.append(Order.created_at >= filters['created_from'])
+        if filters.get('created_to'):
+            conditions.append(Order.created_at < filters['created_to'])
+        return conditions
+
+    def _count_orders(self, conditions):
+        """只在 orders 表上计数 (不带关联加载与排序)"""
+        return db.session.execute(select(func.count()).select_from(Order).where(*conditions)).scalar()
 
     def create_order_from_application(self, application: JobApplication, employer_user_id: int):
         """
@@ -163,186 +207,260 @@ class OrderService:
     def process_order_action(self, order_id: int, user_id: int, user_role: str, action_data: dict):
         """
         Processes various actions on an order based on user role and current order status.
+
+        Each action is a transition from ORDER_ACTIONS applied as one conditional
+        `UPDATE orders ... WHERE id = ? AND <actor> = ? AND status IN (...) [AND version = ?]`,
+        so concurrent actions (double taps, cancel racing confirm) cannot both succeed.
+        Pass `version` in action_data to also reject the action if the order changed since the client read it.
+        The order is only read again for the response (and to diagnose a failed transition).
         """
-        order = self.get_order_by_id(order_id, user_id) # Ensures user has basic access
         action = action_data.get('action')
-
         if not action:
             raise InvalidUsageException("操作类型 (action) 不能为空。")
+        transition = ORDER_ACTIONS.get(action)
+        if transition is None or transition.actors == ('platform',):
+            raise InvalidUsageException(f"不支持的操作类型: {action}")
+
+        expected_version = action_data.get('version')
+        if expected_version is not None:
+            try:
+                expected_version = int(expected_version)
+            except (TypeError, ValueError):
+                raise InvalidUsageException("订单版本号 (version) 格式无效。")
 
+        actor = self._action_actor(transition, user_role)
+        on_applied = None
         if action == 'start_work':
-            return self._freelancer_start_work(order, user_id)
+            values = {
+                'start_time_actual': datetime.now(timezone.utc), # Explicitly UTC aware
+                'freelancer_confirmation_status': ConfirmationStatusEnum.confirmed.value,
+            }
         elif action == 'complete_work':
             # Actual times might be passed in action_data
             actual_times_data = {
                 'start_time_actual': action_data.get('start_time_actual'),
                 'end_time_actual': action_data.get('end_time_actual')
             }
-            return self._freelancer_complete_work(order, user_id, actual_times_data)
+            values, expected_version = self._completion_values(order_id, user_id, actual_times_data, expected_version)
         elif action == 'confirm_completion':
-            return self._employer_confirm_completion(order, user_id)
+            values = {
+                'employer_confirmation_status': ConfirmationStatusEnum.confirmed.value,
+                'confirmation_deadline': None, # Clear deadline
+            }
+            on_applied = lambda: self._on_order_completed(order_id, auto_confirmed=False)
         elif action == 'cancel_order':
-            cancellation_reason = action_data.get('cancellation_reason')
-            return self._cancel_order(order, user_id, user_role, cancellation_reason)
+            reason = action_data.get('cancellation_reason')
+            if not reason:
+                raise InvalidUsageException("取消订单必须提供原因。")
+            values = {
+                'cancellation_reason': reason,
+                'cancelled_by': CancellationPartyEnum[actor].value,
+                'confirmation_deadline': None,
+            }
+            on_applied = lambda: self._on_order_cancelled(order_id)
         # Add 'dispute_completion' later
-        else:
-            raise InvalidUsageException(f"不支持的操作类型: {action}")
 
-    def _freelancer_start_work(self, order: Order, freelancer_id: int):
-        if order.freelancer_user_id != freelancer_id:
-            raise AuthorizationException("只有零工本人才能开始工作。")
-        
-        # 获取当前状态的字符串值以进行比较
-        current_status = order.status
-        if hasattr(order.status, 'value'):
-            current_status = order.status.value
-        
-        if current_status != OrderStatusEnum.pending_start.value:
-            raise InvalidUsageException(f"订单状态为 {current_status}，无法开始工作。")
+        self._apply_transition(order_id, user_id, actor, transition, values, expected_version, on_applied=on_applied)
+        return self.get_order_by_id(order_id, user_id)
 
-        # 直接使用枚举对象设置状态
-        order.status = OrderStatusEnum.in_progress
-        order.start_time_actual = datetime.now(timezone.utc) # Explicitly UTC aware
-        order.freelancer_confirmation_status = ConfirmationStatusEnum.confirmed
-        
+    def auto_confirm_order(self, order_id, expected_version=None, now=None):
+        """
+        平台自动确认已过确认截止时间的订单 (与雇主确认完成走同一迁移路径，同一事务中结算资金并通知双方)
+        :param order_id: 订单ID
+        :param expected_version: 扫描时读取到的版本号，期间订单被修改 (如雇主发起争议) 则不确认
+        :param now: 截止时间比较基准 (UTC)，默认当前时间
+        :raises: BusinessException(409) 订单状态、截止时间或版本已变化
+        """
+        now = now or datetime.utcnow()
+        values = {
+            'employer_confirmation_status': ConfirmationStatusEnum.confirmed.value,
+            'confirmation_deadline': None,
+        }
+        self._apply_transition(order_id, None, 'platform', ORDER_ACTIONS['auto_confirm'], values, expected_version,
+                               conditions=[Order.confirmation_deadline <= now],
+                               on_applied=lambda: self._on_order_completed(order_id, auto_confirmed=True))
+
+    def _on_order_completed(self, order_id, auto_confirmed):
+        """
+        订单完成后的资金结算与通知 (在迁移事务中执行，不提交)
+        已有成功支付时，从托管账户向零工结算 freelancer_income；尚无支付记录的订单只记录日志
+        """
+        freelancer_user_id, employer_user_id, freelancer_income = db.session.query(
+            Order.freelancer_user_id, Order.employer_user_id, Order.freelancer_income
+        ).filter(Order.id == order_id).one()
+        payment = db.session.query(Payment.id, Payment.payee_user_id)\
+            .filter(Payment.order_id == order_id, Payment.status == PaymentStatusEnum.succeeded.value)\
+            .order_by(Payment.id.desc()).first()
+        if payment is not None and freelancer_income:
+            wallet_ledger.post_entries([
+                LedgerEntry(payment.payee_user_id, TransactionTypeEnum.income, balance_delta=-freelancer_income,
+                            related_payment_id=payment.id, related_order_id=order_id,
+                            description=f"订单 #{order_id} 结算给零工"),
+                LedgerEntry(freelancer_user_id, TransactionTypeEnum.income, balance_delta=freelancer_income,
+                            related_payment_id=payment.id, related_order_id=order_id,
+                            description=f"订单 #{order_id} 收入"),
+            ])
+        else:
+            current_app.logger.warning(f"[OrderService] 订单 {order_id} 已完成但没有成功的支付记录，未结算零工收入")
+
+        title = '订单已自动确认完成' if auto_confirmed else '订单已确认完成'
+        content = f"订单 #{order_id} 已超过确认期限，系统已自动确认完成。" if auto_confirmed \
+            else f"订单 #{order_id} 已由雇主确认完成。"
+        notification_service.insert_notifications([freelancer_user_id, employer_user_id], {
+            'notification_type': NotificationTypeEnum.order_update,
+            'title': title,
+            'content': content,
+            'related_resource_type': 'order',
+            'related_resource_id': order_id,
+        })
+
+    def _on_order_cancelled(self, order_id):
+        """
+        订单取消后释放工作名额 (在迁移事务中执行，不提交)
+        只有待开始的订单可以取消；支付成功即进入进行中，待开始的订单没有已托管的资金，无需退款
+        """
+        job_id = db.session.query(Order.job_id).filter(Order.id == order_id).scalar()
+        # 锁定工作行后再修改，并发取消不会丢失扣减；经 ORM 修改以触发缓存、索引等的失效
+        job = db.session.query(Job).filter(Job.id == job_id).with_for_update().populate_existing().first()
+        if job is None:
+            return
+        if job.accepted_people > 0:
+            job.accepted_people -= 1
+        if job.status == JobStatusEnum.filled and job.accepted_people < job.required_people:
+            job.status = JobStatusEnum.active
+
+    def _action_actor(self, transition, user_role):
+        """执行操作的参与方 (freelancer/employer)"""
+        if len(transition.actors) == 1:
+            return transition.actors[0]
+        if user_role not in transition.actors:
+            raise AuthorizationException("无效的用户角色，无法执行此操作。")
+        return user_role
+
+    def apply_platform_transition(self, order_id, action, values=None):
+        """
+        在调用方事务中执行平台发起的状态迁移 (不提交)，与支付、退款等写入一起提交
+        :param order_id: 订单ID
+        :param action: ORDER_ACTIONS 中的平台操作
+        :param values: 同时写入的其他字段
+        :return: 是否迁移成功 (订单当前状态不允许该操作时返回 False，不修改订单)
+        """
+        transition = ORDER_ACTIONS[action]
+        if transition.actors != ('platform',):
+            raise ValueError(f"{action} 不是平台操作")
+        values = dict(values or {}, status=transition.to_status.value, version=Order.version + 1, updated_at=datetime.utcnow())
+        updated = db.session.execute(
+            update(Order)
+            .where(Order.id == order_id, Order.status.in_(_allowed_from_statuses(transition)))
+            .values(**values).execution_options(synchronize_session='fetch')
+        ).rowcount
+        return updated == 1
+
+    def _apply_transition(self, order_id, user_id, actor, transition, values, expected_version=None,
+                          conditions=(), on_applied=None):
+        """
+        单条条件 UPDATE 完成状态迁移；未命中时诊断原因并抛出对应异常
+        :param conditions: 额外的更新条件
+        :param on_applied: 迁移成功后、提交前在同一事务中执行的回调 (结算、通知等)
+        """
+        conditions = [
+            Order.id == order_id,
+            Order.status.in_(_allowed_from_statuses(transition)),
+            *conditions,
+        ]
+        actor_column = None
+        if actor != 'platform':
+            actor_column = Order.freelancer_user_id if actor == 'freelancer' else Order.employer_user_id
+            conditions.append(actor_column == user_id)
+        if expected_version is not None:
+            conditions.append(Order.version == expected_version)
+
+        values = dict(values, status=transition.to_status.value, version=Order.version + 1, updated_at=datetime.utcnow())
         try:
-            db.session.commit()
-            return order
+            updated = db.session.execute(
+                update(Order).where(*conditions).values(**values).execution_options(synchronize_session=False)
+            ).rowcount
+            if updated == 1:
+                if on_applied is not None:
+                    on_applied()
+                db.session.commit()
+                return
+            db.session.rollback()
+        except BusinessException:
+            db.session.rollback()
+            raise
         except Exception as e:
             db.session.rollback()
-            raise BusinessException(message=f"开始工作失败: {str(e)}", status_code=500)
-
-    def _freelancer_complete_work(self, order: Order, freelancer_id: int, actual_times_data: dict = None):
-        if order.freelancer_user_id != freelancer_id:
-            raise AuthorizationException("只有零工本人才能完成工作。")
-        
-        # 获取当前状态的字符串值以进行比较
-        current_status = order.status
-        if hasattr(order.status, 'value'):
-            current_status = order.status.value
-        
-        if current_status != OrderStatusEnum.in_progress.value:
-            raise InvalidUsageException(f"订单状态为 {current_status}，无法完成工作。")
+            raise BusinessException(message=f"订单操作失败: {str(e)}", status_code=500)
+        self._raise_transition_failure(order_id, user_id, actor, actor_column, transition, expected_version)
+
+    def _raise_transition_failure(self, order_id, user_id, actor, actor_column, transition, expected_version):
+        row = db.session.query(Order.status, Order.version, actor_column if actor_column is not None else Order.id,
+                               Order.freelancer_user_id, Order.employer_user_id)\
+            .filter(Order.id == order_id).first()
+        if row is None:
+            raise NotFoundException("订单不存在。")
+        status, version, actor_user_id, freelancer_user_id, employer_user_id = row
+        if actor_column is None:
+            raise BusinessException(message=f"订单状态为 {status} (版本 {version})，未到期或已变更，无法{transition.label}。",
+                                    status_code=409, error_code=40902)
+        if user_id not in (freelancer_user_id, employer_user_id):
+            raise AuthorizationException("您无权查看此订单。")
+        if actor_user_id != user_id:
+            role_label = '零工' if actor == 'freelancer' else '雇主'
+            raise AuthorizationException(f"只有{role_label}本人才能{transition.label}。")
+        if status not in _allowed_from_statuses(transition):
+            raise BusinessException(message=f"订单状态为 {status}，无法{transition.label}。", status_code=409, error_code=40902)
+        raise BusinessException(message=f"订单已被修改 (当前版本 {version})，请刷新后重试。", status_code=409, error_code=40905)
+
+    def _completion_values(self, order_id, freelancer_id, actual_times_data, expected_version):
+        """
+        完成工作时写入的实际时间与工时
+        未提供实际开始时间时读取已记录的开始时间，并以读取到的版本号作为更新条件 (期间订单被修改则更新失败)
+        :return: (写入的字段, 更新条件中的版本号)
+        """
+        start_actual_str = actual_times_data.get('start_time_actual')
+        end_actual_str = actual_times_data.get('end_time_actual')
 
-        # 直接使用枚举对象设置状态
-        order.status = OrderStatusEnum.pending_confirmation
-        
-        # Ensure order.start_time_actual (from DB or previous step) is UTC aware
-        if not order.start_time_actual:
-            raise InvalidUsageException("实际开始时间未记录。请先开始工作或在完成工作时提供。")
-        
-        start_actual_to_use = order.start_time_actual
-        if start_actual_to_use.tzinfo is None:
-            start_actual_to_use = start_actual_to_use.replace(tzinfo=timezone.utc)
+        if start_actual_str:
+            start_actual_to_use = self._parse_actual_time(start_actual_str, "提供的实际开始时间格式无效")
+        else:
+            row = db.session.query(Order.start_time_actual, Order.status, Order.version)\
+                .filter(Order.id == order_id, Order.freelancer_user_id == freelancer_id).first()
+            if row is None or row.status != OrderStatusEnum.in_progress.value:
+                # 订单不存在、不是本人的订单或状态不符，由条件 UPDATE 诊断并返回对应错误
+                return {}, expected_version
+            start_actual_to_use, _, current_version = row
+            if not start_actual_to_use:
+                raise InvalidUsageException("实际开始时间未记录。请先开始工作或在完成工作时提供。")
+            if start_actual_to_use.tzinfo is None:
+                start_actual_to_use = start_actual_to_use.replace(tzinfo=timezone.utc)
+            if expected_version is None:
+                expected_version = current_version
 
         # Default end time to now (UTC)
         end_actual_to_use = datetime.now(timezone.utc)
+        if end_actual_str:
+            end_actual_to_use = self._parse_actual_time(end_actual_str, "提供的实际结束时间格式无效")
 
-        if actual_times_data:
-            start_actual_str = actual_times_data.get('start_time_actual')
-            end_actual_str = actual_times_data.get('end_time_actual')
-
-            if start_actual_str:
-                try:
-                    dt_obj = datetime.fromisoformat(start_actual_str.replace('Z', '+00:00'))
-                    # Convert to UTC if it has timezone info, otherwise assume UTC
-                    start_actual_to_use = dt_obj.astimezone(timezone.utc) if dt_obj.tzinfo else dt_obj.replace(tzinfo=timezone.utc)
-                except ValueError:
-                    raise InvalidUsageException(f"提供的实际开始时间格式无效: {start_actual_str}")
-            
-            if end_actual_str:
-                try:
-                    dt_obj = datetime.fromisoformat(end_actual_str.replace('Z', '+00:00'))
-                    # Convert to UTC if it has timezone info, otherwise assume UTC
-                    end_actual_to_use = dt_obj.astimezone(timezone.utc) if dt_obj.tzinfo else dt_obj.replace(tzinfo=timezone.utc)
-                except ValueError:
-                    raise InvalidUsageException(f"提供的实际结束时间格式无效: {end_actual_str}")
-        
-        # Now, both start_actual_to_use and end_actual_to_use are UTC aware
         if start_actual_to_use >= end_actual_to_use:
             raise InvalidUsageException("实际结束时间必须晚于实际开始时间。")
 
-        order.start_time_actual = start_actual_to_use
-        order.end_time_actual = end_actual_to_use
-        duration = order.end_time_actual - order.start_time_actual
-        order.work_duration_actual = round(duration.total_seconds() / 3600, 2) # Duration in hours
+        duration = end_actual_to_use - start_actual_to_use
+        return {
+            'start_time_actual': start_actual_to_use,
+            'end_time_actual': end_actual_to_use,
+            'work_duration_actual': round(duration.total_seconds() / 3600, 2), # Duration in hours
+            'confirmation_deadline': datetime.now(timezone.utc) + timedelta(days=7),
+        }, expected_version
 
-        order.confirmation_deadline = datetime.now(timezone.utc) + timedelta(days=7)
-        
+    def _parse_actual_time(self, value, error_message):
         try:
-            db.session.commit()
-            return order
-        except Exception as e:
-            db.session.rollback()
-            raise BusinessException(message=f"完成工作操作失败: {str(e)}", status_code=500)
-
-    def _employer_confirm_completion(self, order: Order, employer_id: int):
-        if order.employer_user_id != employer_id:
-            raise AuthorizationException("只有雇主本人才能确认完成。")
-        
-        # 获取当前状态的字符串值以进行比较
-        current_status = order.status
-        if hasattr(order.status, 'value'):
-            current_status = order.status.value
-        
-        if current_status != OrderStatusEnum.pending_confirmation.value:
-            raise InvalidUsageException(f"订单状态为 {current_status}，无法确认完成。")
-
-        # 直接使用枚举对象设置状态
-        order.status = OrderStatusEnum.completed
-        order.employer_confirmation_status = ConfirmationStatusEnum.confirmed
-        order.confirmation_deadline = None # Clear deadline
-        
-        try:
-            db.session.commit()
-            # TODO: Trigger payment processing / fund release to freelancer
-            # TODO: Send notifications (e.g., to freelancer, for evaluation)
-            return order
-        except Exception as e:
-            db.session.rollback()
-            raise BusinessException(message=f"确认工作完成失败: {str(e)}", status_code=500)
-
-    def _cancel_order(self, order: Order, user_id: int, user_role: str, reason: str = None):
-        can_cancel = False
-        
-        # 获取当前状态的字符串值以进行比较
-        current_status = order.status
-        if hasattr(order.status, 'value'):
-            current_status = order.status.value
-        
-        if user_role == 'freelancer' and order.freelancer_user_id == user_id:
-            cancelling_party = CancellationPartyEnum.freelancer
-            # Freelancer can cancel if order is pending_start
-            if current_status == OrderStatusEnum.pending_start.value:
-                can_cancel = True
-        elif user_role == 'employer' and order.employer_user_id == user_id:
-            cancelling_party = CancellationPartyEnum.employer
-            # Employer can cancel if order is pending_start
-            if current_status == OrderStatusEnum.pending_start.value:
-                can_cancel = True
-        # Add admin/platform cancellation logic later
-
-        if not can_cancel:
-            raise InvalidUsageException(f"订单状态为 {current_status} 或您无权取消此订单。")
-        
-        if not reason:
-            raise InvalidUsageException("取消订单必须提供原因。")
-
-        # 直接使用枚举对象设置状态
-        order.status = OrderStatusEnum.cancelled
-        order.cancellation_reason = reason
-        order.cancelled_by = cancelling_party
-        order.confirmation_deadline = None
-
-        try:
-            db.session.commit()
-            # TODO: Handle potential refunds if payment was made
-            # TODO: Update job status (e.g., reopen if it was 'filled' by this order)
-            # TODO: Send notifications
-            return order
-        except Exception as e:
-            db.session.rollback()
-            raise BusinessException(message=f"取消订单失败: {str(e)}", status_code=500)
+            dt_obj = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            raise InvalidUsageException(f"{error_message}: {value}")
+        # Convert to UTC if it has timezone info, otherwise assume UTC
+        return dt_obj.astimezone(timezone.utc) if dt_obj.tzinfo else dt_obj.replace(tzinfo=timezone.utc)
 
     def update_order_actual_times(self, order_id: int, user_id: int, data: dict):
         """
@@ -411,32 +529,4 @@ class OrderService:
             current_app.logger.error(f"更新订单实际时间失败: {str(e)}")
             raise BusinessException(message=f"更新订单实际时间失败: {str(e)}", status_code=500)
 
-    def _get_query_count(self, query):
-        """安全地获取查询结果数量，兼容不同版本的SQLAlchemy"""
-        try:
-            current_app.logger.debug(f"[OrderService] 尝试获取查询结果数量")
-            # 尝试直接使用查询对象的count方法
-            return query.count()
-        except (AttributeError, TypeError) as e1:
-            current_app.logger.warning(f"[OrderService] 直接计数失败，尝试其他方法: {e1}")
-            try:
-                # 尝试新版SQLAlchemy语法
-                count_query = query.statement.with_only_columns(func.count()).order_by(None)
-                return db.session.execute(count_query).scalar()
-            except Exception as e2:
-                current_app.logger.warning(f"[OrderService] 新版语法失败，尝试旧版语法: {e2}")
-                try:
-                    # 尝试旧版SQLAlchemy语法
-                    return db.session.execute(
-                        query.statement.with_only_columns([func.count()]).order_by(None)
-                    ).scalar()
-                except Exception as e3:
-                    current_app.logger.error(f"[OrderService] 所有计数方法均失败: {e3}")
-                    # 最后的回退方案：获取所有数据并计数
-                    try:
-                        return len(query.all())
-                    except Exception as e4:
-                        current_app.logger.error(f"[OrderService] 无法获取查询结果数量: {e4}")
-                        return 0
-
 order_service = OrderService()
\ No newline at end of file
@@ -2,10 +2,13 @@ from ..models.wallet import UserWallet, WalletTransaction, TransactionTypeEnum,
 from ..models.order import Order, Payment, PaymentStatusEnum, OrderStatusEnum
 from ..models.user import User
 from ..core.extensions import db
-from ..utils.exceptions import NotFoundException, AuthorizationException, BusinessException, InvalidUsageException
+from ..utils.exceptions import NotFoundException, AuthorizationException, BusinessException, InvalidUsageException, InsufficientFundsException
 from sqlalchemy.orm import joinedload
 from datetime import datetime
 from decimal import Decimal
+from ..utils.pagination import keyset_paginate
+from .order_service import order_service
+from .wallet_ledger import wallet_ledger, LedgerEntry
 
 class WalletService:
     def get_user_wallet_info(self, user_id):
@@ -30,9 +33,14 @@ class WalletService:
             current_app.logger.error(f"用户 {user_id} 的钱包信息不存在，请检查注册流程")
             raise NotFoundException(message="用户钱包信息未找到", error_code=40405)
         
+        # 平台托管账户的部分入账尚在子账户中，余额按逻辑余额展示
+        if user_id == wallet_ledger.escrow_user_id():
+            db.session.expunge(wallet)
+            wallet.balance = wallet_ledger.get_escrow_balance()
+        
         return wallet
 
-    def get_wallet_transactions(self, user_id, filters=None, page=1, per_page=10, sort_by=None):
+    def get_wallet_transactions(self, user_id, filters=None, page=1, per_page=10, sort_by=None, cursor=None, include_total=False):
         """
         获取用户钱包交易流水
         :param user_id: 用户ID
@@ -40,6 +48,8 @@ class WalletService:
         :param page: 页码
         :param per_page: 每页数量
         :param sort_by: 排序方式，例如"created_at_desc"
+        :param cursor: 游标分页参数，非 None 时启用游标分页 (空字符串表示第一页)
+        :param include_total: 游标分页时是否统计总数
         :return: 交易流水列表和分页信息
         """
         if filters is None:
@@ -89,6 +99,15 @@ class WalletService:
             # 默认按创建时间倒序
             query = query.order_by(WalletTransaction.created_at.desc())
         
+        if cursor is not None:
+            keyset_orders = {
+                'created_at_asc': [(WalletTransaction.created_at, 'asc'), (WalletTransaction.id, 'asc')],
+                'amount_desc': [(WalletTransaction.amount, 'desc'), (WalletTransaction.id, 'desc')],
+                'amount_asc': [(WalletTransaction.amount, 'asc'), (WalletTransaction.id, 'asc')],
+            }
+            order_by = keyset_orders.get(sort_by, [(WalletTransaction.created_at, 'desc'), (WalletTransaction.id, 'desc')])
+            return keyset_paginate(query, order_by, cursor=cursor, per_page=per_page, include_total=include_total)
+        
         # 执行分页
         paginated_transactions = query.paginate(page=page, per_page=per_page, error_out=False)
         
@@ -148,45 +167,42 @@ class WalletService:
             raise InvalidUsageException(message="未提供账户信息", error_code=40017)
         
         try:
-            # 开始数据库事务
-            with db.session.begin():
-                # 更新钱包余额
-                wallet.balance -= requested_amount
-                wallet.frozen_balance += requested_amount
-                
-                # 创建提现申请记录
-                new_withdrawal_request = WithdrawalRequest(
-                    user_id=user_id,
-                    amount=requested_amount,
-                    withdrawal_method=withdrawal_method,
-                    account_info=account_info,
-                    status=WithdrawalStatusEnum.pending,
-                    platform_fee=platform_fee,
-                    actual_amount=actual_amount
-                )
-                
-                db.session.add(new_withdrawal_request)
-                db.session.flush()  # 获取新记录的ID
-                
-                # 创建钱包交易记录
-                new_transaction = WalletTransaction(
-                    user_id=user_id,
-                    transaction_type=TransactionTypeEnum.withdrawal,
-                    amount=-requested_amount,
-                    balance_after=wallet.balance,
+            # 创建提现申请记录
+            new_withdrawal_request = WithdrawalRequest(
+                user_id=user_id,
+                amount=requested_amount,
+                withdrawal_method=withdrawal_method,
+                account_info=account_info,
+                status=WithdrawalStatusEnum.pending,
+                platform_fee=platform_fee,
+                actual_amount=actual_amount
+            )
+            
+            db.session.add(new_withdrawal_request)
+            db.session.flush()  # 获取新记录的ID
+            
+            # 可用余额转入冻结金额 (条件更新，并发提现不会透支)
+            wallet_ledger.post_entries([
+                LedgerEntry(
+                    user_id,
+                    TransactionTypeEnum.withdrawal,
+                    balance_delta=-requested_amount,
+                    frozen_delta=requested_amount,
                     related_withdrawal_id=new_withdrawal_request.id,
                     description=f"提现申请 ({withdrawal_method})"
                 )
-                
-                db.session.add(new_transaction)
+            ])
+            db.session.commit()
             
-            # 事务已提交
             current_app.logger.info(f"用户 {user_id} 成功申请提现 {requested_amount}，实际到账 {actual_amount}，手续费 {platform_fee}")
             
             return new_withdrawal_request
             
+        except InsufficientFundsException:
+            db.session.rollback()
+            raise InsufficientFundsException(message="钱包余额不足")
         except Exception as e:
-            # 事务已回滚
+            db.session.rollback()
             current_app.logger.error(f"申请提现失败: {str(e)}")
             raise BusinessException(message=f"申请提现失败: {str(e)}", status_code=500, error_code=50001)
 
@@ -246,9 +262,9 @@ class PaymentService:
             raise AuthorizationException(message="您不是此订单的雇主，无权支付", error_code=40301)
         
         # 状态校验：确认订单状态允许支付
-        if order.status not in [OrderStatusEnum.pending_start]:
+        if order.status != OrderStatusEnum.pending_start.value:
             raise InvalidUsageException(
-                message=f"订单当前状态（{order.status.value}）不允许支付", 
+                message=f"订单当前状态（{order.status}）不允许支付", 
                 error_code=40018
             )
         
@@ -262,7 +278,7 @@ class PaymentService:
         # 检查是否已有待支付记录
         existing_payment = Payment.query.filter_by(
             order_id=order_id, 
-            status=PaymentStatusEnum.pending
+            status=PaymentStatusEnum.pending.value
         ).first()
         
         if existing_payment:
@@ -279,7 +295,7 @@ class PaymentService:
         try:
             # 创建Payment记录
             new_payment = Payment(
-                status=PaymentStatusEnum.pending,
+                status=PaymentStatusEnum.pending.value,
                 order_id=order_id,
                 payer_user_id=payer_user_id,
                 payee_user_id=platform_escrow_user_id,
@@ -307,9 +323,7 @@ class PaymentService:
         获取平台系统账户ID
         :return: 平台托管账户的用户ID
         """
-        # TODO: 从系统配置获取平台账户ID，或查询具有特定角色的系统用户
-        # 这里简化实现，返回一个固定的ID
-        return 1  # 假设ID为1的用户是平台托管账户
+        return wallet_ledger.escrow_user_id()
 
     def _generate_payment_gateway_payload(self, payment):
         """
@@ -393,8 +407,8 @@ class PaymentService:
             return False
         
         # 状态检查与幂等性：避免重复处理
-        if payment.status in [PaymentStatusEnum.succeeded, PaymentStatusEnum.failed]:
-            current_app.logger.info(f"支付 {internal_transaction_id} 已处理，当前状态: {payment.status.value}")
+        if payment.status in [PaymentStatusEnum.succeeded.value, PaymentStatusEnum.failed.value]:
+            current_app.logger.info(f"支付 {internal_transaction_id} 已处理，当前状态: {payment.status}")
             return True  # 已处理，返回成功
         
         # 获取支付状态
@@ -403,39 +417,51 @@ class PaymentService:
             current_app.logger.error(f"支付回调状态无效: {payment_status}")
             return False
         
+        new_status = PaymentStatusEnum.succeeded if payment_status == 'success' else PaymentStatusEnum.failed
+        
         try:
-            # 开始数据库事务
-            with db.session.begin():
-                # 更新支付记录
-                if payment_status == 'success':
-                    payment.status = PaymentStatusEnum.succeeded
-                    payment.paid_at = datetime.utcnow()
-                else:
-                    payment.status = PaymentStatusEnum.failed
-                    payment.error_code = webhook_payload.get('error_code')
-                    payment.error_message = webhook_payload.get('error_message')
-                
-                payment.external_transaction_id = webhook_payload.get('external_transaction_id')
-                
-                # 如果支付成功，执行后续业务逻辑
-                if payment_status == 'success':
-                    # 更新订单状态
-                    order = Order.query.get(payment.order_id)
-                    if order:
-                        order.status = OrderStatusEnum.in_progress  # 假设支付成功后订单状态变为进行中
-                    
-                    # 资金操作
-                    self._process_successful_payment(payment)
+            # 条件更新抢占该支付的处理权，并发/重复回调只有一个能入账
+            if not self._claim_payment(payment, new_status):
+                db.session.rollback()
+                current_app.logger.info(f"支付 {internal_transaction_id} 已被其他回调处理")
+                return True
+            
+            # 更新支付记录
+            if payment_status == 'success':
+                payment.paid_at = datetime.utcnow()
+            else:
+                payment.error_code = webhook_payload.get('error_code')
+                payment.error_message = webhook_payload.get('error_message')
+            
+            payment.external_transaction_id = webhook_payload.get('external_transaction_id')
             
-            # 事务已提交
+            # 如果支付成功，执行后续业务逻辑
+            if payment_status == 'success':
+                # 资金操作与订单状态迁移
+                self._process_successful_payment(payment)
+            
+            db.session.commit()
             current_app.logger.info(f"支付回调处理成功: {internal_transaction_id}, 状态: {payment_status}")
             return True
             
         except Exception as e:
-            # 事务已回滚
+            db.session.rollback()
             current_app.logger.error(f"处理支付回调时出错: {str(e)}")
             return False
 
+    def _claim_payment(self, payment, new_status):
+        """
+        以条件 UPDATE 将支付从处理中状态转为终态
+        :return: 是否抢占成功 (False 表示已被其他请求处理)
+        """
+        claimed = Payment.query.filter(
+            Payment.id == payment.id,
+            Payment.status.in_([PaymentStatusEnum.pending.value, PaymentStatusEnum.processing.value])
+        ).update({'status': new_status.value}, synchronize_session=False)
+        if claimed:
+            payment.status = new_status.value
+        return bool(claimed)
+
     def _process_successful_payment(self, payment):
         """
         处理成功支付的后续资金操作
@@ -444,46 +470,26 @@ class PaymentService:
         """
         from flask import current_app
         
-        # 1. 雇主支出流水
-        payer_wallet = UserWallet.query.filter_by(user_id=payment.payer_user_id).first()
-        if not payer_wallet:
-            current_app.logger.error(f"支付者 {payment.payer_user_id} 的钱包不存在")
-            raise BusinessException(message="支付者钱包不存在", status_code=500, error_code=50003)
-        
-        # 记录雇主支出交易
-        payer_transaction = WalletTransaction(
-            user_id=payment.payer_user_id,
-            transaction_type=TransactionTypeEnum.payment,
-            amount=-payment.amount,
-            balance_after=payer_wallet.balance,  # 不需要修改余额，因为是托管支付
-            related_payment_id=payment.id,
-            related_order_id=payment.order_id,
-            description=f"支付订单 #{payment.order_id}"
-        )
-        
-        db.session.add(payer_transaction)
-        
-        # 2. 平台托管账户收入流水
-        platform_wallet = UserWallet.query.filter_by(user_id=payment.payee_user_id).first()
-        if not platform_wallet:
-            current_app.logger.error(f"平台托管账户 {payment.payee_user_id} 的钱包不存在")
-            raise BusinessException(message="平台托管账户钱包不存在", status_code=500, error_code=50004)
-        
-        # 更新平台托管账户余额
-        platform_wallet.balance += payment.amount
-        
-        # 记录平台托管收入交易
-        platform_transaction = WalletTransaction(
-            user_id=payment.payee_user_id,
-            transaction_type=TransactionTypeEnum.deposit,
-            amount=payment.amount,
-            balance_after=platform_wallet.balance,
-            related_payment_id=payment.id,
-            related_order_id=payment.order_id,
-            description=f"托管订单 #{payment.order_id} 资金"
-        )
-        
-        db.session.add(platform_transaction)
+        # 1. 雇主支出流水 (托管支付，资金来自外部渠道，雇主可用余额不变)
+        # 2. 平台托管账户收入
+        wallet_ledger.post_entries([
+            LedgerEntry(
+                payment.payer_user_id,
+                TransactionTypeEnum.payment,
+                amount=-payment.amount,
+                related_payment_id=payment.id,
+                related_order_id=payment.order_id,
+                description=f"支付订单 #{payment.order_id}"
+            ),
+            LedgerEntry(
+                payment.payee_user_id,
+                TransactionTypeEnum.deposit,
+                balance_delta=payment.amount,
+                related_payment_id=payment.id,
+                related_order_id=payment.order_id,
+                description=f"托管订单 #{payment.order_id} 资金"
+            ),
+        ])
         
         # 3. 计算零工应得收入（仅作计算，不实际入账）
         order = Order.query.get(payment.order_id)
@@ -494,6 +500,10 @@ class PaymentService:
             
             current_app.logger.info(f"计算订单 {order.id} 的零工收入: {freelancer_income}")
 
+        # 4. 待开始的订单进入进行中 (按订单状态机条件迁移，已开始、争议中或已取消的订单保持不变)
+        if not order_service.apply_platform_transition(payment.order_id, 'payment_succeeded'):
+            current_app.logger.info(f"订单 {payment.order_id} 不是待开始状态，支付成功后不变更订单状态")
+
     def confirm_payment_status(self, current_user_id, internal_transaction_id, confirmation_data):
         """
         手动确认支付状态（管理员功能）
@@ -517,9 +527,9 @@ class PaymentService:
             raise NotFoundException(message="支付记录不存在", error_code=40406)
         
         # 状态检查：避免修改已经是终态的支付
-        if payment.status in [PaymentStatusEnum.succeeded, PaymentStatusEnum.failed]:
+        if payment.status in [PaymentStatusEnum.succeeded.value, PaymentStatusEnum.failed.value]:
             raise InvalidUsageException(
-                message=f"支付已是终态 ({payment.status.value})，无法修改", 
+                message=f"支付已是终态 ({payment.status})，无法修改", 
                 error_code=40019
             )
         
@@ -528,36 +538,35 @@ class PaymentService:
         if status not in ['succeeded', 'failed']:
             raise InvalidUsageException(message="无效的支付状态", error_code=40020)
         
+        new_status = PaymentStatusEnum.succeeded if status == 'succeeded' else PaymentStatusEnum.failed
+        
         try:
-            # 开始事务
-            with db.session.begin():
-                # 更新支付记录
-                if status == 'succeeded':
-                    payment.status = PaymentStatusEnum.succeeded
-                    payment.paid_at = confirmation_data.get('paid_at', datetime.utcnow())
-                else:
-                    payment.status = PaymentStatusEnum.failed
-                    payment.error_code = confirmation_data.get('error_code')
-                    payment.error_message = confirmation_data.get('error_message', '管理员手动确认失败')
-                
-                payment.external_transaction_id = confirmation_data.get('external_transaction_id', f"manual_{internal_transaction_id}")
-                
-                # 如果确认为成功，执行后续业务逻辑
-                if status == 'succeeded':
-                    # 更新订单状态
-                    order = Order.query.get(payment.order_id)
-                    if order:
-                        order.status = OrderStatusEnum.in_progress
-                    
-                    # 资金操作
-                    self._process_successful_payment(payment)
+            if not self._claim_payment(payment, new_status):
+                db.session.rollback()
+                raise InvalidUsageException(message="支付已被其他请求处理，无法修改", error_code=40019)
+            
+            # 更新支付记录
+            if status == 'succeeded':
+                payment.paid_at = confirmation_data.get('paid_at', datetime.utcnow())
+            else:
+                payment.error_code = confirmation_data.get('error_code')
+                payment.error_message = confirmation_data.get('error_message', '管理员手动确认失败')
+            
+            payment.external_transaction_id = confirmation_data.get('external_transaction_id', f"manual_{internal_transaction_id}")
             
-            # 事务已提交
+            # 如果确认为成功，执行后续业务逻辑
+            if status == 'succeeded':
+                # 资金操作与订单状态迁移
+                self._process_successful_payment(payment)
+            
+            db.session.commit()
             current_app.logger.info(f"管理员 {current_user_id} 手动确认支付 {internal_transaction_id} 状态为 {status}")
             return payment
             
+        except InvalidUsageException:
+            raise
         except Exception as e:
-            # 事务已回滚
+            db.session.rollback()
             current_app.logger.error(f"手动确认支付状态时出错: {str(e)}")
             raise BusinessException(message=f"确认支付状态失败: {str(e)}", status_code=500, error_code=50005)
 
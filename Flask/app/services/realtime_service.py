@@ -0,0 +1,334 @@
+"""
+实时推送 (Server-Sent Events + Pub/Sub)
+
+客户端原先轮询消息与通知接口来发现新内容。这里提供按用户的事件推送:
+- send_new_message / create_notification 提交后调用 publish_to_user() 发布事件 (发布失败只记录警告，不影响业务)
+- /communications/stream (SSE) 订阅当前用户的事件，空闲时定期发送心跳注释，连接保持 REALTIME_STREAM_MAX_SECONDS 后
+  由服务端关闭，客户端 (EventSource) 自动重连
+- 断线续传: 每个事件带递增ID，重连时客户端携带 Last-Event-ID，服务端补发每个用户最近 REALTIME_HISTORY_SIZE 条中
+  之后的事件；无法补全 (事件已被淘汰或事件ID来自已重启的进程) 时发送 resync 事件，客户端应重新拉取列表
+- 补发窗口 REALTIME_HISTORY_TTL_SECONDS: 进程内后端在发布时顺带清理超过窗口未收到新事件且没有订阅者的用户历史，
+  内存占用只与近期活跃的用户数相关；最后收到的事件早于已清理的事件时发送 resync
+- 可插拔: REALTIME_BACKEND='memory' 为进程内 Pub/Sub (单节点)；'redis' 使用 Redis Pub/Sub 跨进程分发，
+  事件ID由 Redis INCR 生成，最近事件保存在按用户的 Redis 列表中；每个进程只建立一个 Redis 订阅连接，
+  由后台线程分发给本进程内的订阅者
+- 订阅者队列满 (客户端过慢) 时断开该订阅，客户端重连后补发
+- SSE 连接会长时间占用一个工作线程，部署时需使用多线程或协程 worker
+"""
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+
+from flask import current_app
+
+_EVENT_ID_KEY = 'realtime:event_id'
+_HISTORY_KEY = 'realtime:history:{}'
+_CHANNEL_PREFIX = 'realtime:user:'
+
+
+class Subscription:
+    """单个 SSE 连接的订阅"""
+
+    def __init__(self, broker, user_id, queue_size):
+        self.broker = broker
+        self.user_id = user_id
+        self.overflowed = False
+        self._queue = queue.Queue(maxsize=queue_size)
+
+    def deliver(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """:return: 下一个事件；超时返回 None"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InMemoryRealtimeBroker:
+    """进程内 Pub/Sub: 订阅者与最近事件都保存在当前进程"""
+
+    def __init__(self, history_size=100, queue_size=100, history_ttl=3600):
+        self._history_size = history_size
+        self._queue_size = queue_size
+        self._history_ttl = history_ttl
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        # {user_id: (最近事件, 最后发布时间)}，按最后发布时间排序，最久未发布的在前
+        self._history = OrderedDict()
+        self._event_ids = itertools.count(1)
+        self._last_event_id = 0
+        # 已清理的历史中最大的事件ID，早于它的 Last-Event-ID 无法判断是否完整
+        self._evicted_event_id = 0
+        self._next_sweep = 0
+
+    def publish(self, user_id, event_type, data):
+        now = time.monotonic()
+        with self._lock:
+            event_id = next(self._event_ids)
+            self._last_event_id = event_id
+            event = {'id': event_id, 'type': event_type, 'data': data}
+            history = self._history.pop(user_id, (None, None))[0] or deque(maxlen=self._history_size)
+            history.append(event)
+            self._history[user_id] = (history, now)
+            if now >= self._next_sweep:
+                self._evict_idle_history(now)
+        self._deliver(user_id, event)
+        return event
+
+    def _evict_idle_history(self, now):
+        """清理超过补发窗口未发布新事件且没有订阅者的用户历史 (持有锁时调用)"""
+        self._next_sweep = now + min(self._history_ttl, 60)
+        cutoff = now - self._history_ttl
+        while self._history:
+            user_id, (history, published_at) = next(iter(self._history.items()))
+            if published_at > cutoff:
+                break
+            if self._subscribers.get(user_id):
+                # 仍在线的用户保留历史，重新计时
+                self._history.move_to_end(user_id)
+                self._history[user_id] = (history, now)
+                continue
+            del self._history[user_id]
+            self._evicted_event_id = max(self._evicted_event_id, history[-1]['id'])
+
+    def subscribe(self, user_id):
+        subscription = Subscription(self, user_id, self._queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def replay(self, user_id, last_event_id):
+        """
+        最后收到的事件之后的事件
+        :return: (事件列表, 是否完整)
+        """
+        with self._lock:
+            history = list(self._history.get(user_id, ((), None))[0])
+            latest_event_id = self._last_event_id
+            evicted_event_id = self._evicted_event_id
+        events, complete = self._events_after(history, last_event_id, latest_event_id)
+        return events, complete and last_event_id >= evicted_event_id
+
+    def _events_after(self, history, last_event_id, latest_event_id):
+        if last_event_id < 0 or last_event_id > latest_event_id:
+            # 事件ID无法识别或来自重启前的进程，无法判断遗漏了哪些事件
+            return [], False
+        events = [event for event in history if event['id'] > last_event_id]
+        # 历史已满且最早一条也未收到时，之前可能还有已被淘汰的事件
+        complete = len(history) < self._history_size or history[0]['id'] <= last_event_id
+        return events, complete
+
+    def _deliver(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def reset(self):
+        """清空订阅与历史 (fork 出的子进程调用)"""
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._history = OrderedDict()
+        self._evicted_event_id = 0
+        self._next_sweep = 0
+
+
+class RedisRealtimeBroker(InMemoryRealtimeBroker):
+    """Redis Pub/Sub: 事件经 Redis 分发到所有进程，每个进程由一个后台线程转发给本进程的订阅者"""
+
+    def __init__(self, history_size=100, queue_size=100, redis_url=None, history_ttl=3600):
+        super().__init__(history_size=history_size, queue_size=queue_size, history_ttl=history_ttl)
+        import redis # 可选依赖，仅在启用 redis 后端时需要
+        self._redis = redis.Redis.from_url(redis_url)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, user_id, event_type, data):
+        event = {'id': int(self._redis.incr(_EVENT_ID_KEY)), 'type': event_type, 'data': data}
+        payload = json.dumps(event, ensure_ascii=False, separators=(',', ':'), default=str)
+        history_key = _HISTORY_KEY.format(user_id)
+        pipeline = self._redis.pipeline()
+        pipeline.lpush(history_key, payload)
+        pipeline.ltrim(history_key, 0, self._history_size - 1)
+        pipeline.expire(history_key, self._history_ttl)
+        pipeline.publish(f"{_CHANNEL_PREFIX}{user_id}", payload)
+        pipeline.execute()
+        return event
+
+    def subscribe(self, user_id):
+        self._ensure_listener()
+        return super().subscribe(user_id)
+
+    def replay(self, user_id, last_event_id):
+        latest_event_id = int(self._redis.get(_EVENT_ID_KEY) or 0)
+        history = [json.loads(payload) for payload in reversed(self._redis.lrange(_HISTORY_KEY.format(user_id), 0, -1))]
+        return self._events_after(history, last_event_id, latest_event_id)
+
+    def _ensure_listener(self):
+        if self._listener is not None and self._listener.is_alive():
+            return
+        with self._listener_lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen, name='realtime-redis-listener', daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        while True:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(f"{_CHANNEL_PREFIX}*")
+                for message in pubsub.listen():
+                    user_id = int(message['channel'].decode().rsplit(':', 1)[1])
+                    self._deliver(user_id, json.loads(message['data']))
+            except Exception:
+                # 连接中断: 稍后重新订阅，期间的事件由客户端重连时的补发覆盖
+                time.sleep(1)
+            finally:
+                pubsub.close()
+
+    def reset(self):
+        super().reset()
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+
+_BACKENDS = {
+    'memory': InMemoryRealtimeBroker,
+    'redis': RedisRealtimeBroker,
+}
+
+
+def register_realtime_backend(name, backend_cls):
+    """注册自定义推送后端 (需实现 publish/subscribe/unsubscribe/replay/reset)"""
+    _BACKENDS[name] = backend_cls
+
+
+class RealtimeService:
+    def __init__(self):
+        self._broker = None
+        self._backend_name = None
+        self._broker_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    # --- 发布 ---
+    def publish_to_user(self, user_id, event_type, data):
+        """
+        向用户发布事件 (在业务事务提交后调用)，推送失败只记录警告
+        :param user_id: 接收用户ID
+        :param event_type: 事件类型 (message/notification)
+        :param data: 可 JSON 序列化的事件数据
+        """
+        if not current_app.config.get('REALTIME_ENABLED', True):
+            return None
+        try:
+            return self._get_broker().publish(user_id, event_type, data)
+        except Exception as e:
+            current_app.logger.warning(f"[RealtimeService] 推送事件失败 (用户 {user_id}): {str(e)}")
+            return None
+
+    # --- 订阅 ---
+    def stream(self, user_id, last_event_id=None):
+        """
+        生成用户的 SSE 事件流 (生成器不依赖请求上下文，可在请求结束后继续迭代)
+        :param user_id: 当前用户ID
+        :param last_event_id: 客户端最后收到的事件ID (Last-Event-ID)
+        :return: SSE 文本片段的生成器
+        """
+        config = current_app.config
+        heartbeat = config.get('REALTIME_HEARTBEAT_SECONDS', 15)
+        max_seconds = config.get('REALTIME_STREAM_MAX_SECONDS', 300)
+        retry_ms = config.get('REALTIME_RETRY_MILLISECONDS', 3000)
+        broker = self._get_broker()
+
+        # 先订阅再补发，补发与实时事件按事件ID去重，两者之间不会漏事件
+        subscription = broker.subscribe(user_id)
+        replayed, complete = broker.replay(user_id, last_event_id) if last_event_id is not None else ([], True)
+
+        def generate():
+            try:
+                yield f"retry: {retry_ms}\n\n"
+                last_sent = last_event_id or 0
+                if not complete:
+                    yield self._format({'id': None, 'type': 'resync', 'data': {}})
+                for event in replayed:
+                    yield self._format(event)
+                    last_sent = max(last_sent, event['id'])
+
+                deadline = time.monotonic() + max_seconds
+                while time.monotonic() < deadline:
+                    event = subscription.get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0)))
+                    if subscription.overflowed:
+                        # 客户端处理过慢，断开后由重连补发
+                        yield self._format({'id': None, 'type': 'resync', 'data': {}})
+                        return
+                    if event is None:
+                        yield ": heartbeat\n\n"
+                        continue
+                    if event['id'] <= last_sent:
+                        continue
+                    yield self._format(event)
+                    last_sent = event['id']
+            finally:
+                subscription.close()
+
+        return generate()
+
+    def _format(self, event):
+        lines = []
+        if event['id'] is not None:
+            lines.append(f"id: {event['id']}")
+        lines.append(f"event: {event['type']}")
+        lines.append(f"data: {json.dumps(event['data'], ensure_ascii=False, separators=(',', ':'), default=str)}")
+        return '\n'.join(lines) + '\n\n'
+
+    # --- 后端 ---
+    def _get_broker(self):
+        backend_name = current_app.config.get('REALTIME_BACKEND', 'memory')
+        if self._broker is not None and self._backend_name == backend_name:
+            return self._broker
+        with self._broker_lock:
+            if self._broker is None or self._backend_name != backend_name:
+                backend_cls = _BACKENDS.get(backend_name)
+                if backend_cls is None:
+                    raise ValueError(f"未知的推送后端: {backend_name}")
+                options = {
+                    'history_size': current_app.config.get('REALTIME_HISTORY_SIZE', 100),
+                    'queue_size': current_app.config.get('REALTIME_SUBSCRIBER_QUEUE_SIZE', 100),
+                    'history_ttl': current_app.config.get('REALTIME_HISTORY_TTL_SECONDS', 3600),
+                }
+                if backend_name == 'redis':
+                    options['redis_url'] = current_app.config.get('REALTIME_REDIS_URL') or current_app.config.get('REDIS_URL')
+                self._broker = backend_cls(**options)
+                self._backend_name = backend_name
+        return self._broker
+
+    def _reset_after_fork(self):
+        # 子进程不继承父进程的订阅者与订阅线程
+        if self._broker is not None:
+            self._broker.reset()
+        self._broker_lock = threading.Lock()
+
+
+realtime_service = RealtimeService()
@@ -0,0 +1,79 @@
+"""
+定时任务租约 (Scheduler Leases)
+
+定时任务 (订单自动确认、工作过期清理等) 可以在多个节点上同时启动，由 scheduler_leases 表中的租约决定谁来执行：
+- acquire(): 条件 UPDATE 抢占 "不存在、已过期或本就属于自己" 的租约，不存在时插入 (并发插入冲突视为抢占失败)
+- 执行期间每处理一批调用 renew() 续约；续约失败说明租约已过期并被其他节点接管，当前节点应立即停止
+- release(): 执行结束后主动释放；进程崩溃时租约在 ttl 后自然过期
+- 租约操作使用独立连接并立即提交，不受调用方会话中事务的影响
+"""
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from ..core.extensions import db
+from ..models.system import SchedulerLease
+
+_leases = SchedulerLease.__table__
+
+
+def new_lease_holder():
+    """租约持有者标识: 主机名:进程号:随机串 (同一进程内的多次执行也互不相同)"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class SchedulerLeaseService:
+    def acquire(self, name, holder, ttl_seconds):
+        """
+        尝试获得租约
+        :param name: 定时任务名称
+        :param holder: 持有者标识 (new_lease_holder())
+        :param ttl_seconds: 租约有效期 (秒)
+        :return: 是否获得租约
+        """
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl_seconds)
+        with db.engine.begin() as connection:
+            taken = connection.execute(
+                _leases.update()
+                .where(_leases.c.name == name, or_(_leases.c.holder == holder, _leases.c.expires_at <= now))
+                .values(holder=holder, expires_at=expires_at, acquired_at=now)
+            ).rowcount
+        if taken:
+            return True
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(_leases.insert().values(name=name, holder=holder, expires_at=expires_at, acquired_at=now))
+            return True
+        except IntegrityError:
+            # 租约已存在且由其他节点持有 (或其他节点刚刚插入)
+            return False
+
+    def renew(self, name, holder, ttl_seconds):
+        """
+        续约 (只有当前持有者且租约未过期时成功)
+        :return: 是否仍持有租约
+        """
+        now = datetime.utcnow()
+        with db.engine.begin() as connection:
+            return bool(connection.execute(
+                _leases.update()
+                .where(_leases.c.name == name, _leases.c.holder == holder, _leases.c.expires_at > now)
+                .values(expires_at=now + timedelta(seconds=ttl_seconds))
+            ).rowcount)
+
+    def release(self, name, holder):
+        """释放租约，其他节点可立即获得"""
+        with db.engine.begin() as connection:
+            connection.execute(
+                _leases.update()
+                .where(_leases.c.name == name, _leases.c.holder == holder)
+                .values(expires_at=datetime.utcnow())
+            )
+
+
+scheduler_lease_service = SchedulerLeaseService()
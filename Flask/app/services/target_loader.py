@@ -0,0 +1,70 @@
+"""
+多态目标批量加载 (Batched Target Loader)
+
+收藏 (favorite_type + target_id)、举报 (report_type + target_id) 等记录都以 "类型 + ID" 指向不同的业务对象。
+逐条 `Model.query.get()` 再访问懒加载关系会导致 N+1 查询；这里按目标模型分组，
+每个模型只发一条 `IN` 查询，并预先加载展示摘要所需的关联对象。
+"""
+from sqlalchemy.orm import joinedload, selectinload
+
+from ..models.job import Job
+from ..models.message import Message
+from ..models.order import Order, Evaluation
+from ..models.user import User
+
+
+def _enum_value(value):
+    return value.value if hasattr(value, 'value') else value
+
+
+class TargetLoader:
+    # 目标类型 -> 模型；freelancer/employer 都指向 users 表，会合并到同一条查询中
+    TARGET_MODELS = {
+        'job': Job,
+        'user': User,
+        'freelancer': User,
+        'employer': User,
+        'order': Order,
+        'message': Message,
+        'evaluation': Evaluation,
+    }
+
+    # 各模型加载时预取的关联 (与摘要展示用到的字段保持一致)
+    MODEL_LOAD_OPTIONS = {
+        Job: lambda: [joinedload(Job.employer).joinedload(User.employer_profile)],
+        User: lambda: [selectinload(User.freelancer_profile), selectinload(User.employer_profile)],
+        Order: lambda: [joinedload(Order.job)],
+    }
+
+    def load(self, targets):
+        """
+        批量加载目标对象
+        :param targets: 可迭代的 (target_type, target_id)，target_type 可以是字符串或枚举
+        :return: {(target_type 字符串, target_id): 对象}，不存在的目标不会出现在结果中
+        """
+        targets = list(targets)
+        ids_by_model = {}
+        for target_type, target_id in targets:
+            model = self.TARGET_MODELS.get(_enum_value(target_type))
+            if model is not None and target_id is not None:
+                ids_by_model.setdefault(model, set()).add(target_id)
+
+        objects_by_model = {}
+        for model, ids in ids_by_model.items():
+            query = model.query.filter(model.id.in_(ids))
+            options = self.MODEL_LOAD_OPTIONS.get(model)
+            if options:
+                query = query.options(*options())
+            objects_by_model[model] = {obj.id: obj for obj in query.all()}
+
+        loaded = {}
+        for target_type, target_id in targets:
+            type_key = _enum_value(target_type)
+            model = self.TARGET_MODELS.get(type_key)
+            obj = objects_by_model.get(model, {}).get(target_id)
+            if obj is not None:
+                loaded[(type_key, target_id)] = obj
+        return loaded
+
+
+target_loader = TargetLoader()
@@ -0,0 +1,519 @@
+"""
+后台任务队列 (Background Task Queue)
+
+急聘匹配通知、公告广播等副作用原先在请求线程或进程内线程池中执行，进程重启时未完成的任务直接丢失。
+这里提供一个不依赖外部 broker 的持久化任务队列：
+- 定义: 用 @task 装饰模块级函数，调用方通过 .delay(*args, **kwargs) 或 .apply_async(...) 入队；
+  参数需可 JSON 序列化 (传ID，不传 ORM 对象)，任务在 worker 中重新读取数据；直接调用被装饰的函数仍同步执行
+- 入队使用独立连接并立即提交 (同调度租约)，应在业务事务提交后调用，避免任务读到未提交的数据
+- 幂等键: apply_async(idempotency_key=...) 相同的键只入队一次，重复入队返回已有任务ID
+- 执行: manage.py worker 启动 TASK_QUEUE_WORKERS 个线程，每个线程循环领取一个到期任务执行；
+  领取为条件 UPDATE (status、attempts 未变化时才能领取)，多个 worker 进程/节点可同时运行
+- 租约: 领取时将 run_at 设为租约到期时间 (TASK_QUEUE_LEASE_SECONDS)，worker 崩溃后任务在租约到期时被重新领取，
+  因此任务可能被执行多次 (至少一次语义)，任务本身应可重复执行
+- 重试: 任务抛出异常时按指数退避 (TASK_QUEUE_RETRY_BACKOFF_SECONDS 起每次翻倍，带随机抖动，不超过上限) 重新排队，
+  执行 max_attempts 次仍失败或抛出 4xx 业务异常 (重试也不会成功) 时标记为 failed 并保留错误信息
+- 可插拔: TASK_QUEUE_BACKEND='database' 使用 background_tasks 表 (本地开发与测试无需任何外部服务)；
+  'redis' 使用 Redis (有序集合按可执行时间调度，领取与完成由 Lua 脚本原子执行)
+"""
+import functools
+import json
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ..core.extensions import db
+from ..models.system import BackgroundTask, BackgroundTaskStatusEnum
+from ..utils.exceptions import BusinessException
+from .scheduler_lease import new_lease_holder
+
+_tasks = BackgroundTask.__table__
+
+# worker 领取到的任务
+ClaimedTask = namedtuple('ClaimedTask', ['id', 'name', 'args', 'kwargs', 'attempts', 'max_attempts'])
+
+_ERROR_MAX_LENGTH = 2000
+
+
+class UnknownTaskError(Exception):
+    """任务名称未注册 (worker 未加载定义任务的模块，或任务已被删除)"""
+
+
+class DatabaseTaskBackend:
+    """background_tasks 表: 按 (status, run_at) 索引领取到期任务"""
+
+    CLAIM_CANDIDATES = 10
+
+    def enqueue(self, name, payload, idempotency_key, countdown, max_attempts):
+        now = datetime.utcnow()
+        values = {
+            'name': name, 'payload': payload, 'idempotency_key': idempotency_key,
+            'status': BackgroundTaskStatusEnum.queued, 'attempts': 0, 'max_attempts': max_attempts,
+            'run_at': now + timedelta(seconds=countdown or 0), 'created_at': now, 'updated_at': now,
+        }
+        try:
+            with db.engine.begin() as connection:
+                return connection.execute(_tasks.insert().values(**values)).inserted_primary_key[0], True
+        except IntegrityError:
+            if idempotency_key is None:
+                raise
+            with db.engine.connect() as connection:
+                task_id = connection.execute(select(_tasks.c.id).where(_tasks.c.idempotency_key == idempotency_key)).scalar()
+            if task_id is None:
+                raise
+            return task_id, False
+
+    def claim(self, worker_id, lease_seconds):
+        now = datetime.utcnow()
+        with db.engine.connect() as connection:
+            candidates = connection.execute(
+                select(_tasks.c.id, _tasks.c.name, _tasks.c.payload, _tasks.c.status, _tasks.c.attempts, _tasks.c.max_attempts)
+                .where(_tasks.c.status.in_((BackgroundTaskStatusEnum.queued, BackgroundTaskStatusEnum.running)),
+                       _tasks.c.run_at <= now)
+                .order_by(_tasks.c.run_at.asc()).limit(self.CLAIM_CANDIDATES)
+            ).all()
+
+        for task_id, name, payload, status, attempts, max_attempts in candidates:
+            # 读取之后被其他 worker 领取或完成的任务条件不成立
+            unchanged = (_tasks.c.id == task_id, _tasks.c.status == status, _tasks.c.attempts == attempts, _tasks.c.run_at <= now)
+            if status == BackgroundTaskStatusEnum.running and attempts >= max_attempts:
+                # 执行中的 worker 崩溃或超过租约，且执行次数已用完
+                with db.engine.begin() as connection:
+                    connection.execute(update(_tasks).where(*unchanged).values(
+                        status=BackgroundTaskStatusEnum.failed, locked_by=None, last_error='执行超过租约时间',
+                        finished_at=now, updated_at=now))
+                continue
+            with db.engine.begin() as connection:
+                taken = connection.execute(update(_tasks).where(*unchanged).values(
+                    status=BackgroundTaskStatusEnum.running, attempts=attempts + 1, locked_by=worker_id,
+                    run_at=now + timedelta(seconds=lease_seconds), updated_at=now)).rowcount
+            if taken:
+                payload = payload or {}
+                return ClaimedTask(task_id, name, payload.get('args', []), payload.get('kwargs', {}), attempts + 1, max_attempts)
+        return None
+
+    def complete(self, task_id, worker_id):
+        return self._finish(task_id, worker_id, status=BackgroundTaskStatusEnum.succeeded, last_error=None)
+
+    def retry(self, task_id, worker_id, delay_seconds, error):
+        now = datetime.utcnow()
+        return self._finish(task_id, worker_id, status=BackgroundTaskStatusEnum.queued, last_error=error,
+                            run_at=now + timedelta(seconds=delay_seconds), finished=False)
+
+    def fail(self, task_id, worker_id, error):
+        return self._finish(task_id, worker_id, status=BackgroundTaskStatusEnum.failed, last_error=error)
+
+    def _finish(self, task_id, worker_id, finished=True, **values):
+        now = datetime.utcnow()
+        values.update(locked_by=None, updated_at=now)
+        if finished:
+            values['finished_at'] = now
+        with db.engine.begin() as connection:
+            # 只有仍持有该任务的 worker 可以更新 (租约过期后任务可能已被其他 worker 重新领取)
+            return bool(connection.execute(update(_tasks).where(
+                _tasks.c.id == task_id, _tasks.c.locked_by == worker_id,
+                _tasks.c.status == BackgroundTaskStatusEnum.running).values(**values)).rowcount)
+
+    def get(self, task_id):
+        with db.engine.connect() as connection:
+            row = connection.execute(select(_tasks).where(_tasks.c.id == task_id)).mappings().first()
+        if row is None:
+            return None
+        task = dict(row)
+        task['status'] = task['status'].value
+        return task
+
+    def backlog(self):
+        with db.engine.connect() as connection:
+            return connection.execute(select(func.count()).select_from(_tasks).where(
+                _tasks.c.status == BackgroundTaskStatusEnum.queued, _tasks.c.run_at <= datetime.utcnow())).scalar()
+
+    def purge(self, retention_seconds):
+        before = datetime.utcnow() - timedelta(seconds=retention_seconds)
+        with db.engine.begin() as connection:
+            return connection.execute(delete(_tasks).where(
+                _tasks.c.status == BackgroundTaskStatusEnum.succeeded, _tasks.c.finished_at < before)).rowcount
+
+    def reset(self):
+        pass
+
+
+# --- Redis 后端的 Lua 脚本 ---
+_REDIS_ENQUEUE = """
+local prefix, run_at, name, payload, max_attempts, created_at, idempotency_key = unpack(ARGV)
+if idempotency_key ~= '' then
+    local existing = redis.call('GET', prefix .. 'idempotency:' .. idempotency_key)
+    if existing then return {existing, 0} end
+end
+local id = redis.call('INCR', prefix .. 'next_id')
+redis.call('HSET', prefix .. 'task:' .. id, 'name', name, 'payload', payload, 'status', 'queued', 'attempts', 0,
+           'max_attempts', max_attempts, 'created_at', created_at, 'idempotency_key', idempotency_key)
+if idempotency_key ~= '' then redis.call('SET', prefix .. 'idempotency:' .. idempotency_key, id) end
+redis.call('ZADD', prefix .. 'schedule', run_at, id)
+return {tostring(id), 1}
+"""
+
+_REDIS_CLAIM = """
+local prefix, now, lease_until, worker_id = unpack(ARGV)
+local ids = redis.call('ZRANGEBYSCORE', prefix .. 'schedule', '-inf', now, 'LIMIT', 0, 1)
+if #ids == 0 then return false end
+local id = ids[1]
+local key = prefix .. 'task:' .. id
+if redis.call('EXISTS', key) == 0 then
+    redis.call('ZREM', prefix .. 'schedule', id)
+    return {id, 'missing'}
+end
+local attempts = tonumber(redis.call('HGET', key, 'attempts'))
+if redis.call('HGET', key, 'status') == 'running' and attempts >= tonumber(redis.call('HGET', key, 'max_attempts')) then
+    redis.call('ZREM', prefix .. 'schedule', id)
+    redis.call('HSET', key, 'status', 'failed', 'locked_by', '', 'last_error', 'lease expired', 'finished_at', now)
+    return {id, 'expired'}
+end
+redis.call('ZADD', prefix .. 'schedule', lease_until, id)
+redis.call('HSET', key, 'status', 'running', 'locked_by', worker_id, 'attempts', attempts + 1)
+return {id, 'claimed'}
+"""
+
+_REDIS_FINISH = """
+local prefix, id, worker_id, status, run_at, last_error, finished_at, ttl = unpack(ARGV)
+local key = prefix .. 'task:' .. id
+if redis.call('HGET', key, 'locked_by') ~= worker_id or redis.call('HGET', key, 'status') ~= 'running' then return 0 end
+if run_at == '' then redis.call('ZREM', prefix .. 'schedule', id) else redis.call('ZADD', prefix .. 'schedule', run_at, id) end
+redis.call('HSET', key, 'status', status, 'locked_by', '', 'last_error', last_error, 'finished_at', finished_at)
+if tonumber(ttl) > 0 then
+    redis.call('EXPIRE', key, ttl)
+    local idempotency_key = redis.call('HGET', key, 'idempotency_key')
+    if idempotency_key and idempotency_key ~= '' then redis.call('EXPIRE', prefix .. 'idempotency:' .. idempotency_key, ttl) end
+end
+return 1
+"""
+
+
+class RedisTaskBackend:
+    """
+    Redis: 有序集合 tasks:schedule 按可执行时间 (执行中为租约到期时间) 排列任务ID，任务内容存放在 tasks:task:<id> 哈希中；
+    成功的任务在 retention_seconds 后自动过期
+    """
+
+    PREFIX = 'tasks:'
+    CLAIM_ATTEMPTS = 10
+
+    def __init__(self, redis_url=None, retention_seconds=7 * 86400):
+        import redis # 可选依赖，仅在启用 redis 后端时需要
+        self._redis = redis.Redis.from_url(redis_url, decode_responses=True)
+        self._retention_seconds = retention_seconds
+        self._enqueue_script = self._redis.register_script(_REDIS_ENQUEUE)
+        self._claim_script = self._redis.register_script(_REDIS_CLAIM)
+        self._finish_script = self._redis.register_script(_REDIS_FINISH)
+
+    def enqueue(self, name, payload, idempotency_key, countdown, max_attempts):
+        now = time.time()
+        task_id, created = self._enqueue_script(args=[
+            self.PREFIX, now + (countdown or 0), name, json.dumps(payload, separators=(',', ':')), max_attempts,
+            now, idempotency_key or ''])
+        return int(task_id), bool(created)
+
+    def claim(self, worker_id, lease_seconds):
+        for _ in range(self.CLAIM_ATTEMPTS):
+            now = time.time()
+            result = self._claim_script(args=[self.PREFIX, now, now + lease_seconds, worker_id])
+            if not result:
+                return None
+            task_id, outcome = result
+            if outcome != 'claimed':
+                continue
+            task = self._redis.hgetall(f"{self.PREFIX}task:{task_id}")
+            payload = json.loads(task.get('payload') or '{}')
+            return ClaimedTask(int(task_id), task['name'], payload.get('args', []), payload.get('kwargs', {}),
+                               int(task['attempts']), int(task['max_attempts']))
+        return None
+
+    def complete(self, task_id, worker_id):
+        return self._finish(task_id, worker_id, 'succeeded', ttl=self._retention_seconds)
+
+    def retry(self, task_id, worker_id, delay_seconds, error):
+        return self._finish(task_id, worker_id, 'queued', run_at=time.time() + delay_seconds, last_error=error, finished=False)
+
+    def fail(self, task_id, worker_id, error):
+        return self._finish(task_id, worker_id, 'failed', last_error=error)
+
+    def _finish(self, task_id, worker_id, status, run_at='', last_error=None, ttl=0, finished=True):
+        return bool(self._finish_script(args=[self.PREFIX, task_id, worker_id, status, run_at, last_error or '',
+                                              time.time() if finished else '', ttl]))
+
+    def get(self, task_id):
+        task = self._redis.hgetall(f"{self.PREFIX}task:{task_id}")
+        if not task:
+            return None
+        task.update(id=int(task_id), payload=json.loads(task.get('payload') or '{}'),
+                    attempts=int(task['attempts']), max_attempts=int(task['max_attempts']))
+        return task
+
+    def backlog(self):
+        return self._redis.zcount(f"{self.PREFIX}schedule", '-inf', time.time())
+
+    def purge(self, retention_seconds):
+        # 成功的任务由 Redis 过期时间清理
+        return 0
+
+    def reset(self):
+        self._redis.connection_pool.reset()
+
+
+_BACKENDS = {
+    'database': DatabaseTaskBackend,
+    'redis': RedisTaskBackend,
+}
+
+
+def register_task_backend(name, backend_cls):
+    """注册自定义任务队列后端 (需实现 enqueue/claim/complete/retry/fail/get/backlog/purge/reset)"""
+    _BACKENDS[name] = backend_cls
+
+
+# --- 任务定义 ---
+_TASKS = {}
+
+
+class Task:
+    """@task 装饰后的函数: 直接调用时同步执行，.delay() / .apply_async() 入队由 worker 执行"""
+
+    def __init__(self, func, name, max_attempts=None):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """
+        入队 (参数需可 JSON 序列化)
+        :return: 任务ID
+        """
+        return self.apply_async(args, kwargs)
+
+    def apply_async(self, args=(), kwargs=None, idempotency_key=None, countdown=None):
+        """
+        入队
+        :param args: 位置参数
+        :param kwargs: 关键字参数
+        :param idempotency_key: 幂等键，相同的键只入队一次
+        :param countdown: 延迟执行的秒数
+        :return: 任务ID (幂等键重复时为已有任务的ID)
+        """
+        return task_queue.enqueue(self.name, args, kwargs, idempotency_key=idempotency_key, countdown=countdown,
+                                  max_attempts=self.max_attempts)
+
+
+def task(func=None, name=None, max_attempts=None):
+    """
+    将模块级函数注册为后台任务: `@task` 或 `@task(name='...', max_attempts=3)`
+    :param name: 任务名称，默认 "模块名.函数名" (入队后持久化，重命名函数需保留原名称)
+    :param max_attempts: 最多执行次数，默认 TASK_QUEUE_MAX_ATTEMPTS
+    """
+    def decorate(function):
+        task_name = name or f"{function.__module__}.{function.__qualname__}"
+        if task_name in _TASKS and _TASKS[task_name].func is not function:
+            raise ValueError(f"任务名称重复: {task_name}")
+        _TASKS[task_name] = Task(function, task_name, max_attempts=max_attempts)
+        return _TASKS[task_name]
+
+    return decorate(func) if func is not None else decorate
+
+
+# --- 队列 ---
+class TaskQueue:
+    def __init__(self):
+        self._backend = None
+        self._backend_name = None
+        self._backend_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    # --- 入队 ---
+    def enqueue(self, name, args=(), kwargs=None, idempotency_key=None, countdown=None, max_attempts=None):
+        """
+        入队任务 (在业务事务提交后调用)
+        :return: 任务ID
+        """
+        payload = {'args': list(args), 'kwargs': dict(kwargs or {})}
+        json.dumps(payload) # 参数不可序列化时在调用方立即报错
+        max_attempts = max_attempts or current_app.config.get('TASK_QUEUE_MAX_ATTEMPTS', 5)
+        task_id, created = self._get_backend().enqueue(name, payload, idempotency_key, countdown, max_attempts)
+        if not created:
+            current_app.logger.info(f"[TaskQueue] 幂等键 {idempotency_key} 已入队 (任务 {task_id})，忽略重复提交")
+        return task_id
+
+    def get(self, task_id):
+        """
+        查询任务
+        :return: 任务信息 dict (status: queued/running/succeeded/failed)；不存在或已清理时返回 None
+        """
+        return self._get_backend().get(task_id)
+
+    # --- 执行 ---
+    def process_one(self, worker_id):
+        """
+        领取并执行一个到期任务
+        :param worker_id: worker 标识 (每个执行线程唯一)
+        :return: 是否领取到任务
+        """
+        backend = self._get_backend()
+        claimed = backend.claim(worker_id, current_app.config.get('TASK_QUEUE_LEASE_SECONDS', 300))
+        if claimed is None:
+            return False
+
+        started = time.monotonic()
+        try:
+            registered = _TASKS.get(claimed.name)
+            if registered is None:
+                raise UnknownTaskError(f"未注册的任务: {claimed.name}")
+            registered.func(*claimed.args, **claimed.kwargs)
+        except Exception as e:
+            db.session.rollback()
+            self._handle_failure(backend, claimed, worker_id, e)
+        else:
+            if not backend.complete(claimed.id, worker_id):
+                current_app.logger.warning(f"[TaskQueue] 任务 {claimed.id} ({claimed.name}) 执行超过租约时间，可能已被重复执行")
+            else:
+                current_app.logger.info(f"[TaskQueue] 任务 {claimed.id} ({claimed.name}) 执行成功，"
+                                        f"耗时 {round(time.monotonic() - started, 3)} 秒")
+        finally:
+            db.session.remove()
+        return True
+
+    def run_pending(self, worker_id=None, max_tasks=None):
+        """
+        在当前线程中执行到期任务，直到没有到期任务 (测试与 manage.py worker --burst 使用)
+        :return: 执行的任务数
+        """
+        worker_id = worker_id or new_lease_holder()
+        processed = 0
+        while not max_tasks or processed < max_tasks:
+            if not self.process_one(worker_id):
+                break
+            processed += 1
+        return processed
+
+    def _handle_failure(self, backend, claimed, worker_id, error):
+        message = f"{type(error).__name__}: {error}"[:_ERROR_MAX_LENGTH]
+        permanent = isinstance(error, UnknownTaskError) or \
+            (isinstance(error, BusinessException) and error.status_code < 500)
+        if permanent or claimed.attempts >= claimed.max_attempts:
+            backend.fail(claimed.id, worker_id, message)
+            current_app.logger.error(f"[TaskQueue] 任务 {claimed.id} ({claimed.name}) 第 {claimed.attempts} 次执行失败，"
+                                     f"不再重试: {message}", exc_info=error)
+            return
+        delay = self._retry_delay(claimed.attempts)
+        backend.retry(claimed.id, worker_id, delay, message)
+        current_app.logger.warning(f"[TaskQueue] 任务 {claimed.id} ({claimed.name}) 第 {claimed.attempts} 次执行失败，"
+                                   f"{round(delay, 1)} 秒后重试: {message}")
+
+    def _retry_delay(self, attempts):
+        """指数退避: base * 2^(attempts-1)，不超过上限，乘以 [0.5, 1) 的随机抖动避免大量任务同时重试"""
+        config = current_app.config
+        base = config.get('TASK_QUEUE_RETRY_BACKOFF_SECONDS', 10)
+        ceiling = config.get('TASK_QUEUE_RETRY_BACKOFF_MAX_SECONDS', 3600)
+        return min(base * 2 ** (attempts - 1), ceiling) * random.uniform(0.5, 1)
+
+    # --- 维护 ---
+    def backlog(self):
+        """已到期、等待执行的任务数"""
+        return self._get_backend().backlog()
+
+    def purge(self):
+        """
+        清理超过 TASK_QUEUE_RETENTION_SECONDS 的成功任务
+        :return: 清理的任务数
+        """
+        return self._get_backend().purge(current_app.config.get('TASK_QUEUE_RETENTION_SECONDS', 7 * 86400))
+
+    # --- 后端 ---
+    def _get_backend(self):
+        backend_name = current_app.config.get('TASK_QUEUE_BACKEND', 'database')
+        if self._backend is not None and self._backend_name == backend_name:
+            return self._backend
+        with self._backend_lock:
+            if self._backend is None or self._backend_name != backend_name:
+                backend_cls = _BACKENDS.get(backend_name)
+                if backend_cls is None:
+                    raise ValueError(f"未知的任务队列后端: {backend_name}")
+                options = {}
+                if backend_name == 'redis':
+                    options['redis_url'] = current_app.config.get('TASK_QUEUE_REDIS_URL') or current_app.config.get('REDIS_URL')
+                    options['retention_seconds'] = current_app.config.get('TASK_QUEUE_RETENTION_SECONDS', 7 * 86400)
+                self._backend = backend_cls(**options)
+                self._backend_name = backend_name
+        return self._backend
+
+    def _reset_after_fork(self):
+        # 子进程不复用父进程的连接
+        if self._backend is not None:
+            self._backend.reset()
+        self._backend_lock = threading.Lock()
+
+
+task_queue = TaskQueue()
+
+
+class TaskWorker:
+    """worker 进程: concurrency 个线程各自循环领取并执行任务 (manage.py worker)"""
+
+    def __init__(self, app, concurrency=None, poll_seconds=None):
+        self.app = app
+        self.concurrency = concurrency or app.config.get('TASK_QUEUE_WORKERS', 4)
+        self.poll_seconds = poll_seconds or app.config.get('TASK_QUEUE_POLL_SECONDS', 1)
+        self.worker_id = new_lease_holder()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for index in range(self.concurrency):
+            thread = threading.Thread(target=self._run, args=(f"{self.worker_id}:{index}",),
+                                      name=f'task-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """停止领取新任务，等待执行中的任务结束"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def run_forever(self):
+        """启动执行线程，并在主线程中定期清理过期任务，直到 stop()"""
+        self.start()
+        purge_interval = self.app.config.get('TASK_QUEUE_PURGE_INTERVAL_SECONDS', 3600)
+        next_purge = time.monotonic()
+        while not self._stop.wait(1):
+            if time.monotonic() < next_purge:
+                continue
+            next_purge = time.monotonic() + purge_interval
+            with self.app.app_context():
+                try:
+                    purged = task_queue.purge()
+                    if purged:
+                        self.app.logger.info(f"[TaskQueue] 清理 {purged} 个已完成的任务")
+                except Exception as e:
+                    self.app.logger.warning(f"[TaskQueue] 清理已完成的任务失败: {str(e)}")
+
+    def _run(self, worker_id):
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    processed = task_queue.process_one(worker_id)
+                except Exception as e:
+                    # 队列后端不可用: 稍后重试
+                    self.app.logger.warning(f"[TaskQueue] 领取任务失败: {str(e)}")
+                    processed = False
+            if not processed:
+                self._stop.wait(self.poll_seconds)
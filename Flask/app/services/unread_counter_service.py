@@ -0,0 +1,173 @@
+"""
+未读数计数 (Unread Counters)
+
+前端为了显示角标需要反复拉取通知列表与会话列表，未读数每次都要 COUNT(*) 或逐会话汇总。
+这里为每个用户维护一行计数 user_unread_counters (未读通知数、未读消息数)，角标接口只做一次主键查询：
+- 计数与业务数据在同一事务中更新: 写入通知/消息时 +N，标记已读时按实际更新的行数 -N (不低于 0)
+- 增量一律使用 `SET n = n + :delta` 条件 UPDATE，不做读-改-写，并发写入不会丢失计数；
+  计数行不存在时先在保存点中补建 (值为 0) 再 UPDATE，并发补建冲突时重试
+- 通过 Query.update() 等未经过服务层的批量语句修改数据会造成计数漂移，由 reconcile() 按真实数据校正
+  (manage.py reconcile_unread_counters，建议定期执行)
+"""
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import and_, case, exists, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ..core.extensions import db
+from ..models.message import Message
+from ..models.notification import Notification, UnreadCounter
+from ..models.user import User
+
+_COUNTER_FIELDS = ('unread_notifications', 'unread_messages')
+
+_ENSURE_ROWS_RETRIES = 3
+
+
+class UnreadCounterService:
+    # --- 查询 ---
+    def get_summary(self, user_id):
+        """
+        用户未读数汇总 (一次主键查询；有缓冲中的已读水位时另查一次)
+        :param user_id: 用户ID
+        :return: {'notifications': 未读通知数, 'messages': 未读消息数, 'total': 合计}
+        """
+        from .message_read_receipts import message_read_receipts
+
+        row = db.session.query(UnreadCounter.unread_notifications, UnreadCounter.unread_messages)\
+            .filter(UnreadCounter.user_id == user_id).first()
+        notifications, messages = row if row else (0, 0)
+        # 已读水位尚在缓冲区时，扣除水位已覆盖的消息
+        messages = max(messages - sum(message_read_receipts.pending_read_counts(user_id).values()), 0)
+        return {'notifications': notifications, 'messages': messages, 'total': notifications + messages}
+
+    # --- 维护 (在调用方事务中执行，不提交) ---
+    def increment(self, user_ids, notifications=0, messages=0):
+        """
+        增加一批用户的未读数
+        :param user_ids: 用户ID列表 (同一用户出现多次时只计一次)
+        :param notifications: 每个用户增加的未读通知数
+        :param messages: 每个用户增加的未读消息数
+        """
+        user_ids = sorted({user_id for user_id in user_ids if user_id is not None})
+        if not user_ids or not (notifications or messages):
+            return
+        self._ensure_rows(user_ids)
+        self._apply(UnreadCounter.user_id.in_(user_ids), notifications, messages)
+
+    def increment_selected(self, user_id_select, notifications=0, messages=0):
+        """
+        按子查询增加未读数 (用于 INSERT ... SELECT 写入的批量通知，用户ID不经过应用进程)
+        :param user_id_select: 只查询一列用户ID的 Select (每个用户只出现一次)
+        """
+        if not (notifications or messages):
+            return
+        source = user_id_select.subquery()
+        user_id = list(source.c)[0]
+        missing = select(user_id, literal(0), literal(0), literal(datetime.utcnow(), UnreadCounter.updated_at.type))\
+            .where(~exists().where(UnreadCounter.user_id == user_id))
+        statement = insert(UnreadCounter).from_select(['user_id', *_COUNTER_FIELDS, 'updated_at'], missing)
+        self._insert_with_retry(statement)
+        self._apply(UnreadCounter.user_id.in_(select(user_id)), notifications, messages)
+
+    def decrement(self, user_id, notifications=0, messages=0):
+        """
+        减少用户的未读数 (不低于 0)
+        :param notifications: 减少的未读通知数
+        :param messages: 减少的未读消息数
+        """
+        if not (notifications or messages):
+            return
+        self._apply(UnreadCounter.user_id == user_id, -notifications, -messages)
+
+    def _apply(self, condition, notifications, messages):
+        values = {'updated_at': datetime.utcnow()}
+        for field, delta in zip(_COUNTER_FIELDS, (notifications, messages)):
+            if not delta:
+                continue
+            column = UnreadCounter.__table__.c[field]
+            values[field] = column + delta if delta > 0 \
+                else case((column > -delta, column + delta), else_=0)
+        db.session.execute(update(UnreadCounter).where(condition).values(values).execution_options(synchronize_session=False))
+
+    def _ensure_rows(self, user_ids):
+        """补建缺失的计数行 (值为 0)"""
+        now = datetime.utcnow()
+
+        def insert_missing():
+            existing = {user_id for (user_id,) in db.session.query(UnreadCounter.user_id)
+                        .filter(UnreadCounter.user_id.in_(user_ids)).all()}
+            missing = [user_id for user_id in user_ids if user_id not in existing]
+            if missing:
+                db.session.execute(insert(UnreadCounter).values([
+                    {'user_id': user_id, 'unread_notifications': 0, 'unread_messages': 0, 'updated_at': now}
+                    for user_id in missing
+                ]))
+
+        self._insert_with_retry(insert_missing)
+
+    def _insert_with_retry(self, statement):
+        for attempt in range(_ENSURE_ROWS_RETRIES):
+            try:
+                with db.session.begin_nested():
+                    if callable(statement):
+                        statement()
+                    else:
+                        db.session.execute(statement)
+                return
+            except IntegrityError:
+                # 并发事务已补建部分计数行，重新计算缺失的行
+                if attempt == _ENSURE_ROWS_RETRIES - 1:
+                    raise
+
+    # --- 校正 ---
+    def reconcile(self, batch_size=1000):
+        """
+        按 notifications/messages 表的真实未读数校正计数 (分批比较，只更新有偏差的用户)
+        :return: 校正的用户数
+        """
+        fixed = 0
+        last_id = 0
+        while True:
+            user_ids = [user_id for (user_id,) in db.session.query(User.id).filter(User.id > last_id)
+                        .order_by(User.id.asc()).limit(batch_size).all()]
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+
+            actual_notifications = dict(db.session.query(Notification.user_id, func.count(Notification.id))
+                                        .filter(Notification.user_id.in_(user_ids), Notification.is_read.is_(False))
+                                        .group_by(Notification.user_id).all())
+            actual_messages = dict(db.session.query(Message.recipient_id, func.count(Message.id))
+                                   .filter(Message.recipient_id.in_(user_ids), Message.is_read.is_(False))
+                                   .group_by(Message.recipient_id).all())
+            stored = {user_id: (notifications, messages) for user_id, notifications, messages in
+                      db.session.query(UnreadCounter.user_id, UnreadCounter.unread_notifications, UnreadCounter.unread_messages)
+                      .filter(UnreadCounter.user_id.in_(user_ids)).all()}
+
+            drifted = [user_id for user_id in user_ids
+                       if stored.get(user_id, (0, 0)) != (actual_notifications.get(user_id, 0), actual_messages.get(user_id, 0))]
+            if not drifted:
+                continue
+            try:
+                self._ensure_rows(drifted)
+                # 用关联子查询在同一条语句中重新计数，避免覆盖比较之后发生的变化
+                db.session.execute(update(UnreadCounter).where(UnreadCounter.user_id.in_(drifted)).values(
+                    unread_notifications=select(func.count(Notification.id)).where(
+                        and_(Notification.user_id == UnreadCounter.user_id, Notification.is_read.is_(False))).scalar_subquery(),
+                    unread_messages=select(func.count(Message.id)).where(
+                        and_(Message.recipient_id == UnreadCounter.user_id, Message.is_read.is_(False))).scalar_subquery(),
+                    updated_at=datetime.utcnow(),
+                ).execution_options(synchronize_session=False))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            fixed += len(drifted)
+
+        current_app.logger.info(f"[UnreadCounterService] 未读数校正完成，修正 {fixed} 个用户")
+        return fixed
+
+
+unread_counter_service = UnreadCounterService()
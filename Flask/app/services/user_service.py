@@ -10,6 +10,7 @@ from flask import current_app # For logging
 import re # For phone number validation
 import os
 from werkzeug.utils import secure_filename
+from .identity_service import identity_service
 
 class UserService:
 
@@ -253,6 +254,7 @@ class UserService:
         # 更新当前角色
         user.current_role = role
         db.session.commit()
+        identity_service.invalidate(user)
         
         return user
 
@@ -0,0 +1,234 @@
+"""
+钱包记账引擎 (Wallet Ledger)
+
+所有资金变动 (支付托管、提现冻结/完成/退回、争议退款等) 统一通过 wallet_ledger.post_entries() 记账：
+- 余额变动使用条件 UPDATE (`balance = balance + :delta WHERE balance + :delta >= 0`) 在数据库端原子完成，
+  不在 Python 中读-改-写，并发请求不会丢失更新，也不会透支
+- 同一批分录按 user_id 升序加锁 (UPDATE 即获得行锁)，多个事务以相同顺序锁定钱包，避免死锁
+- 流水通过 `INSERT ... SELECT` 直接从钱包行取 balance_after，余额快照无需回读到应用层
+- 只在当前事务中执行 (不提交)，调用方负责 commit/rollback，保证业务记录与资金变动同事务
+
+平台托管账户 (PLATFORM_ESCROW_USER_ID) 的入账按订单ID分散到 PLATFORM_ESCROW_SHARDS 个子账户，
+支付高峰时各回调只锁定各自的子账户行；出账 (退款) 从平台钱包扣减，不足时先归集子账户。
+托管账户内的加锁顺序固定为: 平台钱包 -> 子账户 (编号升序)，入账只锁单个子账户，不会形成环路。
+"""
+from datetime import datetime
+from decimal import Decimal
+
+from flask import current_app
+from sqlalchemy import func, insert, inspect, literal, select
+from sqlalchemy.exc import IntegrityError
+
+from ..core.extensions import db
+from ..models.wallet import UserWallet, WalletTransaction, PlatformEscrowShard, TransactionTypeEnum
+from ..utils.exceptions import InsufficientFundsException, InvalidUsageException, NotFoundException
+
+_CENT = Decimal('0.01')
+
+
+def _to_amount(value):
+    if value is None:
+        return Decimal('0.00')
+    return Decimal(str(value)).quantize(_CENT)
+
+
+class LedgerEntry:
+    """
+    一条记账分录 (对应一条 WalletTransaction)
+    :param user_id: 钱包所属用户ID
+    :param transaction_type: TransactionTypeEnum
+    :param balance_delta: 可用余额变动 (正增负减)
+    :param frozen_delta: 冻结金额变动 (正增负减)
+    :param amount: 流水上记录的交易金额，默认等于 balance_delta
+    :param description: 流水描述
+    :param related_payment_id / related_order_id / related_withdrawal_id: 关联业务记录
+    """
+    __slots__ = ('user_id', 'transaction_type', 'balance_delta', 'frozen_delta', 'amount', 'description',
+                 'related_payment_id', 'related_order_id', 'related_withdrawal_id')
+
+    def __init__(self, user_id, transaction_type, balance_delta=0, frozen_delta=0, amount=None, description=None,
+                 related_payment_id=None, related_order_id=None, related_withdrawal_id=None):
+        self.user_id = user_id
+        self.transaction_type = transaction_type
+        self.balance_delta = _to_amount(balance_delta)
+        self.frozen_delta = _to_amount(frozen_delta)
+        self.amount = self.balance_delta if amount is None else _to_amount(amount)
+        self.description = description
+        self.related_payment_id = related_payment_id
+        self.related_order_id = related_order_id
+        self.related_withdrawal_id = related_withdrawal_id
+
+    def __repr__(self):
+        return f'<LedgerEntry user={self.user_id} {self.transaction_type.name} balance{self.balance_delta:+} frozen{self.frozen_delta:+}>'
+
+
+class WalletLedger:
+    def post_entries(self, entries):
+        """
+        在当前事务中原子地记入一组分录
+        :param entries: LedgerEntry 列表
+        :return: None
+        :raises: NotFoundException 钱包不存在; InsufficientFundsException 可用余额或冻结金额不足
+        """
+        entries = list(entries)
+        if not entries:
+            raise InvalidUsageException(message="记账分录不能为空", error_code=40001)
+
+        # 统一按 user_id 升序加锁，避免不同事务交叉锁定钱包导致死锁 (sorted 稳定，同一用户的分录保持原顺序)
+        now = datetime.utcnow()
+        escrow_user_id = self.escrow_user_id()
+        touched_user_ids = set()
+        for entry in sorted(entries, key=lambda e: e.user_id):
+            if entry.user_id == escrow_user_id and entry.balance_delta > 0 and not entry.frozen_delta:
+                self._credit_escrow_shard(entry, now)
+            else:
+                if entry.balance_delta or entry.frozen_delta:
+                    if entry.user_id == escrow_user_id:
+                        self._debit_escrow(entry, now)
+                    else:
+                        self._apply_balance_change(entry, now)
+                self._insert_transaction(entry, now, UserWallet.balance, UserWallet.user_id == entry.user_id)
+            touched_user_ids.add(entry.user_id)
+
+        self._expire_loaded_wallets(touched_user_ids)
+
+    def _apply_balance_change(self, entry, now):
+        conditions = [UserWallet.user_id == entry.user_id]
+        if entry.balance_delta < 0:
+            conditions.append(UserWallet.balance + entry.balance_delta >= 0)
+        if entry.frozen_delta < 0:
+            conditions.append(UserWallet.frozen_balance + entry.frozen_delta >= 0)
+
+        updated = db.session.execute(
+            UserWallet.__table__.update()
+            .where(*conditions)
+            .values(
+                balance=UserWallet.balance + entry.balance_delta,
+                frozen_balance=UserWallet.frozen_balance + entry.frozen_delta,
+                updated_at=now
+            )
+        ).rowcount
+        if updated:
+            return
+
+        if db.session.query(UserWallet.user_id).filter(UserWallet.user_id == entry.user_id).first() is None:
+            raise NotFoundException(message=f"用户 {entry.user_id} 的钱包不存在", error_code=40405)
+        if entry.balance_delta < 0:
+            raise InsufficientFundsException(message=f"用户 {entry.user_id} 的钱包可用余额不足")
+        raise InsufficientFundsException(message=f"用户 {entry.user_id} 的钱包冻结金额不足")
+
+    def _insert_transaction(self, entry, now, balance_column, source_condition, escrow_shard_id=None):
+        # balance_after 取自被记账行的当前值 (本事务已持有该行锁，即为本分录记账后的余额)
+        columns = WalletTransaction.__table__.c
+        source = select(
+            literal(entry.user_id, type_=columns.user_id.type),
+            literal(entry.transaction_type, type_=columns.transaction_type.type),
+            literal(entry.amount, type_=columns.amount.type),
+            balance_column,
+            literal(entry.related_payment_id, type_=columns.related_payment_id.type),
+            literal(entry.related_order_id, type_=columns.related_order_id.type),
+            literal(entry.related_withdrawal_id, type_=columns.related_withdrawal_id.type),
+            literal(entry.description, type_=columns.description.type),
+            literal(escrow_shard_id, type_=columns.escrow_shard_id.type),
+            literal(now, type_=columns.created_at.type),
+        ).where(source_condition)
+
+        inserted = db.session.execute(
+            insert(WalletTransaction.__table__).from_select(
+                ['user_id', 'transaction_type', 'amount', 'balance_after', 'related_payment_id',
+                 'related_order_id', 'related_withdrawal_id', 'description', 'escrow_shard_id', 'created_at'],
+                source,
+                include_defaults=False
+            )
+        ).rowcount
+        if not inserted:
+            raise NotFoundException(message=f"用户 {entry.user_id} 的钱包不存在", error_code=40405)
+
+    def _expire_loaded_wallets(self, user_ids):
+        # 余额已在数据库端更新，会话中已加载的钱包对象需在下次访问时重新读取
+        for obj in list(db.session.identity_map.values()):
+            if isinstance(obj, UserWallet) and inspect(obj).identity[0] in user_ids:
+                db.session.expire(obj)
+
+    # --- 平台托管账户 ---
+    def escrow_user_id(self):
+        return current_app.config.get('PLATFORM_ESCROW_USER_ID', 1)
+
+    def _shard_for(self, entry):
+        shard_count = max(int(current_app.config.get('PLATFORM_ESCROW_SHARDS', 1)), 1)
+        key = entry.related_order_id or entry.related_payment_id or 0
+        return key % shard_count
+
+    def _credit_escrow_shard(self, entry, now):
+        """托管入账：只锁定订单所属的子账户行"""
+        if db.session.query(UserWallet.user_id).filter(UserWallet.user_id == entry.user_id).first() is None:
+            raise NotFoundException(message=f"平台托管账户 {entry.user_id} 的钱包不存在", error_code=40405)
+
+        shard_id = self._shard_for(entry)
+        statement = PlatformEscrowShard.__table__.update()\
+            .where(PlatformEscrowShard.shard_id == shard_id)\
+            .values(balance=PlatformEscrowShard.balance + entry.balance_delta, updated_at=now)
+        if not db.session.execute(statement).rowcount:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(PlatformEscrowShard(shard_id=shard_id, balance=entry.balance_delta, updated_at=now))
+            except IntegrityError:
+                # 并发请求已创建该子账户
+                db.session.execute(statement)
+
+        self._insert_transaction(entry, now, PlatformEscrowShard.balance,
+                                 PlatformEscrowShard.shard_id == shard_id, escrow_shard_id=shard_id)
+
+    def _debit_escrow(self, entry, now):
+        """托管出账：从平台钱包扣减，余额不足时先归集子账户再重试"""
+        try:
+            self._apply_balance_change(entry, now)
+        except InsufficientFundsException:
+            if not self.consolidate_escrow():
+                raise
+            self._apply_balance_change(entry, now)
+
+    def consolidate_escrow(self):
+        """
+        将各子账户余额归集到平台钱包 (在当前事务中执行，调用方负责提交)
+        加锁顺序: 平台钱包 -> 子账户编号升序；归集时写入一条流水，balance_after 即为此刻的托管逻辑余额
+        :return: 本次归集的金额
+        """
+        escrow_user_id = self.escrow_user_id()
+        wallet = db.session.query(UserWallet).filter(UserWallet.user_id == escrow_user_id)\
+            .with_for_update().populate_existing().first()
+        if wallet is None:
+            raise NotFoundException(message=f"平台托管账户 {escrow_user_id} 的钱包不存在", error_code=40405)
+
+        shards = db.session.query(PlatformEscrowShard.shard_id, PlatformEscrowShard.balance)\
+            .order_by(PlatformEscrowShard.shard_id.asc()).with_for_update().all()
+        moved = sum((balance for _, balance in shards if balance), Decimal('0.00'))
+        if not moved:
+            return Decimal('0.00')
+
+        now = datetime.utcnow()
+        db.session.execute(
+            PlatformEscrowShard.__table__.update()
+            .where(PlatformEscrowShard.shard_id.in_([shard_id for shard_id, balance in shards if balance]))
+            .values(balance=0, updated_at=now)
+        )
+        db.session.execute(
+            UserWallet.__table__.update()
+            .where(UserWallet.user_id == escrow_user_id)
+            .values(balance=UserWallet.balance + moved, updated_at=now)
+        )
+        entry = LedgerEntry(escrow_user_id, TransactionTypeEnum.adjustment, amount=0,
+                            description=f"托管子账户归集 {moved}")
+        self._insert_transaction(entry, now, UserWallet.balance, UserWallet.user_id == escrow_user_id)
+        self._expire_loaded_wallets({escrow_user_id})
+        return moved
+
+    def get_escrow_balance(self):
+        """平台托管逻辑余额 = 平台钱包余额 + 各子账户未归集余额"""
+        escrow_user_id = self.escrow_user_id()
+        wallet_balance = db.session.query(UserWallet.balance).filter(UserWallet.user_id == escrow_user_id).scalar()
+        shard_balance = db.session.query(func.coalesce(func.sum(PlatformEscrowShard.balance), 0)).scalar()
+        return _to_amount(wallet_balance) + _to_amount(shard_balance)
+
+
+wallet_ledger = WalletLedger()
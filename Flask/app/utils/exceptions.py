@@ -21,4 +21,9 @@ class AuthorizationException(BusinessException):
 class InvalidUsageException(BusinessException):
     def __init__(self, message="Invalid input", error_code=40001, errors=None):
         super().__init__(message, status_code=400, error_code=error_code)
-        self.errors = errors # 用于表单校验的详细字段错误 
\ No newline at end of file
+        self.errors = errors # 用于表单校验的详细字段错误 
+
+
+class InsufficientFundsException(BusinessException):
+    def __init__(self, message="Insufficient balance", error_code=40012):
+        super().__init__(message, status_code=400, error_code=error_code)
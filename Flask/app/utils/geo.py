@@ -0,0 +1,136 @@
+"""Geo Utilities (geohash 网格编码与球面距离计算)"""
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_PRECISION = 9 # 入库精度 (约 4.8m x 4.8m)
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# 各精度下 geohash 单元格的纬度/经度跨度 (度)
+_CELL_SPANS = {}
+for _precision in range(1, 13):
+    _bits = _precision * 5
+    _lng_bits = (_bits + 1) // 2
+    _lat_bits = _bits // 2
+    _CELL_SPANS[_precision] = (180.0 / (2 ** _lat_bits), 360.0 / (2 ** _lng_bits))
+
+
+def extract_lat_lng(location_point):
+    """
+    从 GeoJSON Point 中取出 (纬度, 经度)
+    :param location_point: {"type": "Point", "coordinates": [经度, 纬度]}
+    :return: (lat, lng) 或 None
+    """
+    if not isinstance(location_point, dict):
+        return None
+    coordinates = location_point.get('coordinates')
+    if not isinstance(coordinates, (list, tuple)) or len(coordinates) < 2:
+        return None
+    try:
+        lng, lat = float(coordinates[0]), float(coordinates[1])
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def geohash_encode(lat, lng, precision=GEOHASH_PRECISION):
+    """将经纬度编码为 geohash 字符串"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bit_count = 0
+    value = 0
+    even = True # 偶数位编码经度
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if lng >= mid:
+                value = (value << 1) | 1
+                lng_range[0] = mid
+            else:
+                value <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                value = (value << 1) | 1
+                lat_range[0] = mid
+            else:
+                value <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[value])
+            bit_count = 0
+            value = 0
+    return ''.join(chars)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """两点间的大圆距离 (公里)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    计算以 (lat, lng) 为圆心、radius_km 为半径的外接矩形
+    :return: (min_lat, max_lat, min_lng, max_lng)，经度跨越 ±180 时 min_lng > max_lng
+    """
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - d_lat, lat + d_lat
+    if min_lat <= -90 or max_lat >= 90:
+        # 覆盖极点时经度方向不再有约束
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+    d_lng = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(lat))))
+    if d_lng >= 180:
+        return min_lat, max_lat, -180.0, 180.0
+    min_lng, max_lng = lng - d_lng, lng + d_lng
+    if min_lng < -180:
+        min_lng += 360
+    if max_lng > 180:
+        max_lng -= 360
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def geohash_cells_covering(lat, lng, radius_km, max_cells=16):
+    """
+    计算覆盖圆形区域的 geohash 前缀集合 (用于 LIKE 'prefix%' 的索引范围扫描预筛选)
+    选择能让外接矩形被不超过 max_cells 个单元格覆盖的最高精度
+    :return: geohash 前缀列表；区域过大无法有效裁剪时返回空列表 (表示不做网格预筛选)
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    if min_lng > max_lng:
+        lng_ranges = [(min_lng, 180.0), (-180.0, max_lng)]
+    else:
+        lng_ranges = [(min_lng, max_lng)]
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_span, lng_span = _CELL_SPANS[precision]
+        lat_steps = int((max_lat - min_lat) / lat_span) + 2
+        lng_steps = sum(int((hi - lo) / lng_span) + 2 for lo, hi in lng_ranges)
+        if lat_steps * lng_steps > max_cells:
+            continue
+
+        cells = set()
+        for lo, hi in lng_ranges:
+            for lat_value in _frange(min_lat, max_lat, lat_span):
+                for lng_value in _frange(lo, hi, lng_span):
+                    cells.add(geohash_encode(lat_value, lng_value, precision))
+        return sorted(cells)
+    return []
+
+
+def _frange(start, stop, step):
+    """从 start 到 stop 以 step 为步长取点，并保证包含 stop 本身"""
+    value = start
+    while value < stop:
+        yield value
+        value += step
+    yield stop
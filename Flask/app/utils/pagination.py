@@ -0,0 +1,162 @@
+"""Pagination Utilities"""
+import base64
+import enum
+import json
+import math
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import and_, or_
+
+from .exceptions import InvalidUsageException
+
+
+class ListPagination:
+    """
+    内存分页结果，接口与 Flask-SQLAlchemy 的 Pagination 保持一致 (items/page/per_page/total/pages)，
+    用于排序键无法下推到 SQL 的场景 (例如按距离排序)
+    """
+
+    def __init__(self, items, page, per_page, total):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+
+    @property
+    def pages(self):
+        if not self.per_page or not self.total:
+            return 0
+        return int(math.ceil(self.total / float(self.per_page)))
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+
+class CursorPagination:
+    """
+    游标 (keyset) 分页结果
+    - next_cursor: 下一页游标，没有更多数据时为 None
+    - total: 仅在 include_total=True 时统计，否则为 None (避免额外的 COUNT(*))
+    - page/pages 恒为 None，便于与页码分页结果共用序列化逻辑
+    """
+    page = None
+    pages = None
+
+    def __init__(self, items, per_page, next_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'$d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'$dec': str(value)}
+    if isinstance(value, enum.Enum):
+        return {'$enum': value.name}
+    return value
+
+
+def _decode_value(value, column):
+    if not isinstance(value, dict):
+        return value
+    if '$dt' in value:
+        return datetime.fromisoformat(value['$dt'])
+    if '$d' in value:
+        return date.fromisoformat(value['$d'])
+    if '$dec' in value:
+        return Decimal(value['$dec'])
+    if '$enum' in value:
+        enum_class = getattr(column.type, 'enum_class', None)
+        return enum_class[value['$enum']] if enum_class else value['$enum']
+    raise ValueError("unsupported cursor value")
+
+
+def _order_signature(order_by):
+    return ','.join(f"{column.key}:{direction}" for column, direction in order_by)
+
+
+def encode_cursor(values, order_by):
+    """将最后一条记录的排序键编码为不透明的游标字符串"""
+    payload = {'s': _order_signature(order_by), 'k': [_encode_value(v) for v in values]}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, order_by):
+    """
+    解析游标字符串
+    :raises: InvalidUsageException 游标无效或与当前排序方式不匹配
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if payload.get('s') != _order_signature(order_by) or len(payload['k']) != len(order_by):
+            raise ValueError("cursor does not match sort order")
+        return [_decode_value(value, column) for value, (column, _) in zip(payload['k'], order_by)]
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise InvalidUsageException(message="无效的分页游标，请从第一页重新加载。", error_code=40003)
+
+
+def keyset_paginate(query, order_by, cursor=None, per_page=20, include_total=False):
+    """
+    按 (排序键, id) 做游标分页，避免 OFFSET 深翻页扫描
+    :param query: 已应用过滤条件的查询 (原有 order_by 会被替换)
+    :param order_by: [(column, 'asc'|'desc'), ...]，最后一列必须唯一 (通常为主键 id)，各列不可为 NULL
+    :param cursor: 上一页返回的 next_cursor；None 或空字符串表示第一页
+    :param per_page: 每页数量
+    :param include_total: 是否额外统计总条数
+    :return: CursorPagination
+    """
+    per_page = max(int(per_page or 20), 1)
+    total = query.order_by(None).count() if include_total else None
+
+    if cursor:
+        values = decode_cursor(cursor, order_by)
+        # (a, b, id) > (x, y, z) 展开为 a>x OR (a=x AND b>y) OR (a=x AND b=y AND id>z)，兼容方向混合的排序
+        branches = []
+        for i, (column, direction) in enumerate(order_by):
+            conditions = [order_by[j][0] == values[j] for j in range(i)]
+            conditions.append(column < values[i] if direction == 'desc' else column > values[i])
+            branches.append(and_(*conditions))
+        query = query.filter(or_(*branches))
+
+    ordering = [column.desc() if direction == 'desc' else column.asc() for column, direction in order_by]
+    rows = query.order_by(None).order_by(*ordering).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column, _ in order_by], order_by)
+    return CursorPagination(rows, per_page, next_cursor=next_cursor, total=total)
+
+
+def pagination_meta(paginated):
+    """
+    构造响应中的 pagination 字段，兼容页码分页与游标分页
+    """
+    meta = {
+        'page': paginated.page,
+        'per_page': paginated.per_page,
+        'total_pages': paginated.pages,
+        'total_items': paginated.total,
+    }
+    if isinstance(paginated, CursorPagination):
+        meta['next_cursor'] = paginated.next_cursor
+        meta['has_next'] = paginated.has_next
+    return meta
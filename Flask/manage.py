@@ -124,6 +124,225 @@ def db_history():
         print(f"Error showing migration history: {e}")
 
 
+@cli.command('backfill_job_geohash')
+@click.option('--batch-size', default=1000, help='Rows per batch.')
+def backfill_job_geohash(batch_size):
+    """Populate jobs.location_geohash/location_lat/location_lng from location_point for existing rows."""
+    from app.models.job import Job
+    from app.services.job_service import job_service
+    with app.app_context():
+        last_id = 0
+        updated = 0
+        while True:
+            jobs = Job.query.filter(Job.id > last_id, Job.location_point.isnot(None))\
+                            .order_by(Job.id.asc()).limit(batch_size).all()
+            if not jobs:
+                break
+            for job in jobs:
+                columns = job_service._location_columns(job.location_point)
+                if any(getattr(job, column) != value for column, value in columns.items()):
+                    for column, value in columns.items():
+                        setattr(job, column, value)
+                    updated += 1
+            db.session.commit()
+            last_id = jobs[-1].id
+        print(f"Backfilled geohash for {updated} jobs.")
+
+
+@cli.command('rebuild_conversations')
+@click.option('--batch-size', default=500, help='Conversations per batch.')
+def rebuild_conversations(batch_size):
+    """Rebuild the conversations projection table from messages."""
+    from app.services.communication_service import message_service
+    with app.app_context():
+        created = message_service.rebuild_conversations(batch_size=batch_size)
+        print(f"Rebuilt {created} conversation rows.")
+
+
+@cli.command('rebuild_rating_aggregates')
+def rebuild_rating_aggregates():
+    """Recompute per-user rating aggregates and profile averages from evaluations."""
+    from app.services.evaluation_service import evaluation_service
+    with app.app_context():
+        rebuilt = evaluation_service.rebuild_rating_aggregates()
+        print(f"Rebuilt {rebuilt} rating aggregates.")
+
+
+@cli.command('consolidate_escrow')
+@click.option('--loop', is_flag=True, help='Keep running, consolidating every ESCROW_CONSOLIDATION_INTERVAL_SECONDS.')
+def consolidate_escrow(loop):
+    """Fold platform escrow shard balances into the platform wallet (safe to run on every node)."""
+    import time
+    from app.services.escrow_consolidation import escrow_consolidation
+    with app.app_context():
+        while True:
+            stats = escrow_consolidation.run_once()
+            if stats['acquired']:
+                print(f"Consolidated {stats['moved']} into the platform escrow wallet; "
+                      f"balance is now {stats['escrow_balance']} ({stats['seconds']}s).")
+            else:
+                print("Another node holds the escrow consolidation lease; nothing to do.")
+            if not loop:
+                break
+            time.sleep(app.config.get('ESCROW_CONSOLIDATION_INTERVAL_SECONDS', 300))
+
+
+@cli.command('create_admin')
+@click.option('--username', required=True, help='Admin login name.')
+@click.option('--password', prompt=True, hide_input=True, confirmation_prompt=True, help='Admin password.')
+@click.option('--role', default='super_admin', help='Admin role.')
+@click.option('--real-name', default=None, help='Admin real name.')
+def create_admin(username, password, role, real_name):
+    """Create an admin account (used to log in at /api/v1/admin/auth/login)."""
+    from app.services.admin_auth_service import admin_auth_service
+    with app.app_context():
+        admin = admin_auth_service.create_admin(username, password, role=role, real_name=real_name)
+        print(f"Created admin {admin.username} (id {admin.id}).")
+
+
+@cli.command('rebuild_job_taxonomy')
+@click.option('--batch-size', default=1000, help='Jobs per batch.')
+def rebuild_job_taxonomy(batch_size):
+    """Rebuild the job tag/category dictionary and usage counts from the jobs table."""
+    from app.services.job_taxonomy_service import job_taxonomy_service
+    from app.services.job_cache import job_cache
+    with app.app_context():
+        rebuilt = job_taxonomy_service.rebuild(batch_size=batch_size)
+        job_cache.invalidate_listings()
+        print(f"Rebuilt {rebuilt} job taxonomy terms.")
+
+
+@cli.command('precompute_recommendations')
+@click.option('--full', is_flag=True, help='Recompute every freelancer instead of only stale lists.')
+@click.option('--workers', default=None, type=int, help='Worker processes (defaults to JOB_RECOMMENDATION_PRECOMPUTE_WORKERS).')
+@click.option('--chunk-size', default=None, type=int, help='Freelancers per worker task.')
+def precompute_recommendations(full, workers, chunk_size):
+    """Precompute top-N job recommendations for active freelancers (run periodically, e.g. from cron)."""
+    from app.services.job_recommendation_lists import job_recommendation_lists
+    with app.app_context():
+        stats = job_recommendation_lists.precompute(full=full, workers=workers, chunk_size=chunk_size)
+        print(f"Checked {stats['checked']} freelancers, refreshed {stats['refreshed']} recommendation lists "
+              f"in {stats['seconds']}s.")
+
+@cli.command('reconcile_unread_counters')
+@click.option('--batch-size', default=1000, help='Users per batch.')
+def reconcile_unread_counters(batch_size):
+    """Fix drift in per-user unread notification/message counters (run periodically, e.g. from cron)."""
+    from app.services.unread_counter_service import unread_counter_service
+    with app.app_context():
+        fixed = unread_counter_service.reconcile(batch_size=batch_size)
+        print(f"Reconciled unread counters for {fixed} users.")
+
+@cli.command('auto_confirm_orders')
+@click.option('--batch-size', default=None, type=int, help='Orders per batch (defaults to ORDER_AUTO_CONFIRM_BATCH_SIZE).')
+@click.option('--max-batches', default=None, type=int, help='Stop after this many batches (0 = until no order is due).')
+@click.option('--loop', is_flag=True, help='Keep running, sweeping every ORDER_AUTO_CONFIRM_INTERVAL_SECONDS.')
+def auto_confirm_orders(batch_size, max_batches, loop):
+    """Auto-confirm pending_confirmation orders past their confirmation deadline (safe to run on every node)."""
+    import time
+    from app.services.order_auto_confirm import order_auto_confirm
+    with app.app_context():
+        while True:
+            stats = order_auto_confirm.run_once(batch_size=batch_size, max_batches=max_batches)
+            if stats['acquired']:
+                print(f"Auto-confirmed {stats['confirmed']} orders, skipped {stats['skipped']} "
+                      f"in {stats['batches']} batches ({stats['seconds']}s).")
+            else:
+                print("Another node holds the auto-confirm lease; nothing to do.")
+            if not loop:
+                break
+            time.sleep(app.config.get('ORDER_AUTO_CONFIRM_INTERVAL_SECONDS', 60))
+
+@cli.command('expire_jobs')
+@click.option('--batch-size', default=None, type=int, help='Jobs per batch (defaults to JOB_EXPIRY_BATCH_SIZE).')
+@click.option('--max-batches', default=None, type=int, help='Stop after this many batches (0 = until no job is overdue).')
+@click.option('--loop', is_flag=True, help='Keep running, sweeping every JOB_EXPIRY_INTERVAL_SECONDS.')
+def expire_jobs(batch_size, max_batches, loop):
+    """Expire active jobs past their application deadline or end time and reject their open applications."""
+    import time
+    from app.services.job_expiry import job_expiry_sweeper
+    with app.app_context():
+        while True:
+            stats = job_expiry_sweeper.run_once(batch_size=batch_size, max_batches=max_batches)
+            if stats['acquired']:
+                print(f"Expired {stats['expired_by_deadline']} jobs past their application deadline and "
+                      f"{stats['expired_by_end_time']} past their end time, rejected {stats['applications_rejected']} "
+                      f"applications in {stats['batches']} batches (oldest overdue {stats['max_overdue_seconds']}s, "
+                      f"{stats['seconds']}s).")
+            else:
+                print("Another node holds the job expiry lease; nothing to do.")
+            if not loop:
+                break
+            time.sleep(app.config.get('JOB_EXPIRY_INTERVAL_SECONDS', 300))
+
+@cli.command('worker')
+@click.option('--concurrency', default=None, type=int, help='Worker threads (defaults to TASK_QUEUE_WORKERS).')
+@click.option('--burst', is_flag=True, help='Run due tasks in the current thread until the queue is empty, then exit.')
+def worker(concurrency, burst):
+    """Run background tasks queued with @task(...).delay() (safe to run on every node)."""
+    import signal
+    from app.services.task_queue import TaskWorker, task_queue
+    if burst:
+        with app.app_context():
+            processed = task_queue.run_pending()
+            print(f"Processed {processed} tasks.")
+        return
+
+    task_worker = TaskWorker(app, concurrency=concurrency)
+
+    def shutdown(signum, frame):
+        print("Stopping worker, waiting for running tasks to finish...")
+        task_worker.stop()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    print(f"Worker {task_worker.worker_id} started with {task_worker.concurrency} threads "
+          f"(backend: {app.config.get('TASK_QUEUE_BACKEND', 'database')}).")
+    task_worker.run_forever()
+
+@cli.command('benchmark_order_list')
+@click.option('--user-id', required=True, type=int, help='User whose orders are listed.')
+@click.option('--role', default='freelancer', type=click.Choice(['freelancer', 'employer']), help='Role of the user in the orders.')
+@click.option('--status', default=None, help='Optional order status filter.')
+@click.option('--per-page', default=20, help='Orders per page.')
+@click.option('--requests', 'request_count', default=50, help='Requests per pagination mode.')
+def benchmark_order_list(user_id, role, status, per_page, request_count):
+    """Measure SQL statements and latency per order-list request (read-only, page and cursor modes)."""
+    import statistics
+    import time
+    from sqlalchemy import event
+    from app.schemas.order_schema import OrderSchema
+    from app.services.order_service import order_service
+
+    with app.app_context():
+        filters = {'status': status} if status else {}
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        for label, cursor in (('page', None), ('cursor', '')):
+            # 预热一次 (编译语句缓存、建立连接)，不计入统计
+            order_service.get_orders_for_user(user_id, role, filters=filters, per_page=per_page, cursor=cursor)
+            db.session.remove()
+            timings = []
+            statements.clear()
+            event.listen(db.engine, 'before_cursor_execute', count_statement)
+            try:
+                for _ in range(request_count):
+                    started = time.perf_counter()
+                    paginated = order_service.get_orders_for_user(user_id, role, filters=filters, page=1,
+                                                                  per_page=per_page, cursor=cursor)
+                    OrderSchema(many=True).dump(paginated.items)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    db.session.remove()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count_statement)
+            timings.sort()
+            print(f"{label:>6}: {len(statements) / request_count:.1f} queries/request, "
+                  f"mean {statistics.mean(timings):.2f} ms, p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms, "
+                  f"{len(paginated.items)} orders/page")
+
 # Add other custom commands if needed
 # @cli.command('seed_db')
 # def seed_db():
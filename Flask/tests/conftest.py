@@ -1,8 +1,11 @@
 """Pytest configuration and fixtures"""
 import pytest
 import os
+from sqlalchemy import event
 from app import create_app
-from app.core.extensions import db as _db
+from app.core.config import TestingConfig
+from app.core.extensions import cache, db as _db
+from app.services.job_view_counter import job_view_counter
 
 @pytest.fixture(scope='session')
 def app():
@@ -19,6 +22,32 @@ def app():
 
     ctx.pop() # Clean up the context
 
+@pytest.fixture()
+def sqlite_config():
+    """Extra TestingConfig overrides for sqlite_app; override this fixture in a test module."""
+    return {}
+
+@pytest.fixture()
+def sqlite_app(sqlite_config):
+    """Per-test Flask application on a fresh SQLite database (in-memory unless sqlite_config overrides it)."""
+    overrides = {'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SQLALCHEMY_ENGINE_OPTIONS': {}, **sqlite_config}
+    with pytest.MonkeyPatch.context() as mp:
+        for key, value in overrides.items():
+            mp.setattr(TestingConfig, key, value, raising=False)
+        app = create_app(config_name='testing')
+
+    with app.app_context():
+        # Test databases never need durable writes (matters for file-backed SQLite)
+        event.listen(_db.engine, 'connect', lambda connection, _: connection.executescript(
+            'PRAGMA synchronous=OFF; PRAGMA journal_mode=MEMORY;'))
+        _db.create_all()
+        cache.clear()
+        # Buffered view counts and write-back floors are keyed by job id, which a fresh database reuses
+        job_view_counter.reset()
+        yield app
+        _db.session.remove()
+        _db.drop_all()
+
 @pytest.fixture(scope='function') # Use 'function' scope for client if needed per test
 def client(app):
     """A test client for the app."""
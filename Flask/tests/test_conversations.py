@@ -0,0 +1,144 @@
+"""会话列表投影测试 (SQLite 内存库，无需启动服务)"""
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app.core.extensions import db as _db
+from app.models.message import Conversation, Message
+from app.models.profile import FreelancerProfile
+from app.models.user import User
+from app.services.communication_service import message_service
+from app.services.message_read_receipts import InMemoryReadReceiptBuffer, message_read_receipts
+
+
+@pytest.fixture()
+def users(sqlite_app, monkeypatch):
+    monkeypatch.setattr(message_read_receipts, '_buffer', InMemoryReadReceiptBuffer())
+    users = [User(phone_number=f'1380000060{index}', password_hash='x', current_role='freelancer',
+                  available_roles=['freelancer'], status='active') for index in range(3)]
+    _db.session.add_all(users)
+    _db.session.flush()
+    _db.session.add(FreelancerProfile(user_id=users[1].id, nickname='Bob', avatar_url='https://example.com/bob.png'))
+    _db.session.commit()
+    return [user.id for user in users]
+
+
+def _send(sender_id, recipient_id, content):
+    return message_service.send_new_message(sender_id, {'recipient_id': recipient_id, 'content': content})
+
+
+def _rows():
+    _db.session.expire_all()
+    return {(row.conversation_id, row.user_id): (row.other_party_id, row.last_message_id, row.last_message_snippet,
+                                                 row.unread_count)
+            for row in Conversation.query.all()}
+
+
+def test_first_message_creates_a_row_per_participant(users):
+    alice, bob, _ = users
+    message = _send(alice, bob, 'x' * 60)
+
+    snippet = 'x' * 50 + '...'
+    assert _rows() == {(message.conversation_id, alice): (bob, message.id, snippet, 0),
+                       (message.conversation_id, bob): (alice, message.id, snippet, 1)}
+
+
+def test_unread_counts_follow_each_recipient(users):
+    alice, bob, carol = users
+    _send(alice, bob, 'one')
+    _send(alice, bob, 'two')
+    reply = _send(bob, alice, 'three')
+    other = _send(carol, bob, 'hello bob')
+
+    rows = _rows()
+    assert rows[(reply.conversation_id, alice)][1:] == (reply.id, 'three', 1)
+    assert rows[(reply.conversation_id, bob)][1:] == (reply.id, 'three', 2)
+    assert rows[(other.conversation_id, bob)][1:] == (other.id, 'hello bob', 1)
+    assert rows[(other.conversation_id, carol)][1:] == (other.id, 'hello bob', 0)
+
+
+def test_out_of_order_message_does_not_replace_latest(users):
+    alice, bob, _ = users
+    first = _send(alice, bob, 'first')
+    latest = _send(alice, bob, 'latest')
+
+    # 较早的消息晚到 (例如并发事务后提交)：只累加未读数，不覆盖最新消息摘要
+    late = Message(id=first.id, sender_id=alice, recipient_id=bob, conversation_id=first.conversation_id,
+                   content='late', created_at=latest.created_at - timedelta(minutes=1))
+    message_service._apply_message_to_conversations(late)
+    _db.session.commit()
+
+    rows = _rows()
+    assert rows[(latest.conversation_id, bob)][1:] == (latest.id, 'latest', 3)
+    assert rows[(latest.conversation_id, alice)][1:] == (latest.id, 'latest', 0)
+
+
+def test_summary_reads_the_projection_with_constant_queries(users):
+    alice, bob, carol = users
+    now = datetime.utcnow()
+    with_bob = _send(alice, bob, 'to bob')
+    with_carol = _send(carol, alice, 'from carol')
+    # 固定时间，确保排序可预期
+    _db.session.query(Conversation).filter_by(conversation_id=with_bob.conversation_id)\
+        .update({'last_message_at': now - timedelta(hours=1)})
+    _db.session.query(Conversation).filter_by(conversation_id=with_carol.conversation_id)\
+        .update({'last_message_at': now})
+    _db.session.commit()
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(_db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        result = message_service.get_user_conversations_summary(alice, page=1, per_page=10)
+    finally:
+        event.remove(_db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    assert [(item['other_party_id'], item['last_message_content'], item['unread_count']) for item in result['items']] == [
+        (carol, 'from carol', 1), (bob, 'to bob', 0)]
+    # 有档案取档案昵称，否则以手机号兜底
+    assert result['items'][1]['other_party_nickname'] == 'Bob'
+    assert result['items'][0]['other_party_nickname'] == '13800000602'
+    assert result['pagination']['total_items'] == 2
+    # 分页查询 + COUNT，与会话数量无关
+    assert len([s for s in statements if s.lstrip().upper().startswith('SELECT')]) == 2
+
+    first_page = message_service.get_user_conversations_summary(alice, per_page=1, cursor='')
+    assert [item['other_party_id'] for item in first_page['items']] == [carol]
+    second_page = message_service.get_user_conversations_summary(alice, per_page=1,
+                                                                 cursor=first_page['pagination']['next_cursor'])
+    assert [item['other_party_id'] for item in second_page['items']] == [bob]
+
+
+def test_rebuild_matches_incremental_projection(users):
+    alice, bob, carol = users
+    _send(alice, bob, 'one')
+    _send(bob, alice, 'two')
+    _send(alice, bob, 'three')
+    _send(carol, alice, 'four')
+    incremental = _rows()
+
+    _db.session.query(Conversation).delete()
+    _db.session.commit()
+
+    assert message_service.rebuild_conversations(batch_size=1) == len(incremental)
+    assert _rows() == incremental
+
+
+def test_conversations_endpoint(users, sqlite_app):
+    alice, bob, _ = users
+    _send(bob, alice, 'hi alice')
+    token = create_access_token(identity=_db.session.get(User, alice).uuid)
+
+    response = sqlite_app.test_client().get('/api/v1/communications/messages/conversations?cursor=',
+                                            headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert [(item['other_party_nickname'], item['last_message_content'], item['unread_count']) for item in data['items']] == [
+        ('Bob', 'hi alice', 1)]
+    assert data['pagination']['has_next'] is False
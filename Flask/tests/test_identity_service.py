@@ -0,0 +1,187 @@
+"""JWT 身份解析缓存测试 (SimpleCache + SQLite 内存库，无需启动服务)"""
+import importlib
+from types import SimpleNamespace
+
+import pytest
+from flask_jwt_extended import create_access_token, verify_jwt_in_request
+from sqlalchemy import event
+
+from app.core.extensions import cache, db as _db
+from app.models.profile import FreelancerProfile
+from app.models.user import User
+from app.models.verification import VerificationProfileTypeEnum, VerificationRecord
+from app.services.admin_user_service import admin_user_service
+from app.services.admin_verification_service import admin_verification_service
+from app.services.identity_service import CurrentIdentity, identity_service
+from app.services.user_service import user_service
+from app.utils.exceptions import NotFoundException
+
+# app.services 包导出了同名的服务实例，这里需要模块本身
+identity_module = importlib.import_module('app.services.identity_service')
+
+
+@pytest.fixture()
+def sqlite_config():
+    return {'CACHE_TYPE': 'SimpleCache'}
+
+
+@pytest.fixture()
+def users(sqlite_app):
+    identity_service.clear_local()
+    created = [User(phone_number=f'1380000080{index}', password_hash='x', current_role='freelancer',
+                    available_roles=['freelancer', 'employer'], status='active') for index in range(3)]
+    _db.session.add_all(created)
+    _db.session.commit()
+    # 只返回 ID/UUID 快照，避免测试中访问 ORM 属性触发额外查询
+    yield [SimpleNamespace(id=user.id, uuid=user.uuid) for user in created]
+    identity_service.clear_local()
+
+
+@pytest.fixture()
+def user_queries(sqlite_app):
+    """记录查询 users 表的 SQL 条数"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'FROM users' in statement:
+            statements.append(statement)
+
+    event.listen(_db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(_db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _set_row(user_id, **values):
+    """绕过服务直接改库 (不会触发缓存失效)"""
+    _db.session.execute(User.__table__.update().where(User.id == user_id).values(**values))
+    _db.session.commit()
+
+
+def test_resolve_by_uuid_or_id_and_unknown_identity(users):
+    user = users[0]
+    by_uuid = identity_service.resolve(user.uuid)
+    assert isinstance(by_uuid, CurrentIdentity)
+    assert (by_uuid.id, by_uuid.uuid, by_uuid.current_role, by_uuid.status) == (user.id, user.uuid, 'freelancer', 'active')
+    assert by_uuid.has_role('employer') and not by_uuid.has_role('admin')
+    assert identity_service.resolve_user_id(user.id) == user.id
+    with pytest.raises(NotFoundException):
+        identity_service.resolve('00000000-0000-0000-0000-000000000000')
+
+
+def test_local_cache_hit_skips_database(users, user_queries):
+    user = users[0]
+    identity_service.resolve(user.uuid)
+    assert len(user_queries) == 1
+
+    identity_service.resolve(user.uuid)
+    assert len(user_queries) == 1
+
+
+def test_local_cache_evicts_least_recently_used(sqlite_app, users, user_queries):
+    sqlite_app.config['IDENTITY_CACHE_MAX_SIZE'] = 2
+    sqlite_app.config['IDENTITY_CACHE_USE_SHARED'] = False
+    first, second, third = users
+
+    identity_service.resolve(first.uuid)
+    identity_service.resolve(second.uuid)
+    identity_service.resolve(first.uuid)  # first 变为最近使用
+    identity_service.resolve(third.uuid)  # 淘汰 second
+    assert len(user_queries) == 3
+    assert list(identity_service._local) == [first.uuid, third.uuid]
+
+    identity_service.resolve(first.uuid)
+    assert len(user_queries) == 3
+    identity_service.resolve(second.uuid)
+    assert len(user_queries) == 4
+
+
+def test_local_cache_entries_expire_after_ttl(sqlite_app, users, user_queries, monkeypatch):
+    sqlite_app.config['IDENTITY_CACHE_LOCAL_TTL'] = 30
+    sqlite_app.config['IDENTITY_CACHE_USE_SHARED'] = False
+    now = [1000.0]
+    monkeypatch.setattr(identity_module, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    user = users[0]
+
+    identity_service.resolve(user.uuid)
+    now[0] += 29
+    identity_service.resolve(user.uuid)
+    assert len(user_queries) == 1
+
+    _set_row(user.id, current_role='employer')
+    assert identity_service.resolve(user.uuid).current_role == 'freelancer'
+    now[0] += 2
+    assert identity_service.resolve(user.uuid).current_role == 'employer'
+
+
+def test_shared_cache_serves_other_processes(users, user_queries):
+    user = users[0]
+    identity_service.resolve(user.uuid)
+    assert cache.get(f'identity:{user.uuid}')['id'] == user.id
+
+    # 模拟另一个进程：本地缓存为空，命中共享缓存，不查库
+    identity_service.clear_local()
+    _set_row(user.id, current_role='employer')
+    queries_before = len(user_queries)
+    assert identity_service.resolve(user.uuid).current_role == 'freelancer'
+    assert len(user_queries) == queries_before
+
+
+def test_current_identity_reads_jwt_subject(sqlite_app, users):
+    user = users[1]
+    token = create_access_token(identity=user.uuid)
+    with sqlite_app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+        verify_jwt_in_request()
+        assert identity_service.current_identity().id == user.id
+        assert identity_service.current_user_id() == user.id
+
+
+def test_switch_role_invalidates_both_tiers(users):
+    user = users[0]
+    assert identity_service.resolve(user.uuid).current_role == 'freelancer'
+    assert identity_service.resolve(user.id).current_role == 'freelancer'
+
+    user_service.switch_role(user.id, 'employer')
+
+    assert cache.get(f'identity:{user.uuid}') is None
+    assert identity_service.resolve(user.uuid).current_role == 'employer'
+    assert identity_service.resolve(user.id).current_role == 'employer'
+
+
+def test_admin_status_change_invalidates_identity(users):
+    user = users[0]
+    assert identity_service.resolve(user.uuid).status == 'active'
+
+    admin_user_service.update_user_status_by_admin(1, user.uuid, {'status': 'banned', 'ban_reason': 'spam'})
+
+    assert identity_service.resolve(user.uuid).status == 'banned'
+
+
+def test_verification_approval_invalidates_identity(users):
+    user = users[0]
+    _set_row(user.id, status='pending_verification')
+    _db.session.add(FreelancerProfile(user_id=user.id))
+    record = VerificationRecord(user_id=user.id, profile_type=VerificationProfileTypeEnum.freelancer,
+                                submitted_data={'real_name': 'Test'})
+    _db.session.add(record)
+    _db.session.flush()
+    record_id = record.id
+    _db.session.commit()
+    assert identity_service.resolve(user.uuid).status == 'pending_verification'
+    _db.session.commit()  # 审核在自己的事务中执行
+
+    admin_verification_service.review_verification_request(1, record_id, {'action': 'approve'})
+
+    assert identity_service.resolve(user.uuid).status == 'active'
+
+
+def test_job_and_order_endpoints_use_cached_identity(sqlite_app, users, user_queries):
+    user = users[0]
+    headers = {'Authorization': f'Bearer {create_access_token(identity=user.uuid)}'}
+    identity_service.resolve(user.uuid)
+    client = sqlite_app.test_client()
+
+    response = client.get('/api/v1/orders/?role=freelancer', headers=headers)
+    assert response.status_code == 200
+    # 身份与角色校验通过后才会校验必填字段
+    assert client.post('/api/v1/jobs/', json={}, headers=headers).status_code == 400
+    assert len(user_queries) == 1
@@ -0,0 +1,156 @@
+"""工作读路径缓存测试 (SimpleCache + SQLite 内存库，无需启动服务)"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.extensions import db as _db, cache
+from app.models.job import Job, JobStatusEnum
+from app.models.skill import Skill, JobRequiredSkill
+from app.models.user import User
+from app.services.job_cache import job_cache
+from app.services.job_view_counter import job_view_counter
+
+
+@pytest.fixture()
+def sqlite_config():
+    return {'CACHE_TYPE': 'SimpleCache'}
+
+
+def _create_job(title='Cached job title', category='delivery', tags=None):
+    employer = User.query.filter_by(phone_number='13800000000').first()
+    if employer is None:
+        employer = User(phone_number='13800000000', password_hash='x', current_role='employer', available_roles=['employer'])
+        _db.session.add(employer)
+        _db.session.flush()
+    now = datetime.utcnow()
+    job = Job(employer_user_id=employer.id, title=title, description='A job description long enough for the schema.',
+              job_category=category, job_tags=tags or ['tag-a'], location_address='Somewhere',
+              start_time=now + timedelta(days=1), end_time=now + timedelta(days=2), salary_amount=100,
+              salary_type='daily', status=JobStatusEnum.active)
+    _db.session.add(job)
+    _db.session.commit()
+    return job
+
+
+def test_job_detail_is_served_from_cache(sqlite_app):
+    job = _create_job()
+    client = sqlite_app.test_client()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {'id': job.id, 'title': Job.query.get(job.id).title}
+
+    assert job_cache.get_job_detail(job.id, loader)['title'] == 'Cached job title'
+    assert job_cache.get_job_detail(job.id, loader)['title'] == 'Cached job title'
+    assert len(calls) == 1
+
+    response = client.get(f'/api/v1/jobs/{job.id}')
+    assert response.status_code == 200
+
+
+def test_job_update_invalidates_detail_after_commit(sqlite_app):
+    job = _create_job()
+    client = sqlite_app.test_client()
+
+    assert client.get(f'/api/v1/jobs/{job.id}').get_json()['data']['title'] == 'Cached job title'
+
+    job = Job.query.get(job.id)
+    job.title = 'Updated job title'
+    _db.session.flush()
+    # 提交前缓存保持不变 (未提交的数据不能被其他请求读到)
+    assert cache.get(f'job:detail:{job.id}')['title'] == 'Cached job title'
+    _db.session.commit()
+
+    assert cache.get(f'job:detail:{job.id}') is None
+    assert client.get(f'/api/v1/jobs/{job.id}').get_json()['data']['title'] == 'Updated job title'
+
+
+def test_view_count_does_not_invalidate_detail(sqlite_app):
+    job = _create_job()
+    client = sqlite_app.test_client()
+
+    client.get(f'/api/v1/jobs/{job.id}')
+    client.get(f'/api/v1/jobs/{job.id}')
+
+    assert cache.get(f'job:detail:{job.id}') is not None
+    job_view_counter.flush()
+    assert _db.session.query(Job.view_count).filter(Job.id == job.id).scalar() == 2
+    assert cache.get(f'job:detail:{job.id}') is not None
+
+
+def test_rolled_back_changes_do_not_invalidate(sqlite_app):
+    job = _create_job()
+    job_cache.get_job_detail(job.id, lambda: {'id': job.id})
+
+    job = Job.query.get(job.id)
+    job.title = 'Never committed'
+    _db.session.flush()
+    _db.session.rollback()
+
+    assert cache.get(f'job:detail:{job.id}') == {'id': job.id}
+
+
+def test_listings_are_invalidated_by_job_and_skill_changes(sqlite_app):
+    job = _create_job(category='delivery', tags=['night'])
+    client = sqlite_app.test_client()
+
+    assert client.get('/api/v1/jobs/categories').get_json()['data']['categories'] == ['delivery']
+    first_page = client.get('/api/v1/jobs?page=1&per_page=10').get_json()['data']
+    assert [item['id'] for item in first_page['items']] == [job.id]
+
+    _create_job(title='Another cached job', category='cleaning', tags=['day'])
+    assert client.get('/api/v1/jobs/categories').get_json()['data']['categories'] == ['cleaning', 'delivery']
+    assert client.get('/api/v1/jobs/tags').get_json()['data']['tags'] == ['day', 'night']
+    assert len(client.get('/api/v1/jobs?page=1&per_page=10').get_json()['data']['items']) == 2
+
+    skill = Skill(name='Forklift')
+    _db.session.add(skill)
+    _db.session.commit()
+    job_cache.get_job_detail(job.id, lambda: {'id': job.id})
+    _db.session.add(JobRequiredSkill(job_id=job.id, skill_id=skill.id))
+    _db.session.commit()
+    assert cache.get(f'job:detail:{job.id}') is None
+
+
+def test_search_cache_key_is_normalized_and_limited_to_first_pages(sqlite_app):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {'items': [], 'pagination': {}}
+
+    job_cache.get_search_page({'q': ' 搬家 ', 'location_city': None}, None, 1, 20, None, False, loader)
+    job_cache.get_search_page({'q': '搬家'}, None, 1, 20, None, False, loader)
+    assert len(calls) == 1
+
+    # 超过缓存页数或游标分页的后续页不缓存
+    job_cache.get_search_page({'q': '搬家'}, None, 99, 20, None, False, loader)
+    job_cache.get_search_page({'q': '搬家'}, None, 99, 20, None, False, loader)
+    job_cache.get_search_page({'q': '搬家'}, None, 1, 20, 'next-cursor', False, loader)
+    assert len(calls) == 4
+
+
+def test_concurrent_misses_load_once(sqlite_app):
+    calls = []
+    results = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'id': 42}
+
+    def worker():
+        with sqlite_app.app_context():
+            results.append(job_cache.get_job_detail(42, loader))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{'id': 42}] * 8
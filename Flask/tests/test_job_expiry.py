@@ -0,0 +1,146 @@
+"""工作过期清理测试 (SimpleCache + SQLite 内存库，无需启动服务)"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.extensions import db as _db, cache
+from app.models.job import Job, JobApplication, JobStatusEnum
+from app.models.user import User
+from app.services.job_cache import job_cache
+from app.services.job_expiry import LEASE_NAME, job_expiry_sweeper
+from app.services.job_recommendation import job_recommender
+from app.services.job_search_index import job_search_index
+from app.services.job_service import job_service
+from app.services.job_taxonomy_service import job_taxonomy_service
+from app.services.scheduler_lease import scheduler_lease_service
+
+
+@pytest.fixture()
+def sqlite_config():
+    return {'CACHE_TYPE': 'SimpleCache'}
+
+
+@pytest.fixture()
+def expiry_app(sqlite_app):
+    job_search_index.reset()
+    yield sqlite_app
+    job_search_index.reset()
+
+
+@pytest.fixture()
+def users(expiry_app):
+    employer, freelancer_a, freelancer_b = [
+        User(phone_number=f'1380000070{index}', password_hash='x', current_role=role, available_roles=[role])
+        for index, role in enumerate(('employer', 'freelancer', 'freelancer'))]
+    _db.session.add_all([employer, freelancer_a, freelancer_b])
+    _db.session.commit()
+    return employer.id, freelancer_a.id, freelancer_b.id
+
+
+def _job(employer_id, deadline_days=None, end_days=2, status=JobStatusEnum.active, title='Expiring job',
+         job_category='delivery', job_tags=None):
+    now = datetime.utcnow()
+    job = Job(employer_user_id=employer_id, title=title, description='A job description long enough for the schema.',
+              job_category=job_category, job_tags=job_tags, location_address='Somewhere', start_time=now + timedelta(days=end_days - 1),
+              end_time=now + timedelta(days=end_days), salary_amount=100, salary_type='daily', status=status,
+              application_deadline=None if deadline_days is None else now + timedelta(days=deadline_days))
+    _db.session.add(job)
+    _db.session.commit()
+    return job.id
+
+
+def _apply(job_id, employer_id, freelancer_id, status='pending'):
+    _db.session.add(JobApplication(job_id=job_id, employer_user_id=employer_id, freelancer_user_id=freelancer_id, status=status))
+    _db.session.commit()
+
+
+def _statuses(model):
+    return {row_id: status.value for row_id, status in _db.session.query(model.id, model.status).all()}
+
+
+def test_overdue_jobs_expire_in_batches_and_reject_open_applications(users, monkeypatch):
+    employer_id, freelancer_a, freelancer_b = users
+    past_deadline = [_job(employer_id, deadline_days=-index - 1) for index in range(3)]
+    past_end = [_job(employer_id, end_days=-1), _job(employer_id, deadline_days=5, end_days=-2)]
+    open_job = _job(employer_id, deadline_days=1)
+    filled_job = _job(employer_id, deadline_days=-1, status=JobStatusEnum.filled)
+    _apply(past_deadline[0], employer_id, freelancer_a)
+    _apply(past_deadline[0], employer_id, freelancer_b, status='accepted')
+    _apply(past_end[0], employer_id, freelancer_a, status='viewed')
+    _apply(open_job, employer_id, freelancer_b)
+
+    detail_loads = []
+    job_cache.get_job_detail(past_deadline[0], lambda: detail_loads.append(1) or {'id': past_deadline[0]})
+    generation = cache.get('job:list:gen')
+    changed = []
+    monkeypatch.setattr(job_recommender, 'mark_jobs_changed', lambda job_ids: changed.extend(job_ids))
+
+    stats = job_expiry_sweeper.run_once(batch_size=2)
+
+    assert stats['acquired'] is True
+    assert (stats['expired_by_deadline'], stats['expired_by_end_time'], stats['applications_rejected']) == (3, 2, 2)
+    assert stats['batches'] == 3
+    assert stats['max_overdue_seconds'] >= 3 * 86400 - 60
+    jobs = _statuses(Job)
+    assert all(jobs[job_id] == 'expired' for job_id in past_deadline + past_end)
+    assert (jobs[open_job], jobs[filled_job]) == ('active', 'filled')
+    applications = {(application.job_id, application.freelancer_user_id): application for application in JobApplication.query.all()}
+    assert applications[(past_deadline[0], freelancer_a)].status.value == 'rejected'
+    assert applications[(past_deadline[0], freelancer_a)].rejection_reason
+    assert applications[(past_deadline[0], freelancer_b)].status.value == 'accepted'
+    assert applications[(past_end[0], freelancer_a)].status.value == 'rejected'
+    assert applications[(open_job, freelancer_b)].status.value == 'pending'
+
+    # 缓存与推荐引擎收到变更
+    assert cache.get('job:list:gen') != generation
+    job_cache.get_job_detail(past_deadline[0], lambda: detail_loads.append(1) or {'id': past_deadline[0]})
+    assert len(detail_loads) == 2
+    assert set(changed) == set(past_deadline + past_end)
+    # 搜索默认只返回招聘中的工作
+    assert [job.id for job in job_service.search_jobs(filters={'job_category': 'delivery'}).items] == [open_job]
+
+    assert job_expiry_sweeper.run_once()['batches'] == 0
+
+
+def test_expired_jobs_leave_search_index_and_taxonomy(users):
+    employer_id = users[0]
+    expiring = _job(employer_id, deadline_days=-1, title='Plumbing repair', job_category='repair', job_tags=['plumbing', 'weekend'])
+    open_job = _job(employer_id, deadline_days=1, title='Plumbing helper', job_category='delivery', job_tags=['weekend'])
+    active_filters = {'status': 'active'}
+
+    def facets():
+        return job_cache.get_search_facets(active_filters, lambda: job_service.get_search_facets(active_filters))
+
+    assert {job_id for job_id, _ in job_search_index.search('plumbing')} == {expiring, open_job}
+    assert job_taxonomy_service.get_tags() == ['plumbing', 'weekend']
+    assert job_taxonomy_service.get_categories() == ['delivery', 'repair']
+    assert {item['value'] for item in facets()['job_category']} == {'delivery', 'repair'}
+
+    assert job_expiry_sweeper.run_once()['expired_by_deadline'] == 1
+
+    assert [job_id for job_id, _ in job_search_index.search('plumbing')] == [open_job]
+    assert job_taxonomy_service.get_top_tags() == [{'name': 'weekend', 'usage_count': 1}]
+    assert job_taxonomy_service.get_categories() == ['delivery']
+    assert facets()['job_category'] == [{'value': 'delivery', 'count': 1}]
+    # 增量扣减与全量重建结果一致
+    job_taxonomy_service.rebuild()
+    assert job_taxonomy_service.get_top_tags() == [{'name': 'weekend', 'usage_count': 1}]
+
+
+def test_max_batches_limits_a_run(users):
+    employer_id = users[0]
+    job_ids = [_job(employer_id, deadline_days=-1) for _ in range(3)]
+
+    assert job_expiry_sweeper.run_once(batch_size=1, max_batches=2)['expired_by_deadline'] == 2
+    assert sorted(_statuses(Job).values()) == ['active', 'expired', 'expired']
+    assert job_expiry_sweeper.run_once(batch_size=1)['expired_by_deadline'] == 1
+    assert set(_statuses(Job)) == set(job_ids)
+
+
+def test_lease_held_elsewhere_skips_the_sweep(users):
+    job_id = _job(users[0], deadline_days=-1)
+    assert scheduler_lease_service.acquire(LEASE_NAME, 'other-node', 60)
+
+    stats = job_expiry_sweeper.run_once()
+    assert (stats['acquired'], stats['batches']) == (False, 0)
+    assert _statuses(Job)[job_id] == 'active'
@@ -0,0 +1,76 @@
+"""工作搜索分面统计测试 (SimpleCache + SQLite 内存库，无需启动服务)"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.extensions import db as _db
+from app.models.job import Job, JobStatusEnum
+from app.models.user import User
+from app.services.job_service import job_service
+
+
+@pytest.fixture()
+def sqlite_config():
+    return {'CACHE_TYPE': 'SimpleCache'}
+
+
+def _seed_jobs():
+    employer = User(phone_number='13600000000', password_hash='x', current_role='employer', available_roles=['employer'])
+    _db.session.add(employer)
+    _db.session.flush()
+    now = datetime.utcnow()
+    specs = [
+        ('delivery', '厦门市', '思明区', 'daily', True, JobStatusEnum.active),
+        ('delivery', '厦门市', '湖里区', 'hourly', False, JobStatusEnum.active),
+        ('cleaning', '厦门市', '思明区', 'daily', False, JobStatusEnum.active),
+        ('cleaning', '福州市', '鼓楼区', 'daily', True, JobStatusEnum.active),
+        ('delivery', '厦门市', '思明区', 'daily', True, JobStatusEnum.cancelled),
+    ]
+    for category, city, district, salary_type, urgent, status in specs:
+        _db.session.add(Job(employer_user_id=employer.id, title='Facet job', description='A job description long enough.',
+                            job_category=category, location_address='Somewhere', location_city=city,
+                            location_district=district, start_time=now + timedelta(days=1), end_time=now + timedelta(days=2),
+                            salary_amount=100, salary_type=salary_type, is_urgent=urgent, status=status))
+    _db.session.commit()
+
+
+def _as_dict(facet):
+    return {entry['value']: entry['count'] for entry in facet}
+
+
+def test_facets_exclude_own_dimension(sqlite_app):
+    _seed_jobs()
+
+    facets = job_service.get_search_facets({'job_category': 'delivery', 'location_city': '厦门市'})
+
+    # 类别分面不受自身条件限制，仍返回其他类别的数量
+    assert _as_dict(facets['job_category']) == {'delivery': 2, 'cleaning': 1}
+    assert _as_dict(facets['location_city']) == {'厦门市': 2}
+    assert _as_dict(facets['location_district']) == {'思明区': 1, '湖里区': 1}
+    assert _as_dict(facets['salary_type']) == {'daily': 1, 'hourly': 1}
+    assert _as_dict(facets['is_urgent']) == {True: 1, False: 1}
+
+
+def test_facets_respect_non_facet_filters(sqlite_app):
+    _seed_jobs()
+
+    facets = job_service.get_search_facets({'status': 'cancelled'})
+
+    assert _as_dict(facets['job_category']) == {'delivery': 1}
+
+
+def test_list_endpoint_returns_cached_facets(sqlite_app, monkeypatch):
+    _seed_jobs()
+    client = sqlite_app.test_client()
+
+    data = client.get('/api/v1/jobs?include_facets=true&job_category=cleaning').get_json()['data']
+    assert len(data['items']) == 2
+    assert _as_dict(data['facets']['job_category']) == {'delivery': 2, 'cleaning': 2}
+    assert _as_dict(data['facets']['location_city']) == {'厦门市': 1, '福州市': 1}
+
+    # 翻页复用同一份分面统计
+    calls = []
+    original = job_service.get_search_facets
+    monkeypatch.setattr(job_service, 'get_search_facets', lambda filters=None: calls.append(filters) or original(filters))
+    client.get('/api/v1/jobs?include_facets=true&job_category=cleaning&page=2')
+    assert calls == []
@@ -0,0 +1,85 @@
+"""地理范围搜索测试 (SQLite 内存库，无需启动服务)"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.extensions import db as _db
+from app.models.job import Job, JobStatusEnum
+from app.models.user import User
+from app.services.job_service import job_service
+from app.utils.geo import EARTH_RADIUS_KM, geohash_encode
+
+
+@pytest.fixture()
+def sqlite_config():
+    return {'CACHE_TYPE': 'SimpleCache'}
+
+
+@pytest.fixture()
+def employer_id(sqlite_app):
+    employer = User(phone_number='13800000950', password_hash='x', current_role='employer', available_roles=['employer'])
+    _db.session.add(employer)
+    _db.session.commit()
+    return employer.id
+
+
+def _job(employer_id, lat, lng, title='Geo job'):
+    now = datetime.utcnow()
+    point = {'type': 'Point', 'coordinates': [lng, lat]}
+    job = Job(employer_user_id=employer_id, title=title, description='Weekend shift, paid daily.', job_category='delivery',
+              location_address='Somewhere', location_point=point, **job_service._location_columns(point),
+              start_time=now + timedelta(days=1), end_time=now + timedelta(days=2), salary_amount=100,
+              salary_type='daily', status=JobStatusEnum.active)
+    _db.session.add(job)
+    _db.session.commit()
+    return job.id
+
+
+def _km_to_lat_degrees(km):
+    return km / (EARTH_RADIUS_KM * 3.141592653589793 / 180)
+
+
+def _search(lat, lng, radius_km, sort_by='distance_asc'):
+    result = job_service.search_jobs({'latitude': lat, 'longitude': lng, 'radius_km': radius_km}, sort_by=sort_by)
+    return [(job.id, job.distance_km) for job in result.items]
+
+
+def test_radius_edge_is_inclusive_and_corners_are_excluded(employer_id):
+    inside = _job(employer_id, 30 + _km_to_lat_degrees(4.99), 120)
+    outside = _job(employer_id, 30 + _km_to_lat_degrees(5.01), 120)
+    # 外接矩形的角落: 在矩形内但超出半径
+    corner = _job(employer_id, 30 + _km_to_lat_degrees(4.5), 120 + _km_to_lat_degrees(4.5) / 0.866)
+
+    found = dict(_search(30, 120, 5))
+    assert inside in found and found[inside] == pytest.approx(4.99, abs=0.01)
+    assert outside not in found
+    assert corner not in found
+
+
+def test_results_across_geohash_cell_boundaries(employer_id):
+    # 赤道与本初子午线交点附近，四个象限的 geohash 首字符各不相同
+    points = [(0.01, 0.01), (0.01, -0.01), (-0.01, 0.01), (-0.01, -0.01)]
+    assert len({geohash_encode(lat, lng, 1) for lat, lng in points}) == 4
+    job_ids = [_job(employer_id, lat, lng) for lat, lng in points]
+    far = _job(employer_id, 0.5, 0.5)
+
+    found = [job_id for job_id, _ in _search(0, 0, 3)]
+    assert sorted(found) == sorted(job_ids)
+    assert far not in found
+
+
+def test_results_across_antimeridian(employer_id):
+    east = _job(employer_id, 10, 179.99)
+    west = _job(employer_id, 10, -179.99)
+    _job(employer_id, 10, 170)
+
+    found = [job_id for job_id, _ in _search(10, 179.995, 5)]
+    assert sorted(found) == sorted([east, west])
+
+
+def test_candidates_are_capped_to_the_nearest(sqlite_app, employer_id):
+    sqlite_app.config['JOB_GEO_MAX_CANDIDATES'] = 3
+    job_ids = [_job(employer_id, 30 + _km_to_lat_degrees(km), 120) for km in (4, 1, 3, 2, 0.5)]
+
+    found = _search(30, 120, 10)
+    assert [job_id for job_id, _ in found] == [job_ids[4], job_ids[1], job_ids[3]]
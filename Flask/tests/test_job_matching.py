@@ -0,0 +1,116 @@
+"""急聘工作反向匹配测试 (SQLite 内存库，无需启动服务)"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.extensions import db as _db
+from app.models.job import Job
+from app.models.notification import Notification, NotificationTypeEnum
+from app.models.profile import FreelancerProfile
+from app.models.skill import Skill, FreelancerSkill, JobRequiredSkill
+from app.models.user import User
+from app.services.job_matching_service import job_matching_service
+from app.services.job_service import job_service
+from app.services.task_queue import task_queue
+
+
+@pytest.fixture()
+def world(sqlite_app):
+    employer = User(phone_number='13600000000', password_hash='x', current_role='employer',
+                    available_roles=['employer'], status='active')
+    skills = [Skill(name='forklift'), Skill(name='driving')]
+    _db.session.add_all([employer, *skills])
+    _db.session.flush()
+
+    freelancers = {}
+    # 名称: (城市, 区县, 技能, 账号状态)
+    for index, (name, city, district, skill_names, status) in enumerate([
+        ('qualified', '厦门市', '思明区', ['forklift', 'driving'], 'active'),
+        ('no_district', '厦门市', None, ['forklift'], 'active'),
+        ('missing_skill', '厦门市', '思明区', ['driving'], 'active'),
+        ('other_district', '厦门市', '湖里区', ['forklift'], 'active'),
+        ('other_city', '福州市', '思明区', ['forklift'], 'active'),
+        ('banned', '厦门市', '思明区', ['forklift'], 'banned'),
+    ]):
+        user = User(phone_number=f'1360000010{index}', password_hash='x', current_role='freelancer',
+                    available_roles=['freelancer'], status=status)
+        _db.session.add(user)
+        _db.session.flush()
+        _db.session.add(FreelancerProfile(user_id=user.id, location_city=city, location_district=district))
+        for skill in skills:
+            if skill.name in skill_names:
+                _db.session.add(FreelancerSkill(freelancer_user_id=user.id, skill_id=skill.id))
+        freelancers[name] = user.id
+    _db.session.commit()
+    return {'employer': employer.id, 'freelancers': freelancers, 'skills': {skill.name: skill.id for skill in skills}}
+
+
+def _job_data(is_urgent=True):
+    now = datetime.utcnow()
+    return {
+        'title': 'Urgent forklift driver', 'description': 'A job description long enough.', 'job_category': 'warehouse',
+        'location_address': 'Somewhere', 'location_city': '厦门市', 'location_district': '思明区',
+        'start_time': (now + timedelta(days=1)).isoformat(), 'end_time': (now + timedelta(days=2)).isoformat(),
+        'salary_amount': 200, 'salary_type': 'daily', 'required_people': 1, 'is_urgent': is_urgent,
+    }
+
+
+def _notified_user_ids(job_id):
+    return {user_id for (user_id,) in _db.session.query(Notification.user_id)
+            .filter(Notification.related_resource_type == 'job', Notification.related_resource_id == job_id).all()}
+
+
+def test_urgent_job_notifies_freelancers_nearby(world):
+    job = job_service.create_job(world['employer'], _job_data())
+
+    freelancers = world['freelancers']
+    assert _notified_user_ids(job.id) == {freelancers['qualified'], freelancers['no_district'], freelancers['missing_skill']}
+    notification = Notification.query.filter_by(user_id=freelancers['qualified']).one()
+    assert notification.notification_type == NotificationTypeEnum.job_recommendation
+    assert notification.is_read is False
+
+
+def test_regular_job_does_not_notify(world):
+    job = job_service.create_job(world['employer'], _job_data(is_urgent=False))
+
+    assert _notified_user_ids(job.id) == set()
+
+
+def test_mandatory_skills_must_be_covered_in_batches(world, sqlite_app, monkeypatch):
+    monkeypatch.setitem(sqlite_app.config, 'JOB_MATCHING_ENABLED', False)
+    job = job_service.create_job(world['employer'], _job_data())
+    _db.session.add_all([
+        JobRequiredSkill(job_id=job.id, skill_id=world['skills']['forklift'], is_mandatory=True),
+        JobRequiredSkill(job_id=job.id, skill_id=world['skills']['driving'], is_mandatory=False),
+    ])
+    _db.session.commit()
+
+    monkeypatch.setitem(sqlite_app.config, 'JOB_MATCHING_BATCH_SIZE', 1)
+    assert job_matching_service.notify_matching_freelancers(job.id) == 2
+
+    freelancers = world['freelancers']
+    assert _notified_user_ids(job.id) == {freelancers['qualified'], freelancers['no_district']}
+
+
+def test_closed_job_is_skipped(world, sqlite_app, monkeypatch):
+    monkeypatch.setitem(sqlite_app.config, 'JOB_MATCHING_ENABLED', False)
+    job = job_service.create_job(world['employer'], _job_data())
+    job_service.delete_job(job.id, world['employer'])
+
+    assert job_matching_service.notify_matching_freelancers(job.id) == 0
+    assert Job.query.get(job.id) is not None
+
+
+def test_async_matching_runs_as_an_idempotent_background_task(world, sqlite_app, monkeypatch):
+    monkeypatch.setitem(sqlite_app.config, 'JOB_MATCHING_ASYNC', True)
+    job_id = job_service.create_job(world['employer'], _job_data()).id
+    assert _notified_user_ids(job_id) == set()
+    # 同一工作重复提交只入队一次
+    job_matching_service.dispatch_urgent_job(job_id)
+
+    assert task_queue.run_pending() == 1
+    freelancers = world['freelancers']
+    assert _notified_user_ids(job_id) == {freelancers['qualified'], freelancers['no_district'], freelancers['missing_skill']}
+    # 任务重复执行 (重试或租约到期后重新领取) 不会重复通知
+    assert job_matching_service.notify_matching_freelancers(job_id) == 0
+    assert Notification.query.filter_by(related_resource_id=job_id).count() == 3
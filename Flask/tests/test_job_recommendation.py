@@ -0,0 +1,130 @@
+"""工作推荐引擎测试 (SQLite 内存库，无需启动服务)"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.extensions import db as _db
+from app.models.job import Job, JobApplication, JobRecommendationList, JobStatusEnum
+from app.models.profile import FreelancerProfile
+from app.models.skill import Skill, FreelancerSkill, JobRequiredSkill, ProficiencyLevelEnum
+from app.models.user import User
+from app.services.job_recommendation import job_recommender
+from app.services.job_recommendation_lists import job_recommendation_lists, unpack_job_ids
+from app.services.job_service import job_service
+
+
+@pytest.fixture()
+def recommendation_app(sqlite_app):
+    job_recommender.rebuild()
+    return sqlite_app
+
+
+@pytest.fixture()
+def world(recommendation_app):
+    employer = User(phone_number='13500000000', password_hash='x', current_role='employer', available_roles=['employer'])
+    freelancer = User(phone_number='13500000001', password_hash='x', current_role='freelancer', available_roles=['freelancer'],
+                      status='active')
+    skills = [Skill(name=name) for name in ('forklift', 'cooking', 'driving')]
+    _db.session.add_all([employer, freelancer, *skills])
+    _db.session.flush()
+    _db.session.add(FreelancerProfile(user_id=freelancer.id, location_province='福建省', location_city='厦门市',
+                                      location_district='思明区', work_preference={'categories': ['warehouse']}))
+    _db.session.add(FreelancerSkill(freelancer_user_id=freelancer.id, skill_id=skills[0].id,
+                                    proficiency_level=ProficiencyLevelEnum.expert, years_of_experience=5))
+    _db.session.commit()
+    return {'employer': employer.id, 'freelancer': freelancer.id, 'skills': {skill.name: skill.id for skill in skills}}
+
+
+def _create_job(world, title, skills, city='厦门市', category='warehouse', status=JobStatusEnum.active):
+    now = datetime.utcnow()
+    job = Job(employer_user_id=world['employer'], title=title, description='A job description long enough.',
+              job_category=category, location_address='Somewhere', location_province='福建省', location_city=city,
+              start_time=now + timedelta(days=1), end_time=now + timedelta(days=2), salary_amount=100,
+              salary_type='daily', status=status)
+    _db.session.add(job)
+    _db.session.flush()
+    for name, is_mandatory in skills:
+        _db.session.add(JobRequiredSkill(job_id=job.id, skill_id=world['skills'][name], is_mandatory=is_mandatory))
+    _db.session.commit()
+    return job.id
+
+
+def test_ranks_by_skill_match_and_location(world):
+    forklift_local = _create_job(world, 'Forklift local', [('forklift', True)])
+    forklift_remote = _create_job(world, 'Forklift remote', [('forklift', True)], city='福州市', category='retail')
+    cooking = _create_job(world, 'Cooking', [('cooking', True)])
+    _create_job(world, 'Cancelled forklift', [('forklift', True)], status=JobStatusEnum.cancelled)
+
+    jobs = job_service.get_recommended_jobs(world['freelancer'], count=10)
+
+    assert [job.id for job in jobs] == [forklift_local, forklift_remote, cooking]
+
+
+def test_job_changes_are_applied_incrementally(world):
+    first = _create_job(world, 'Cooking', [('cooking', True)])
+    assert job_recommender.recommend(world['freelancer'], count=5) == [first]
+
+    # 推荐矩阵构建后新增、修改、取消的工作在下次推荐时生效
+    second = _create_job(world, 'Forklift', [('forklift', True)])
+    job_service.add_required_skill_to_job(first, world['employer'], {'skill_id': world['skills']['forklift'], 'is_mandatory': False})
+    assert job_recommender.recommend(world['freelancer'], count=5) == [second, first]
+
+    job_service.delete_job(second, world['employer'])
+    assert job_recommender.recommend(world['freelancer'], count=5) == [first]
+
+
+def test_applied_jobs_are_excluded(world):
+    applied = _create_job(world, 'Forklift', [('forklift', True)])
+    other = _create_job(world, 'Driving', [('driving', False)])
+    _db.session.add(JobApplication(job_id=applied, freelancer_user_id=world['freelancer'], employer_user_id=world['employer']))
+    _db.session.commit()
+
+    assert job_recommender.recommend(world['freelancer'], count=5) == [other]
+
+
+def test_compaction_keeps_scores(world, recommendation_app, monkeypatch):
+    job_ids = [_create_job(world, f'Forklift {i}', [('forklift', i % 2 == 0)]) for i in range(6)]
+    before = job_recommender.recommend(world['freelancer'], count=6)
+
+    monkeypatch.setitem(recommendation_app.config, 'JOB_RECOMMENDATION_COMPACT_THRESHOLD', 0)
+    job_recommender.mark_jobs_changed(job_ids)
+    assert job_recommender.recommend(world['freelancer'], count=6) == before
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_precomputed_lists_are_served_and_refreshed_incrementally(world, recommendation_app, monkeypatch, workers):
+    monkeypatch.setitem(recommendation_app.config, 'JOB_RECOMMENDATION_PRECOMPUTE_SIZE', 2)
+    forklift = _create_job(world, 'Forklift', [('forklift', True)])
+    cooking = _create_job(world, 'Cooking', [('cooking', True)])
+    driving = _create_job(world, 'Driving', [('driving', True)], city='福州市')
+
+    assert job_recommendation_lists.precompute(workers=workers)['refreshed'] == 1
+    row = _db.session.get(JobRecommendationList, world['freelancer'])
+    assert list(unpack_job_ids(row.job_ids)) == [forklift, cooking]
+    # 预计算列表优先: 之后发布的工作在下次刷新前不出现
+    _create_job(world, 'Forklift 2', [('forklift', True)])
+    assert [job.id for job in job_service.get_recommended_jobs(world['freelancer'], count=2)] == [forklift, cooking]
+
+    # 未变化的零工不重新计算
+    assert job_recommendation_lists.precompute(workers=workers)['refreshed'] == 0
+
+    # 列表中的工作关闭后刷新
+    job_service.delete_job(cooking, world['employer'])
+    assert job_recommendation_lists.precompute(workers=workers)['refreshed'] == 1
+    assert cooking not in list(unpack_job_ids(_db.session.get(JobRecommendationList, world['freelancer']).job_ids))
+    assert driving not in list(unpack_job_ids(_db.session.get(JobRecommendationList, world['freelancer']).job_ids))
+
+
+def test_changed_skills_bypass_precomputed_list(world):
+    forklift = _create_job(world, 'Forklift', [('forklift', True)])
+    driving = _create_job(world, 'Driving', [('driving', True)])
+    job_recommendation_lists.precompute(workers=1)
+    assert job_recommendation_lists.get_job_ids(world['freelancer']) == [forklift, driving]
+
+    _db.session.add(FreelancerSkill(freelancer_user_id=world['freelancer'], skill_id=world['skills']['driving'],
+                                    proficiency_level=ProficiencyLevelEnum.expert, years_of_experience=8))
+    _db.session.commit()
+
+    assert job_recommendation_lists.get_job_ids(world['freelancer']) is None
+    assert job_recommendation_lists.precompute(workers=1)['refreshed'] == 1
+    assert job_recommendation_lists.get_job_ids(world['freelancer']) is not None
@@ -0,0 +1,106 @@
+"""工作全文检索索引测试 (SQLite 内存库，无需启动服务)"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.extensions import db as _db
+from app.models.job import Job, JobStatusEnum
+from app.models.user import User
+from app.services.job_search_index import InMemoryJobSearchIndex, job_search_index, tokenize
+from app.services.job_service import job_service
+
+
+@pytest.fixture()
+def sqlite_config():
+    return {'CACHE_TYPE': 'SimpleCache'}
+
+
+@pytest.fixture()
+def search_app(sqlite_app):
+    job_search_index.reset()
+    yield sqlite_app
+    job_search_index.reset()
+
+
+@pytest.fixture()
+def employer_id(search_app):
+    employer = User(phone_number='13800000900', password_hash='x', current_role='employer', available_roles=['employer'])
+    _db.session.add(employer)
+    _db.session.commit()
+    return employer.id
+
+
+def _job(employer_id, title, description='Weekend shift, paid daily.', status=JobStatusEnum.active):
+    now = datetime.utcnow()
+    job = Job(employer_user_id=employer_id, title=title, description=description, job_category='it',
+              location_address='Somewhere', start_time=now + timedelta(days=1), end_time=now + timedelta(days=2),
+              salary_amount=100, salary_type='daily', status=status)
+    _db.session.add(job)
+    _db.session.commit()
+    return job.id
+
+
+def _search_ids(filters, sort_by=None):
+    return sorted(job.id for job in job_service.search_jobs(filters, sort_by=sort_by).items)
+
+
+def test_tokenize_uses_bigrams_and_trigrams():
+    assert tokenize('Python开发') == ['pyt', 'yth', 'tho', 'hon', '开发']
+    assert tokenize('Go 前端工程师') == ['go', '前端', '端工', '工程', '程师']
+
+
+def test_index_matches_substrings_of_latin_words(employer_id):
+    javascript = _job(employer_id, 'JavaScript developer')
+    python = _job(employer_id, 'Senior Python engineer', description='Develops backend services in python.')
+    _job(employer_id, 'Warehouse packer')
+
+    index = InMemoryJobSearchIndex()
+    index.rebuild()
+    assert {job_id for job_id, _ in index.search('script')} == {javascript}
+    assert {job_id for job_id, _ in index.search('develop')} == {javascript, python}
+    assert index.search('rust') == []
+    # 两个字母的片段无法用三元组回答，交给 SQL
+    assert index.search('py') is None
+
+
+def test_index_only_contains_active_jobs(employer_id):
+    active = _job(employer_id, 'Python engineer')
+    cancelled = _job(employer_id, 'Python tester', status=JobStatusEnum.cancelled)
+
+    index = InMemoryJobSearchIndex()
+    index.rebuild()
+    assert {job_id for job_id, _ in index.search('python')} == {active}
+
+    job = _db.session.get(Job, active)
+    job.status = JobStatusEnum.filled
+    _db.session.commit()
+    index.index_job(job)
+    assert index.search('python') == []
+    assert cancelled not in index._doc_lengths
+
+
+def test_search_jobs_falls_back_to_sql_for_short_terms(employer_id):
+    python = _job(employer_id, 'Python engineer')
+    happy = _job(employer_id, 'Happy helper')
+    _job(employer_id, 'Warehouse packer')
+
+    assert _search_ids({'q': 'py'}) == [python, happy]
+    assert _search_ids({'q': 'script'}) == []  # 三元组未命中，无需扫描全表
+    assert _search_ids({'q': 'thon'}, sort_by='relevance') == [python]
+
+
+def test_search_jobs_verifies_index_candidates_with_like(employer_id):
+    # 两个工作都包含 'java' 与 'script' 的三元组，只有一个包含完整子串
+    javascript = _job(employer_id, 'JavaScript developer')
+    _job(employer_id, 'Java and shell script maintainer')
+
+    assert _search_ids({'q': 'javascript'}) == [javascript]
+    assert len(_search_ids({'q': 'script'})) == 2
+
+
+def test_search_other_status_uses_sql(employer_id):
+    _job(employer_id, 'Python engineer')
+    cancelled = _job(employer_id, 'Python tester', status=JobStatusEnum.cancelled)
+
+    assert _search_ids({'q': 'python', 'status': 'cancelled'}) == [cancelled]
+    assert len(_search_ids({'q': 'python'})) == 1
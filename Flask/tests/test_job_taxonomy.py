@@ -0,0 +1,73 @@
+"""工作标签/类别字典测试 (SQLite 内存库，无需启动服务)"""
+from datetime import datetime, timedelta
+
+from app.core.extensions import db as _db
+from app.models.job import Job, JobStatusEnum, JobTaxonomyTerm
+from app.models.user import User
+from app.services.job_service import job_service
+from app.services.job_taxonomy_service import job_taxonomy_service
+
+
+def _create_job(category, tags, status=JobStatusEnum.active):
+    employer = User.query.filter_by(phone_number='13700000000').first()
+    if employer is None:
+        employer = User(phone_number='13700000000', password_hash='x', current_role='employer', available_roles=['employer'])
+        _db.session.add(employer)
+        _db.session.flush()
+    now = datetime.utcnow()
+    job = Job(employer_user_id=employer.id, title='Taxonomy job', description='A job description long enough.',
+              job_category=category, job_tags=tags, location_address='Somewhere', start_time=now + timedelta(days=1),
+              end_time=now + timedelta(days=2), salary_amount=100, salary_type='daily', status=status)
+    _db.session.add(job)
+    _db.session.commit()
+    return job
+
+
+def _usage():
+    return {(term.term_type.value, term.name): term.usage_count for term in JobTaxonomyTerm.query.all()
+            if term.usage_count}
+
+
+def test_dictionary_follows_create_update_and_cancel(sqlite_app):
+    first = _create_job('delivery', ['night', 'weekend'])
+    second = _create_job('delivery', ['night'])
+    _create_job('cleaning', ['day'], status=JobStatusEnum.rejected)
+
+    assert job_service.get_all_job_categories() == ['delivery']
+    assert job_service.get_all_job_tags() == ['night', 'weekend']
+
+    job_service.update_job(second.id, second.employer_user_id, {'job_category': 'moving', 'job_tags': ['night', 'heavy']})
+    assert _usage() == {('category', 'delivery'): 1, ('category', 'moving'): 1,
+                        ('tag', 'night'): 2, ('tag', 'weekend'): 1, ('tag', 'heavy'): 1}
+
+    job_service.delete_job(first.id, first.employer_user_id)
+    assert job_service.get_all_job_categories() == ['moving']
+    assert job_service.get_all_job_tags() == ['heavy', 'night']
+
+
+def test_top_tags_and_prefix_suggestions(sqlite_app):
+    _create_job('delivery', ['night', 'nightshift'])
+    _create_job('delivery', ['night', 'noon'])
+    _create_job('delivery', ['night', 'nightshift', '100%_cash'])
+
+    assert job_taxonomy_service.get_top_tags(2) == [{'name': 'night', 'usage_count': 3},
+                                                    {'name': 'nightshift', 'usage_count': 2}]
+    assert [tag['name'] for tag in job_taxonomy_service.suggest_tags('nig')] == ['night', 'nightshift']
+    assert job_taxonomy_service.suggest_tags('nig', limit=1) == [{'name': 'night', 'usage_count': 3}]
+    assert [tag['name'] for tag in job_taxonomy_service.suggest_tags('100%')] == ['100%_cash']
+    assert job_taxonomy_service.suggest_tags('10_') == []
+
+    client = sqlite_app.test_client()
+    response = client.get('/api/v1/jobs/tags/suggest?prefix=no&limit=5').get_json()
+    assert response['data']['tags'] == [{'name': 'noon', 'usage_count': 1}]
+
+
+def test_rebuild_matches_incremental_counts(sqlite_app):
+    job = _create_job('delivery', ['night', 'weekend'])
+    _create_job('cleaning', ['day'])
+    job_service.update_job(job.id, job.employer_user_id, {'job_tags': ['weekend']})
+    incremental = _usage()
+
+    job_taxonomy_service.rebuild()
+
+    assert _usage() == incremental
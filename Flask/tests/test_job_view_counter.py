@@ -0,0 +1,72 @@
+"""工作浏览次数缓冲计数测试 (SimpleCache + SQLite 内存库，无需启动服务)"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.extensions import db as _db
+from app.models.job import Job, JobStatusEnum
+from app.models.user import User
+from app.services.job_view_counter import job_view_counter
+
+
+@pytest.fixture()
+def sqlite_config():
+    return {'CACHE_TYPE': 'SimpleCache'}
+
+
+def _create_jobs(count):
+    employer = User(phone_number='13900000000', password_hash='x', current_role='employer', available_roles=['employer'])
+    _db.session.add(employer)
+    _db.session.flush()
+    now = datetime.utcnow()
+    jobs = [Job(employer_user_id=employer.id, title=f'Buffered job {i}', description='A job description long enough.',
+                job_category='delivery', location_address='Somewhere', start_time=now + timedelta(days=1),
+                end_time=now + timedelta(days=2), salary_amount=100, salary_type='daily', status=JobStatusEnum.active)
+            for i in range(count)]
+    _db.session.add_all(jobs)
+    _db.session.commit()
+    return [job.id for job in jobs]
+
+
+def _stored_view_count(job_id):
+    return _db.session.query(Job.view_count).filter(Job.id == job_id).scalar()
+
+
+def test_views_are_buffered_and_merged_into_responses(sqlite_app):
+    job_id = _create_jobs(1)[0]
+    client = sqlite_app.test_client()
+
+    counts = [client.get(f'/api/v1/jobs/{job_id}').get_json()['data']['view_count'] for _ in range(3)]
+
+    assert counts == [1, 2, 3]
+    assert _stored_view_count(job_id) == 0
+    listed = client.get('/api/v1/jobs?page=1&per_page=10').get_json()['data']['items']
+    assert listed[0]['view_count'] == 3
+
+
+def test_flush_writes_batched_deltas(sqlite_app):
+    job_ids = _create_jobs(3)
+    for job_id, views in zip(job_ids, (1, 1, 4)):
+        job_view_counter.record_view(job_id, count=views)
+
+    assert job_view_counter.flush() == 6
+    assert [_stored_view_count(job_id) for job_id in job_ids] == [1, 1, 4]
+    assert job_view_counter.pending_views(job_ids[2]) == 0
+    assert job_view_counter.flush() == 0
+
+
+def test_view_count_does_not_go_backwards_after_flush(sqlite_app):
+    job_id = _create_jobs(1)[0]
+    client = sqlite_app.test_client()
+
+    # 第一次请求把 view_count=0 的详情与列表写入缓存，之后的浏览只累加在缓冲区
+    counts = [client.get(f'/api/v1/jobs/{job_id}').get_json()['data']['view_count'] for _ in range(3)]
+    assert counts == [1, 2, 3]
+    assert client.get('/api/v1/jobs?page=1&per_page=10').get_json()['data']['items'][0]['view_count'] == 3
+
+    assert job_view_counter.flush() == 3
+    assert _stored_view_count(job_id) == 3
+    # 缓存中仍是写回前的数据，返回的浏览次数不应倒退
+    assert client.get('/api/v1/jobs?page=1&per_page=10').get_json()['data']['items'][0]['view_count'] == 3
+    assert client.get(f'/api/v1/jobs/{job_id}').get_json()['data']['view_count'] == 4
+    assert client.get('/api/v1/jobs?page=1&per_page=10').get_json()['data']['items'][0]['view_count'] == 4
@@ -0,0 +1,106 @@
+"""会话已读水位测试 (SQLite 内存库，无需启动服务)"""
+import pytest
+from sqlalchemy import event
+
+from app.core.extensions import db as _db
+from app.models.message import Conversation, Message
+from app.models.user import User
+from app.services.communication_service import message_service
+from app.services.message_read_receipts import InMemoryReadReceiptBuffer, message_read_receipts
+from app.services.unread_counter_service import unread_counter_service
+
+
+@pytest.fixture()
+def receipts_app(sqlite_app, monkeypatch):
+    # 每个测试使用独立的缓冲区与合并窗口
+    monkeypatch.setattr(message_read_receipts, '_buffer', InMemoryReadReceiptBuffer())
+    return sqlite_app
+
+
+@pytest.fixture()
+def users(receipts_app):
+    users = [User(phone_number=f'1380000030{index}', password_hash='x', current_role='freelancer',
+                  available_roles=['freelancer'], status='active') for index in range(2)]
+    _db.session.add_all(users)
+    _db.session.commit()
+    return [user.id for user in users]
+
+
+def _watermark(user_id, conversation_id):
+    return _db.session.query(Conversation.last_read_message_id)\
+        .filter_by(user_id=user_id, conversation_id=conversation_id).scalar()
+
+
+def _count_writes(statements):
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('UPDATE', 'INSERT', 'DELETE')):
+            statements.append(statement)
+    return before_cursor_execute
+
+
+def test_reading_without_new_messages_does_not_write(users):
+    alice, bob = users
+    message = message_service.send_new_message(alice, {'recipient_id': bob, 'content': 'hi'})
+    message_service.get_messages_in_conversation(bob, message.conversation_id)
+    assert _watermark(bob, message.conversation_id) == message.id
+    assert unread_counter_service.get_summary(bob)['messages'] == 0
+
+    writes = []
+    listener = _count_writes(writes)
+    event.listen(_db.engine, 'before_cursor_execute', listener)
+    try:
+        for _ in range(3):
+            message_service.get_messages_in_conversation(bob, message.conversation_id)
+    finally:
+        event.remove(_db.engine, 'before_cursor_execute', listener)
+    assert writes == []
+
+
+def test_watermark_writes_are_coalesced_and_flushed(users, receipts_app):
+    alice, bob = users
+    receipts_app.config['MESSAGE_READ_RECEIPT_COALESCE_SECONDS'] = 60
+    first = message_service.send_new_message(alice, {'recipient_id': bob, 'content': 'one'})
+    conversation_id = first.conversation_id
+    message_service.get_messages_in_conversation(bob, conversation_id)
+
+    second = message_service.send_new_message(alice, {'recipient_id': bob, 'content': 'two'})
+    third = message_service.send_new_message(alice, {'recipient_id': bob, 'content': 'three'})
+    message_service.get_messages_in_conversation(bob, conversation_id, per_page=1)
+    message_service.get_messages_in_conversation(bob, conversation_id)
+
+    # 合并窗口内的前移只进入缓冲区
+    assert _watermark(bob, conversation_id) == first.id
+    assert message_read_receipts.get_watermark(bob, conversation_id) == third.id
+    # 写回前的读取按缓冲水位推导未读状态
+    assert unread_counter_service.get_summary(bob)['messages'] == 0
+    assert message_service.get_user_conversations_summary(bob)['items'][0]['unread_count'] == 0
+    assert message_service.get_user_conversations_summary(alice)['items'][0]['unread_count'] == 0
+    fourth = message_service.send_new_message(alice, {'recipient_id': bob, 'content': 'four'})
+    assert unread_counter_service.get_summary(bob)['messages'] == 1
+    assert message_service.get_user_conversations_summary(bob)['items'][0]['unread_count'] == 1
+
+    assert message_read_receipts.flush() == 1
+    assert _watermark(bob, conversation_id) == third.id
+    assert unread_counter_service.get_summary(bob)['messages'] == 1
+    assert _db.session.get(Conversation, _db.session.query(Conversation.id)
+                           .filter_by(user_id=bob, conversation_id=conversation_id).scalar()).unread_count == 1
+    assert {m.id for m in Message.query.filter_by(is_read=True)} == {first.id, second.id, third.id}
+    assert not _db.session.get(Message, fourth.id).is_read
+    assert message_read_receipts.flush() == 0
+
+
+def test_older_pages_do_not_move_watermark_back(users):
+    alice, bob = users
+    messages = [message_service.send_new_message(alice, {'recipient_id': bob, 'content': str(n)}) for n in range(3)]
+    conversation_id = messages[0].conversation_id
+
+    message_service.get_messages_in_conversation(bob, conversation_id, before_message_id=messages[1].id)
+    assert _watermark(bob, conversation_id) == messages[0].id
+    assert unread_counter_service.get_summary(bob)['messages'] == 2
+
+    message_read_receipts._buffer.clear()
+    message_service.get_messages_in_conversation(bob, conversation_id)
+    message_read_receipts._buffer.clear()
+    message_service.get_messages_in_conversation(bob, conversation_id, before_message_id=messages[1].id)
+    assert _watermark(bob, conversation_id) == messages[2].id
+    assert unread_counter_service.get_summary(bob)['messages'] == 0
@@ -0,0 +1,122 @@
+"""批量通知与公告广播测试 (SQLite 内存库，无需启动服务)"""
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app.core.extensions import db as _db
+from app.models.admin import AdminStatusEnum
+from app.models.notification import Notification, NotificationTypeEnum
+from app.models.profile import FreelancerProfile
+from app.models.user import User
+from app.services.admin_auth_service import admin_auth_service
+from app.services.communication_service import notification_service
+from app.services.task_queue import task_queue
+
+
+@pytest.fixture()
+def sqlite_config():
+    return {'CACHE_TYPE': 'SimpleCache'}
+
+
+@pytest.fixture()
+def users(sqlite_app):
+    user_ids = {}
+    for index, status in enumerate(['active', 'active', 'active', 'active', 'active', 'banned']):
+        user = User(phone_number=f'1370000000{index}', password_hash='x', current_role='freelancer',
+                    available_roles=['freelancer'], status=status)
+        _db.session.add(user)
+        _db.session.flush()
+        if index < 2:
+            _db.session.add(FreelancerProfile(user_id=user.id))
+        user_ids.setdefault(status, []).append(user.id)
+    _db.session.commit()
+    return user_ids
+
+
+def _recipients(title):
+    return sorted(user_id for (user_id,) in _db.session.query(Notification.user_id).filter(Notification.title == title).all())
+
+
+def test_bulk_from_iterable_commits_per_chunk(users):
+    progress = []
+    result = notification_service.create_notifications_bulk(
+        (user_id for user_id in users['active']), {'title': 'Iterable', 'content': 'Hello'},
+        chunk_size=2, progress_callback=progress.append)
+
+    assert result == {'sent': 5, 'chunks': 3}
+    assert progress == [2, 4, 5]
+    assert _recipients('Iterable') == sorted(users['active'])
+
+
+def test_bulk_from_query_uses_insert_select_chunks(users):
+    progress = []
+    query = notification_service.broadcast_audience_query('all')
+    result = notification_service.create_notifications_bulk(
+        query, {'title': 'Query', 'content': 'Hello', 'notification_type': NotificationTypeEnum.policy_update},
+        chunk_size=2, progress_callback=progress.append)
+
+    assert result['sent'] == 5
+    assert progress[-1] == 5
+    assert _recipients('Query') == sorted(users['active'])
+    notification = Notification.query.filter_by(title='Query').first()
+    assert notification.notification_type == NotificationTypeEnum.policy_update
+    assert notification.is_read is False
+
+
+def test_admin_broadcast_endpoint(users, sqlite_app):
+    client = sqlite_app.test_client()
+    admin_auth_service.create_admin('ops', 'secret-pass')
+    login = client.post('/api/v1/admin/auth/login', json={'username': 'ops', 'password': 'secret-pass'})
+    assert login.status_code == 200
+    admin_headers = {'Authorization': f"Bearer {login.get_json()['data']['access_token']}"}
+    identity = _db.session.get(User, users['active'][0]).uuid
+    user_headers = {'Authorization': f"Bearer {create_access_token(identity=identity)}"}
+    # 用户令牌即使带 is_admin 声明也不是管理员令牌
+    forged_headers = {'Authorization': f"Bearer {create_access_token(identity=identity, additional_claims={'is_admin': True})}"}
+    payload = {'title': 'Maintenance', 'content': 'Tonight 2am', 'audience': 'freelancer'}
+
+    assert client.post('/api/v1/admin/notifications/broadcasts', json=payload, headers=user_headers).status_code == 403
+    assert client.post('/api/v1/admin/notifications/broadcasts', json=payload, headers=forged_headers).status_code == 403
+
+    response = client.post('/api/v1/admin/notifications/broadcasts', json=payload, headers=admin_headers)
+    assert response.status_code == 202
+    broadcast = response.get_json()['data']
+    assert broadcast['status'] == 'completed'
+    assert broadcast['sent'] == 2
+    assert _recipients('Maintenance') == sorted(users['active'][:2])
+
+    status = client.get(f"/api/v1/admin/notifications/broadcasts/{broadcast['broadcast_id']}", headers=admin_headers)
+    assert status.get_json()['data']['sent'] == 2
+
+    invalid = client.post('/api/v1/admin/notifications/broadcasts', json={'title': 'x', 'content': 'y', 'audience': 'bots'},
+                          headers=admin_headers)
+    assert invalid.status_code == 400
+
+
+def test_async_broadcast_runs_on_task_queue(users, sqlite_app):
+    sqlite_app.config['NOTIFICATION_BROADCAST_ASYNC'] = True
+    status = notification_service.start_broadcast({'title': 'Queued', 'content': 'Hello'}, audience='all')
+
+    assert status['status'] == 'pending'
+    assert _recipients('Queued') == []
+    assert task_queue.run_pending() == 1
+    final = notification_service.get_broadcast_status(status['broadcast_id'])
+    assert (final['status'], final['sent']) == ('completed', 5)
+    assert _recipients('Queued') == sorted(users['active'])
+    assert task_queue.run_pending() == 0
+
+
+def test_admin_login_and_disabled_admin(sqlite_app):
+    client = sqlite_app.test_client()
+    admin = admin_auth_service.create_admin('ops', 'secret-pass')
+    assert client.post('/api/v1/admin/auth/login', json={'username': 'ops', 'password': 'wrong'}).status_code == 401
+
+    headers = {'Authorization': f"Bearer {admin_auth_service.create_token(admin)}"}
+    admin.status = AdminStatusEnum.inactive
+    _db.session.commit()
+    # 停用后已签发的令牌立即失效
+    assert client.get('/api/v1/admin/notifications/broadcasts/unknown', headers=headers).status_code == 401
+
+
+def test_v2_placeholders_are_not_mounted(sqlite_app):
+    # v2 仍是占位接口 (返回伪造的成功响应)，不应注册到应用
+    assert not [rule.rule for rule in sqlite_app.url_map.iter_rules() if rule.rule.startswith('/api/v2')]
@@ -0,0 +1,109 @@
+"""订单自动确认定时任务测试 (SQLite 内存库，无需启动服务)"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.core.extensions import db as _db
+from app.models.job import Job, JobStatusEnum
+from app.models.notification import Notification
+from app.models.order import Order, Payment
+from app.models.system import SchedulerLease
+from app.models.user import User
+from app.models.wallet import UserWallet
+from app.services.order_auto_confirm import LEASE_NAME, order_auto_confirm
+from app.services.scheduler_lease import scheduler_lease_service
+
+
+@pytest.fixture()
+def parties(sqlite_app):
+    escrow, employer, freelancer = [
+        User(phone_number=f'1380000060{index}', password_hash='x', current_role=role, available_roles=[role], status='active')
+        for index, role in enumerate(('employer', 'employer', 'freelancer'))]
+    _db.session.add_all([escrow, employer, freelancer])
+    _db.session.flush()
+    sqlite_app.config['PLATFORM_ESCROW_USER_ID'] = escrow.id
+    _db.session.add_all([UserWallet(user_id=escrow.id, balance=Decimal('1000.00')),
+                         UserWallet(user_id=freelancer.id, balance=Decimal('0.00'))])
+    now = datetime.utcnow()
+    job = Job(employer_user_id=employer.id, title='Job', description='A job description long enough.',
+              job_category='warehouse', location_address='Somewhere', start_time=now, end_time=now + timedelta(hours=8),
+              salary_amount=100, salary_type='daily', status=JobStatusEnum.active)
+    _db.session.add(job)
+    _db.session.commit()
+    return escrow.id, employer.id, freelancer.id, job.id
+
+
+def _order(parties, status='pending_confirmation', deadline_days=-1, paid=False):
+    escrow_id, employer_id, freelancer_id, job_id = parties
+    now = datetime.utcnow()
+    order = Order(job_id=job_id, freelancer_user_id=freelancer_id, employer_user_id=employer_id, order_amount=100,
+                  platform_fee=10, freelancer_income=90, start_time_scheduled=now, end_time_scheduled=now,
+                  status=status, confirmation_deadline=now + timedelta(days=deadline_days))
+    _db.session.add(order)
+    _db.session.flush()
+    if paid:
+        _db.session.add(Payment(order_id=order.id, payer_user_id=employer_id, payee_user_id=escrow_id, amount=100,
+                                internal_transaction_id=f'TX{order.id}', status='succeeded'))
+    _db.session.commit()
+    return order.id
+
+
+def _statuses():
+    return dict(_db.session.query(Order.id, Order.status).all())
+
+
+def test_due_orders_are_confirmed_in_batches_with_settlement_and_notifications(parties):
+    escrow_id, employer_id, freelancer_id, _ = parties
+    due = [_order(parties, paid=index < 2, deadline_days=-index - 1) for index in range(5)]
+    not_due = _order(parties, deadline_days=3)
+    in_progress = _order(parties, status='in_progress')
+
+    stats = order_auto_confirm.run_once(batch_size=2)
+
+    assert (stats['acquired'], stats['confirmed'], stats['skipped'], stats['batches']) == (True, 5, 0, 3)
+    statuses = _statuses()
+    assert all(statuses[order_id] == 'completed' for order_id in due)
+    assert (statuses[not_due], statuses[in_progress]) == ('pending_confirmation', 'in_progress')
+    # 两个已支付的订单从托管账户结算给零工
+    assert _db.session.get(UserWallet, freelancer_id).balance == Decimal('180.00')
+    assert _db.session.get(UserWallet, escrow_id).balance == Decimal('820.00')
+    assert Notification.query.filter_by(related_resource_type='order').count() == 10
+    assert order_auto_confirm.run_once()['confirmed'] == 0
+
+
+def test_orders_changed_after_the_scan_are_skipped(parties, monkeypatch):
+    first = _order(parties, deadline_days=-2)
+    second = _order(parties, deadline_days=-1)
+    original_due_orders = order_auto_confirm._due_orders
+
+    def due_orders_then_dispute(*args):
+        rows = original_due_orders(*args)
+        if rows:
+            # 扫描之后雇主发起了争议
+            _db.session.query(Order).filter_by(id=first).update({'status': 'disputed', 'version': Order.version + 1})
+            _db.session.commit()
+        return rows
+
+    monkeypatch.setattr(order_auto_confirm, '_due_orders', due_orders_then_dispute)
+    stats = order_auto_confirm.run_once()
+
+    assert (stats['confirmed'], stats['skipped']) == (1, 1)
+    assert _statuses() == {first: 'disputed', second: 'completed'}
+
+
+def test_lease_prevents_concurrent_runs(parties):
+    order_id = _order(parties)
+    assert scheduler_lease_service.acquire(LEASE_NAME, 'other-node', 60)
+    assert not scheduler_lease_service.acquire(LEASE_NAME, 'third-node', 60)
+
+    assert order_auto_confirm.run_once()['acquired'] is False
+    assert _statuses()[order_id] == 'pending_confirmation'
+
+    # 持有者崩溃后租约到期，其他节点接管
+    _db.session.query(SchedulerLease).update({'expires_at': datetime.utcnow() - timedelta(seconds=1)})
+    _db.session.commit()
+    assert not scheduler_lease_service.renew(LEASE_NAME, 'other-node', 60)
+    assert order_auto_confirm.run_once()['confirmed'] == 1
+    # 执行结束后释放租约
+    assert scheduler_lease_service.acquire(LEASE_NAME, 'third-node', 60)
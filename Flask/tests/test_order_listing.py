@@ -0,0 +1,99 @@
+"""订单列表读取路径测试 (SQLite 内存库，无需启动服务)"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.core.extensions import db as _db
+from app.models.job import Job, JobApplication, JobStatusEnum
+from app.models.order import Order
+from app.models.user import User
+from app.schemas.order_schema import OrderSchema
+from app.services.order_service import order_service
+from app.utils.exceptions import InvalidUsageException
+
+
+@pytest.fixture()
+def orders(sqlite_app):
+    employer = User(phone_number='13800000401', password_hash='x', current_role='employer',
+                    available_roles=['employer'], status='active')
+    freelancer = User(phone_number='13800000402', password_hash='x', current_role='freelancer',
+                      available_roles=['freelancer'], status='active')
+    _db.session.add_all([employer, freelancer])
+    _db.session.flush()
+
+    now = datetime.utcnow()
+    created = []
+    for index in range(5):
+        job = Job(employer_user_id=employer.id, title=f'Job {index}', description='A job description long enough.',
+                  job_category='warehouse', location_address='Somewhere', start_time=now + timedelta(days=1),
+                  end_time=now + timedelta(days=2), salary_amount=100, salary_type='daily', status=JobStatusEnum.active)
+        _db.session.add(job)
+        _db.session.flush()
+        application = JobApplication(job_id=job.id, freelancer_user_id=freelancer.id, employer_user_id=employer.id)
+        _db.session.add(application)
+        _db.session.flush()
+        order = Order(job_id=job.id, application_id=application.id, freelancer_user_id=freelancer.id,
+                      employer_user_id=employer.id, order_amount=100, platform_fee=10, freelancer_income=90,
+                      start_time_scheduled=job.start_time, end_time_scheduled=job.end_time,
+                      status='completed' if index < 2 else 'pending_start', created_at=now - timedelta(days=index))
+        _db.session.add(order)
+        created.append(order)
+    _db.session.commit()
+    return freelancer.id, employer.id, [order.id for order in created]
+
+
+def _list_with_statements(*args, **kwargs):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    _db.session.expunge_all()
+    event.listen(_db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        paginated = order_service.get_orders_for_user(*args, **kwargs)
+        data = OrderSchema(many=True).dump(paginated.items)
+    finally:
+        event.remove(_db.engine, 'before_cursor_execute', before_cursor_execute)
+    return paginated, data, statements
+
+
+def test_page_mode_counts_once_on_bare_orders_table(orders):
+    freelancer_id, _, order_ids = orders
+    paginated, data, statements = _list_with_statements(freelancer_id, 'freelancer', page=1, per_page=2)
+
+    assert [item['id'] for item in data] == order_ids[:2]
+    assert paginated.total == 5 and paginated.pages == 3
+    assert data[0]['job'] == {'id': paginated.items[0].job_id, 'title': 'Job 0'}
+    assert data[0]['application']['id'] == paginated.items[0].application_id
+    # COUNT + 本页订单 + 工作 + 申请，序列化不再触发懒加载
+    assert len(statements) == 4
+    count_sql = statements[0].upper()
+    assert 'COUNT' in count_sql and 'JOIN' not in count_sql and 'USERS' not in count_sql
+
+
+def test_cursor_mode_skips_count(orders):
+    _, employer_id, order_ids = orders
+    first, _, statements = _list_with_statements(employer_id, 'employer', cursor='', per_page=3)
+    assert len(statements) == 3 and not any('COUNT' in statement.upper() for statement in statements)
+    assert first.total is None and first.next_cursor
+
+    second, _, _ = _list_with_statements(employer_id, 'employer', cursor=first.next_cursor, per_page=3,
+                                         include_total=True)
+    assert [order.id for order in second.items] == order_ids[3:]
+    assert second.total == 5 and second.next_cursor is None
+
+
+def test_status_and_date_range_filters(orders):
+    freelancer_id, _, order_ids = orders
+    now = datetime.utcnow()
+    completed = order_service.get_orders_for_user(freelancer_id, 'freelancer', filters={'status': 'completed'})
+    assert [order.id for order in completed.items] == order_ids[:2]
+
+    recent = order_service.get_orders_for_user(freelancer_id, 'freelancer', filters={
+        'status': 'pending_start', 'created_from': now - timedelta(days=3, hours=12), 'created_to': now})
+    assert [order.id for order in recent.items] == order_ids[2:4] and recent.total == 2
+
+    with pytest.raises(InvalidUsageException):
+        order_service.get_orders_for_user(freelancer_id, 'freelancer', filters={'status': 'unknown'})
@@ -0,0 +1,160 @@
+"""订单状态机与乐观并发控制测试 (SQLite 内存库，无需启动服务)"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.core.extensions import db as _db
+from app.models.job import Job, JobStatusEnum
+from app.models.order import ORDER_STATUS_TRANSITIONS, Order, OrderStatusEnum
+from app.models.user import User
+from app.services.order_service import ORDER_ACTIONS, OrderTransition, order_service
+from app.utils.exceptions import AuthorizationException, BusinessException, InvalidUsageException, NotFoundException
+
+
+@pytest.fixture()
+def order(sqlite_app):
+    employer = User(phone_number='13800000501', password_hash='x', current_role='employer',
+                    available_roles=['employer'], status='active')
+    freelancer = User(phone_number='13800000502', password_hash='x', current_role='freelancer',
+                      available_roles=['freelancer'], status='active')
+    _db.session.add_all([employer, freelancer])
+    _db.session.flush()
+    now = datetime.utcnow()
+    job = Job(employer_user_id=employer.id, title='Job', description='A job description long enough.',
+              job_category='warehouse', location_address='Somewhere', start_time=now, end_time=now + timedelta(hours=8),
+              salary_amount=100, salary_type='daily', status=JobStatusEnum.active)
+    _db.session.add(job)
+    _db.session.flush()
+    order = Order(job_id=job.id, freelancer_user_id=freelancer.id, employer_user_id=employer.id, order_amount=100,
+                  platform_fee=10, freelancer_income=90, start_time_scheduled=job.start_time,
+                  end_time_scheduled=job.end_time)
+    _db.session.add(order)
+    _db.session.commit()
+    return order.id, freelancer.id, employer.id
+
+
+def _act(order_id, user_id, role, action, **extra):
+    return order_service.process_order_action(order_id, user_id, role, dict(action=action, **extra))
+
+
+def test_lifecycle_applies_each_action_as_one_conditional_update(order):
+    order_id, freelancer_id, employer_id = order
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.lstrip().split()[0].upper())
+
+    event.listen(_db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        started = _act(order_id, freelancer_id, 'freelancer', 'start_work', version=1)
+    finally:
+        event.remove(_db.engine, 'before_cursor_execute', before_cursor_execute)
+    # 条件 UPDATE 之前没有读取订单，之后只为响应读取一次
+    assert statements == ['UPDATE', 'SELECT']
+    assert (started.status, started.version, started.freelancer_confirmation_status) == ('in_progress', 2, 'confirmed')
+
+    completed = _act(order_id, freelancer_id, 'freelancer', 'complete_work',
+                     start_time_actual='2030-01-01T08:00:00Z', end_time_actual='2030-01-01T12:30:00Z')
+    assert (completed.status, completed.version, float(completed.work_duration_actual)) == ('pending_confirmation', 3, 4.5)
+
+    confirmed = _act(order_id, employer_id, 'employer', 'confirm_completion', version=3)
+    assert (confirmed.status, confirmed.version, confirmed.confirmation_deadline) == ('completed', 4, None)
+
+
+def test_double_tap_and_racing_actions_conflict(order):
+    order_id, freelancer_id, employer_id = order
+    _act(order_id, freelancer_id, 'freelancer', 'start_work')
+
+    with pytest.raises(BusinessException) as double_tap:
+        _act(order_id, freelancer_id, 'freelancer', 'start_work')
+    assert (double_tap.value.status_code, double_tap.value.error_code) == (409, 40902)
+
+    # 雇主基于开始工作之前读取的订单取消，状态已变化
+    with pytest.raises(BusinessException) as racing_cancel:
+        _act(order_id, employer_id, 'employer', 'cancel_order', cancellation_reason='No longer needed')
+    assert racing_cancel.value.status_code == 409
+    assert _db.session.get(Order, order_id).status == 'in_progress'
+
+
+def test_stale_version_is_rejected(order):
+    order_id, freelancer_id, employer_id = order
+    with pytest.raises(BusinessException) as stale:
+        _act(order_id, employer_id, 'employer', 'cancel_order', cancellation_reason='Changed plans', version=7)
+    assert (stale.value.status_code, stale.value.error_code) == (409, 40905)
+
+    cancelled = _act(order_id, employer_id, 'employer', 'cancel_order', cancellation_reason='Changed plans', version=1)
+    assert (cancelled.status, cancelled.cancelled_by, cancelled.version) == ('cancelled', 'employer', 2)
+
+
+def test_failed_transitions_report_the_cause(order):
+    order_id, freelancer_id, employer_id = order
+    with pytest.raises(NotFoundException):
+        _act(order_id + 100, freelancer_id, 'freelancer', 'start_work')
+    with pytest.raises(AuthorizationException):
+        _act(order_id, employer_id, 'employer', 'start_work')
+    with pytest.raises(InvalidUsageException):
+        _act(order_id, employer_id, 'employer', 'cancel_order')
+    with pytest.raises(BusinessException) as wrong_state:
+        _act(order_id, freelancer_id, 'freelancer', 'complete_work')
+    assert wrong_state.value.status_code == 409
+    assert _db.session.get(Order, order_id).version == 1
+
+
+def test_orm_updates_check_and_bump_version(order):
+    order_id, freelancer_id, _ = order
+    stale = _db.session.get(Order, order_id)
+    _db.session.expunge(stale)
+    # 其他请求在此期间修改了订单
+    _db.session.execute(Order.__table__.update().where(Order.__table__.c.id == order_id).values(version=5))
+    _db.session.commit()
+
+    _db.session.add(stale)
+    stale.cancellation_reason = 'edited from a stale copy'
+    with pytest.raises(StaleDataError):
+        _db.session.commit()
+    _db.session.rollback()
+
+    fresh = _db.session.get(Order, order_id)
+    fresh.cancellation_reason = 'edited from a fresh copy'
+    _db.session.commit()
+    assert fresh.version == 6
+
+
+@pytest.mark.parametrize('action', sorted(ORDER_ACTIONS))
+def test_order_actions_follow_the_status_table(action):
+    transition = ORDER_ACTIONS[action]
+    for from_status in transition.from_statuses:
+        assert transition.to_status in ORDER_STATUS_TRANSITIONS[from_status], (action, from_status)
+
+
+def test_edges_missing_from_the_status_table_are_refused(order, monkeypatch):
+    order_id, freelancer_id, employer_id = order
+    _act(order_id, freelancer_id, 'freelancer', 'start_work')
+    # in_progress -> cancelled 不在状态机中，即使操作表误配也不会执行
+    monkeypatch.setitem(ORDER_ACTIONS, 'cancel_order', OrderTransition(
+        ('freelancer', 'employer'), (OrderStatusEnum.pending_start, OrderStatusEnum.in_progress),
+        OrderStatusEnum.cancelled, '取消订单'))
+    monkeypatch.setitem(ORDER_ACTIONS, 'platform_cancel', OrderTransition(
+        ('platform',), (OrderStatusEnum.in_progress,), OrderStatusEnum.cancelled, '平台取消'))
+
+    with pytest.raises(BusinessException) as refused:
+        _act(order_id, employer_id, 'employer', 'cancel_order', cancellation_reason='Too late')
+    assert (refused.value.status_code, refused.value.error_code) == (409, 40902)
+    assert order_service.apply_platform_transition(order_id, 'platform_cancel') is False
+    _db.session.rollback()
+    assert _db.session.get(Order, order_id).status == 'in_progress'
+
+
+def test_cancel_releases_the_job_slot(order):
+    order_id, _, employer_id = order
+    job = _db.session.get(Job, _db.session.get(Order, order_id).job_id)
+    job.accepted_people, job.required_people, job.status = 1, 1, JobStatusEnum.filled
+    _db.session.commit()
+
+    cancelled = _act(order_id, employer_id, 'employer', 'cancel_order', cancellation_reason='Changed plans')
+
+    assert (cancelled.status, cancelled.cancelled_by) == ('cancelled', 'employer')
+    _db.session.expire_all()
+    assert (job.accepted_people, job.status) == (0, JobStatusEnum.active)
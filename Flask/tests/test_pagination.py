@@ -0,0 +1,128 @@
+"""游标分页测试 (SQLite 内存库，无需启动服务)"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app.core.extensions import db as _db
+from app.models.job import Job, JobStatusEnum
+from app.models.notification import Notification, NotificationTypeEnum
+from app.models.user import User
+from app.models.wallet import TransactionTypeEnum, WalletTransaction
+from app.services.admin_auth_service import admin_auth_service
+from app.utils.exceptions import InvalidUsageException
+from app.utils.pagination import keyset_paginate
+
+
+@pytest.fixture()
+def sqlite_config():
+    return {'CACHE_TYPE': 'SimpleCache'}
+
+
+@pytest.fixture()
+def user(sqlite_app):
+    user = User(phone_number='13800000990', password_hash='x', current_role='freelancer', available_roles=['freelancer'])
+    _db.session.add(user)
+    _db.session.commit()
+    return user
+
+
+def _notifications(user_id, created_ats):
+    notifications = [Notification(user_id=user_id, notification_type=NotificationTypeEnum.system_announcement,
+                                  title=f'n{index}', content='x', created_at=created_at)
+                     for index, created_at in enumerate(created_ats)]
+    _db.session.add_all(notifications)
+    _db.session.commit()
+    return [notification.id for notification in notifications]
+
+
+_ORDER = [(Notification.created_at, 'desc'), (Notification.id, 'desc')]
+
+
+def _walk(query, per_page):
+    pages, cursor = [], ''
+    while True:
+        page = keyset_paginate(query, _ORDER, cursor=cursor, per_page=per_page)
+        pages.append([item.id for item in page.items])
+        if not page.has_next:
+            return pages
+        cursor = page.next_cursor
+
+
+def test_ties_on_sort_key_are_neither_skipped_nor_repeated(user):
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    # 5 条记录共用同一个 created_at，跨越分页边界
+    ids = _notifications(user.id, [now] * 5 + [now - timedelta(minutes=1)] * 2)
+
+    pages = _walk(Notification.query.filter_by(user_id=user.id), per_page=3)
+    flat = [item for page in pages for item in page]
+    assert flat == sorted(ids[:5], reverse=True) + sorted(ids[5:], reverse=True)
+    assert [len(page) for page in pages] == [3, 3, 1]
+
+
+def test_last_page_has_no_next_cursor(user):
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    _notifications(user.id, [now - timedelta(minutes=index) for index in range(4)])
+    query = Notification.query.filter_by(user_id=user.id)
+
+    # 恰好整除: 第二页是最后一页，不能再返回一个空页的游标
+    first = keyset_paginate(query, _ORDER, cursor='', per_page=2, include_total=True)
+    second = keyset_paginate(query, _ORDER, cursor=first.next_cursor, per_page=2)
+    assert first.total == 4 and first.has_next
+    assert len(second.items) == 2
+    assert second.next_cursor is None and not second.has_next
+
+    assert keyset_paginate(Notification.query.filter_by(user_id=-1), _ORDER, cursor='', per_page=2).items == []
+
+
+def test_cursor_from_another_sort_order_is_rejected(user):
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    _notifications(user.id, [now - timedelta(minutes=index) for index in range(3)])
+    query = Notification.query.filter_by(user_id=user.id)
+    cursor = keyset_paginate(query, _ORDER, cursor='', per_page=1).next_cursor
+
+    with pytest.raises(InvalidUsageException):
+        keyset_paginate(query, [(Notification.created_at, 'asc'), (Notification.id, 'asc')], cursor=cursor, per_page=1)
+
+
+def test_notification_and_wallet_endpoints_expose_cursor(sqlite_app, user):
+    client = sqlite_app.test_client()
+    headers = {'Authorization': f"Bearer {create_access_token(identity=user.uuid)}"}
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    _notifications(user.id, [now] * 3)
+    _db.session.add_all([WalletTransaction(user_id=user.id, transaction_type=TransactionTypeEnum.income, amount=Decimal('10.00'),
+                                           balance_after=Decimal(10 * (index + 1)), created_at=now)
+                         for index in range(3)])
+    _db.session.commit()
+
+    for url in ('/api/v1/communications/notifications/me', '/api/v1/wallet/transactions'):
+        first = client.get(f'{url}?cursor=&per_page=2&include_total=true', headers=headers).get_json()['data']
+        assert len(first['items']) == 2 and first['total_items'] == 3 and first['has_next']
+        second = client.get(f"{url}?cursor={first['next_cursor']}&per_page=2", headers=headers).get_json()['data']
+        assert len(second['items']) == 1 and second['next_cursor'] is None and second['total_items'] is None
+        assert {item['id'] for item in first['items']}.isdisjoint(item['id'] for item in second['items'])
+
+        paged = client.get(f'{url}?page=2&per_page=2', headers=headers).get_json()['data']
+        assert paged['page'] == 2 and paged['total_items'] == 3 and 'next_cursor' not in paged
+
+
+def test_admin_pending_review_exposes_cursor(sqlite_app, user):
+    client = sqlite_app.test_client()
+    now = datetime.utcnow()
+    _db.session.add_all([Job(employer_user_id=user.id, title=f'Pending {index}', description='Weekend shift, paid daily.',
+                             job_category='delivery', location_address='Somewhere', start_time=now + timedelta(days=1),
+                             end_time=now + timedelta(days=2), salary_amount=100, salary_type='daily',
+                             status=JobStatusEnum.pending_review, created_at=now)
+                         for index in range(3)])
+    _db.session.commit()
+    headers = {'Authorization': f"Bearer {admin_auth_service.create_token(admin_auth_service.create_admin('ops', 'pw'))}"}
+
+    url = '/api/v1/admin/jobs/pending-review'
+    first = client.get(f'{url}?cursor=&per_page=2', headers=headers).get_json()['data']
+    second = client.get(f"{url}?cursor={first['next_cursor']}&per_page=2", headers=headers).get_json()['data']
+    assert [item['title'] for item in first['items'] + second['items']] == ['Pending 0', 'Pending 1', 'Pending 2']
+    assert second['has_next'] is False
+
+    user_headers = {'Authorization': f"Bearer {create_access_token(identity=user.uuid)}"}
+    assert client.get(url, headers=user_headers).status_code == 403
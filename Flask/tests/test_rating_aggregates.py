@@ -0,0 +1,125 @@
+"""评分统计增量维护与重建测试 (SQLite 内存库，无需启动服务)"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from flask_sqlalchemy.query import Query
+
+from app.core.extensions import db as _db
+from app.models.job import Job, JobStatusEnum
+from app.models.order import Evaluation, EvaluatorRoleEnum, Order, UserRatingAggregate
+from app.models.profile import EmployerProfile, EmployerProfileTypeEnum, FreelancerProfile
+from app.models.user import User
+from app.services.evaluation_service import evaluation_service
+from app.utils.exceptions import InvalidUsageException
+
+
+@pytest.fixture()
+def users(sqlite_app):
+    """同时是零工与雇主的用户 (两个档案) 及另外两名交易对手"""
+    both, employer, freelancer = [
+        User(phone_number=f'1380000070{index}', password_hash='x', current_role='freelancer',
+             available_roles=['freelancer', 'employer'], status='active') for index in range(3)]
+    _db.session.add_all([both, employer, freelancer])
+    _db.session.flush()
+    _db.session.add_all([FreelancerProfile(user_id=both.id), EmployerProfile(user_id=both.id, profile_type=EmployerProfileTypeEnum.individual),
+                         FreelancerProfile(user_id=freelancer.id),
+                         EmployerProfile(user_id=employer.id, profile_type=EmployerProfileTypeEnum.individual)])
+    _db.session.commit()
+    return both.id, employer.id, freelancer.id
+
+
+def _completed_order(employer_id, freelancer_id):
+    now = datetime.utcnow()
+    job = Job(employer_user_id=employer_id, title='Rated job', description='A job description long enough.',
+              job_category='warehouse', location_address='Somewhere', start_time=now - timedelta(days=2),
+              end_time=now - timedelta(days=1), salary_amount=100, salary_type='daily', status=JobStatusEnum.completed)
+    _db.session.add(job)
+    _db.session.flush()
+    order = Order(job_id=job.id, freelancer_user_id=freelancer_id, employer_user_id=employer_id, order_amount=100,
+                  platform_fee=10, freelancer_income=90, start_time_scheduled=job.start_time,
+                  end_time_scheduled=job.end_time, status='completed')
+    _db.session.add(order)
+    _db.session.commit()
+    return order.id
+
+
+def _rate(evaluator_id, employer_id, freelancer_id, rating):
+    return evaluation_service.create_evaluation(evaluator_id, _completed_order(employer_id, freelancer_id), {'rating': rating})
+
+
+def _snapshot():
+    _db.session.expire_all()
+    aggregates = {(a.user_id, a.role): (a.rating_count, a.rating_sum, a.histogram) for a in UserRatingAggregate.query.all()}
+    averages = {(type(p).__name__, p.user_id): p.average_rating
+                for model in (FreelancerProfile, EmployerProfile) for p in model.query.all()}
+    return aggregates, averages
+
+
+def test_ratings_accumulate_per_role(users):
+    both, employer, freelancer = users
+    # both 作为零工被雇主评 5、4 分，作为雇主被零工评 2 分
+    _rate(employer, employer, both, 5)
+    _rate(employer, employer, both, 4)
+    _rate(freelancer, both, freelancer, 2)
+
+    assert evaluation_service.get_rating_aggregate(both, 'freelancer') == {
+        'rating_count': 2, 'average_rating': Decimal('4.50'), 'histogram': {1: 0, 2: 0, 3: 0, 4: 1, 5: 1}}
+    assert evaluation_service.get_rating_aggregate(both, EvaluatorRoleEnum.employer) == {
+        'rating_count': 1, 'average_rating': Decimal('2.00'), 'histogram': {1: 0, 2: 1, 3: 0, 4: 0, 5: 0}}
+    assert evaluation_service.get_rating_aggregate(employer, 'employer')['rating_count'] == 0
+
+    _, averages = _snapshot()
+    assert averages[('FreelancerProfile', both)] == Decimal('4.50')
+    assert averages[('EmployerProfile', both)] == Decimal('2.00')
+    assert averages[('EmployerProfile', employer)] is None
+
+
+@pytest.mark.parametrize('rating', [True, False, 0, 6, 4.5, '5', None])
+def test_invalid_ratings_are_rejected(users, rating):
+    both, employer, _ = users
+    with pytest.raises(InvalidUsageException):
+        _rate(employer, employer, both, rating)
+    assert Evaluation.query.count() == 0
+    assert UserRatingAggregate.query.count() == 0
+
+
+def test_first_rating_race_falls_back_to_update(users, monkeypatch):
+    both, employer, _ = users
+    _rate(employer, employer, both, 3)
+
+    # 模拟并发：本请求的条件 UPDATE 未命中，随后插入时统计行已由另一请求创建
+    original_update = Query.update
+    misses = []
+
+    def update(self, values, **kwargs):
+        if not misses:
+            misses.append(True)
+            return 0
+        return original_update(self, values, **kwargs)
+
+    monkeypatch.setattr(Query, 'update', update)
+    _rate(employer, employer, both, 5)
+
+    assert misses == [True]
+    aggregates, averages = _snapshot()
+    assert aggregates[(both, EvaluatorRoleEnum.freelancer)] == (2, 8, {1: 0, 2: 0, 3: 1, 4: 0, 5: 1})
+    assert averages[('FreelancerProfile', both)] == Decimal('4.00')
+    assert Evaluation.query.count() == 2
+
+
+def test_rebuild_matches_incremental_aggregates(users):
+    both, employer, freelancer = users
+    for evaluator, order_employer, order_freelancer, rating in (
+            (employer, employer, both, 5), (employer, employer, both, 2), (employer, employer, freelancer, 1),
+            (freelancer, both, freelancer, 4), (both, both, freelancer, 3), (freelancer, employer, freelancer, 5)):
+        _rate(evaluator, order_employer, order_freelancer, rating)
+    incremental = _snapshot()
+
+    # 人为破坏统计与档案后重建
+    UserRatingAggregate.query.delete()
+    FreelancerProfile.query.update({'average_rating': Decimal('1.00')})
+    _db.session.commit()
+
+    assert evaluation_service.rebuild_rating_aggregates() == len(incremental[0])
+    assert _snapshot() == incremental
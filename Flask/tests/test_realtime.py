@@ -0,0 +1,105 @@
+"""实时推送测试 (进程内后端 + SQLite 内存库，无需启动服务)"""
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app.core.extensions import db as _db
+from app.models.user import User
+from app.services.communication_service import message_service, notification_service
+from app.services.realtime_service import InMemoryRealtimeBroker, realtime_service
+
+
+@pytest.fixture()
+def realtime_app(sqlite_app, monkeypatch):
+    sqlite_app.config.update(REALTIME_BACKEND='memory', REALTIME_HEARTBEAT_SECONDS=0.05, REALTIME_STREAM_MAX_SECONDS=0.2)
+    # 每个测试使用独立的事件历史
+    monkeypatch.setattr(realtime_service, '_broker', InMemoryRealtimeBroker(history_size=3))
+    monkeypatch.setattr(realtime_service, '_backend_name', 'memory')
+    return sqlite_app
+
+
+@pytest.fixture()
+def users(realtime_app):
+    users = [User(phone_number=f'1380000020{index}', password_hash='x', current_role='freelancer',
+                  available_roles=['freelancer'], status='active') for index in range(2)]
+    _db.session.add_all(users)
+    _db.session.commit()
+    return [user.id for user in users]
+
+
+def test_broker_replays_events_after_last_event_id():
+    broker = InMemoryRealtimeBroker(history_size=3)
+    subscription = broker.subscribe(1)
+    first = broker.publish(1, 'message', {'n': 1})
+    broker.publish(2, 'message', {'n': 'other user'})
+    second = broker.publish(1, 'message', {'n': 2})
+
+    assert subscription.get(timeout=0.1) == first
+    assert subscription.get(timeout=0.1) == second
+    assert subscription.get(timeout=0.01) is None
+    assert broker.replay(1, first['id']) == ([second], True)
+
+    # 历史已淘汰最早的事件，或事件ID无法识别时需要重新同步
+    for n in range(3, 6):
+        broker.publish(1, 'message', {'n': n})
+    assert broker.replay(1, first['id'])[1] is False
+    assert broker.replay(1, 10_000) == ([], False)
+    subscription.close()
+    assert not broker._subscribers
+
+
+def test_broker_evicts_idle_history_after_replay_window(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('app.services.realtime_service.time.monotonic', lambda: clock[0])
+    broker = InMemoryRealtimeBroker(history_size=3, history_ttl=60)
+    online = broker.subscribe(1)
+    stale = broker.publish(2, 'message', {'n': 'offline user'})
+    broker.publish(1, 'message', {'n': 'online user'})
+
+    clock[0] += 61
+    latest = broker.publish(3, 'message', {'n': 'new user'})
+
+    # 离线且超过补发窗口的用户历史被清理，在线用户保留
+    assert set(broker._history) == {1, 3}
+    assert broker.replay(2, stale['id'] - 1) == ([], False)
+    assert broker.replay(3, stale['id']) == ([latest], True)
+    online.close()
+    clock[0] += 61
+    broker.publish(3, 'message', {'n': 'again'})
+    assert set(broker._history) == {3}
+
+
+def test_stream_sends_replay_live_events_and_heartbeats(users):
+    alice, bob = users
+    missed = message_service.send_new_message(alice, {'recipient_id': bob, 'content': 'while offline'})
+    stream = realtime_service.stream(bob, last_event_id=0)
+
+    assert next(stream) == 'retry: 3000\n\n'
+    replayed = next(stream)
+    assert replayed.startswith('id: 1\nevent: message\n')
+    assert f'"id":{missed.id}' in replayed and '"content":"while offline"' in replayed
+
+    notification_service.create_notification(bob, {'title': '新通知', 'content': 'x'})
+    live = next(stream)
+    assert live.startswith('id: 2\nevent: notification\n') and '"title":"新通知"' in live
+    rest = list(stream)
+    assert rest and all(chunk == ': heartbeat\n\n' for chunk in rest)
+
+
+def test_stream_requests_resync_for_unknown_event_id(users):
+    chunks = list(realtime_service.stream(users[0], last_event_id=99))
+    assert chunks[1] == 'event: resync\ndata: {}\n\n'
+
+
+def test_stream_endpoint_accepts_query_token(users, realtime_app):
+    alice, bob = users
+    message_service.send_new_message(alice, {'recipient_id': bob, 'content': 'hello'})
+    token = create_access_token(identity=_db.session.get(User, bob).uuid)
+
+    response = realtime_app.test_client().get(f'/api/v1/communications/stream?jwt={token}',
+                                              headers={'Last-Event-ID': '0'})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    body = response.get_data(as_text=True)
+    assert 'event: message' in body and '"content":"hello"' in body
+    assert realtime_app.test_client().get('/api/v1/communications/stream').status_code == 401
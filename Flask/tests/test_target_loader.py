@@ -0,0 +1,152 @@
+"""收藏/举报目标批量加载测试 (SQLite 内存库，无需启动服务)"""
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.core.extensions import db as _db
+from app.models.favorite import Favorite, FavoriteTypeEnum
+from app.models.job import Job
+from app.models.message import Message
+from app.models.order import Evaluation, EvaluatorRoleEnum, Order
+from app.models.profile import EmployerProfile, EmployerProfileTypeEnum, FreelancerProfile
+from app.models.report import Report, ReportTypeEnum
+from app.models.user import User
+from app.services.admin_dispute_report_service import admin_report_service
+from app.services.favorite_service import favorite_service
+
+
+@pytest.fixture()
+def statements(sqlite_app):
+    """记录执行的 SELECT 语句"""
+    recorded = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            recorded.append(statement)
+
+    event.listen(_db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield recorded
+    event.remove(_db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _queries_by_table(statements):
+    """按主表 (第一个 FROM) 统计查询条数"""
+    counts = {}
+    for statement in statements:
+        table = re.search(r'\bFROM (\w+)', statement).group(1)
+        counts[table] = counts.get(table, 0) + 1
+    return counts
+
+
+def _seed_targets(count):
+    """创建 count 组目标：雇主发布的工作、零工、订单、消息、评价"""
+    now = datetime.utcnow()
+    targets = []
+    for index in range(count):
+        employer = User(phone_number=f'13900{count:02d}{index:04d}', password_hash='x', current_role='employer',
+                        available_roles=['employer'], status='active')
+        freelancer = User(phone_number=f'13800{count:02d}{index:04d}', password_hash='x', current_role='freelancer',
+                          available_roles=['freelancer'], status='active')
+        _db.session.add_all([employer, freelancer])
+        _db.session.flush()
+        _db.session.add_all([EmployerProfile(user_id=employer.id, profile_type=EmployerProfileTypeEnum.individual,
+                                             nickname=f'Employer {index}'),
+                             FreelancerProfile(user_id=freelancer.id, nickname=f'Freelancer {index}')])
+        job = Job(employer_user_id=employer.id, title=f'Job {index}', description='A job description long enough.',
+                  job_category='warehouse', location_address='Somewhere', start_time=now + timedelta(days=1),
+                  end_time=now + timedelta(days=2), salary_amount=100, salary_type='daily')
+        _db.session.add(job)
+        _db.session.flush()
+        order = Order(job_id=job.id, freelancer_user_id=freelancer.id, employer_user_id=employer.id, order_amount=100,
+                      platform_fee=10, freelancer_income=90, start_time_scheduled=job.start_time,
+                      end_time_scheduled=job.end_time, status='completed')
+        _db.session.add(order)
+        _db.session.flush()
+        message = Message(sender_id=employer.id, recipient_id=freelancer.id,
+                          conversation_id=f'{employer.id}_{freelancer.id}', content=f'Message {index}')
+        evaluation = Evaluation(order_id=order.id, job_id=job.id, evaluator_user_id=employer.id,
+                                evaluatee_user_id=freelancer.id, evaluator_role=EvaluatorRoleEnum.employer, rating=4)
+        _db.session.add_all([message, evaluation])
+        _db.session.flush()
+        targets.append({'employer': employer.id, 'freelancer': freelancer.id, 'job': job.id, 'order': order.id,
+                        'message': message.id, 'evaluation': evaluation.id})
+    return targets
+
+
+@pytest.fixture()
+def collector(sqlite_app):
+    user = User(phone_number='13700000000', password_hash='x', current_role='freelancer',
+                available_roles=['freelancer'], status='active')
+    _db.session.add(user)
+    _db.session.commit()
+    return user.id
+
+
+def _add_favorites(user_id, targets):
+    for target in targets:
+        _db.session.add_all([Favorite(user_id=user_id, favorite_type=FavoriteTypeEnum.job, target_id=target['job']),
+                             Favorite(user_id=user_id, favorite_type=FavoriteTypeEnum.freelancer, target_id=target['freelancer']),
+                             Favorite(user_id=user_id, favorite_type=FavoriteTypeEnum.employer, target_id=target['employer'])])
+    _db.session.commit()
+    # 清空会话，避免身份映射中已加载的对象掩盖懒加载查询
+    _db.session.expunge_all()
+
+
+def _add_reports(reporter_id, targets):
+    for target in targets:
+        for report_type, target_id in ((ReportTypeEnum.job, target['job']), (ReportTypeEnum.user, target['freelancer']),
+                                       (ReportTypeEnum.order, target['order']), (ReportTypeEnum.message, target['message']),
+                                       (ReportTypeEnum.evaluation, target['evaluation'])):
+            _db.session.add(Report(reporter_user_id=reporter_id, report_type=report_type, target_id=target_id,
+                                   reason_category='spam'))
+    _db.session.commit()
+    _db.session.expunge_all()
+
+
+def test_favorite_list_loads_each_target_type_once(collector, statements):
+    _add_favorites(collector, _seed_targets(2))
+    statements.clear()
+    favorites = favorite_service.get_my_favorites_list(collector, per_page=50)
+    small = _queries_by_table(statements)
+
+    details = sorted((f.target_details['type'], f.target_details.get('title') or f.target_details.get('nickname'))
+                     for f in favorites.items)
+    assert details == [('employer', 'Employer 0'), ('employer', 'Employer 1'), ('freelancer', 'Freelancer 0'),
+                       ('freelancer', 'Freelancer 1'), ('job', 'Job 0'), ('job', 'Job 1')]
+    # 工作一条 (连带雇主及雇主档案)，零工与雇主合并为一条 users 查询，档案各一条 selectin 查询
+    assert small['jobs'] == 1 and small['users'] == 1
+    assert small['freelancer_profiles'] == 1 and small['employer_profiles'] == 1
+    assert all(' IN (' in s for s in statements if re.search(r'\bFROM (jobs|users|\w+_profiles)\b', s))
+
+    # 收藏数量增加后查询条数不变
+    _add_favorites(collector, _seed_targets(5))
+    statements.clear()
+    favorites = favorite_service.get_my_favorites_list(collector, per_page=50)
+    assert len(favorites.items) == 21
+    assert _queries_by_table(statements) == small
+
+
+def test_admin_report_list_loads_each_target_type_once(collector, statements):
+    _add_reports(collector, _seed_targets(2))
+    statements.clear()
+    reports = admin_report_service.get_pending_reports(per_page=50)
+    small = _queries_by_table(statements)
+
+    summaries = {report.target_summary for report in reports.items}
+    assert '工作：Job 0 (ID: 1)' in summaries
+    assert '订单：Job 1 (订单ID: 2)' in summaries
+    assert '消息：Message 0 (ID: 1)' in summaries
+    assert '评价 ID: 2, 评分: 4' in summaries
+    assert not any('未知类型' in summary or '出错' in summary for summary in summaries)
+    for table in ('jobs', 'users', 'orders', 'messages', 'evaluations'):
+        assert small[table] == 1, table
+        assert ' IN (' in next(s for s in statements if re.search(rf'\bFROM {table}\b', s))
+
+    # 举报数量增加后查询条数不变
+    _add_reports(collector, _seed_targets(5))
+    statements.clear()
+    reports = admin_report_service.get_pending_reports(per_page=50)
+    assert len(reports.items) == 35
+    assert _queries_by_table(statements) == small
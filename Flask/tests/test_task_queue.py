@@ -0,0 +1,143 @@
+"""后台任务队列测试 (数据库后端 + SQLite 内存库，无需外部 broker)"""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.extensions import db as _db
+from app.models.system import BackgroundTask
+from app.services.task_queue import TaskWorker, task, task_queue
+from app.utils.exceptions import InvalidUsageException
+
+calls = []
+failures_left = {}
+
+
+@task(name='tests.record')
+def record(value, suffix=''):
+    calls.append(f"{value}{suffix}")
+
+
+@task(name='tests.flaky', max_attempts=3)
+def flaky(key):
+    if failures_left.get(key, 0) > 0:
+        failures_left[key] -= 1
+        raise RuntimeError(f"{key} failed")
+    calls.append(key)
+
+
+@task(name='tests.invalid')
+def invalid():
+    raise InvalidUsageException("bad input")
+
+
+@pytest.fixture()
+def queue_app(sqlite_app):
+    calls.clear()
+    failures_left.clear()
+    return sqlite_app
+
+
+def _make_due(task_id):
+    _db.session.query(BackgroundTask).filter_by(id=task_id).update({'run_at': datetime.utcnow() - timedelta(seconds=1)})
+    _db.session.commit()
+
+
+def test_delayed_task_runs_in_worker_and_direct_call_runs_inline(queue_app):
+    record('inline')
+    task_id = record.delay('queued', suffix='!')
+    assert calls == ['inline']
+    assert task_queue.get(task_id)['status'] == 'queued'
+    assert task_queue.backlog() == 1
+
+    assert task_queue.run_pending() == 1
+    assert calls == ['inline', 'queued!']
+    stored = task_queue.get(task_id)
+    assert (stored['status'], stored['attempts'], stored['finished_at'] is not None) == ('succeeded', 1, True)
+    assert task_queue.run_pending() == 0
+
+
+def test_idempotency_key_enqueues_once_and_countdown_defers(queue_app):
+    first = record.apply_async(('once',), idempotency_key='record:once')
+    assert record.apply_async(('twice',), idempotency_key='record:once') == first
+    later = record.apply_async(('later',), countdown=60)
+
+    assert task_queue.run_pending() == 1
+    assert calls == ['once']
+    assert task_queue.get(later)['status'] == 'queued'
+
+    with pytest.raises(TypeError):
+        record.delay(object())
+
+
+def test_failures_retry_with_backoff_until_max_attempts(queue_app, monkeypatch):
+    monkeypatch.setitem(queue_app.config, 'TASK_QUEUE_RETRY_BACKOFF_SECONDS', 100)
+    failures_left.update(recovers=1, broken=5)
+    recovers = flaky.delay('recovers')
+    broken = flaky.delay('broken')
+
+    assert task_queue.run_pending() == 2
+    retried = task_queue.get(recovers)
+    assert (retried['status'], retried['attempts']) == ('queued', 1)
+    assert 'recovers failed' in retried['last_error']
+    assert 50 <= (retried['run_at'] - datetime.utcnow()).total_seconds() <= 100
+    # 退避期间不会被领取
+    assert task_queue.run_pending() == 0
+
+    for attempt in (2, 3):
+        _make_due(recovers)
+        _make_due(broken)
+        task_queue.run_pending()
+    assert calls == ['recovers']
+    assert (task_queue.get(recovers)['status'], task_queue.get(recovers)['attempts']) == ('succeeded', 2)
+    exhausted = task_queue.get(broken)
+    assert (exhausted['status'], exhausted['attempts']) == ('failed', 3)
+
+
+def test_business_errors_and_unknown_tasks_fail_without_retry(queue_app):
+    invalid_id = invalid.delay()
+    unknown_id = task_queue.enqueue('tests.missing')
+
+    assert task_queue.run_pending() == 2
+    assert (task_queue.get(invalid_id)['status'], task_queue.get(invalid_id)['attempts']) == ('failed', 1)
+    assert 'bad input' in task_queue.get(invalid_id)['last_error']
+    assert 'tests.missing' in task_queue.get(unknown_id)['last_error']
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(queue_app):
+    task_id = record.delay('crashed')
+    backend = task_queue._get_backend()
+    claimed = backend.claim('worker-a', 300)
+    assert claimed.id == task_id
+    assert backend.claim('worker-b', 300) is None
+
+    # worker-a 崩溃，租约到期后由 worker-b 重新执行
+    _make_due(task_id)
+    assert task_queue.run_pending(worker_id='worker-b') == 1
+    assert calls == ['crashed']
+    assert task_queue.get(task_id)['attempts'] == 2
+    assert backend.complete(task_id, 'worker-a') is False
+
+
+def test_threaded_worker_drains_the_queue(queue_app):
+    task_ids = [record.delay(index) for index in range(5)]
+    worker = TaskWorker(queue_app, concurrency=2, poll_seconds=0.05)
+    worker.start()
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline and any(task_queue.get(task_id)['status'] != 'succeeded' for task_id in task_ids):
+        time.sleep(0.05)
+    worker.stop(timeout=5)
+
+    assert sorted(calls) == ['0', '1', '2', '3', '4']
+
+
+def test_purge_removes_old_succeeded_tasks(queue_app, monkeypatch):
+    done = record.delay('done')
+    failed = invalid.delay()
+    task_queue.run_pending()
+    _db.session.query(BackgroundTask).update({'finished_at': datetime.utcnow() - timedelta(days=8)})
+    _db.session.commit()
+
+    assert task_queue.purge() == 1
+    assert task_queue.get(done) is None
+    assert task_queue.get(failed)['status'] == 'failed'
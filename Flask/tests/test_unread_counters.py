@@ -0,0 +1,75 @@
+"""未读数计数测试 (SQLite 内存库，无需启动服务)"""
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app.core.extensions import db as _db
+from app.models.notification import Notification, UnreadCounter
+from app.models.user import User
+from app.services.communication_service import message_service, notification_service
+from app.services.unread_counter_service import unread_counter_service
+
+
+@pytest.fixture()
+def users(sqlite_app):
+    users = [User(phone_number=f'1380000010{index}', password_hash='x', current_role='freelancer',
+                  available_roles=['freelancer'], status='active') for index in range(3)]
+    _db.session.add_all(users)
+    _db.session.commit()
+    return [user.id for user in users]
+
+
+def test_notification_counters_follow_writes_and_reads(users):
+    alice, bob, carol = users
+    first = notification_service.create_notification(alice, {'title': 'One', 'content': 'x'})
+    notification_service.create_notifications_bulk([alice, bob], {'title': 'Two', 'content': 'x'})
+    notification_service.create_notifications_bulk(notification_service.broadcast_audience_query('all'),
+                                                   {'title': 'Three', 'content': 'x'}, chunk_size=2)
+
+    assert unread_counter_service.get_summary(alice) == {'notifications': 3, 'messages': 0, 'total': 3}
+    assert unread_counter_service.get_summary(bob)['notifications'] == 2
+    assert unread_counter_service.get_summary(carol)['notifications'] == 1
+
+    notification_service.mark_notification_read(alice, first.id)
+    notification_service.mark_notification_read(alice, first.id)
+    assert unread_counter_service.get_summary(alice)['notifications'] == 2
+
+    notification_service.mark_all_my_notifications_read(alice)
+    assert unread_counter_service.get_summary(alice)['notifications'] == 0
+
+
+def test_message_counters_follow_send_and_read(users):
+    alice, bob, _ = users
+    message = message_service.send_new_message(alice, {'recipient_id': bob, 'content': 'hi'})
+    message_service.send_new_message(alice, {'recipient_id': bob, 'content': 'again'})
+
+    assert unread_counter_service.get_summary(bob) == {'notifications': 0, 'messages': 2, 'total': 2}
+    assert unread_counter_service.get_summary(alice)['messages'] == 0
+
+    message_service.get_messages_in_conversation(bob, message.conversation_id)
+    assert unread_counter_service.get_summary(bob)['messages'] == 0
+
+
+def test_reconcile_fixes_drift(users):
+    alice, bob, _ = users
+    notification_service.create_notifications_bulk([alice, bob], {'title': 'Drift', 'content': 'x'})
+    # 绕过服务层的批量修改不会更新计数
+    Notification.query.filter_by(user_id=alice).update({'is_read': True})
+    _db.session.query(UnreadCounter).filter_by(user_id=bob).delete()
+    _db.session.commit()
+
+    assert unread_counter_service.reconcile(batch_size=2) == 2
+    assert unread_counter_service.get_summary(alice)['notifications'] == 0
+    assert unread_counter_service.get_summary(bob)['notifications'] == 1
+    assert unread_counter_service.reconcile() == 0
+
+
+def test_unread_summary_endpoint(users, sqlite_app):
+    alice = users[0]
+    notification_service.create_notification(alice, {'title': 'Badge', 'content': 'x'})
+    token = create_access_token(identity=_db.session.get(User, alice).uuid)
+
+    response = sqlite_app.test_client().get('/api/v1/communications/unread-summary',
+                                             headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 200
+    assert response.get_json()['data'] == {'notifications': 1, 'messages': 0, 'total': 1}
@@ -0,0 +1,273 @@
+"""钱包记账引擎测试 (SQLite 文件库，并发测试需要多个连接)"""
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.core.extensions import db as _db
+from app.models.dispute import Dispute, DisputeStatusEnum
+from app.models.job import Job, JobStatusEnum
+from app.models.order import Order, Payment
+from app.models.system import SchedulerLease
+from app.models.user import User
+from app.models.wallet import PlatformEscrowShard, TransactionTypeEnum, UserWallet, WalletTransaction
+from app.services.admin_dispute_report_service import admin_dispute_service
+from app.services.escrow_consolidation import LEASE_NAME, escrow_consolidation
+from app.services.payment_wallet_service import payment_service
+from app.services.scheduler_lease import scheduler_lease_service
+from app.services.wallet_ledger import LedgerEntry, wallet_ledger
+from app.utils.exceptions import InsufficientFundsException, InvalidUsageException
+
+ESCROW_USER_ID = 1
+
+
+@pytest.fixture()
+def sqlite_config(tmp_path):
+    return {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'ledger.db'}",
+            'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': 30}},
+            'PLATFORM_ESCROW_USER_ID': ESCROW_USER_ID, 'PLATFORM_ESCROW_SHARDS': 4}
+
+
+@pytest.fixture()
+def wallets(sqlite_app):
+    """平台托管账户 (余额0) 与一个余额 50.00 的用户钱包"""
+    users = [User(phone_number=f'1380000098{index}', password_hash='x', current_role='freelancer', available_roles=['freelancer'])
+             for index in range(2)]
+    _db.session.add_all(users)
+    _db.session.commit()
+    escrow_id, user_id = users[0].id, users[1].id
+    assert escrow_id == ESCROW_USER_ID
+    _db.session.add_all([UserWallet(user_id=escrow_id, balance=Decimal('0.00')),
+                         UserWallet(user_id=user_id, balance=Decimal('50.00'))])
+    _db.session.commit()
+    return escrow_id, user_id
+
+
+def _balances(user_id):
+    _db.session.expire_all()
+    wallet = _db.session.get(UserWallet, user_id)
+    return wallet.balance, wallet.frozen_balance
+
+
+def _transactions(user_id):
+    return WalletTransaction.query.filter_by(user_id=user_id).order_by(WalletTransaction.id.asc()).all()
+
+
+def test_overdraft_is_rejected_without_side_effects(wallets):
+    _, user_id = wallets
+    with pytest.raises(InsufficientFundsException):
+        wallet_ledger.post_entries([LedgerEntry(user_id, TransactionTypeEnum.payment, balance_delta=-60)])
+    _db.session.rollback()
+
+    assert _balances(user_id) == (Decimal('50.00'), Decimal('0.00'))
+    assert _transactions(user_id) == []
+
+    wallet_ledger.post_entries([LedgerEntry(user_id, TransactionTypeEnum.payment, balance_delta=-50)])
+    _db.session.commit()
+    assert _balances(user_id)[0] == Decimal('0.00')
+    assert _transactions(user_id)[-1].balance_after == Decimal('0.00')
+
+
+def test_failed_entry_rolls_back_the_whole_batch(wallets):
+    escrow_id, user_id = wallets
+    with pytest.raises(InsufficientFundsException):
+        wallet_ledger.post_entries([
+            LedgerEntry(user_id, TransactionTypeEnum.payment, balance_delta=-40),
+            LedgerEntry(user_id, TransactionTypeEnum.platform_fee, balance_delta=-20),
+        ])
+    _db.session.rollback()
+    assert _balances(user_id)[0] == Decimal('50.00')
+    assert _transactions(user_id) == []
+
+
+def test_frozen_balance_moves_and_underflow(wallets):
+    _, user_id = wallets
+    # 提现申请: 可用余额转入冻结
+    wallet_ledger.post_entries([LedgerEntry(user_id, TransactionTypeEnum.withdrawal, balance_delta=-30, frozen_delta=30)])
+    _db.session.commit()
+    assert _balances(user_id) == (Decimal('20.00'), Decimal('30.00'))
+
+    # 冻结金额不足时拒绝，且不影响可用余额
+    with pytest.raises(InsufficientFundsException, match='冻结金额不足'):
+        wallet_ledger.post_entries([LedgerEntry(user_id, TransactionTypeEnum.withdrawal, frozen_delta=-31, amount=-31)])
+    _db.session.rollback()
+    assert _balances(user_id) == (Decimal('20.00'), Decimal('30.00'))
+
+    # 提现完成: 冻结金额扣除，流水余额快照为可用余额
+    wallet_ledger.post_entries([LedgerEntry(user_id, TransactionTypeEnum.withdrawal, frozen_delta=-30, amount=-30)])
+    _db.session.commit()
+    assert _balances(user_id) == (Decimal('20.00'), Decimal('0.00'))
+    assert [t.balance_after for t in _transactions(user_id)] == [Decimal('20.00'), Decimal('20.00')]
+
+
+def test_escrow_balance_after_tracks_each_shard(wallets):
+    escrow_id, _ = wallets
+    for order_id, amount in ((1, 10), (2, 20), (5, 5)): # 4 个子账户: 订单 1、5 -> 子账户 1，订单 2 -> 子账户 2
+        wallet_ledger.post_entries([LedgerEntry(escrow_id, TransactionTypeEnum.income, balance_delta=amount,
+                                                related_order_id=order_id)])
+        _db.session.commit()
+
+    credits = _transactions(escrow_id)
+    assert [(t.escrow_shard_id, t.balance_after) for t in credits] == [
+        (1, Decimal('10.00')), (2, Decimal('20.00')), (1, Decimal('15.00'))]
+    assert {s.shard_id: s.balance for s in PlatformEscrowShard.query.all()} == {1: Decimal('15.00'), 2: Decimal('20.00')}
+    assert wallet_ledger.get_escrow_balance() == Decimal('35.00')
+
+    # 出账超过托管逻辑余额: 归集后仍不足，整体回滚
+    with pytest.raises(InsufficientFundsException):
+        wallet_ledger.post_entries([LedgerEntry(escrow_id, TransactionTypeEnum.refund, balance_delta=-40, related_order_id=1)])
+    _db.session.rollback()
+    assert wallet_ledger.get_escrow_balance() == Decimal('35.00')
+
+    # 出账时先归集子账户到平台钱包，再扣减
+    wallet_ledger.post_entries([LedgerEntry(escrow_id, TransactionTypeEnum.refund, balance_delta=-30, related_order_id=1)])
+    _db.session.commit()
+    consolidation, refund = _transactions(escrow_id)[-2:]
+    assert (consolidation.escrow_shard_id, consolidation.balance_after) == (None, Decimal('35.00'))
+    assert (refund.escrow_shard_id, refund.balance_after) == (None, Decimal('5.00'))
+    assert wallet_ledger.get_escrow_balance() == Decimal('5.00')
+
+
+
+def test_scheduled_consolidation_runs_under_lease(wallets):
+    escrow_id, _ = wallets
+    for order_id, amount in ((1, 10), (2, 20)):
+        wallet_ledger.post_entries([LedgerEntry(escrow_id, TransactionTypeEnum.income, balance_delta=amount,
+                                                related_order_id=order_id)])
+        _db.session.commit()
+
+    # 其他节点持有租约时跳过
+    assert scheduler_lease_service.acquire(LEASE_NAME, 'other-node', 60)
+    assert escrow_consolidation.run_once()['acquired'] is False
+    assert _balances(escrow_id)[0] == Decimal('0.00')
+
+    # 租约到期后接管，子账户余额归集到平台钱包，托管逻辑余额不变
+    _db.session.query(SchedulerLease).update({'expires_at': datetime.utcnow() - timedelta(seconds=1)})
+    _db.session.commit()
+    stats = escrow_consolidation.run_once()
+    assert (stats['acquired'], stats['moved'], stats['escrow_balance']) == (True, Decimal('30.00'), Decimal('30.00'))
+    assert _balances(escrow_id)[0] == Decimal('30.00')
+    assert {s.shard_id: s.balance for s in PlatformEscrowShard.query.all()} == {1: Decimal('0.00'), 2: Decimal('0.00')}
+    assert _transactions(escrow_id)[-1].balance_after == Decimal('30.00')
+
+    # 没有待归集余额时不写流水；执行结束后释放租约
+    assert escrow_consolidation.run_once()['moved'] == Decimal('0.00')
+    assert len(_transactions(escrow_id)) == 3
+    assert scheduler_lease_service.acquire(LEASE_NAME, 'third-node', 60)
+
+def test_concurrent_debits_never_overdraw(sqlite_app, wallets):
+    _, user_id = wallets
+    _db.session.remove()
+    results = []
+    barrier = threading.Barrier(10)
+
+    def debit():
+        with sqlite_app.app_context():
+            barrier.wait()
+            try:
+                wallet_ledger.post_entries([LedgerEntry(user_id, TransactionTypeEnum.payment, balance_delta=-10)])
+                _db.session.commit()
+                results.append('ok')
+            except InsufficientFundsException:
+                _db.session.rollback()
+                results.append('insufficient')
+            finally:
+                _db.session.remove()
+
+    threads = [threading.Thread(target=debit) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == ['insufficient'] * 5 + ['ok'] * 5
+    assert _balances(user_id)[0] == Decimal('0.00')
+    # 每条流水的余额快照都是各自记账后的余额，没有重复或丢失
+    assert sorted(t.balance_after for t in _transactions(user_id)) == [Decimal(v) for v in ('0.00', '10.00', '20.00', '30.00', '40.00')]
+
+
+
+def _order_with_payment(employer_id, status, payment_status='pending'):
+    """雇主 employer_id 的订单 (金额 100.00) 及其托管支付记录"""
+    freelancer = User(phone_number=f'1390000{_db.session.query(User).count():04d}', password_hash='x',
+                      current_role='freelancer', available_roles=['freelancer'])
+    _db.session.add(freelancer)
+    _db.session.flush()
+    now = datetime.utcnow()
+    job = Job(employer_user_id=employer_id, title='Job', description='A job description long enough.',
+              job_category='warehouse', location_address='Somewhere', start_time=now, end_time=now + timedelta(hours=8),
+              salary_amount=100, salary_type='daily', status=JobStatusEnum.active)
+    _db.session.add(job)
+    _db.session.flush()
+    order = Order(job_id=job.id, freelancer_user_id=freelancer.id, employer_user_id=employer_id, order_amount=100,
+                  platform_fee=10, freelancer_income=90, start_time_scheduled=job.start_time,
+                  end_time_scheduled=job.end_time, status=status)
+    _db.session.add(order)
+    _db.session.flush()
+    payment = Payment(order_id=order.id, payer_user_id=employer_id, payee_user_id=ESCROW_USER_ID, amount=100,
+                      payment_method='wechat_pay', status=payment_status, internal_transaction_id=f'pay_{order.id}')
+    _db.session.add(payment)
+    _db.session.commit()
+    return order.id, payment.internal_transaction_id
+
+
+def test_payment_webhook_posts_to_ledger_and_starts_order(wallets):
+    escrow_id, employer_id = wallets
+    order_id, transaction_id = _order_with_payment(employer_id, 'pending_start')
+
+    payload = {'internal_transaction_id': transaction_id, 'status': 'success', 'external_transaction_id': 'ext-1'}
+    assert payment_service.handle_payment_webhook(payload) is True
+
+    _db.session.expire_all()
+    payment = Payment.query.filter_by(internal_transaction_id=transaction_id).one()
+    order = _db.session.get(Order, order_id)
+    assert payment.status == 'succeeded' and payment.external_transaction_id == 'ext-1'
+    assert (order.status, order.version) == ('in_progress', 2)
+    assert wallet_ledger.get_escrow_balance() == Decimal('100.00')
+    # 托管支付只记雇主支出流水，不动用雇主钱包余额
+    assert _balances(employer_id)[0] == Decimal('50.00')
+    assert [(t.transaction_type, t.amount) for t in _transactions(employer_id)] == [(TransactionTypeEnum.payment, Decimal('-100.00'))]
+
+    # 重复回调幂等：返回成功但不再记账
+    assert payment_service.handle_payment_webhook(payload) is True
+    assert WalletTransaction.query.filter_by(related_payment_id=payment.id).count() == 2
+    assert wallet_ledger.get_escrow_balance() == Decimal('100.00')
+
+
+def test_manual_confirmation_keeps_finished_order_status(wallets):
+    _, employer_id = wallets
+    order_id, transaction_id = _order_with_payment(employer_id, 'completed')
+
+    payment = payment_service.confirm_payment_status(99, transaction_id, {'status': 'succeeded'})
+
+    assert payment.status == 'succeeded'
+    assert wallet_ledger.get_escrow_balance() == Decimal('100.00')
+    _db.session.expire_all()
+    order = _db.session.get(Order, order_id)
+    assert (order.status, order.version) == ('completed', 1)
+    with pytest.raises(InvalidUsageException):
+        payment_service.confirm_payment_status(99, transaction_id, {'status': 'succeeded'})
+
+
+def test_dispute_full_refund_cancels_order_and_refunds_through_ledger(wallets):
+    escrow_id, employer_id = wallets
+    order_id, transaction_id = _order_with_payment(employer_id, 'pending_start')
+    assert payment_service.handle_payment_webhook({'internal_transaction_id': transaction_id, 'status': 'success'})
+    _db.session.execute(Order.__table__.update().where(Order.id == order_id).values(status='disputed'))
+    dispute = Dispute(order_id=order_id, initiator_user_id=employer_id, reason='no show',
+                      status=DisputeStatusEnum.platform_intervening)
+    _db.session.add(dispute)
+    _db.session.flush()
+    dispute_id = dispute.id
+    _db.session.commit()
+
+    admin_dispute_service.mediate_dispute(None, dispute_id, {'status': 'resolved', 'resolution_result': 'refund',
+                                                             'resolution_action': 'full_refund'})
+
+    _db.session.expire_all()
+    assert _db.session.get(Order, order_id).status == 'cancelled'
+    assert wallet_ledger.get_escrow_balance() == Decimal('0.00')
+    assert _balances(employer_id)[0] == Decimal('150.00')
+    refund = Payment.query.filter_by(internal_transaction_id=f'refund_{transaction_id}').one()
+    assert (refund.status, refund.payer_user_id, refund.amount) == ('succeeded', escrow_id, Decimal('100.00'))